@@ -5,13 +5,15 @@ import sys
 # Add the modules directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from utils import tracing, memory_profile
+
 # Import all page modules
 try:
     from modules import (
         circular_column, rectangular_column, rect_column_footing, 
         circular_column_footing, sunshade, lintel, t_beam, l_beam,
         staircase, road_lsection, road_plan, road_cross_section,
-        pmgsy_road, bridge, rectangular_beam
+        pmgsy_road, bridge, rectangular_beam, estimate
     )
 except ImportError as e:
     st.error(f"Error importing modules: {str(e)}")
@@ -86,7 +88,8 @@ def main():
         
         misc_modules = [
             "🪜 Staircase",
-            "🌉 Bridge"
+            "🌉 Bridge",
+            "🧾 Quantity Estimate"
         ]
         
         road_modules = [
@@ -130,8 +133,29 @@ def main():
         *Modernized from RajLisp*
         """)
 
+        # Memory profiling toggle (opt-in; RAJLISP_MEMORY_PROFILE=1 turns it on by default)
+        memory_profiling = st.checkbox("🧠 Memory Profiling", value=memory_profile.enabled_by_default(),
+                                       key="memory_profiling",
+                                       help="Record peak memory and top allocation sites for each generation")
+
     # Page routing with enhanced UI
-    if page == "🏠 Home" or not 'page' in locals():
+    if memory_profiling:
+        with memory_profile.profile_session(page) as profile:
+            route_page(page)
+        if profile['phases']:
+            show_memory_profile(profile)
+    else:
+        route_page(page)
+
+    # Optional diagnostics panel - rendered last so it includes this run's spans
+    with st.sidebar:
+        st.markdown("---")
+        if st.checkbox("🩺 Show Diagnostics", value=False, key="show_diagnostics",
+                       help="Span timings for calculation, DXF, serialization and reports"):
+            show_diagnostics_panel()
+
+def route_page(page):
+    if page == "🏠 Home":
         show_home_page()
     elif page == "🔘 Circular Column":
         circular_column.page_circular_column()
@@ -155,6 +179,8 @@ def main():
         staircase.page_staircase()
     elif page == "🌉 Bridge":
         bridge.page_bridge()
+    elif page == "🧾 Quantity Estimate":
+        estimate.page_estimate()
 
     elif page == "🛣️ Road L-Section":
         road_lsection.page_road_lsection()
@@ -165,6 +191,47 @@ def main():
     elif page == "🛤️ PMGSY Road":
         pmgsy_road.page_pmgsy_road()
 
+def show_memory_profile(profile):
+    path = memory_profile.save_profile(profile)
+
+    with st.expander(f"🧠 Memory Profile - peak {profile['peak_kb']:.0f} KB", expanded=True):
+        st.dataframe(
+            [{'Span': p['span'], 'Peak (KB)': round(p['peak_kb'], 1), 'Retained (KB)': round(p['retained_kb'], 1),
+              'Time (ms)': round(p['duration_ms'], 1)} for p in profile['phases']],
+            hide_index=True, use_container_width=True
+        )
+        for phase in profile['phases']:
+            if phase['top_sites']:
+                st.markdown(f"**Top allocation sites - {phase['span']}**")
+                st.dataframe(
+                    [{'Site': t['site'], 'Size (KB)': round(t['size_kb'], 1), 'Blocks': t['count']}
+                     for t in phase['top_sites']],
+                    hide_index=True, use_container_width=True
+                )
+        st.caption(f"Saved to {path}")
+
+def show_diagnostics_panel():
+    stats = tracing.get_stats()
+
+    st.markdown("### 🩺 Diagnostics")
+    if not stats:
+        st.info("No spans recorded yet. Generate a design to collect timings.")
+        return
+
+    st.dataframe(
+        [{'Span': r['span'], 'Calls': r['count'], 'Mean (ms)': round(r['mean_ms'], 2),
+          'Max (ms)': round(r['max_ms'], 2), 'Total (ms)': round(r['total_ms'], 1),
+          'Errors': r['errors']} for r in stats],
+        hide_index=True, use_container_width=True
+    )
+
+    st.download_button("📄 Spans (JSON lines)", data=tracing.export_jsonl(),
+                       file_name="rajlisp_spans.jsonl", mime="application/jsonl")
+    st.download_button("📈 Metrics (Prometheus)", data=tracing.export_prometheus(),
+                       file_name="rajlisp_metrics.prom", mime="text/plain")
+    if st.button("🗑️ Reset Diagnostics"):
+        tracing.reset()
+
 def show_home_page():
     st.markdown('<div class="main-header"><h1>🏗️ RajLisp Structural Design Suite</h1><p>Professional CAD Tools for Civil Engineers</p></div>', unsafe_allow_html=True)
     
@@ -223,6 +290,7 @@ def show_home_page():
         st.markdown("""
         - **Staircase** - Stair design and detailing
         - **Bridge** - Bridge structural design
+        - **Quantity Estimate** - Project abstract of quantities and bar schedule
         - **Advanced features** - Load analysis & optimization
         - **Professional reports** - Detailed documentation
         """)
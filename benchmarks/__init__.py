@@ -0,0 +1,3 @@
+"""
+Performance benchmarks for RajLisp Structural Design Suite
+"""
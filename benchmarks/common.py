@@ -0,0 +1,131 @@
+"""
+Shared helpers for RajLisp benchmark scripts: result files and regression checks
+"""
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'baselines')
+
+
+def environment_info():
+    """Collect interpreter and library versions stored alongside results"""
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    for package in ('numpy', 'ezdxf', 'streamlit', 'pandas'):
+        try:
+            module = __import__(package)
+            info[package] = getattr(module, '__version__', 'unknown')
+        except ImportError:
+            info[package] = None
+    return info
+
+
+def load_module(qualified_name):
+    """Load a modules.*/utils.* file directly from its path
+
+    modules/__init__.py imports every page, so a single broken page would make
+    all of them unimportable. Loading each file on its own keeps the other
+    benchmarks running and reports the failure against the right module.
+    """
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    if qualified_name in sys.modules:
+        return sys.modules[qualified_name]
+
+    path = os.path.join(ROOT_DIR, *qualified_name.split('.')) + '.py'
+    spec = importlib.util.spec_from_file_location(qualified_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[qualified_name] = module
+    return module
+
+
+def write_results(path, results, suite):
+    """Write benchmark results as a JSON document"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    document = {
+        'suite': suite,
+        'environment': environment_info(),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return document
+
+
+def load_results(path):
+    """Load the results mapping of a benchmark JSON document (None if missing)"""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get('results', {})
+
+
+def compare_results(current, baseline, metrics):
+    """Compare results against a baseline
+
+    metrics maps a metric name to (relative_threshold, absolute_floor). A case
+    regresses when the metric grows by more than the relative threshold and by
+    more than the absolute floor (to ignore noise on very small numbers).
+    Cases that errored in either run are skipped.
+    """
+    regressions = []
+    for case, result in current.items():
+        base = baseline.get(case)
+        if not base or result.get('status') != 'ok' or base.get('status') != 'ok':
+            continue
+        for metric, (threshold, floor) in metrics.items():
+            new_value = result.get(metric)
+            old_value = base.get(metric)
+            if new_value is None or old_value is None:
+                continue
+            delta = new_value - old_value
+            if delta > floor and new_value > old_value * (1 + threshold):
+                regressions.append({
+                    'case': case,
+                    'metric': metric,
+                    'baseline': old_value,
+                    'current': new_value,
+                    'change_pct': (delta / old_value * 100) if old_value else float('inf'),
+                })
+    return regressions
+
+
+def print_table(results, columns):
+    """Print results as a plain text table"""
+    headers = ['case'] + [name for name, _ in columns]
+    rows = []
+    for case, result in results.items():
+        row = [case]
+        for name, fmt in columns:
+            value = result.get(name)
+            row.append(fmt.format(value) if isinstance(value, (int, float)) else str(value or '-')[:80])
+        rows.append(row)
+
+    widths = [max(len(str(r[i])) for r in rows + [headers]) for i in range(len(headers))]
+    print('  '.join(h.ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def report_regressions(regressions):
+    """Print regressions and return the process exit code"""
+    if not regressions:
+        print("\nNo regressions against baseline.")
+        return 0
+
+    print(f"\n{len(regressions)} regression(s) against baseline:", file=sys.stderr)
+    for reg in regressions:
+        print(f"  {reg['case']} [{reg['metric']}]: {reg['baseline']:.2f} -> {reg['current']:.2f} "
+              f"(+{reg['change_pct']:.1f}%)", file=sys.stderr)
+    return 1
@@ -0,0 +1,21 @@
+"""
+Streamlit entry point used by the load test: serves the module page named in
+the ?page=<module> query parameter, without the app.py sidebar
+"""
+import os
+import sys
+
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import load_module
+from benchmarks.startup import PAGES
+
+module = st.query_params.get('page', PAGES[0][1])
+functions = {mod: function for _, mod, function in PAGES}
+
+if module in functions:
+    getattr(load_module(f"modules.{module}"), functions[module])()
+else:
+    st.error(f"Unknown page: {module}")
@@ -0,0 +1,398 @@
+"""
+Concurrent-user load test for the RajLisp Streamlit app
+
+Starts a real Streamlit server (benchmarks/load_app.py, which serves one module
+page per ?page= query) and drives N simulated users against it over the
+browser websocket protocol. Each user opens a page, fills the form with a
+randomised but realistic parameter mix and submits it, over and over.
+
+For every concurrency level it reports submit latency percentiles, throughput
+and the resident memory of the server process, so the numbers show how one
+office server behaves as more people press "Generate" at the same time. A
+level with any failed submit is an error: it fails the run and is never
+written as a baseline.
+
+Usage:
+    python -m benchmarks.load_test                           # 1, 2, 4, 8, 16 users
+    python -m benchmarks.load_test --concurrency 1,4,16 --iterations 10
+    python -m benchmarks.load_test --only Column --update-baseline
+
+Requires the `websockets` package (installed with recent Streamlit releases).
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import (
+    ROOT_DIR, BASELINE_DIR, write_results, load_results, compare_results,
+    print_table, report_regressions
+)
+from benchmarks.startup import PAGES
+
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, 'load.json')
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16]
+LOAD_APP = os.path.join(ROOT_DIR, 'benchmarks', 'load_app.py')
+
+# Sampling period of the server memory monitor
+RSS_INTERVAL = 0.05
+
+
+def rss_kb(pid):
+    """Resident set size of a process in KB (None where /proc is not available)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return float(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class _RssMonitor:
+    """Background thread recording the highest server RSS seen while a level runs"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.start_kb = rss_kb(pid)
+        self.peak_kb = self.start_kb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_INTERVAL):
+            current = rss_kb(self.pid)
+            if current is not None and (self.peak_kb is None or current > self.peak_kb):
+                self.peak_kb = current
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end_kb = rss_kb(self.pid)
+        return False
+
+
+# --- Server -----------------------------------------------------------------
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(timeout=60):
+    """Launch load_app.py on a free port and wait until it answers the health check"""
+    port = _free_port()
+    log = tempfile.NamedTemporaryFile(prefix='rajlisp_load_', suffix='.log', delete=False)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', LOAD_APP,
+         '--server.headless=true', f'--server.port={port}', '--server.address=127.0.0.1',
+         '--server.fileWatcherType=none', '--browser.gatherUsageStats=false'],
+        cwd=ROOT_DIR, stdout=log, stderr=subprocess.STDOUT
+    )
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Streamlit server exited with code {proc.returncode}, see {log.name}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as resp:
+                if resp.status == 200:
+                    return proc, port, log.name
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"Streamlit server did not become healthy within {timeout}s, see {log.name}")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# --- Simulated user ---------------------------------------------------------
+
+def _snap(value, low, high, step):
+    """Clamp to [low, high] and round to the widget's step from its minimum"""
+    value = min(max(value, low), high)
+    if step:
+        value = low + round((value - low) / step) * step
+    return min(max(value, low), high)
+
+
+def randomize_inputs(widgets, rng):
+    """Widget states for a submit with every input perturbed around its default
+
+    Numbers move to between 0.75x and 1.5x of the default inside the widget
+    limits, selectboxes pick any option and sliders any position. The form's
+    submit button is triggered, or the first button on pages without a form.
+    """
+    from streamlit.proto.NumberInput_pb2 import NumberInput
+    from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+    states = WidgetStates()
+    for kind, proto in widgets:
+        if proto.disabled:
+            continue
+        if kind == 'number_input':
+            default = proto.default
+            low = proto.min if proto.has_min else default * 0.5
+            high = proto.max if proto.has_max else (default * 2 or 1)
+            value = _snap(default * rng.uniform(0.75, 1.5) if default else rng.uniform(low, high),
+                          low, high, proto.step)
+            if proto.data_type == NumberInput.INT:
+                value = int(value)
+            states.widgets.add(id=proto.id, double_value=value)
+        elif kind == 'selectbox' and proto.options:
+            states.widgets.add(id=proto.id, string_value=rng.choice(list(proto.options)))
+        elif kind == 'slider' and len(proto.default) == 1:
+            value = _snap(rng.uniform(proto.min, proto.max), proto.min, proto.max, proto.step)
+            states.widgets.add(id=proto.id).double_array_value.data.append(value)
+
+    buttons = [proto for kind, proto in widgets if kind == 'button']
+    submit = [proto for proto in buttons if proto.is_form_submitter] or buttons[:1]
+    for proto in submit:
+        states.widgets.add(id=proto.id, trigger_value=True)
+    return states
+
+
+class Session:
+    """One browser tab: runs the page script over an open websocket on demand"""
+
+    def __init__(self, ws, page, timeout):
+        self.ws = ws
+        self.page = page
+        self.timeout = timeout
+
+    def run(self, widget_states=None):
+        """Rerun the script and collect its widgets; returns (widgets, error)"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = f'page={self.page}'
+        if widget_states is not None:
+            msg.rerun_script.widget_states.CopyFrom(widget_states)
+        self.ws.send(msg.SerializeToString())
+
+        widgets, error = [], None
+        deadline = time.time() + self.timeout
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv(timeout=max(deadline - time.time(), 0.1)))
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception' and error is None:
+                    error = f"{element.exception.type}: {element.exception.message.splitlines()[0]}"
+                elif element_type in ('number_input', 'selectbox', 'slider', 'button'):
+                    widgets.append((element_type, getattr(element, element_type)))
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    widgets = []
+                    continue
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    error = error or "script compile error"
+                return widgets, error
+
+
+def run_session(port, page, rng, timeout):
+    """One simulated user: open a page, fill the form, submit; returns the request record"""
+    from websockets.sync.client import connect
+
+    label, module, _ = page
+    record = {'page': label, 'ok': False}
+    with connect(f'ws://127.0.0.1:{port}/_stcore/stream', subprotocols=['streamlit'],
+                 open_timeout=timeout, max_size=None) as ws:
+        session = Session(ws, module, timeout)
+        start = time.perf_counter()
+        widgets, error = session.run()
+        record['render_ms'] = (time.perf_counter() - start) * 1000
+        if error:
+            record['error'] = error
+            return record
+        if not any(kind == 'button' for kind, _ in widgets):
+            record['error'] = "page has no submit button"
+            return record
+
+        states = randomize_inputs(widgets, rng)
+        start = time.perf_counter()
+        _, error = session.run(states)
+        record['submit_ms'] = (time.perf_counter() - start) * 1000
+        if error:
+            record['error'] = error
+            return record
+
+    record['ok'] = True
+    return record
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _worker(port, pages, iterations, seed, timeout, barrier):
+    rng = random.Random(seed)
+    barrier.wait()
+    records = []
+    for _ in range(iterations):
+        page = rng.choice(pages)
+        try:
+            records.append(run_session(port, page, rng, timeout))
+        except Exception as exc:
+            records.append({'page': page[0], 'ok': False, 'error': f"{type(exc).__name__}: {exc}"})
+    return records
+
+
+def run_level(server, port, pages, users, iterations, seed, timeout):
+    """Run `users` concurrent users of `iterations` submits each and summarise them"""
+    barrier = threading.Barrier(users + 1)
+    with _RssMonitor(server.pid) as monitor, ThreadPoolExecutor(max_workers=users) as pool:
+        futures = [pool.submit(_worker, port, pages, iterations, seed * 1000 + i, timeout, barrier)
+                   for i in range(users)]
+        barrier.wait()
+        start = time.perf_counter()
+        records = [r for future in futures for r in future.result()]
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in records if r['ok']]
+    submit_ms = [r['submit_ms'] for r in ok]
+    render_ms = [r['render_ms'] for r in records if 'render_ms' in r]
+    errors = [r for r in records if not r['ok']]
+
+    result = {
+        'status': 'error' if errors else 'ok',
+        'users': users,
+        'requests': len(records),
+        'failed': len(errors),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(ok) / elapsed if elapsed else None,
+        'p50_ms': percentile(submit_ms, 50),
+        'p90_ms': percentile(submit_ms, 90),
+        'p95_ms': percentile(submit_ms, 95),
+        'p99_ms': percentile(submit_ms, 99),
+        'max_ms': max(submit_ms) if submit_ms else None,
+        'render_p95_ms': percentile(render_ms, 95),
+        'rss_start_kb': monitor.start_kb,
+        'rss_peak_kb': monitor.peak_kb,
+        'rss_end_kb': monitor.end_kb,
+        'pages': sorted({r['page'] for r in ok}),
+    }
+    if errors:
+        result['error'] = f"{errors[0]['page']}: {errors[0]['error']}"
+    return result
+
+
+def working_pages(port, only, timeout):
+    """Pages that render and submit cleanly; broken ones are reported and skipped"""
+    pages, skipped = [], {}
+    for page in PAGES:
+        if only and only not in page[0]:
+            continue
+        try:
+            record = run_session(port, page, random.Random(0), timeout)
+        except Exception as exc:
+            record = {'ok': False, 'error': f"{type(exc).__name__}: {exc}"}
+        if record['ok']:
+            pages.append(page)
+        else:
+            skipped[page[0]] = record['error']
+    return pages, skipped
+
+
+def run_benchmarks(levels, iterations=5, seed=1, timeout=120, only=None):
+    """Start a server, warm every page once, then run each concurrency level"""
+    try:
+        import websockets.sync.client  # noqa: F401
+    except ImportError:
+        return {'setup': {'status': 'error', 'error': "the load test needs the 'websockets' package"}}
+
+    server, port, log_path = start_server()
+    try:
+        # The warm-up pass also imports every page module so import time is not counted
+        pages, skipped = working_pages(port, only, timeout)
+        for label, error in skipped.items():
+            print(f"  skipping {label}: {error}", file=sys.stderr)
+        if not pages:
+            return {'warmup': {'status': 'error', 'error': f"no page could be submitted (server log: {log_path})"}}
+
+        results = {}
+        for users in levels:
+            print(f"  {users} concurrent user(s) x {iterations} submits ...", file=sys.stderr)
+            results[f"users:{users}"] = run_level(server, port, pages, users, iterations, seed, timeout)
+        return results
+    finally:
+        stop_server(server)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RajLisp concurrent-user load test")
+    parser.add_argument('--concurrency', default=','.join(map(str, DEFAULT_CONCURRENCY)),
+                        help="Comma separated numbers of simultaneous users")
+    parser.add_argument('--iterations', type=int, default=5, help="Submits per simulated user")
+    parser.add_argument('--only', help="Only use pages whose label contains this text")
+    parser.add_argument('--seed', type=int, default=1, help="Seed of the parameter mix")
+    parser.add_argument('--timeout', type=int, default=120, help="Timeout per script run in seconds")
+    parser.add_argument('--output', default=os.path.join(BASELINE_DIR, 'load_latest.json'))
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative increase before a level counts as a regression")
+    parser.add_argument('--min-delta-ms', type=float, default=50.0)
+    parser.add_argument('--min-delta-kb', type=float, default=16384.0)
+    args = parser.parse_args(argv)
+
+    levels = [int(n) for n in args.concurrency.split(',') if n.strip()]
+    results = run_benchmarks(levels, args.iterations, args.seed, args.timeout, args.only)
+
+    print_table(results, [('status', '{}'), ('requests', '{}'), ('failed', '{}'),
+                          ('throughput_rps', '{:.2f}'), ('p50_ms', '{:.0f}'), ('p95_ms', '{:.0f}'),
+                          ('p99_ms', '{:.0f}'), ('max_ms', '{:.0f}'), ('rss_peak_kb', '{:.0f}'),
+                          ('error', '{}')])
+    write_results(args.output, results, 'load')
+
+    failed = [case for case, result in results.items() if result['status'] != 'ok']
+    if failed:
+        print(f"\n{len(failed)} level(s) failed, no baseline comparison: {', '.join(failed)}", file=sys.stderr)
+        return 1
+
+    if args.update_baseline:
+        write_results(args.baseline, results, 'load')
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    regressions = compare_results(results, baseline, {
+        'p95_ms': (args.threshold, args.min_delta_ms),
+        'rss_peak_kb': (args.threshold, args.min_delta_kb),
+    })
+    return report_regressions(regressions)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,441 @@
+"""
+Scaled performance benchmark for every calculation, DXF generator and report
+
+Each case is run at up to four sizes (small, medium, large, extreme) and reports
+wall time, peak Python memory (tracemalloc), DXF entity count and serialized
+output size. Results are written as JSON so two versions can be diffed.
+A case that errors fails the run and is never written as a baseline; leave
+known-broken modules out with --exclude.
+
+Usage:
+    python -m benchmarks.scaled                          # all cases, all sizes
+    python -m benchmarks.scaled --sizes small,medium --only road
+    python -m benchmarks.scaled --exclude lintel --exclude beam
+    python -m benchmarks.scaled --update-baseline
+    python -m benchmarks.scaled --baseline old.json      # compare with another run
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.common import (
+    BASELINE_DIR, load_module, write_results, load_results, compare_results,
+    print_table, report_regressions
+)
+
+SIZES = ['small', 'medium', 'large', 'extreme']
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, 'scaled.json')
+
+# Row counts for the batched calculate_* cases
+BATCH_ROWS = {'small': 100, 'medium': 1000, 'large': 10000, 'extreme': 100000}
+
+
+class _AnyResults(dict):
+    """Design results stand-in for report generators: unknown keys read as 0"""
+
+    def __missing__(self, key):
+        return 0
+
+
+def _beam_results():
+    return _AnyResults(moment_capacity=250.0, neutral_axis_depth=120.0, lever_arm=480.0,
+                       section_modulus=1.2e7, axial_capacity=2500.0)
+
+
+# --- Inputs for the calculation batches -------------------------------------
+
+def _rng(rows):
+    return np.random.default_rng(rows)
+
+
+def _grades(rng, rows):
+    concrete = rng.choice(['M20', 'M25', 'M30', 'M35', 'M40'], rows)
+    steel = rng.choice(['Fe415', 'Fe500', 'Fe550'], rows)
+    return concrete, steel
+
+
+def _rows_column(rows):
+    rng = _rng(rows)
+    concrete, steel = _grades(rng, rows)
+    dia = rng.uniform(300, 900, rows)
+    length = rng.uniform(3000, 12000, rows)
+    return [(dia[i], length[i], concrete[i], steel[i], 0.02 * np.pi * dia[i]**2 / 4) for i in range(rows)]
+
+
+def _rows_rect_column(rows):
+    rng = _rng(rows)
+    concrete, steel = _grades(rng, rows)
+    width = rng.uniform(230, 600, rows)
+    depth = rng.uniform(300, 900, rows)
+    length = rng.uniform(3000, 12000, rows)
+    return [(width[i], depth[i], length[i], concrete[i], steel[i], 0.015 * width[i] * depth[i])
+            for i in range(rows)]
+
+
+def _rows_footing_bearing(rows):
+    rng = _rng(rows)
+    width = rng.uniform(1.0, 4.0, rows)
+    return [(width[i], width[i] * 1.2, 150.0, rng.uniform(300, 3000)) for i in range(rows)]
+
+
+def _rows_beam_moment(rows):
+    rng = _rng(rows)
+    concrete, steel = _grades(rng, rows)
+    width = rng.uniform(230, 450, rows)
+    depth = rng.uniform(300, 900, rows)
+    return [(width[i], depth[i], concrete[i], steel[i], 0.01 * width[i] * depth[i], 0.004 * width[i] * depth[i])
+            for i in range(rows)]
+
+
+def _rows_shear(rows):
+    rng = _rng(rows)
+    concrete, _ = _grades(rng, rows)
+    spacing = rng.choice([75, 100, 125, 150, 200], rows)
+    return [(300, rng.uniform(300, 900), concrete[i], 8, spacing[i]) for i in range(rows)]
+
+
+def _rows_deflection(rows):
+    rng = _rng(rows)
+    types = rng.choice(['simply_supported', 'continuous', 'cantilever'], rows)
+    return [(rng.uniform(3000, 12000), rng.uniform(300, 900), types[i]) for i in range(rows)]
+
+
+def _rows_staircase(rows):
+    rng = _rng(rows)
+    return [(rng.uniform(150, 190), rng.uniform(250, 300), 150, rng.uniform(3.0, 5.0), 4.0) for _ in range(rows)]
+
+
+def _rows_development(rows):
+    rng = _rng(rows)
+    concrete, steel = _grades(rng, rows)
+    dia = rng.choice([10, 12, 16, 20, 25, 32], rows)
+    return [(dia[i], concrete[i], steel[i]) for i in range(rows)]
+
+
+def _rows_crack(rows):
+    rng = _rng(rows)
+    return [(rng.uniform(25, 50), rng.uniform(100, 300), rng.uniform(150, 300)) for _ in range(rows)]
+
+
+def _rows_footing_design(rows):
+    rng = _rng(rows)
+    concrete, steel = _grades(rng, rows)
+    types = rng.choice(['Square', 'Rectangular', 'Circular'], rows)
+    return [(types[i], rng.uniform(1.5, 4.0), 500, rng.uniform(500, 3000), 150.0, concrete[i], steel[i],
+             12, 150, 10, 200) for i in range(rows)]
+
+
+def _rows_rect_beam(rows):
+    rng = _rng(rows)
+    return [(300, rng.uniform(400, 750), rng.uniform(3, 12), 25, 20, 3, 16, 2, 8,
+             rng.choice([75, 100, 150]), 30, 500, 15.0, 10.0) for _ in range(rows)]
+
+
+CALCULATIONS = [
+    ('utils.calculations', 'calculate_column_capacity', _rows_column),
+    ('utils.calculations', 'calculate_rectangular_column_capacity', _rows_rect_column),
+    ('utils.calculations', 'calculate_footing_bearing_capacity', _rows_footing_bearing),
+    ('utils.calculations', 'calculate_beam_moment_capacity', _rows_beam_moment),
+    ('utils.calculations', 'calculate_shear_capacity', _rows_shear),
+    ('utils.calculations', 'calculate_deflection_check', _rows_deflection),
+    ('utils.calculations', 'calculate_staircase_design', _rows_staircase),
+    ('utils.calculations', 'calculate_development_length', _rows_development),
+    ('utils.calculations', 'check_crack_width', _rows_crack),
+    ('utils.calculations', 'calculate_footing_design', _rows_footing_design),
+    ('modules.rectangular_beam', 'calculate_rectangular_beam', _rows_rect_beam),
+]
+
+
+# --- Inputs for the DXF generators and reports -------------------------------
+
+def _road_plan_args(length, curves):
+    return (length, 7.0, 1.5, 30, curves, 150, 3, "T-Junction", 0, True, 4.0, 60, 4.0)
+
+
+def _road_lsection_args(length):
+    return (length, 7.0, 100, 100 + length * 0.02, 40, 150, 200, 1.5, 600, 500, 2.5)
+
+
+def _bridge_params(nspan):
+    span = 10.8
+    return {
+        'scale1': 186, 'scale2': 100, 'skew': 0.0, 'nspan': nspan, 'span1': span,
+        'lbridge': span * nspan, 'datum': 100.0, 'toprl': 110.98, 'rtl': 110.98, 'sofl': 110.0,
+        'ccbr': 11.1, 'kerbw': 0.23, 'kerbd': 0.23, 'slbthc': 0.9, 'slbthe': 0.75, 'slbtht': 0.75,
+        'wcth': 0.08, 'laslab': 3.5, 'apwth': 12.0, 'apthk': 0.38,
+        'capt': 110.0, 'capb': 109.4, 'capw': 1.2, 'piertw': 1.2, 'battr': 10.0, 'pierst': 12.0,
+        'futrl': 100.0, 'futd': 1.0, 'futw': 4.5, 'futl': 12.0, 'abtlen': 12.0, 'dwth': 0.3,
+        'alcw': 0.75, 'alcd': 1.2, 'alfl': 100.0, 'alfb': 10.0, 'altb': 10.0, 'albb': 3.0,
+        'alfo': 1.5, 'alfd': 1.0,
+    }
+
+
+BRIDGE_DRAWINGS = ["General Arrangement - Elevation", "General Arrangement - Plan",
+                   "Pier Details", "Foundation Plan"]
+
+GENERATORS = [
+    ('modules.road_plan', 'create_road_plan_dxf', {
+        'small': _road_plan_args(2000, 2), 'medium': _road_plan_args(5000, 5),
+        'large': _road_plan_args(10000, 10), 'extreme': _road_plan_args(20000, 20)}),
+    ('modules.road_plan', 'generate_road_plan_report', {
+        'small': (2000, 7.0, 1.5, 30, 60, 2, 150, 1, 17000.0)}),
+    ('modules.road_lsection', 'create_road_lsection_dxf', {
+        'small': _road_lsection_args(1000), 'medium': _road_lsection_args(5000),
+        'large': _road_lsection_args(10000), 'extreme': _road_lsection_args(20000)}),
+    ('modules.road_lsection', 'generate_road_lsection_report', {
+        'small': (1000, 7.0, 100, 105, 0.5, 40, 150, 200, 60, "Plain", 35000.0, 2730.0)}),
+    ('modules.road_cross_section', 'create_road_cross_section_dxf', {
+        'small': (7.0, 1.5, 0, 2.5, 3.0, 40, 30, 150, 200, "Granular", 100, True, 600, 500, 1.5,
+                  1.5, 2.0, False, 0),
+        'medium': (14.0, 2.5, 3.0, 2.5, 3.0, 40, 30, 250, 300, "Bituminous", 150, True, 1000, 800, 1.5,
+                   6.0, 2.0, True, 3)}),
+    ('modules.road_cross_section', 'generate_road_cross_section_report', {
+        'small': (7.0, 1.5, 0, 10.0, 40, 150, 200, 420, 1.5, 2.0, 2940.0)}),
+    ('modules.pmgsy_road', 'create_pmgsy_road_dxf', {
+        'small': ("Major Rural Link", 4.75, 1.0, 2.5, 25, 125, 150, True, 450, 450, "T2")}),
+    ('modules.pmgsy_road', 'generate_pmgsy_report', {
+        'small': ("Major Rural Link", "T2", 4.75, 6.75, "Plain", 65, 25, 125, 150, 118.75, 593.75, 712.5)}),
+    ('modules.bridge', 'generate_bridge_dxf', {
+        'small': (_bridge_params(1), BRIDGE_DRAWINGS, True, True),
+        'medium': (_bridge_params(4), BRIDGE_DRAWINGS, True, True),
+        'large': (_bridge_params(7), BRIDGE_DRAWINGS, True, True),
+        'extreme': (_bridge_params(10), BRIDGE_DRAWINGS, True, True)}),
+    ('modules.circular_column', 'create_circular_column_dxf', {
+        'small': (400, 3000, 16, 8, 8, 150, 40), 'medium': (600, 6000, 20, 12, 8, 100, 40),
+        'large': (750, 9000, 25, 16, 10, 75, 40), 'extreme': (900, 12000, 32, 20, 10, 75, 50)}),
+    ('modules.rectangular_column', 'create_rectangular_column_dxf', {
+        'small': (300, 450, 3000, 16, 3, 4, 8, 150, 40), 'medium': (400, 600, 6000, 20, 4, 5, 8, 100, 40),
+        'large': (500, 750, 9000, 25, 5, 6, 10, 75, 40), 'extreme': (600, 900, 12000, 32, 6, 8, 10, 75, 50)}),
+    ('modules.rectangular_column', 'generate_column_report', {
+        'small': (300, 450, 3000, "M25", "Fe500", 16, 10, 8, 150, 1200, 75, 50, _beam_results())}),
+    ('modules.circular_column_footing', 'create_circular_column_footing_dxf', {
+        'small': (400, 3000, "Circular", 2000, 500, 16, 8, 12, 150, 40),
+        'medium': (600, 6000, "Square", 3000, 600, 20, 12, 16, 125, 50),
+        'large': (750, 9000, "Circular", 4000, 800, 25, 16, 16, 100, 50),
+        'extreme': (900, 12000, "Square", 6000, 1000, 32, 20, 20, 75, 75)}),
+    ('modules.circular_column_footing', 'generate_circular_footing_report', {
+        'small': (400, 3000, "Circular", 2000, 500, "M25", "Fe500", 900, 80, 60, 150, _AnyResults())}),
+    ('modules.rect_column_footing', 'create_column_footing_dxf', {
+        'small': (300, 450, 3000, 2000, 1800, 500, 16, 3, 4, 12, 150, 10, 200, 40),
+        'medium': (400, 600, 6000, 3000, 2500, 600, 20, 4, 5, 16, 125, 12, 150, 50),
+        'large': (500, 750, 9000, 4000, 3500, 800, 25, 5, 6, 16, 100, 12, 100, 50),
+        'extreme': (600, 900, 12000, 6000, 5000, 1000, 32, 6, 8, 20, 75, 16, 75, 75)}),
+    ('modules.rect_column_footing', 'generate_footing_report', {
+        'small': (300, 450, 3000, 2000, 1800, 500, "M25", "Fe500", 1200, 100, 75, 150, _AnyResults())}),
+    ('modules.sunshade', 'create_sunshade_dxf', {
+        'small': (300, 450, 1000, 150, 100, 12, 4, 10, 2, 8, 150, 10, 8, 150, 25, "01"),
+        'medium': (300, 600, 1500, 175, 100, 12, 6, 10, 3, 8, 100, 10, 8, 125, 25, "02"),
+        'large': (300, 750, 2000, 200, 125, 16, 8, 12, 4, 8, 75, 12, 8, 100, 25, "03"),
+        'extreme': (300, 900, 3000, 250, 150, 16, 8, 12, 4, 8, 75, 12, 8, 75, 25, "04")}),
+    ('modules.sunshade', 'generate_sunshade_report', {
+        'small': (300, 450, 1000, 150, 100, 12, 4, 10, 2, 8, 150, 10, 8, 150, "01")}),
+    ('modules.lintel', 'create_lintel_dxf', {
+        'small': (1200, 230, 230, 200, 12, 3, 10, 2, 6, 150, 25),
+        'medium': (2400, 230, 300, 200, 12, 3, 10, 2, 6, 100, 25),
+        'large': (3600, 300, 375, 250, 16, 4, 10, 2, 8, 75, 25),
+        'extreme': (6000, 300, 450, 300, 16, 4, 12, 2, 8, 75, 25)}),
+    ('modules.lintel', 'generate_lintel_report', {
+        'small': (1200, 230, 230, 200, "M20", "Fe415", 12, 3, 18.0, 3.2, 10.8, _beam_results())}),
+    ('modules.t_beam', 'create_t_beam_dxf', {
+        'small': (6000, 1200, 125, 300, 600, 20, 6, 16, 4, 10, 200, 8, 150, 40),
+        'medium': (8000, 1500, 150, 300, 700, 20, 6, 16, 4, 10, 150, 8, 125, 40),
+        'large': (10000, 1800, 150, 350, 800, 25, 8, 16, 4, 10, 150, 8, 100, 40),
+        'extreme': (12000, 2000, 175, 400, 900, 25, 8, 20, 4, 10, 125, 8, 75, 40)}),
+    ('modules.t_beam', 'generate_t_beam_report', {
+        'small': (6000, 1200, 125, 300, 600, "M25", "Fe500", 20, 6, 40.0, 180.0, 120.0, _beam_results())}),
+    ('modules.l_beam', 'create_l_beam_dxf', {
+        'small': (5000, 300, 500, 400, 150, 20, 4, 16, 3, 10, 200, 8, 150, 8, 200, 40),
+        'medium': (8000, 300, 600, 500, 150, 20, 4, 16, 3, 10, 150, 8, 125, 8, 150, 40),
+        'large': (10000, 350, 700, 600, 175, 25, 5, 16, 3, 10, 150, 8, 100, 8, 150, 40),
+        'extreme': (12000, 400, 800, 700, 200, 25, 6, 20, 3, 10, 125, 8, 75, 8, 125, 40)}),
+    ('modules.l_beam', 'generate_l_beam_report', {
+        'small': (5000, 300, 500, 400, 150, "M25", "Fe500", 20, 4, 45.0, 140.0, 112.0, _beam_results())}),
+    ('modules.staircase', 'create_staircase_dxf', {
+        'small': (3500, 2700, 150, 175, 300, 12, 150, 8, 200, 10, 20, 15, 14),
+        'medium': (5000, 3600, 175, 170, 300, 12, 125, 8, 200, 10, 20, 21, 20),
+        'large': (7000, 5000, 200, 165, 280, 16, 100, 10, 150, 10, 25, 30, 29),
+        'extreme': (10000, 7000, 225, 160, 280, 16, 75, 10, 150, 12, 25, 44, 43)}),
+    ('modules.staircase', 'generate_staircase_report', {
+        'small': (3500, 2700, 150, 175, 300, 15, 14, "M20", "Fe415", 12, 150, 12.0, 25.0, "Simply Supported")}),
+]
+
+
+RECT_BEAM_SIZES = {'small': (450, 6, 150), 'medium': (600, 8, 125), 'large': (750, 10, 100), 'extreme': (900, 12, 75)}
+
+
+def _rect_beam_args(size):
+    """generate_rectangular_beam_dxf needs results from calculate_rectangular_beam"""
+    module = load_module('modules.rectangular_beam')
+    depth, length, spacing = RECT_BEAM_SIZES[size]
+    results = module.calculate_rectangular_beam(300, depth, length, 25, 20, 3, 16, 2, 8,
+                                                spacing, 30, 500, 15.0, 10.0)
+    return (300, depth, 20, 3, 16, 2, 8, spacing, "B1", "1:25", results)
+
+
+# --- Measurement --------------------------------------------------------------
+
+def _output_metrics(output):
+    """Entity count, serialized size and serialization time of a case's output"""
+    try:
+        from ezdxf.document import Drawing
+    except ImportError:
+        Drawing = None
+
+    if Drawing is not None and isinstance(output, Drawing):
+        entities = sum(len(layout) for layout in output.layouts)
+        start = time.perf_counter()
+        stream = io.StringIO()
+        output.write(stream)
+        serialize_ms = (time.perf_counter() - start) * 1000
+        return entities, len(stream.getvalue().encode('utf-8')), serialize_ms
+
+    if isinstance(output, (bytes, bytearray)):
+        entities = None
+        try:
+            import ezdxf
+            doc = ezdxf.read(io.StringIO(output.decode('utf-8', errors='ignore')))
+            entities = sum(len(layout) for layout in doc.layouts)
+        except Exception:
+            pass
+        return entities, len(output), None
+
+    if isinstance(output, str):
+        return None, len(output.encode('utf-8')), None
+
+    if isinstance(output, list):
+        return None, len(output), None
+
+    return None, None, None
+
+
+def measure(function, args, repeat):
+    """Time `function(*args)`, then measure its peak memory and output"""
+    wall_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        wall_times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        output = function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    entities, size, serialize_ms = _output_metrics(output)
+    return {
+        'status': 'ok',
+        'wall_ms': statistics.median(wall_times),
+        'wall_ms_min': min(wall_times),
+        'peak_kb': peak / 1024,
+        'entities': entities,
+        'output_bytes': size,
+        'serialize_ms': serialize_ms,
+    }
+
+
+def iter_cases(sizes):
+    """Yield (case name, module, function name, args builder) for every case"""
+    for module_name, function_name, row_builder in CALCULATIONS:
+        for size in sizes:
+            rows = BATCH_ROWS[size]
+            yield (f"{module_name}.{function_name}[{size}:{rows}rows]", module_name, function_name,
+                   ('batch', row_builder, rows))
+
+    for module_name, function_name, size_args in GENERATORS:
+        for size in sizes:
+            if size in size_args:
+                yield (f"{module_name}.{function_name}[{size}]", module_name, function_name,
+                       ('call', size_args[size]))
+
+    for size in sizes:
+        yield (f"modules.rectangular_beam.generate_rectangular_beam_dxf[{size}]",
+               'modules.rectangular_beam', 'generate_rectangular_beam_dxf', ('rect_beam', size))
+
+
+def run_case(module_name, function_name, spec, repeat):
+    module = load_module(module_name)
+    function = getattr(module, function_name)
+
+    if spec[0] == 'batch':
+        _, row_builder, rows = spec
+        batch = row_builder(rows)
+        return measure(lambda data: [function(*row) for row in data], (batch,), repeat)
+
+    if spec[0] == 'rect_beam':
+        return measure(function, _rect_beam_args(spec[1]), repeat)
+
+    return measure(function, spec[1], repeat)
+
+
+def run_benchmarks(sizes=SIZES, repeat=3, only=None, exclude=()):
+    """Run all cases and return the results mapping"""
+    results = {}
+    for case, module_name, function_name, spec in iter_cases(sizes):
+        if only and only not in case:
+            continue
+        if any(pattern.lower() in case.lower() for pattern in exclude):
+            continue
+        print(f"  {case} ...", file=sys.stderr)
+        try:
+            results[case] = run_case(module_name, function_name, spec, repeat)
+        except Exception as e:
+            results[case] = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RajLisp scaled calculation/DXF benchmark")
+    parser.add_argument('--sizes', default=','.join(SIZES), help="Comma separated sizes to run")
+    parser.add_argument('--only', help="Only run cases whose name contains this text")
+    parser.add_argument('--exclude', action='append', default=[],
+                        help="Skip cases whose name contains this text, any case (repeatable)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (median is reported)")
+    parser.add_argument('--output', default=os.path.join(BASELINE_DIR, 'scaled_latest.json'))
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative increase before a case counts as a regression")
+    parser.add_argument('--min-delta-ms', type=float, default=5.0)
+    parser.add_argument('--min-delta-kb', type=float, default=512.0)
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip() in SIZES]
+    results = run_benchmarks(sizes, args.repeat, args.only, args.exclude)
+
+    print_table(results, [('status', '{}'), ('wall_ms', '{:.1f}'), ('peak_kb', '{:.0f}'),
+                          ('entities', '{}'), ('output_bytes', '{}'), ('error', '{}')])
+    write_results(args.output, results, 'scaled')
+
+    failed = [case for case, result in results.items() if result['status'] != 'ok']
+    if failed:
+        print(f"\n{len(failed)} case(s) failed, no baseline comparison: {', '.join(failed)}", file=sys.stderr)
+        return 1
+
+    if args.update_baseline:
+        write_results(args.baseline, results, 'scaled')
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    regressions = compare_results(results, baseline, {
+        'wall_ms': (args.threshold, args.min_delta_ms),
+        'peak_kb': (args.threshold, args.min_delta_kb),
+        'output_bytes': (args.threshold, 4096),
+    })
+    return report_regressions(regressions)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Cold-start benchmark for the RajLisp Streamlit app
+
+Measures, each in a fresh interpreter so nothing is already cached:
+- wall time and memory to import every modules.* and utils.* file
+- wall time and memory for the first render of app.py and of every page
+
+Page files are loaded directly from their path (benchmarks.common.load_module),
+so one broken page does not take the others down through modules/__init__.py.
+A case that errors fails the run and is never written as a baseline; leave
+known-broken pages out with --exclude.
+
+Usage:
+    python -m benchmarks.startup                      # run and compare with baseline
+    python -m benchmarks.startup --update-baseline    # record a new baseline
+    python -m benchmarks.startup --threshold 0.5 --skip-pages
+    python -m benchmarks.startup --exclude lintel --exclude beam --exclude render:app
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import (
+    ROOT_DIR, BASELINE_DIR, write_results, load_results, compare_results,
+    print_table, report_regressions
+)
+
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, 'startup.json')
+
+# (page label, module, page function) - same pages as the sidebar in app.py
+PAGES = [
+    ("Circular Column", "circular_column", "page_circular_column"),
+    ("Rectangular Column", "rectangular_column", "page_rectangular_column"),
+    ("Circular Column + Footing", "circular_column_footing", "page_circular_column_footing"),
+    ("Rectangular Column + Footing", "rect_column_footing", "page_rect_column_footing"),
+    ("Sunshade", "sunshade", "page_sunshade"),
+    ("Lintel", "lintel", "page_lintel"),
+    ("T-Beam", "t_beam", "page_t_beam"),
+    ("L-Beam", "l_beam", "page_l_beam"),
+    ("Rectangular Beam", "rectangular_beam", "page_rectangular_beam"),
+    ("Staircase", "staircase", "page_staircase"),
+    ("Bridge", "bridge", "page_bridge"),
+    ("Quantity Estimate", "estimate", "page_estimate"),
+    ("Road L-Section", "road_lsection", "page_road_lsection"),
+    ("Road Plan", "road_plan", "page_road_plan"),
+    ("Road Cross Section", "road_cross_section", "page_road_cross_section"),
+    ("PMGSY Road", "pmgsy_road", "page_pmgsy_road"),
+]
+
+# Executed with `python -c` so the child only loads the standard library before
+# the measured block. {setup} runs untimed, {body} is timed.
+CHILD_TEMPLATE = '''
+import json, sys, time, tracemalloc
+sys.path.insert(0, {root!r})
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def rss_kb():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 if sys.platform == "darwin" else usage
+
+error = None
+try:
+{setup}
+except BaseException as exc:
+    error = "setup: %s: %s" % (type(exc).__name__, exc)
+
+rss_before = rss_kb()
+if {trace}:
+    tracemalloc.start()
+start = time.perf_counter()
+if error is None:
+    try:
+{body}
+    except BaseException as exc:
+        error = "%s: %s" % (type(exc).__name__, exc)
+elapsed = time.perf_counter() - start
+peak = tracemalloc.get_traced_memory()[1] if {trace} else None
+rss_after = rss_kb()
+print(json.dumps({{
+    "wall_ms": elapsed * 1000,
+    "peak_kb": peak / 1024 if peak is not None else None,
+    "rss_kb": (rss_after - rss_before) if rss_before is not None else None,
+    "error": error,
+}}))
+'''
+
+PAGE_SCRIPT = (
+    "from benchmarks.common import load_module\n"
+    "load_module('modules.{module}').{function}()\n"
+)
+RENDER_CHECK = (
+    "at.run()\n"
+    "if at.exception:\n"
+    "    raise RuntimeError(at.exception[0].message)\n"
+    "if at.error:\n"
+    "    raise RuntimeError(at.error[0].value)\n"
+)
+
+
+def _indent(code, spaces=4):
+    return '\n'.join(' ' * spaces + line for line in code.strip().splitlines()) or ' ' * spaces + 'pass'
+
+
+def run_child(setup, body, trace_memory, timeout):
+    """Run one measurement in a fresh interpreter and return its JSON record"""
+    code = CHILD_TEMPLATE.format(
+        root=ROOT_DIR, setup=_indent(setup, 4), body=_indent(body, 8), trace=bool(trace_memory)
+    )
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True,
+            text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {'error': f"timeout after {timeout}s"}
+
+    lines = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+    if not lines:
+        return {'error': f"child failed (exit {proc.returncode}): {proc.stderr.strip()[-300:]}"}
+    return json.loads(lines[-1])
+
+
+def measure(setup, body, repeat, timeout):
+    """Median wall time over `repeat` cold runs plus one memory-traced run"""
+    runs = [run_child(setup, body, False, timeout) for _ in range(repeat)]
+    errors = [r['error'] for r in runs if r.get('error')]
+    if errors:
+        return {'status': 'error', 'error': errors[0]}
+
+    # tracemalloc slows allocation-heavy code, so memory gets its own run
+    traced = run_child(setup, body, True, timeout)
+    wall_times = [r['wall_ms'] for r in runs]
+    return {
+        'status': 'ok',
+        'wall_ms': statistics.median(wall_times),
+        'wall_ms_min': min(wall_times),
+        'wall_ms_max': max(wall_times),
+        'peak_kb': traced.get('peak_kb'),
+        'rss_kb': statistics.median(r['rss_kb'] for r in runs) if runs[0].get('rss_kb') is not None else None,
+    }
+
+
+def import_targets():
+    """All importable modules.* and utils.* files"""
+    targets = []
+    for package in ('utils', 'modules'):
+        package_dir = os.path.join(ROOT_DIR, package)
+        for filename in sorted(os.listdir(package_dir)):
+            if filename.endswith('.py') and filename != '__init__.py':
+                targets.append(f"{package}.{filename[:-3]}")
+    return targets
+
+
+def run_benchmarks(repeat=3, timeout=120, skip_imports=False, skip_pages=False, only=None, exclude=()):
+    """Run the startup benchmark and return the results mapping"""
+    results = {}
+
+    cases = []
+    if not skip_imports:
+        import_setup = "from benchmarks.common import load_module\n"
+        for target in import_targets():
+            cases.append((f"import:{target}", import_setup, f"load_module({target!r})"))
+        cases.append(("import:app", "", "import app"))
+
+    if not skip_pages:
+        render_setup = "from streamlit.testing.v1 import AppTest\n"
+        app_body = (
+            f"at = AppTest.from_file({os.path.join(ROOT_DIR, 'app.py')!r}, default_timeout={timeout})\n"
+            + RENDER_CHECK
+        )
+        cases.append(("render:app", render_setup, app_body))
+
+        for label, module, function in PAGES:
+            script = PAGE_SCRIPT.format(module=module, function=function)
+            body = (
+                f"at = AppTest.from_string({script!r}, default_timeout={timeout})\n"
+                + RENDER_CHECK
+            )
+            cases.append((f"render:{label}", render_setup, body))
+
+    for case, setup, body in cases:
+        if only and only not in case:
+            continue
+        if any(pattern.lower() in case.lower() for pattern in exclude):
+            continue
+        print(f"  {case} ...", file=sys.stderr)
+        results[case] = measure(setup, body, repeat, timeout)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RajLisp cold-start benchmark")
+    parser.add_argument('--output', default=os.path.join(BASELINE_DIR, 'startup_latest.json'),
+                        help="Where to write this run's results")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="Write results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative increase before a case counts as a regression (0.25 = 25%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=20.0,
+                        help="Ignore time increases smaller than this (noise floor)")
+    parser.add_argument('--min-delta-kb', type=float, default=1024.0,
+                        help="Ignore memory increases smaller than this (noise floor)")
+    parser.add_argument('--repeat', type=int, default=3, help="Cold runs per case (median is reported)")
+    parser.add_argument('--timeout', type=int, default=120, help="Timeout per run in seconds")
+    parser.add_argument('--skip-imports', action='store_true')
+    parser.add_argument('--skip-pages', action='store_true')
+    parser.add_argument('--only', help="Only run cases whose name contains this text")
+    parser.add_argument('--exclude', action='append', default=[],
+                        help="Skip cases whose name contains this text, any case (repeatable)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat, args.timeout, args.skip_imports, args.skip_pages, args.only,
+                             args.exclude)
+
+    print_table(results, [('status', '{}'), ('wall_ms', '{:.1f}'), ('peak_kb', '{:.0f}'),
+                          ('rss_kb', '{:.0f}'), ('error', '{}')])
+    write_results(args.output, results, 'startup')
+
+    failed = [case for case, result in results.items() if result['status'] != 'ok']
+    if failed:
+        print(f"\n{len(failed)} case(s) failed, no baseline comparison: {', '.join(failed)}", file=sys.stderr)
+        return 1
+
+    if args.update_baseline:
+        write_results(args.baseline, results, 'startup')
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    regressions = compare_results(results, baseline, {
+        'wall_ms': (args.threshold, args.min_delta_ms),
+        'peak_kb': (args.threshold, args.min_delta_kb),
+    })
+    return report_regressions(regressions)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,7 +17,8 @@ from . import (
     road_plan,
     road_cross_section,
     pmgsy_road,
-    bridge
+    bridge,
+    estimate
 )
 
 __all__ = [
@@ -34,5 +35,6 @@ __all__ = [
     'road_plan',
     'road_cross_section',
     'pmgsy_road',
-    'bridge'
+    'bridge',
+    'estimate'
 ]
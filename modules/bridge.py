@@ -3,9 +3,9 @@ import pandas as pd
 import ezdxf
 import math
 import numpy as np
-import tempfile
-import os
 from math import atan2, degrees, sqrt, cos, sin, tan, radians, pi
+from utils.dxf_utils import dxf_to_bytes
+from utils.tracing import traced
 
 def page_bridge():
     st.title("🌉 Bridge Designer")
@@ -251,6 +251,7 @@ def drawing_generation_section():
                 st.error(f"❌ Error generating drawings: {str(e)}")
                 st.error("Please check your input parameters and try again.")
 
+@traced("bridge.dxf")
 def generate_bridge_dxf(params, drawing_types, include_dimensions, include_annotations):
     """Generate comprehensive bridge DXF drawing based on the original bridge_gad_app logic"""
     
@@ -294,12 +295,8 @@ def generate_bridge_dxf(params, drawing_types, include_dimensions, include_annot
     if include_annotations:
         add_title_block(msp, params)
     
-    # Save to memory buffer
-    with tempfile.NamedTemporaryFile(suffix='.dxf', delete=False) as tmp_file:
-        doc.saveas(tmp_file.name)
-        with open(tmp_file.name, 'rb') as f:
-            dxf_content = f.read()
-        os.unlink(tmp_file.name)
+    # Serialize DXF
+    dxf_content = dxf_to_bytes(doc, "bridge.serialize")
     
     return dxf_content
 
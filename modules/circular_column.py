@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
 from utils.calculations import calculate_column_capacity
+from utils.tracing import traced
 
 def page_circular_column():
     st.title("🔘 Circular Column Designer")
@@ -104,11 +104,8 @@ def page_circular_column():
                 with col_download:
                     st.subheader("📥 Download")
                     
-                    # Save DXF to temporary file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    # Serialize DXF
+                    dxf_data = dxf_to_bytes(doc, "circular_column.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -122,6 +119,7 @@ def page_circular_column():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+@traced("circular_column.dxf")
 def create_circular_column_dxf(diameter, height, main_bar_dia, num_bars, tie_dia, tie_spacing, clear_cover):
     """Create DXF drawing for circular column"""
     doc = ezdxf.new('R2010')
@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
 from utils.calculations import calculate_footing_design
+from utils.tracing import traced
 
 def page_circular_column_footing():
     st.title("🔘🦶 Circular Column with Footing")
@@ -197,10 +197,7 @@ def page_circular_column_footing():
                     st.subheader("📥 Downloads")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "circular_column_footing.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -228,6 +225,7 @@ def page_circular_column_footing():
                 st.error(f"❌ Error in design: {str(e)}")
                 st.error("Please verify all input parameters and try again.")
 
+@traced("circular_column_footing.dxf")
 def create_circular_column_footing_dxf(col_diameter, col_height, footing_type, footing_dimension,
                                      footing_thickness, col_main_dia, num_main_bars,
                                      footing_main_dia, footing_main_spacing, clear_cover):
@@ -363,6 +361,7 @@ def create_circular_column_footing_dxf(col_diameter, col_height, footing_type, f
     
     return doc
 
+@traced("circular_column_footing.report")
 def generate_circular_footing_report(col_diameter, col_height, footing_type, footing_dimension,
                                    footing_thickness, concrete_grade, steel_grade,
                                    total_load, moment_x, moment_y, sbc, results):
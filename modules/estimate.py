@@ -0,0 +1,146 @@
+import streamlit as st
+import numpy as np
+from utils.cross_sections import read_cross_sections
+from utils.estimate import (
+    beam_quantities, sunshade_quantities, column_quantities, footing_quantities, footsqr_column_bars,
+    road_quantities, bar_schedule, bar_schedule_table, estimate_abstract, abstract_table, abstract_csv,
+    lisp_checks
+)
+
+# One example row per member type; every column is one argument of the utils.estimate routine
+BEAMS = {"Mark": ["L1"], "Nos": [10], "Length (m)": [1.5], "b (mm)": [230], "D (mm)": [150],
+         "Flange b (mm)": [0], "Flange D (mm)": [0], "Bottom Bars": [2], "Bottom Dia": [10],
+         "Top Bars": [2], "Top Dia": [8], "Stirrup Dia": [6], "Stirrup Spacing": [150]}
+SUNSHADES = {"Mark": ["SS1"], "Nos": [4], "Length (m)": [1.5], "b (mm)": [230], "D (mm)": [300],
+             "Projection (mm)": [600], "Thickness at Support": [100], "Thickness at Edge": [75],
+             "Bottom Bars": [2], "Bottom Dia": [10], "Top Bars": [2], "Top Dia": [10], "Stirrup Dia": [6],
+             "Stirrup Spacing": [150], "Main Dia": [8], "Main Spacing": [150], "Dist. Dia": [6],
+             "Dist. Spacing": [150]}
+COLUMNS = {"Mark": ["C1"], "Nos": [8], "Height (m)": [3.0], "b (mm)": [300], "D (mm)": [300],
+           "Circular": [False], "Bars": [8], "Bar Dia": [16], "Tie Dia": [8], "Tie Spacing": [200]}
+FOOTINGS = {"Mark": ["F1"], "Nos": [8], "Width (mm)": [1500], "Edge Depth (mm)": [250], "Centre Depth (mm)": [450],
+            "Column b (mm)": [300], "Column D (mm)": [300], "Pedestal (mm)": [75], "PCC Projection (mm)": [100],
+            "PCC Thickness (mm)": [100], "Dia X": [12], "Spacing X": [150], "Dia Y": [12], "Spacing Y": [200],
+            "Column Bars": [8], "Bars per Flange": [3], "Column Bar Dia": [16]}
+
+
+def _column(table, name, dtype=float):
+    """One column of an edited member table as an array, blanks as zero"""
+    return np.array([0 if value is None else value for value in table[name]], dtype=dtype)
+
+
+def _member_quantities(beams, sunshades, columns, footings):
+    """utils.estimate quantities of every member table with at least one row"""
+    quantities = []
+    if len(beams["Mark"]):
+        c = lambda name: _column(beams, name)
+        quantities.append(beam_quantities(c("b (mm)"), c("D (mm)"), c("Length (m)"), c("Bottom Bars"),
+                                          c("Bottom Dia"), c("Top Bars"), c("Top Dia"), c("Stirrup Dia"),
+                                          c("Stirrup Spacing"), c("Nos"), c("Flange b (mm)"), c("Flange D (mm)")))
+    if len(sunshades["Mark"]):
+        c = lambda name: _column(sunshades, name)
+        quantities.append(sunshade_quantities(c("b (mm)"), c("D (mm)"), c("Length (m)"), c("Projection (mm)"),
+                                              c("Thickness at Support"), c("Thickness at Edge"), c("Bottom Bars"),
+                                              c("Bottom Dia"), c("Top Bars"), c("Top Dia"), c("Stirrup Dia"),
+                                              c("Stirrup Spacing"), c("Main Dia"), c("Main Spacing"),
+                                              c("Dist. Dia"), c("Dist. Spacing"), c("Nos")))
+    if len(columns["Mark"]):
+        c = lambda name: _column(columns, name)
+        circular = _column(columns, "Circular", bool)
+        for shape in (False, True):
+            rows = circular == shape
+            if rows.any():
+                quantities.append(column_quantities(c("b (mm)")[rows], c("D (mm)")[rows], c("Height (m)")[rows],
+                                                    c("Bars")[rows], c("Bar Dia")[rows], c("Tie Dia")[rows],
+                                                    c("Tie Spacing")[rows], c("Nos")[rows], circular=shape))
+    if len(footings["Mark"]):
+        c = lambda name: _column(footings, name)
+        quantities.append(footing_quantities(c("Width (mm)"), c("Edge Depth (mm)"), c("Centre Depth (mm)"),
+                                             c("Column b (mm)"), c("Column D (mm)"), c("Pedestal (mm)"),
+                                             c("PCC Projection (mm)"), c("PCC Thickness (mm)"), c("Dia X"),
+                                             c("Spacing X"), c("Dia Y"), c("Spacing Y"),
+                                             footsqr_column_bars(c("Column Bars"), c("Bars per Flange")),
+                                             c("Column Bar Dia"), c("Nos")))
+    return quantities
+
+
+def page_estimate():
+    st.title("🧾 Quantity Estimate")
+    st.markdown("Abstract of quantities for a whole project, measured as the EXSUM and EXPROAD routines do")
+
+    with st.form("estimate_form"):
+        project_name = st.text_input("Project Name", value="RajLisp Project")
+
+        tab1, tab2, tab3, tab4, tab5 = st.tabs(["📏 Lintels & Beams", "🌞 Sunshades", "⬜ Columns",
+                                                "🦶 Footings", "🛣️ Road (ROADX)"])
+        with tab1:
+            beams = st.data_editor(BEAMS, num_rows="dynamic", key="estimate_beams", use_container_width=True)
+        with tab2:
+            sunshades = st.data_editor(SUNSHADES, num_rows="dynamic", key="estimate_sunshades",
+                                       use_container_width=True)
+        with tab3:
+            columns = st.data_editor(COLUMNS, num_rows="dynamic", key="estimate_columns", use_container_width=True)
+        with tab4:
+            footings = st.data_editor(FOOTINGS, num_rows="dynamic", key="estimate_footings",
+                                      use_container_width=True)
+            st.caption("Column bars are laid out as FOOTSQR does: 2 x (bars per flange + side bars)")
+        with tab5:
+            col1, col2 = st.columns(2)
+            with col1:
+                survey_file = st.file_uploader("Cross-Section Survey (station, offset, level)", type=['csv', 'txt'],
+                                               help="Leave empty for structures only")
+                formation_level = st.number_input("Formation Level at Centre (m)", value=100.0, step=0.1)
+                formation_width = st.number_input("Formation Width FW (m)", min_value=4.0, max_value=30.0,
+                                                  value=12.0, step=0.5)
+            with col2:
+                carriageway_width = st.number_input("Carriageway Width CW (m)", min_value=3.0, max_value=25.0,
+                                                    value=7.0, step=0.5)
+                camber_carriageway = st.number_input("Camber in Carriageway (%)", min_value=0.0, max_value=5.0,
+                                                     value=2.5, step=0.5)
+                camber_shoulder = st.number_input("Camber in Shoulders (%)", min_value=0.0, max_value=6.0,
+                                                  value=3.0, step=0.5)
+                side_slope = st.number_input("Side Slope (n : 1)", min_value=0.5, max_value=4.0, value=2.0, step=0.5)
+
+        submitted = st.form_submit_button("🔄 Compute Abstract", type="primary")
+
+    with st.expander("✅ Checks against LISP Hand Calculations"):
+        st.table(lisp_checks())
+
+    if not submitted:
+        return
+
+    with st.spinner("🔄 Measuring quantities..."):
+        try:
+            if carriageway_width > formation_width:
+                st.error("❌ Carriageway width cannot exceed the formation width")
+                return
+            quantities = _member_quantities(beams, sunshades, columns, footings)
+            road = None
+            if survey_file is not None:
+                road = road_quantities(read_cross_sections(survey_file), formation_level, formation_width,
+                                       carriageway_width, camber_carriageway, camber_shoulder, side_slope)
+            abstract = estimate_abstract(*quantities, road=road)
+            schedule = bar_schedule(*quantities)
+
+            col_results, col_download = st.columns([2, 1])
+
+            with col_results:
+                st.success(f"✅ Steel {abstract['steel_total'] / 1000:.3f} MT, "
+                           f"concrete {abstract['concrete']:.2f} m³ measured")
+                with st.expander("📋 Abstract of Quantities", expanded=True):
+                    st.table(abstract_table(abstract))
+                with st.expander("🔩 Bar Schedule"):
+                    st.table(bar_schedule_table(schedule))
+
+            with col_download:
+                st.subheader("📥 Download")
+                st.download_button(
+                    label="📊 Download Abstract (CSV)",
+                    data=abstract_csv(abstract),
+                    file_name=f"{project_name.replace(' ', '_')}_abstract.csv",
+                    mime="text/csv"
+                )
+
+        except Exception as e:
+            st.error(f"❌ Error measuring quantities: {str(e)}")
+            st.error("Please check the member tables and survey file and try again.")
@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
 from utils.calculations import calculate_l_beam_capacity
+from utils.tracing import traced
 
 def page_l_beam():
     st.title("📏 L-Beam Designer")
@@ -205,10 +205,7 @@ def page_l_beam():
                     st.subheader("📥 Download")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "l_beam.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -235,6 +232,7 @@ def page_l_beam():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+@traced("l_beam.dxf")
 def create_l_beam_dxf(span, web_width, web_height, flange_width, flange_thickness,
                      web_main_dia, num_web_bars, web_top_dia, num_web_top,
                      flange_main_dia, flange_bar_spacing, stirrup_dia, stirrup_spacing,
@@ -375,6 +373,7 @@ def create_l_beam_dxf(span, web_width, web_height, flange_width, flange_thicknes
     
     return doc
 
+@traced("l_beam.report")
 def generate_l_beam_report(span, web_width, web_height, flange_width, flange_thickness,
                           concrete_grade, steel_grade, web_main_dia, num_web_bars,
                           total_load, design_moment, design_shear, results):
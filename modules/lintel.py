@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
 from utils.calculations import calculate_beam_moment, calculate_shear_reinforcement
+from utils.tracing import traced
 
 def page_lintel():
     st.title("🔗 Lintel Designer")
@@ -163,10 +163,7 @@ def page_lintel():
                     st.subheader("📥 Download")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "lintel.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -192,6 +189,7 @@ def page_lintel():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+@traced("lintel.dxf")
 def create_lintel_dxf(span, width, depth, bearing_length, main_bar_dia, num_main_bars, 
                      top_bar_dia, num_top_bars, stirrup_dia, stirrup_spacing, clear_cover):
     """Create DXF drawing for lintel"""
@@ -319,6 +317,7 @@ def create_lintel_dxf(span, width, depth, bearing_length, main_bar_dia, num_main
     
     return doc
 
+@traced("lintel.report")
 def generate_lintel_report(span, width, depth, bearing_length, concrete_grade, steel_grade,
                           main_bar_dia, num_main_bars, total_load, design_moment, design_shear, results):
     """Generate lintel design report"""
@@ -1,13 +1,28 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, dxf_to_bytes, dxf_zip
+from utils.tracing import traced
+from utils.pavement import pavement_design
+from utils.pmgsy_package import (
+    WIDTH_DEFAULTS, PAVEMENT_STRUCTURES, TRAFFIC_LOADS, GRADIENT_LIMITS, CONSTRUCTION_RATES,
+    read_roads_table, package_quantities, package_boq, package_boq_csv, package_summary,
+    generate_package_report
+)
 
 def page_pmgsy_road():
     st.title("🛤️ PMGSY Road Designer")
     st.markdown("Design rural roads as per PMGSY (Pradhan Mantri Gram Sadak Yojana) specifications")
 
+    mode = st.radio("Mode", ["Single Road", "Package of Roads"], horizontal=True,
+                    help="Package mode designs every road of a tender package from a roads table")
+    if mode == "Package of Roads":
+        page_pmgsy_package()
+        return
+
     with st.form("pmgsy_road_form"):
         col1, col2, col3 = st.columns(3)
 
@@ -17,17 +32,9 @@ def page_pmgsy_road():
                                        ["Through Route", "Major Rural Link", "Minor Rural Link", "Village Road"],
                                        index=1, help="PMGSY road classification")
             
-            # Set default widths based on category
-            width_defaults = {
-                "Through Route": 5.5,
-                "Major Rural Link": 4.75,
-                "Minor Rural Link": 4.0,
-                "Village Road": 3.75
-            }
-            
             carriageway_width = st.number_input("Carriageway Width (m)", 
                                               min_value=3.0, max_value=7.0, 
-                                              value=width_defaults[road_category], step=0.25,
+                                              value=WIDTH_DEFAULTS[road_category], step=0.25,
                                               help="As per PMGSY specifications")
             
             shoulder_width = st.number_input("Shoulder Width (m)", min_value=0.5, max_value=1.5, value=1.0, step=0.25,
@@ -41,25 +48,9 @@ def page_pmgsy_road():
             st.subheader("🛤️ Pavement Design")
             traffic_category = st.selectbox("Traffic Category", ["T1", "T2", "T3", "T4"], index=1,
                                           help="PMGSY traffic categories")
+            st.info(f"Traffic Load: {TRAFFIC_LOADS[traffic_category]}")
             
-            # Traffic loads
-            traffic_loads = {
-                "T1": "< 10 CVPD",
-                "T2": "10-20 CVPD", 
-                "T3": "20-50 CVPD",
-                "T4": "> 50 CVPD"
-            }
-            st.info(f"Traffic Load: {traffic_loads[traffic_category]}")
-            
-            # Pavement structure based on traffic
-            pavement_structures = {
-                "T1": {"surface": 20, "base": 100, "subbase": 150},
-                "T2": {"surface": 25, "base": 125, "subbase": 150},
-                "T3": {"surface": 30, "base": 150, "subbase": 200},
-                "T4": {"surface": 40, "base": 175, "subbase": 225}
-            }
-            
-            structure = pavement_structures[traffic_category]
+            structure = PAVEMENT_STRUCTURES[traffic_category]
             
             surface_thickness = st.number_input("Surface Course (mm)", min_value=15, max_value=50, 
                                               value=structure["surface"], step=5,
@@ -71,6 +62,15 @@ def page_pmgsy_road():
                                               value=structure["subbase"], step=25,
                                               help="Granular sub-base")
 
+            st.markdown("**Pavement Design (IRC:37)**")
+            design_pavement = st.checkbox("Design Layers from Traffic", value=False,
+                                          help="Replace the layer thicknesses above with the IRC:37 catalogue design")
+            if design_pavement:
+                cvpd = st.number_input("Commercial Vehicles per Day", min_value=1, max_value=20000, value=30, step=10)
+                growth_rate = st.number_input("Traffic Growth (%)", min_value=0.0, max_value=15.0, value=5.0, step=0.5)
+                design_life = st.number_input("Design Life (years)", min_value=5, max_value=30, value=10, step=5)
+                subgrade_cbr = st.number_input("Subgrade CBR (%)", min_value=1.0, max_value=15.0, value=5.0, step=0.5)
+
         with col3:
             st.subheader("🌊 Drainage & Specifications")
             cross_fall = st.number_input("Cross Fall (%)", min_value=2.0, max_value=4.0, value=2.5, step=0.5,
@@ -95,11 +95,31 @@ def page_pmgsy_road():
         submitted = st.form_submit_button("🔄 Design PMGSY Road", type="primary")
 
     if submitted:
+        if design_pavement:
+            lanes = 'Single Lane' if carriageway_width < 5.5 else 'Intermediate Lane'
+            pavement = pavement_design(cvpd, subgrade_cbr, growth_rate / 100, design_life, lanes, terrain)
+            surface_thickness = int(pavement['surface'] + pavement['binder'])
+            base_thickness, subbase_thickness = int(pavement['base']), int(pavement['subbase'])
+            st.info(f"🧮 IRC:37 design for {float(pavement['msa']):.2f} msa on CBR {subgrade_cbr}%: "
+                    f"surfacing {surface_thickness} + base {base_thickness} + sub-base {subbase_thickness} mm")
+            if pavement['outside']:
+                st.warning("⚠️ Traffic or CBR outside the design catalogue - specific design needed")
         with st.spinner("🔄 Designing PMGSY road..."):
             try:
-                # Calculate PMGSY specific parameters
-                formation_width = carriageway_width + 2 * shoulder_width
+                # Standards and quantities per km, as one road of a package
+                road = {
+                    'name': np.array([road_category]), 'length': np.array([1.0]),
+                    'category': np.array([road_category]), 'traffic': np.array([traffic_category]),
+                    'terrain': np.array([terrain]), 'carriageway': np.array([carriageway_width]),
+                    'shoulder': np.array([shoulder_width]), 'surface': np.array([float(surface_thickness)]),
+                    'base': np.array([float(base_thickness)]), 'subbase': np.array([float(subbase_thickness)]),
+                }
+                quantities = {key: value[0] for key, value in package_quantities(
+                    road, side_drain_required, drain_depth if side_drain_required else 0,
+                    drain_width if side_drain_required else 0).items()}
+                formation_width = quantities['formation_width']
                 total_pavement = surface_thickness + base_thickness + subbase_thickness
+                design_speed = int(quantities['design_speed'])
                 
                 # Create DXF drawing
                 doc = create_pmgsy_road_dxf(
@@ -123,7 +143,7 @@ def page_pmgsy_road():
                             st.markdown("**Road Classification**")
                             st.write(f"• Category: {road_category}")
                             st.write(f"• Traffic Category: {traffic_category}")
-                            st.write(f"• Traffic Load: {traffic_loads[traffic_category]}")
+                            st.write(f"• Traffic Load: {TRAFFIC_LOADS[traffic_category]}")
                             st.write(f"• Terrain: {terrain}")
                             
                             st.markdown("**Geometric Standards**")
@@ -138,19 +158,11 @@ def page_pmgsy_road():
                             st.write(f"• Base Course: {base_thickness} mm") 
                             st.write(f"• Sub-base: {subbase_thickness} mm")
                             st.write(f"• **Total Thickness: {total_pavement} mm**")
-                            
-                            # Check compliance with PMGSY standards
-                            min_widths = {
-                                "Through Route": 5.5,
-                                "Major Rural Link": 4.75,
-                                "Minor Rural Link": 4.0,
-                                "Village Road": 3.75
-                            }
-                            
-                            if carriageway_width >= min_widths[road_category]:
-                                st.success(f"✅ Width compliant (min: {min_widths[road_category]}m)")
+
+                            if quantities['width_compliant']:
+                                st.success(f"✅ Width compliant (min: {WIDTH_DEFAULTS[road_category]}m)")
                             else:
-                                st.error(f"❌ Increase width (min: {min_widths[road_category]}m)")
+                                st.error(f"❌ Increase width (min: {WIDTH_DEFAULTS[road_category]}m)")
 
                     # PMGSY specifications
                     with st.expander("📋 PMGSY Technical Specifications", expanded=True):
@@ -158,23 +170,9 @@ def page_pmgsy_road():
                         
                         with spec_col1:
                             st.markdown("**Design Standards**")
-                            
-                            # Design speed based on terrain and category
-                            design_speeds = {
-                                "Plain": {"Through Route": 80, "Major Rural Link": 65, "Minor Rural Link": 50, "Village Road": 40},
-                                "Rolling": {"Through Route": 65, "Major Rural Link": 50, "Minor Rural Link": 40, "Village Road": 35},
-                                "Hilly": {"Through Route": 50, "Major Rural Link": 40, "Minor Rural Link": 30, "Village Road": 25},
-                                "Steep": {"Through Route": 40, "Major Rural Link": 30, "Minor Rural Link": 25, "Village Road": 20}
-                            }
-                            
-                            design_speed = design_speeds[terrain][road_category]
+
                             st.write(f"• Design Speed: {design_speed} kmph")
-                            
-                            # Gradient limits
-                            gradient_limits = {
-                                "Plain": 4, "Rolling": 6, "Hilly": 8, "Steep": 10
-                            }
-                            st.write(f"• Max Gradient: {gradient_limits[terrain]}%")
+                            st.write(f"• Max Gradient: {GRADIENT_LIMITS[terrain]}%")
                             
                             # Minimum curve radius
                             min_radius = design_speed ** 2 / (127 * 0.15)  # Simplified formula
@@ -210,10 +208,7 @@ def page_pmgsy_road():
                             st.write(f"• Construction Season: {construction_season}")
                             st.write(f"• Quality Control: {quality_control}")
                             
-                            # Construction duration estimate
-                            const_rate = {"Plain": 2.0, "Rolling": 1.5, "Hilly": 1.0, "Steep": 0.8}
-                            rate = const_rate[terrain]
-                            st.write(f"• Construction Rate: ~{rate} km/month")
+                            st.write(f"• Construction Rate: ~{CONSTRUCTION_RATES[terrain]} km/month")
                             
                             # Special requirements
                             if terrain in ["Hilly", "Steep"]:
@@ -225,36 +220,23 @@ def page_pmgsy_road():
                             
                         with const_col2:
                             st.markdown("**Quantity Estimates (per km)**")
-                            
-                            # Calculate material quantities
-                            pavement_area = carriageway_width * 1000  # m² per km
-                            
-                            surface_volume = pavement_area * surface_thickness / 1000  # m³
-                            base_volume = pavement_area * base_thickness / 1000
-                            subbase_volume = pavement_area * subbase_thickness / 1000
+
+                            surface_volume = quantities['surface_volume']
+                            base_volume = quantities['base_volume']
+                            subbase_volume = quantities['subbase_volume']
                             
                             st.write(f"• Surface Course: {surface_volume:.0f} m³")
                             st.write(f"• Base Course: {base_volume:.0f} m³")
                             st.write(f"• Sub-base: {subbase_volume:.0f} m³")
-                            
-                            # Earthwork estimate
-                            avg_fill_height = 0.5  # Assumed average
-                            earthwork = formation_width * 1000 * avg_fill_height
-                            st.write(f"• Earthwork: ~{earthwork:.0f} m³")
-                            
-                            # Drainage
+                            st.write(f"• Earthwork: ~{quantities['earthwork']:.0f} m³")
                             if side_drain_required:
-                                drain_excavation = 2 * (drain_width * drain_depth / 1e6) * 1000
-                                st.write(f"• Drain Excavation: {drain_excavation:.0f} m³")
+                                st.write(f"• Drain Excavation: {quantities['drain_excavation']:.0f} m³")
 
                 with col_download:
                     st.subheader("📥 Download")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "pmgsy_road.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -281,6 +263,127 @@ def page_pmgsy_road():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+def page_pmgsy_package():
+    """Package mode: roads table in, road-wise drawings, consolidated BOQ and report out"""
+    with st.form("pmgsy_package_form"):
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.subheader("📋 Package")
+            package_name = st.text_input("Package Name", value="PMGSY Package")
+            roads_file = st.file_uploader("Roads Table (CSV)", type=['csv', 'txt'],
+                                          help="Columns: name, length (km), category, traffic (T1-T4), terrain; "
+                                               "optional carriageway, shoulder, surface, base, subbase, cvpd, cbr")
+
+        with col2:
+            st.subheader("🛤️ Pavement Design")
+            growth_rate = st.number_input("Traffic Growth (%)", min_value=0.0, max_value=15.0, value=5.0, step=0.5,
+                                          help="For roads with cvpd and cbr in the table (IRC:37 design)")
+            design_life = st.number_input("Design Life (years)", min_value=5, max_value=30, value=10, step=5)
+            cross_fall = st.number_input("Cross Fall (%)", min_value=2.0, max_value=4.0, value=2.5, step=0.5,
+                                         help="Cross-fall for surface drainage")
+
+        with col3:
+            st.subheader("🌊 Drainage")
+            side_drain_required = st.checkbox("Side Drains", value=True, help="Roadside drainage on every road")
+            drain_depth = st.number_input("Drain Depth (mm)", min_value=300, max_value=600, value=450, step=50)
+            drain_width = st.number_input("Drain Width (mm)", min_value=300, max_value=600, value=450, step=50)
+            road_drawings = st.checkbox("Road-wise Drawings", value=True,
+                                        help="Cross-section DXF of every road, drawn in parallel (zip)")
+
+        submitted = st.form_submit_button("🔄 Design PMGSY Package", type="primary")
+
+    if not submitted:
+        return
+    if roads_file is None:
+        st.error("❌ Please upload the roads table of the package")
+        return
+
+    with st.spinner("🔄 Designing PMGSY package..."):
+        try:
+            roads = read_roads_table(roads_file, growth_rate / 100, design_life)
+            quantities = package_quantities(roads, side_drain_required, drain_depth, drain_width)
+            summary = package_summary(roads, quantities)
+
+            col_results, col_download = st.columns([2, 1])
+
+            with col_results:
+                st.success(f"✅ {summary['roads']} roads, {summary['length']:.2f} km designed successfully!")
+
+                with st.expander("📋 Package Summary", expanded=True):
+                    st.table({
+                        "Road": [str(name) for name in roads['name']],
+                        "Length (km)": [f"{length:.2f}" for length in roads['length']],
+                        "Category": list(roads['category']),
+                        "Traffic": list(roads['traffic']),
+                        "Carriageway (m)": [f"{width:.2f}" for width in roads['carriageway']],
+                        "Layers (mm)": [f"{a:.0f}/{b:.0f}/{c:.0f}"
+                                        for a, b, c in zip(roads['surface'], roads['base'], roads['subbase'])],
+                        "Speed (kmph)": [str(speed) for speed in quantities['design_speed']],
+                    })
+                    if summary['designed']:
+                        st.info(f"🧮 Layers of {summary['designed']} road(s) designed by IRC:37 from traffic and CBR")
+                    if summary['non_compliant']:
+                        st.error(f"❌ Carriageway below the PMGSY minimum: {', '.join(summary['non_compliant'])}")
+
+                with st.expander("🧾 Consolidated Bill of Quantities", expanded=True):
+                    st.table(package_boq(quantities))
+
+            with col_download:
+                st.subheader("📥 Download")
+
+                if road_drawings:
+                    drawings = package_drawings(roads, cross_fall, side_drain_required, drain_depth, drain_width)
+                    st.download_button(
+                        label=f"📐 Download {len(drawings)} Road Drawings (zip)",
+                        data=dxf_zip(drawings, "pmgsy_package.zip"),
+                        file_name=f"{package_name.replace(' ', '_')}_drawings.zip",
+                        mime="application/zip"
+                    )
+
+                st.download_button(
+                    label="📊 Download BOQ (CSV)",
+                    data=package_boq_csv(roads, quantities),
+                    file_name=f"{package_name.replace(' ', '_')}_boq.csv",
+                    mime="text/csv"
+                )
+
+                st.download_button(
+                    label="📄 Download Report",
+                    data=generate_package_report(package_name, roads, quantities),
+                    file_name=f"{package_name.replace(' ', '_')}_report.txt",
+                    mime="text/plain"
+                )
+
+        except Exception as e:
+            st.error(f"❌ Error designing package: {str(e)}")
+            st.error("Please check the roads table and input values and try again.")
+
+def _road_drawing(road):
+    """(name, DXF bytes) of one package road - runs in a worker process"""
+    name, arguments = road
+    doc = create_pmgsy_road_dxf(*arguments)
+    return name, dxf_to_bytes(doc, "pmgsy_package.serialize")
+
+@traced("pmgsy_package.drawings")
+def package_drawings(roads, cross_fall, side_drain_required, drain_depth, drain_width, workers=None):
+    """Cross-section drawing of every road in the package, drawn concurrently in worker processes"""
+    jobs = []
+    for i, name in enumerate(roads['name']):
+        file_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(name))
+        jobs.append((f"{i + 1:03d}_{file_name}", (
+            str(roads['category'][i]), float(roads['carriageway'][i]), float(roads['shoulder'][i]), cross_fall,
+            int(roads['surface'][i]), int(roads['base'][i]), int(roads['subbase'][i]),
+            side_drain_required, drain_depth if side_drain_required else 0,
+            drain_width if side_drain_required else 0, str(roads['traffic'][i])
+        )))
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [_road_drawing(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_road_drawing, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+@traced("pmgsy_road.dxf")
 def create_pmgsy_road_dxf(road_category, carriageway_width, shoulder_width, cross_fall,
                          surface_thickness, base_thickness, subbase_thickness,
                          side_drain_required, drain_depth, drain_width, traffic_category):
@@ -397,8 +500,8 @@ def create_pmgsy_road_dxf(road_category, carriageway_width, shoulder_width, cros
         ]
         msp.add_lwpolyline(right_drain_points, dxfattribs={'color': 4})
     
-    # Add dimensions
-    add_dimensions(msp, [
+    # Add dimensions: (first point, second point, dimension line point, text)
+    for p1, p2, base, text in [
         ((-carriageway_half - shoulder_width_scaled, center_y + scale_dim(1)),
          (carriageway_half + shoulder_width_scaled, center_y + scale_dim(1)),
          (0, center_y + scale_dim(1.5)), f"{formation_width:.2f}m FORMATION"),
@@ -409,7 +512,9 @@ def create_pmgsy_road_dxf(road_category, carriageway_width, shoulder_width, cros
          (carriageway_half + shoulder_width_scaled + scale_dim(0.5), formation_level),
          (carriageway_half + shoulder_width_scaled + scale_dim(1), center_y - scale_height(total_pavement/2)),
          f"{total_pavement}mm PAVEMENT")
-    ])
+    ]:
+        msp.add_linear_dim(base=base, p1=p1, p2=p2, angle=90 if p1[0] == p2[0] else 0, text=text,
+                           dimstyle="EZDXF", dxfattribs={'layer': 'DIMENSIONS'}).render()
     
     # Title and specifications
     title_y = center_y + scale_dim(3)
@@ -458,6 +563,7 @@ STANDARDS:
     
     return doc
 
+@traced("pmgsy_road.report")
 def generate_pmgsy_report(road_category, traffic_category, carriageway_width, formation_width,
                          terrain, design_speed, surface_thickness, base_thickness, subbase_thickness,
                          surface_volume, base_volume, subbase_volume):
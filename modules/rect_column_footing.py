@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
 from utils.calculations import calculate_footing_design
+from utils.tracing import traced
 
 def page_rect_column_footing():
     st.title("⬜🦶 Rectangular Column with Footing")
@@ -189,10 +189,7 @@ def page_rect_column_footing():
                     st.subheader("📥 Downloads")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "rect_column_footing.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -221,6 +218,7 @@ def page_rect_column_footing():
                 st.error(f"❌ Error in design: {str(e)}")
                 st.error("Please check input parameters and try again.")
 
+@traced("rect_column_footing.dxf")
 def create_column_footing_dxf(col_width, col_depth, col_height, footing_length, footing_width, 
                              footing_thickness, col_main_dia, col_bars_width, col_bars_depth,
                              footing_main_dia, footing_main_spacing, footing_dist_dia, 
@@ -323,6 +321,7 @@ def create_column_footing_dxf(col_width, col_depth, col_height, footing_length,
     
     return doc
 
+@traced("rect_column_footing.report")
 def generate_footing_report(col_width, col_depth, col_height, footing_length, footing_width, 
                            footing_thickness, concrete_grade, steel_grade, total_load, 
                            moment_x, moment_y, sbc, results):
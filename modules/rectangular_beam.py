@@ -1,10 +1,10 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
 import math
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
 from utils.calculations import calculate_beam_capacity
+from utils.tracing import traced
 
 def page_rectangular_beam():
     st.title("📏 Rectangular Beam Designer")
@@ -99,6 +99,7 @@ def page_rectangular_beam():
                 use_container_width=True
             )
 
+@traced("rectangular_beam.calculate")
 def calculate_rectangular_beam(b, d, length, cover, dia_bottom, n_bottom, dia_top, n_top, 
                               stirrup_dia, stirrup_spacing, fck, fy, dl, ll):
     """
@@ -337,6 +338,7 @@ def display_beam_results(results, b, d, length):
         if results['deflection_check'] != "OK":
             st.warning("• Increase beam depth or reduce span")
 
+@traced("rectangular_beam.dxf")
 def generate_rectangular_beam_dxf(b, d, dia_bottom, n_bottom, dia_top, n_top, 
                                  stirrup_dia, stirrup_spacing, beam_num, scale, results):
     """
@@ -468,13 +470,8 @@ def generate_rectangular_beam_dxf(b, d, dia_bottom, n_bottom, dia_top, n_top,
     # Set zoom to fit drawing
     # This would be handled by the CAD software when opening
     
-    # Save DXF to bytes
-    with tempfile.NamedTemporaryFile(suffix='.dxf', delete=False) as tmp_file:
-        doc.saveas(tmp_file.name)
-        with open(tmp_file.name, 'rb') as f:
-            dxf_content = f.read()
-        import os
-        os.unlink(tmp_file.name)
+    # Serialize DXF
+    dxf_content = dxf_to_bytes(doc, "rectangular_beam.serialize")
     
     return dxf_content
 
@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
 from utils.calculations import calculate_column_capacity
+from utils.tracing import traced
 
 def page_rectangular_column():
     st.title("⬜ Rectangular Column Designer")
@@ -132,11 +132,8 @@ def page_rectangular_column():
                     st.subheader("📥 Download")
                     st.markdown("**CAD Files**")
                     
-                    # Save DXF to temporary file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    # Serialize DXF
+                    dxf_data = dxf_to_bytes(doc, "rectangular_column.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -165,6 +162,7 @@ def page_rectangular_column():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please verify your input parameters and try again.")
 
+@traced("rectangular_column.dxf")
 def create_rectangular_column_dxf(width, depth, height, main_bar_dia, bars_width, bars_depth, tie_dia, tie_spacing, clear_cover):
     """Create DXF drawing for rectangular column"""
     doc = ezdxf.new('R2010')
@@ -268,6 +266,7 @@ def create_rectangular_column_dxf(width, depth, height, main_bar_dia, bars_width
     
     return doc
 
+@traced("rectangular_column.report")
 def generate_column_report(width, depth, height, concrete_grade, steel_grade, main_bar_dia, total_bars, 
                           tie_dia, tie_spacing, axial_load, moment_x, moment_y, results):
     """Generate detailed design calculation report"""
@@ -1,23 +1,33 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from ezdxf.enums import TextEntityAlignment
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
+from utils.tracing import traced
+from utils.pavement import pavement_design
+from utils.alignment import format_chainage
+from utils.cross_sections import (read_cross_sections, compute_cross_sections, cross_section_summary,
+                                  section_volumes, sheet_layout)
+from utils.interval_quantities import station_areas, chunk_stations, interval_quantities_csv
+from utils.superelevation import read_superelevation
 
 def page_road_cross_section():
     st.title("✂️ Road Cross Section Designer")
     st.markdown("Design typical road cross-sections with pavement layers, drainage, and utilities")
 
+    mode = st.radio("Mode", ["Typical Section", "Batch from Survey"], horizontal=True,
+                    help="Batch mode applies the template at every station of a cross-section survey")
+
     with st.form("road_cross_section_form"):
         col1, col2, col3 = st.columns(3)
 
         with col1:
             st.subheader("📐 Road Geometry")
-            carriageway_width = st.number_input("Carriageway Width (m)", min_value=3.5, max_value=15, value=7.0, step=0.5,
+            carriageway_width = st.number_input("Carriageway Width (m)", min_value=3.5, max_value=15.0, value=7.0, step=0.5,
                                               help="Width of main carriageway")
             shoulder_width = st.number_input("Shoulder Width (m)", min_value=1.0, max_value=3.0, value=1.5, step=0.5,
                                            help="Width of road shoulder each side")
-            median_width = st.number_input("Median Width (m)", min_value=0, max_value=5, value=0, step=0.5,
+            median_width = st.number_input("Median Width (m)", min_value=0.0, max_value=5.0, value=0.0, step=0.5,
                                          help="Central median width (0 for no median)")
             
             st.markdown("**Cross-fall & Camber**")
@@ -36,7 +46,16 @@ def page_road_cross_section():
                                         help="Water bound macadam base")
             subbase_course = st.number_input("Sub-base Course (mm)", min_value=150, max_value=400, value=200, step=25,
                                            help="Granular sub-base")
-            
+
+            st.markdown("**Pavement Design (IRC:37)**")
+            design_pavement = st.checkbox("Design Layers from Traffic", value=False,
+                                          help="Replace the layer thicknesses above with the IRC:37 catalogue design")
+            if design_pavement:
+                cvpd = st.number_input("Commercial Vehicles per Day", min_value=1, max_value=20000, value=300, step=10)
+                growth_rate = st.number_input("Traffic Growth (%)", min_value=0.0, max_value=15.0, value=5.0, step=0.5)
+                design_life = st.number_input("Design Life (years)", min_value=5, max_value=30, value=15, step=5)
+                subgrade_cbr = st.number_input("Subgrade CBR (%)", min_value=1.0, max_value=15.0, value=5.0, step=0.5)
+
             st.markdown("**Shoulder Construction**")
             shoulder_type = st.selectbox("Shoulder Type", ["Bituminous", "Concrete", "Granular", "Earth"], index=2,
                                        help="Type of shoulder surface")
@@ -52,7 +71,7 @@ def page_road_cross_section():
                 drain_side_slope = st.number_input("Drain Side Slope (H:V)", min_value=1.0, max_value=3.0, value=1.5, step=0.5)
             
             st.markdown("**Embankment/Cut**")
-            embankment_height = st.number_input("Embankment Height (m)", min_value=0, max_value=10, value=1.5, step=0.5,
+            embankment_height = st.number_input("Embankment Height (m)", min_value=0.0, max_value=10.0, value=1.5, step=0.5,
                                               help="Height above natural ground (0 for at grade)")
             side_slope = st.number_input("Embankment Side Slope (H:V)", min_value=1.5, max_value=3.0, value=2.0, step=0.5,
                                        help="Side slope of embankment")
@@ -62,9 +81,49 @@ def page_road_cross_section():
             if utility_corridor:
                 utility_width = st.number_input("Utility Width (m)", min_value=2, max_value=5, value=3, step=1)
 
+            if mode == "Batch from Survey":
+                st.markdown("**Cross-Section Survey**")
+                survey_file = st.file_uploader("Survey Points (station, offset, level)", type=['csv', 'txt'],
+                                               help="One point per line: chainage (m), offset from centreline "
+                                                    "(m, negative to the left), level (m). Any number of stations.")
+                start_level = st.number_input("Road Level at First Station (m)", value=100.0, step=0.1,
+                                              help="Finished road level at the crown")
+                grade = st.number_input("Longitudinal Grade (%)", min_value=-10.0, max_value=10.0, value=0.0, step=0.1)
+                cut_slope = st.number_input("Cut Side Slope (H:V)", min_value=0.5, max_value=3.0, value=1.0, step=0.5)
+                quantity_interval = st.selectbox("Quantity Interval (m)", [20, 30, 50, 100], index=1,
+                                                 help="Chainage interval of the measurement quantities")
+                superelevation_file = st.file_uploader("Superelevation Table (optional)", type=['csv', 'txt'],
+                                                       help="Station CSV from the Road Plan page (chainage, left %, "
+                                                            "right %, widening); camber is used where empty")
+
         submitted = st.form_submit_button("🔄 Generate Cross Section", type="primary")
 
-    if submitted:
+    if submitted and design_pavement:
+        lanes = 'Two Lane' if median_width == 0 else 'Four Lane Divided'
+        pavement = pavement_design(cvpd, subgrade_cbr, growth_rate / 100, design_life, lanes, 'Plain')
+        surface_course, binder_course = int(pavement['surface']), int(pavement['binder'])
+        base_course, subbase_course = int(pavement['base']), int(pavement['subbase'])
+        st.info(f"🧮 IRC:37 design for {float(pavement['msa']):.2f} msa on CBR {subgrade_cbr}%: "
+                f"BC {surface_course} + DBM {binder_course} + WMM {base_course} + GSB {subbase_course} mm")
+        if pavement['outside']:
+            st.warning("⚠️ Traffic or CBR outside the design catalogue - specific design needed")
+
+    if submitted and mode == "Batch from Survey":
+        if survey_file is None:
+            st.warning("⚠️ Upload a cross-section survey file")
+        else:
+            drain_area = 0.0
+            if side_drain:
+                bottom_width = max(drain_width - 2 * drain_depth / drain_side_slope, 0)
+                drain_area = (drain_width + bottom_width) * drain_depth / 2 / 1e6  # m²
+            show_batch_cross_sections(survey_file, start_level, grade, carriageway_width, shoulder_width,
+                                      median_width, camber, shoulder_slope,
+                                      surface_course + binder_course + base_course + subbase_course,
+                                      side_slope, cut_slope,
+                                      layers=(surface_course + binder_course, base_course, subbase_course),
+                                      shoulder_thickness=shoulder_thickness, drain_area=drain_area,
+                                      quantity_interval=quantity_interval, superelevation_file=superelevation_file)
+    elif submitted:
         with st.spinner("🔄 Generating road cross section..."):
             try:
                 # Calculate total widths
@@ -205,10 +264,7 @@ def page_road_cross_section():
                     st.subheader("📥 Download")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "road_cross_section.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -235,6 +291,170 @@ def page_road_cross_section():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+def show_batch_cross_sections(survey_file, start_level, grade, carriageway_width, shoulder_width, median_width,
+                              camber, shoulder_slope, total_pavement, fill_slope, cut_slope,
+                              layers=None, shoulder_thickness=None, drain_area=0.0, quantity_interval=30,
+                              superelevation_file=None):
+    """Batch mode: template at every surveyed station, areas, volumes, interval quantities and sheets
+
+    superelevation_file: optional station table of cross-fall and widening
+    (see utils.superelevation.read_superelevation), interpolated at each station.
+    """
+    with st.spinner("🔄 Generating cross sections from survey..."):
+        try:
+            survey = read_cross_sections(survey_file)
+            stations = survey['stations']
+            formation = start_level + grade / 100 * (stations - stations[0]) - total_pavement / 1000
+            cross_fall = widening = None
+            if superelevation_file is not None:
+                (fall_chainage, left, right), (widening_chainage, extra) = read_superelevation(superelevation_file)
+                cross_fall = (np.interp(stations, fall_chainage, left), np.interp(stations, fall_chainage, right))
+                widening = np.interp(stations, widening_chainage, extra)
+            sections = compute_cross_sections(survey, formation, carriageway_width, shoulder_width,
+                                              median_width, camber, shoulder_slope, fill_slope, cut_slope,
+                                              cross_fall=cross_fall, widening=widening)
+            summary = cross_section_summary(sections)
+            doc = create_cross_sections_dxf(sections)
+
+            col_results, col_download = st.columns([2, 1])
+
+            with col_results:
+                st.success(f"✅ {summary['stations']} cross sections generated successfully!")
+
+                with st.expander("📋 Earthwork Summary", expanded=True):
+                    summary_col1, summary_col2 = st.columns(2)
+
+                    with summary_col1:
+                        st.markdown("**Survey**")
+                        st.write(f"• Stations: {summary['stations']}")
+                        st.write(f"• From: {format_chainage(summary['first_chainage'])}")
+                        st.write(f"• To: {format_chainage(summary['last_chainage'])}")
+                        st.write(f"• Side Slopes: {fill_slope}:1 fill, {cut_slope}:1 cut (H:V)")
+                        if cross_fall is not None:
+                            steepest = max(np.abs(cross_fall[0]).max(), np.abs(cross_fall[1]).max())
+                            st.write(f"• Superelevation: up to {steepest:.1f}%, widening up to {widening.max():.2f} m")
+
+                    with summary_col2:
+                        st.markdown("**Quantities (average end area)**")
+                        st.write(f"• Cut: {summary['cut_volume']:.0f} m³")
+                        st.write(f"• Fill: {summary['fill_volume']:.0f} m³")
+                        st.write(f"• Max Cut Area: {summary['max_cut_area']:.2f} m²")
+                        st.write(f"• Max Fill Area: {summary['max_fill_area']:.2f} m²")
+
+                    if summary['not_daylighted']:
+                        st.warning(f"⚠️ {summary['not_daylighted']} stations have a side slope that does not meet "
+                                   f"the ground within the surveyed width")
+
+            with col_download:
+                st.subheader("📥 Download")
+
+                st.download_button(
+                    label="📐 Download DXF",
+                    data=dxf_to_bytes(doc, "road_cross_section.serialize"),
+                    file_name=f"road_cross_sections_{summary['stations']}.dxf",
+                    mime="application/dxf"
+                )
+
+                st.download_button(
+                    label="📊 Download Areas (CSV)",
+                    data=cross_section_areas_csv(sections),
+                    file_name="road_cross_section_areas.csv",
+                    mime="text/csv"
+                )
+
+                if layers is not None:
+                    areas = station_areas(stations, carriageway_width + median_width, shoulder_width, *layers,
+                                          sections['cut_area'], sections['fill_area'], drain_area,
+                                          shoulder_thickness=shoulder_thickness)
+                    st.download_button(
+                        label=f"📊 Download Quantities per {quantity_interval} m (CSV)",
+                        data=interval_quantities_csv(chunk_stations(stations, areas), quantity_interval, excel=True),
+                        file_name=f"road_quantities_{quantity_interval}m.csv",
+                        mime="text/csv"
+                    )
+
+        except Exception as e:
+            st.error(f"❌ Error generating cross sections: {str(e)}")
+            st.error("Please check the survey file and input values and try again.")
+
+def cross_section_areas_csv(sections):
+    """Station-wise levels, areas and interval volumes as CSV text"""
+    cut_volume, fill_volume = section_volumes(sections)
+    lines = ["chainage,ground_level,formation_level,cut_area,fill_area,cut_volume,fill_volume,left_catch,right_catch"]
+    for i, chainage in enumerate(sections['stations']):
+        # Interval volumes are listed against the station that closes the interval
+        cut = cut_volume[i - 1] if i else 0.0
+        fill = fill_volume[i - 1] if i else 0.0
+        lines.append(f"{chainage:.3f},{sections['centre_ground'][i]:.3f},{sections['formation_level'][i]:.3f},"
+                     f"{sections['cut_area'][i]:.3f},{sections['fill_area'][i]:.3f},{cut:.3f},{fill:.3f},"
+                     f"{sections['catch_offset'][i, 0]:.3f},{sections['catch_offset'][i, 1]:.3f}")
+    return "\n".join(lines) + "\n"
+
+@traced("road_cross_section.sheets_dxf")
+def create_cross_sections_dxf(sections, scale=100, sheet_width=841, sheet_height=594):
+    """Create DXF with every cross section laid out on A1 sheets (ROADX.LSP style bands)"""
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+    create_dxf_header(doc, "Road Cross Sections")
+
+    unit = 1000 / scale  # drawing mm per metre
+    text_height = 2.5
+    band_height = 4 * text_height  # chainage and area text below each section
+    survey = sections['survey']
+    start = survey['start']
+    count = len(sections['stations'])
+
+    # Section extents: survey width and height above each station's own datum
+    left = np.minimum(survey['offset'][start[:-1]], sections['design_offset'][:, 0])
+    right = np.maximum(survey['offset'][start[1:] - 1], sections['design_offset'][:, -1])
+    top = np.maximum(np.maximum.reduceat(survey['level'], start[:-1]), sections['design_level'].max(axis=1))
+    bottom = np.minimum(np.minimum.reduceat(survey['level'], start[:-1]), sections['design_level'].min(axis=1))
+    datum = np.floor(bottom)  # whole metre below the lowest point of each section
+    half_width = np.maximum(-left, right).max()
+    cell_width = 2 * half_width * unit + 4 * text_height
+    cell_height = (top - datum).max() * unit + band_height + 2 * text_height
+
+    sheet, cell_x, cell_y, per_sheet = sheet_layout(count, cell_width, cell_height, sheet_width, sheet_height)
+    sheets = int(sheet[-1]) + 1
+    sheet_x = sheet * (sheet_width + 50)  # sheets side by side with a 50 mm gap
+
+    for n in range(sheets):
+        x0 = n * (sheet_width + 50)
+        msp.add_lwpolyline([(x0, 0), (x0 + sheet_width, 0), (x0 + sheet_width, sheet_height), (x0, sheet_height)],
+                           close=True, dxfattribs={'layer': 'OUTLINE'})
+        first, last = n * per_sheet, min((n + 1) * per_sheet, count) - 1
+        msp.add_text(f"CROSS SECTIONS CH {format_chainage(sections['stations'][first])} TO "
+                     f"{format_chainage(sections['stations'][last])} - SHEET {n + 1} OF {sheets} - SCALE 1:{scale}",
+                     dxfattribs={'layer': 'TEXT', 'height': 2 * text_height}
+                     ).set_placement((x0 + sheet_width / 2, 8), align=TextEntityAlignment.MIDDLE_CENTER)
+
+    for i in range(count):
+        # Section centreline at the middle of its cell, datum on the band
+        cx = sheet_x[i] + cell_x[i] + cell_width / 2
+        cy = cell_y[i] + band_height
+        points = slice(start[i], start[i + 1])
+
+        ground = np.column_stack((cx + survey['offset'][points] * unit,
+                                  cy + (survey['level'][points] - datum[i]) * unit))
+        msp.add_lwpolyline(ground, dxfattribs={'color': 3})  # Green for ground
+        design = np.column_stack((cx + sections['design_offset'][i] * unit,
+                                  cy + (sections['design_level'][i] - datum[i]) * unit))
+        msp.add_lwpolyline(design, dxfattribs={'color': 1})  # Red for formation
+        msp.add_line((cx, cy), (cx, cy + (top[i] - datum[i]) * unit + text_height),
+                     dxfattribs={'color': 7, 'linetype': 'CENTER'})
+        msp.add_line((ground[0, 0], cy), (ground[-1, 0], cy), dxfattribs={'layer': 'CONSTRUCTION'})
+
+        msp.add_text(f"CH {format_chainage(sections['stations'][i])}   DATUM {datum[i]:.3f}",
+                     dxfattribs={'layer': 'TEXT', 'height': text_height}
+                     ).set_placement((cx, cy - 1.5 * text_height), align=TextEntityAlignment.MIDDLE_CENTER)
+        msp.add_text(f"FL {sections['formation_level'][i]:.3f}   CUT {sections['cut_area'][i]:.2f} m²   "
+                     f"FILL {sections['fill_area'][i]:.2f} m²",
+                     dxfattribs={'layer': 'TEXT', 'height': text_height}
+                     ).set_placement((cx, cy - 3 * text_height), align=TextEntityAlignment.MIDDLE_CENTER)
+
+    return doc
+
+@traced("road_cross_section.dxf")
 def create_road_cross_section_dxf(carriageway_width, shoulder_width, median_width, camber, shoulder_slope,
                                  surface_course, binder_course, base_course, subbase_course,
                                  shoulder_type, shoulder_thickness, side_drain, drain_depth,
@@ -454,6 +674,7 @@ SHOULDER SLOPE: {shoulder_slope}%"""
     
     return doc
 
+@traced("road_cross_section.report")
 def generate_road_cross_section_report(carriageway_width, shoulder_width, median_width, formation_width,
                                      surface_course, base_course, subbase_course, total_pavement,
                                      embankment_height, side_slope, total_pavement_volume):
@@ -1,8 +1,22 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import (
+    create_dxf_header, add_dimensions, dxf_to_bytes, CHAINAGE_FORMATS, chainage_labels,
+    add_chainage_markers
+)
+from utils.tracing import traced
+from utils.vertical_alignment import profile_from_pvis, evaluate, profile_vertices, curve_table, level_at
+from utils.earthwork import read_ground_profile, compute_earthwork, earthwork_summary
+from utils.mass_haul import compute_mass_haul, mass_haul_summary
+from utils.pavement import pavement_design
+from utils.alignment import evenly_spaced_curves
+from utils.corridor import Corridor
+from utils.sheets import tile_sheets, draw_sheets, sheets_zip
+from utils.interval_quantities import station_areas, chunk_stations, interval_quantities_csv
+from utils.drainage import (
+    RUNOFF_COEFFICIENTS, MANNING_N, weighted_runoff_coefficient, design_side_drains, drainage_summary
+)
 
 def page_road_lsection():
     st.title("🛣️ Road Longitudinal Section Designer")
@@ -15,7 +29,7 @@ def page_road_lsection():
             st.subheader("📐 Road Geometry")
             road_length = st.number_input("Road Length (m)", min_value=100, max_value=10000, value=1000, step=100,
                                         help="Total length of road section")
-            road_width = st.number_input("Road Width (m)", min_value=3.5, max_value=15, value=7.0, step=0.5,
+            road_width = st.number_input("Road Width (m)", min_value=3.5, max_value=15.0, value=7.0, step=0.5,
                                        help="Total carriageway width")
             
             st.markdown("**Gradients**")
@@ -28,6 +42,24 @@ def page_road_lsection():
             gradient = ((end_level - start_level) / road_length) * 100
             st.info(f"Calculated Gradient: {gradient:.2f}%")
 
+            st.markdown("**Vertical Curves**")
+            pvi_text = st.text_area("Intermediate PVIs", value="", height=120,
+                                    placeholder="300, 106\n700, 98, 60",
+                                    help="One PVI per line: chainage (m), level (m)[, curve length (m)]. "
+                                         "Curve lengths left out are sized from the design speed.")
+
+            st.markdown("**Ground Survey**")
+            survey_file = st.file_uploader("Ground Levels (chainage, NSL)", type=['csv', 'txt'],
+                                           help="One station per line: chainage (m), natural soil level (m). "
+                                                "Any number of stations; a header line is allowed.")
+
+            st.markdown("**Chainage Marking**")
+            chainage_interval = st.selectbox("Chainage Interval (m)", [20, 30, 50, 100], index=3,
+                                             help="Spacing of chainage ticks and labels")
+            chainage_format = st.selectbox("Chainage Labels", list(CHAINAGE_FORMATS), index=0)
+            quantity_interval = st.selectbox("Quantity Interval (m)", [20, 30, 50, 100], index=1,
+                                             help="Chainage interval of the measurement quantities (with a survey)")
+
         with col2:
             st.subheader("🛤️ Pavement Layers")
             surface_thickness = st.number_input("Surface Course (mm)", min_value=20, max_value=100, value=40, step=10,
@@ -36,13 +68,30 @@ def page_road_lsection():
                                            help="Granular base course thickness")
             subbase_thickness = st.number_input("Sub-base (mm)", min_value=150, max_value=400, value=200, step=25,
                                               help="Granular sub-base thickness")
-            
+
+            st.markdown("**Pavement Design (IRC:37)**")
+            design_pavement = st.checkbox("Design Layers from Traffic", value=False,
+                                          help="Replace the layer thicknesses above with the IRC:37 catalogue design")
+            if design_pavement:
+                cvpd = st.number_input("Commercial Vehicles per Day", min_value=1, max_value=20000, value=300, step=10)
+                growth_rate = st.number_input("Traffic Growth (%)", min_value=0.0, max_value=15.0, value=5.0, step=0.5)
+                design_life = st.number_input("Design Life (years)", min_value=5, max_value=30, value=15, step=5)
+                subgrade_cbr = st.number_input("Subgrade CBR (%)", min_value=1.0, max_value=15.0, value=5.0, step=0.5)
+
             st.markdown("**Shoulder Details**")
             shoulder_width = st.number_input("Shoulder Width (m)", min_value=1.0, max_value=3.0, value=1.5, step=0.5,
                                            help="Width of road shoulder")
             shoulder_type = st.selectbox("Shoulder Type", ["Paved", "Granular", "Earth"], index=1,
                                        help="Type of shoulder construction")
 
+            st.markdown("**Mass Haul**")
+            shrinkage = st.number_input("Shrinkage (%)", min_value=0.0, max_value=40.0, value=10.0, step=1.0,
+                                        help="Volume lost when cut soil is compacted into embankment")
+            bulking = st.number_input("Bulking (%)", min_value=0.0, max_value=60.0, value=0.0, step=5.0,
+                                      help="Volume gained when cut material (e.g. rock) is placed in fill")
+            free_haul = st.number_input("Free Haul Distance (m)", min_value=0.0, max_value=1000.0, value=100.0, step=10.0,
+                                        help="Haul included in the earthwork rate; longer hauls are paid as overhaul")
+
         with col3:
             st.subheader("💧 Drainage & Utilities")
             camber = st.number_input("Camber (%)", min_value=1.5, max_value=4.0, value=2.5, step=0.5,
@@ -52,6 +101,17 @@ def page_road_lsection():
                                              help="Depth of roadside drainage")
             side_drain_width = st.number_input("Side Drain Width (mm)", min_value=300, max_value=800, value=500, step=100,
                                              help="Top width of side drain")
+            hydraulic_design = st.checkbox("Hydraulic Drain Design", value=False,
+                                           help="Size the side drain per reach by the rational method and Manning's equation")
+            if hydraulic_design:
+                one_hour_rainfall = st.number_input("One-hour Rainfall (mm)", min_value=10, max_value=150, value=50,
+                                                    step=5, help="Design one-hour rainfall of the area")
+                land_width = st.number_input("Land Draining to Road (m)", min_value=0, max_value=200, value=15,
+                                             step=5, help="Width of adjoining land draining to each side drain")
+                land_type = st.selectbox("Land Surface", list(RUNOFF_COEFFICIENTS), index=4)
+                drain_lining = st.selectbox("Drain Lining", list(MANNING_N), index=2)
+                outfall_spacing = st.number_input("Outfall Spacing (m)", min_value=50, max_value=1000, value=250,
+                                                  step=50, help="Length of drain reach between outfalls")
             
             st.markdown("**Design Standards**")
             design_speed = st.selectbox("Design Speed (kmph)", [30, 50, 60, 80, 100, 120], index=2,
@@ -59,16 +119,80 @@ def page_road_lsection():
             terrain_type = st.selectbox("Terrain", ["Plain", "Rolling", "Hilly", "Steep"], index=0,
                                       help="Terrain classification")
 
+            st.markdown("**Drawing Sheets**")
+            plan_profile_sheets = st.checkbox("Plan & Profile Sheets", value=False,
+                                              help="Tile the road into A1 plan-and-profile sheets (zip of DXFs)")
+            if plan_profile_sheets:
+                sheet_length = st.selectbox("Sheet Length (m)", [250, 400, 500], index=2,
+                                            help="Chainage covered by each sheet at 1:1000")
+                sheet_overlap = st.number_input("Sheet Overlap (m)", min_value=0, max_value=50, value=20, step=5,
+                                                help="Drawn beyond each match line into the next sheet")
+
         submitted = st.form_submit_button("🔄 Generate L-Section", type="primary")
 
     if submitted:
+        if design_pavement:
+            pavement = pavement_design(cvpd, subgrade_cbr, growth_rate / 100, design_life, 'Two Lane', terrain_type)
+            # Bituminous layers are drawn as one surface course here
+            surface_thickness = int(pavement['surface'] + pavement['binder'])
+            base_thickness, subbase_thickness = int(pavement['base']), int(pavement['subbase'])
+            st.info(f"🧮 IRC:37 design for {float(pavement['msa']):.2f} msa on CBR {subgrade_cbr}%: "
+                    f"bituminous {surface_thickness} + base {base_thickness} + sub-base {subbase_thickness} mm")
+            if pavement['outside']:
+                st.warning("⚠️ Traffic or CBR outside the design catalogue - specific design needed")
         with st.spinner("🔄 Generating road longitudinal section..."):
             try:
+                # Vertical alignment through start, intermediate PVIs and end
+                pvis = parse_pvis(pvi_text, road_length, start_level, end_level)
+                profile = profile_from_pvis(pvis, design_speed)
+                vertical_curves = curve_table(profile)
+                max_gradient = np.abs(profile['grade']).max() * 100
+
+                # Side drains sized per reach between outfalls (masonry drain, vertical sides)
+                drains = None
+                drainage = None
+                if hydraulic_design:
+                    runoff_coefficient = weighted_runoff_coefficient(
+                        [road_width / 2, shoulder_width, land_width],
+                        [RUNOFF_COEFFICIENTS['Bituminous surface'], RUNOFF_COEFFICIENTS['Earthen shoulder'],
+                         RUNOFF_COEFFICIENTS[land_type]]
+                    )
+                    drains = design_side_drains(
+                        lambda chainage: level_at(profile, chainage), 0, road_length,
+                        road_width / 2 + shoulder_width + land_width, runoff_coefficient, one_hour_rainfall,
+                        outfall_spacing, side_drain_width / 1000, 0.0, drain_lining, side_drain_depth / 1000
+                    )
+                    drainage = drainage_summary(drains)
+
+                # Earthwork against the surveyed ground
+                ground = None
+                earthwork = None
+                mass_haul = None
+                if survey_file is not None:
+                    survey_chainage, survey_level = read_ground_profile(survey_file)
+                    within = (survey_chainage >= 0) & (survey_chainage <= road_length)
+                    if within.sum() < 2:
+                        raise ValueError("Ground survey has fewer than two stations within the road length")
+                    ground = (survey_chainage[within], survey_level[within])
+                    pavement_depth = (surface_thickness + base_thickness + subbase_thickness) / 1000
+                    quantities = compute_earthwork(
+                        ground[0], ground[1], level_at(profile, ground[0]) - pavement_depth,
+                        road_width + 2 * shoulder_width
+                    )
+                    earthwork = earthwork_summary(quantities)
+                    mass_haul = compute_mass_haul(
+                        quantities['chainage'], quantities['cut_volume_prismoidal'],
+                        quantities['fill_volume_prismoidal'], shrinkage / 100, bulking / 100, free_haul
+                    )
+                    earthwork['mass_haul'] = mass_haul_summary(mass_haul)
+
                 # Create DXF drawing
                 doc = create_road_lsection_dxf(
                     road_length, road_width, start_level, end_level,
                     surface_thickness, base_thickness, subbase_thickness,
-                    shoulder_width, side_drain_depth, side_drain_width, camber
+                    shoulder_width, side_drain_depth, side_drain_width, camber,
+                    pvis=pvis, design_speed=design_speed, ground=ground, mass_haul=mass_haul,
+                    chainage_interval=chainage_interval, chainage_format=chainage_format, drains=drains
                 )
 
                 # Display results
@@ -88,13 +212,15 @@ def page_road_lsection():
                             st.write(f"• Start Level: {start_level} m")
                             st.write(f"• End Level: {end_level} m")
                             st.write(f"• Gradient: {gradient:.2f}%")
+                            if vertical_curves:
+                                st.write(f"• Steepest Grade: {max_gradient:.2f}%")
                             
                             # Check gradient limits
-                            if terrain_type == "Plain" and abs(gradient) <= 3:
+                            if terrain_type == "Plain" and max_gradient <= 3:
                                 st.success("✅ Gradient within limits for plain terrain")
-                            elif terrain_type == "Rolling" and abs(gradient) <= 6:
+                            elif terrain_type == "Rolling" and max_gradient <= 6:
                                 st.success("✅ Gradient within limits for rolling terrain")
-                            elif terrain_type == "Hilly" and abs(gradient) <= 8:
+                            elif terrain_type == "Hilly" and max_gradient <= 8:
                                 st.success("✅ Gradient within limits for hilly terrain")
                             else:
                                 st.warning("⚠️ Check gradient limits for terrain type")
@@ -111,6 +237,20 @@ def page_road_lsection():
                             st.write(f"• Shoulder: {shoulder_width} m ({shoulder_type})")
                             st.write(f"• Camber: {camber}%")
 
+                    # Vertical curves
+                    if vertical_curves:
+                        with st.expander("⛰️ Vertical Curves", expanded=True):
+                            st.table({
+                                "PVI Ch (m)": [f"{c['pvi_chainage']:.1f}" for c in vertical_curves],
+                                "PVI RL (m)": [f"{c['pvi_level']:.3f}" for c in vertical_curves],
+                                "Grades (%)": [f"{c['grade_in']:+.2f} / {c['grade_out']:+.2f}" for c in vertical_curves],
+                                "Type": [c['type'] for c in vertical_curves],
+                                "Length (m)": [f"{c['length']:.0f}" for c in vertical_curves],
+                                "K": [f"{c['k']:.1f}" for c in vertical_curves],
+                                "Status": ["✅" if c['k'] >= c['k_required'] else f"❌ K < {c['k_required']:.1f}"
+                                           for c in vertical_curves],
+                            })
+
                     # Drainage and geometric details
                     with st.expander("💧 Drainage & Geometric Details", expanded=True):
                         drain_col1, drain_col2 = st.columns(2)
@@ -123,6 +263,22 @@ def page_road_lsection():
                             # Calculate drain capacity (simplified)
                             drain_area = (side_drain_depth * side_drain_width) / 1e6  # m²
                             st.write(f"• Drain Cross-section: {drain_area:.3f} m²")
+                            if drainage:
+                                st.write(f"• Peak Flow: {drainage['max_flow'] * 1000:.0f} l/s "
+                                         f"(Ch {drainage['max_flow_reach'][0]:.0f}-{drainage['max_flow_reach'][1]:.0f})")
+                                st.write(f"• Required Depth: {drainage['max_design_depth'] * 1000:.0f} mm max")
+                                if drainage['overloaded']:
+                                    st.error(f"❌ {drainage['overloaded']} of {drainage['reaches']} reaches "
+                                             f"overflow the {side_drain_depth} mm drain")
+                                else:
+                                    st.success(f"✅ Drain carries the runoff in all {drainage['reaches']} reaches")
+                                if drainage['insufficient']:
+                                    st.error(f"❌ {drainage['insufficient']} reaches carry more than the section "
+                                             f"can take at any depth - widen the drain or add outfalls")
+                                if drainage['silting']:
+                                    st.warning(f"⚠️ {drainage['silting']} reaches below the non-silting velocity")
+                                if drainage['scouring']:
+                                    st.warning(f"⚠️ {drainage['scouring']} reaches above the permissible velocity")
                             
                             # Camber check
                             min_camber = 1.5 if surface_thickness >= 40 else 2.0
@@ -144,6 +300,19 @@ def page_road_lsection():
                             sight_distance = {30: 30, 50: 60, 60: 85, 80: 120, 100: 160, 120: 200}
                             st.write(f"• Stopping Sight Distance: {sight_distance.get(design_speed, 85)} m")
 
+                    if drains is not None:
+                        with st.expander("🌧️ Side Drain Reaches", expanded=False):
+                            st.table({
+                                "Reach (m)": [f"{a:.0f}-{b:.0f}" for a, b in zip(drains['start'], drains['end'])],
+                                "Slope": [f"1 in {1 / slope:.0f}" for slope in drains['slope']],
+                                "Flow (l/s)": [f"{flow * 1000:.1f}" for flow in drains['flow']],
+                                "Capacity (l/s)": [f"{capacity * 1000:.1f}" for capacity in drains['capacity']],
+                                "Depth Req. (mm)": [f"{depth * 1000:.0f}" for depth in drains['design_depth']],
+                                "Velocity (m/s)": [f"{velocity:.2f}" for velocity in drains['velocity']],
+                                "Status": ["❌ Beyond section" if beyond else "❌ Overflows" if over else "✅"
+                                           for beyond, over in zip(drains['insufficient'], drains['overloaded'])],
+                            })
+
                     # Design calculations
                     with st.expander("🧮 Design Calculations", expanded=True):
                         calc_col1, calc_col2 = st.columns(2)
@@ -151,16 +320,41 @@ def page_road_lsection():
                         with calc_col1:
                             st.markdown("**Earthwork Quantities**")
                             
-                            # Simplified earthwork calculation
-                            avg_height = abs(end_level - start_level) / 2
                             formation_width = road_width + 2 * shoulder_width + 1.0  # Including side drains
                             
-                            cut_fill_area = avg_height * formation_width
-                            total_earthwork = cut_fill_area * road_length
-                            
-                            st.write(f"• Formation Width: {formation_width} m")
-                            st.write(f"• Avg Cut/Fill Height: {avg_height:.2f} m")
-                            st.write(f"• Estimated Earthwork: {total_earthwork:.0f} m³")
+                            if earthwork:
+                                # From the ground survey, station by station
+                                total_earthwork = earthwork['cut_prismoidal'] + earthwork['fill_prismoidal']
+                                
+                                st.write(f"• Survey Stations: {earthwork['stations']}")
+                                st.write(f"• Max Cut / Fill: {earthwork['max_cut']:.2f} m / {earthwork['max_fill']:.2f} m")
+                                st.write(f"• Cut: {earthwork['cut_prismoidal']:.0f} m³ prismoidal, "
+                                         f"{earthwork['cut_trapezoidal']:.0f} m³ trapezoidal")
+                                st.write(f"• Fill: {earthwork['fill_prismoidal']:.0f} m³ prismoidal, "
+                                         f"{earthwork['fill_trapezoidal']:.0f} m³ trapezoidal")
+
+                                haul = earthwork['mass_haul']
+                                st.markdown("**Mass Haul**")
+                                st.write(f"• Balance Points: {haul['balance_points']} ({haul['loops']} balanced hauls)")
+                                st.write(f"• Balanced Volume: {haul['balanced_volume']:.0f} m³, "
+                                         f"average haul {haul['average_haul']:.0f} m")
+                                st.write(f"• Free Haul: {haul['free_haul_volume']:.0f} m³ within {free_haul:.0f} m")
+                                st.write(f"• Overhaul: {haul['overhaul_volume']:.0f} m³, "
+                                         f"{haul['overhaul'] / 1000:.1f} m³·km beyond free haul")
+                                if haul['waste'] > 0:
+                                    st.write(f"• Surplus to Waste: {haul['waste']:.0f} m³")
+                                if haul['borrow'] > 0:
+                                    st.write(f"• Borrow Required: {haul['borrow']:.0f} m³")
+                            else:
+                                # Simplified earthwork calculation
+                                avg_height = abs(end_level - start_level) / 2
+                                
+                                cut_fill_area = avg_height * formation_width
+                                total_earthwork = cut_fill_area * road_length
+                                
+                                st.write(f"• Formation Width: {formation_width} m")
+                                st.write(f"• Avg Cut/Fill Height: {avg_height:.2f} m")
+                                st.write(f"• Estimated Earthwork: {total_earthwork:.0f} m³")
                         
                         with calc_col2:
                             st.markdown("**Material Quantities**")
@@ -183,10 +377,7 @@ def page_road_lsection():
                     st.subheader("📥 Download")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "road_lsection.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -194,12 +385,44 @@ def page_road_lsection():
                         file_name=f"road_lsection_{road_length}m_{design_speed}kmph.dxf",
                         mime="application/dxf"
                     )
+
+                    if earthwork is not None:
+                        areas = station_areas(quantities['chainage'], road_width, shoulder_width, surface_thickness,
+                                              base_thickness, subbase_thickness, quantities['cut_area'],
+                                              quantities['fill_area'], side_drain_width * side_drain_depth / 1e6)
+                        st.download_button(
+                            label=f"📊 Download Quantities per {quantity_interval} m (CSV)",
+                            data=interval_quantities_csv(chunk_stations(quantities['chainage'], areas,
+                                                                        quantities['depth']),
+                                                         quantity_interval, excel=True),
+                            file_name=f"road_quantities_{quantity_interval}m.csv",
+                            mime="text/csv"
+                        )
+
+                    if plan_profile_sheets:
+                        # Straight plan along the L-section chainages, profile from the PVIs
+                        corridor = Corridor(evenly_spaced_curves(road_length, 0, 0), profile, camber)
+                        half = road_width / 2
+                        sheets = tile_sheets(
+                            corridor, {'Centre Line': (0, 1), 'Left Edge': (half, 2), 'Right Edge': (-half, 2),
+                                       'Left Shoulder': (half + shoulder_width, 3),
+                                       'Right Shoulder': (-half - shoulder_width, 3)},
+                            sheet_length, sheet_overlap, ground=ground, label_interval=chainage_interval,
+                            label_format=chainage_format, title="ROAD PLAN AND PROFILE"
+                        )
+                        st.download_button(
+                            label=f"🗂️ Download {len(sheets)} Sheets (zip)",
+                            data=sheets_zip(draw_sheets(sheets)),
+                            file_name=f"road_plan_profile_{road_length}m.zip",
+                            mime="application/zip"
+                        )
                     
                     # Generate report
                     report = generate_road_lsection_report(
                         road_length, road_width, start_level, end_level, gradient,
                         surface_thickness, base_thickness, subbase_thickness,
-                        design_speed, terrain_type, total_earthwork, total_material
+                        design_speed, terrain_type, total_earthwork, total_material,
+                        vertical_curves=vertical_curves, earthwork=earthwork, drainage=drainage
                     )
                     
                     st.download_button(
@@ -213,9 +436,31 @@ def page_road_lsection():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+def parse_pvis(text, road_length, start_level, end_level):
+    """PVI list from the start/end levels and 'chainage, level[, curve length]' lines"""
+    pvis = [(0.0, float(start_level))]
+    for line_no, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            values = [float(v) for v in line.replace(';', ',').split(',') if v.strip()]
+        except ValueError:
+            raise ValueError(f"PVI line {line_no}: '{line}' is not 'chainage, level[, curve length]'")
+        if len(values) not in (2, 3):
+            raise ValueError(f"PVI line {line_no}: expected 2 or 3 values, got {len(values)}")
+        if not 0 < values[0] < road_length:
+            raise ValueError(f"PVI line {line_no}: chainage {values[0]} is outside 0-{road_length} m")
+        pvis.append(tuple(values))
+    pvis.append((float(road_length), float(end_level)))
+    return sorted(pvis, key=lambda p: p[0])
+
+@traced("road_lsection.dxf")
 def create_road_lsection_dxf(road_length, road_width, start_level, end_level,
                            surface_thickness, base_thickness, subbase_thickness,
-                           shoulder_width, side_drain_depth, side_drain_width, camber):
+                           shoulder_width, side_drain_depth, side_drain_width, camber,
+                           pvis=None, design_speed=60, ground=None, mass_haul=None,
+                           chainage_interval=100, chainage_format='Metres (1200m)', drains=None):
     """Create DXF drawing for road longitudinal section"""
     doc = ezdxf.new('R2010')
     msp = doc.modelspace()
@@ -230,62 +475,69 @@ def create_road_lsection_dxf(road_length, road_width, start_level, end_level,
     
     # Scale for drawing
     scale_factor = 0.1 if road_length > 2000 else 0.2
+
+    # Design profile (vertical alignment)
+    profile = profile_from_pvis(pvis or [(0, start_level), (road_length, end_level)], design_speed)
+    vertices = profile_vertices(profile)
+    profile_x = vertices[:, 0] * 1000 * scale_factor
+    profile_y = vertices[:, 1] * 1000
+
+    def add_profile_line(depth_mm, dxfattribs):
+        """Profile polyline `depth_mm` below the road surface"""
+        points = np.column_stack((profile_x, (profile_y - depth_mm) * scale_factor))
+        msp.add_lwpolyline(points, dxfattribs=dxfattribs)
     
-    # Ground profile
-    ground_start = (0, start_level_mm * scale_factor)
-    ground_end = (length_mm * scale_factor, end_level_mm * scale_factor)
-    msp.add_line(ground_start, ground_end, dxfattribs={'color': 3})  # Green for ground
+    # Ground profile - the survey as one polyline when given
+    if ground is not None:
+        ground_points = np.column_stack((np.asarray(ground[0]) * 1000 * scale_factor,
+                                         np.asarray(ground[1]) * 1000 * scale_factor))
+        msp.add_lwpolyline(ground_points, dxfattribs={'color': 3})  # Green for ground
+    else:
+        ground_start = (0, start_level_mm * scale_factor)
+        ground_end = (length_mm * scale_factor, end_level_mm * scale_factor)
+        msp.add_line(ground_start, ground_end, dxfattribs={'color': 3})  # Green for ground
     
-    # Formation level (road surface)
+    # Formation level (bottom of pavement)
     formation_offset = (surface_thickness + base_thickness + subbase_thickness)
-    formation_start = (0, (start_level_mm - formation_offset) * scale_factor)
-    formation_end = (length_mm * scale_factor, (end_level_mm - formation_offset) * scale_factor)
-    msp.add_line(formation_start, formation_end, dxfattribs={'color': 1})  # Red for formation
+    add_profile_line(formation_offset, {'color': 1})  # Red for formation
     
     # Pavement layers
     # Sub-base
-    subbase_start = (0, (start_level_mm - subbase_thickness) * scale_factor)
-    subbase_end = (length_mm * scale_factor, (end_level_mm - subbase_thickness) * scale_factor)
-    msp.add_line(subbase_start, subbase_end, dxfattribs={'linetype': 'DASHED'})
+    add_profile_line(subbase_thickness, {'linetype': 'DASHED'})
     
     # Base course
-    base_start = (0, (start_level_mm - surface_thickness - base_thickness) * scale_factor)
-    base_end = (length_mm * scale_factor, (end_level_mm - surface_thickness - base_thickness) * scale_factor)
-    msp.add_line(base_start, base_end, dxfattribs={'linetype': 'DASHED'})
+    add_profile_line(surface_thickness + base_thickness, {'linetype': 'DASHED'})
     
     # Road surface
-    surface_start = (0, start_level_mm * scale_factor)
-    surface_end = (length_mm * scale_factor, end_level_mm * scale_factor)
-    msp.add_line(surface_start, surface_end, dxfattribs={'color': 2, 'lineweight': 35})  # Yellow, thick line
+    add_profile_line(0, {'color': 2, 'lineweight': 35})  # Yellow, thick line
     
     # Side drains
     drain_depth_mm = side_drain_depth
     drain_offset = (road_width/2 + shoulder_width) * 1000 * scale_factor
     
-    # Left side drain
-    left_drain_bottom = (0, (start_level_mm - drain_depth_mm) * scale_factor)
-    left_drain_end = (length_mm * scale_factor, (end_level_mm - drain_depth_mm) * scale_factor)
-    msp.add_line(left_drain_bottom, left_drain_end, dxfattribs={'color': 4, 'linetype': 'DASHED'})
+    # Left side drain: as provided, or the invert sized for each reach
+    if drains is None:
+        add_profile_line(drain_depth_mm, {'color': 4, 'linetype': 'DASHED'})
+    else:
+        for start, end, depth in zip(drains['start'], drains['end'], drains['design_depth']):
+            inside = (vertices[:, 0] > start) & (vertices[:, 0] < end)
+            chainage = np.concatenate(([start], vertices[inside, 0], [end]))
+            invert = level_at(profile, chainage) - depth
+            msp.add_lwpolyline(np.column_stack((chainage, invert)) * 1000 * scale_factor,
+                               dxfattribs={'color': 4, 'linetype': 'DASHED'})
+            msp.add_text(
+                f"DRAIN {depth * 1000:.0f}",
+                dxfattribs={'height': 60 * scale_factor, 'style': 'STANDARD'}
+            ).set_placement(((start + end) / 2 * 1000 * scale_factor,
+                             (level_at(profile, (start + end) / 2) - depth) * 1000 * scale_factor - 100 * scale_factor))
     
-    # Chainage marks every 100m
-    num_chainages = int(road_length / 100) + 1
-    for i in range(num_chainages):
-        chainage_x = i * 100 * 1000 * scale_factor
-        chainage_y_ground = start_level_mm + (end_level_mm - start_level_mm) * (i * 100 / road_length)
-        chainage_y = chainage_y_ground * scale_factor
-        
-        # Chainage line
-        msp.add_line(
-            (chainage_x, chainage_y - 50 * scale_factor),
-            (chainage_x, chainage_y + 50 * scale_factor),
-            dxfattribs={'color': 7}
-        )
-        
-        # Chainage text
-        msp.add_text(
-            f"{i * 100}m",
-            dxfattribs={'height': 100 * scale_factor, 'style': 'STANDARD'}
-        ).set_placement((chainage_x, chainage_y + 100 * scale_factor))
+    # Chainage marks
+    chainages = np.arange(0, road_length + 1e-6, float(chainage_interval))
+    chainage_levels, _ = evaluate(profile, chainages)
+    add_chainage_markers(msp, chainages * 1000 * scale_factor, chainage_levels * 1000 * scale_factor,
+                         chainage_labels(chainages, chainage_format), tick_below=50 * scale_factor,
+                         tick_above=50 * scale_factor, text_offset=100 * scale_factor,
+                         text_height=100 * scale_factor, dxfattribs={'color': 7})
     
     # Level annotations
     msp.add_text(
@@ -298,15 +550,71 @@ def create_road_lsection_dxf(road_length, road_width, start_level, end_level,
         dxfattribs={'height': 150 * scale_factor, 'style': 'STANDARD'}
     ).set_placement((length_mm * scale_factor - 500 * scale_factor, end_level_mm * scale_factor + 200 * scale_factor))
     
-    # Gradient text
-    gradient = ((end_level - start_level) / road_length) * 100
-    msp.add_text(
-        f"GRADIENT: {gradient:.2f}%",
-        dxfattribs={'height': 200 * scale_factor, 'style': 'STANDARD'}
-    ).set_placement((length_mm * scale_factor / 2, (start_level_mm + end_level_mm) / 2 * scale_factor + 300 * scale_factor))
+    # Gradient text on every grade
+    pvi_x = profile['chainage'] * 1000 * scale_factor
+    pvi_y = profile['level'] * 1000 * scale_factor
+    for i, grade in enumerate(profile['grade']):
+        msp.add_text(
+            f"GRADIENT: {grade * 100:.2f}%",
+            dxfattribs={'height': 200 * scale_factor, 'style': 'STANDARD'}
+        ).set_placement(((pvi_x[i] + pvi_x[i + 1]) / 2, (pvi_y[i] + pvi_y[i + 1]) / 2 + 300 * scale_factor))
+
+    # Vertical curves: tangent lines to the PVI, BVC/EVC ticks and curve data
+    for curve in curve_table(profile):
+        pvi = (curve['pvi_chainage'] * 1000 * scale_factor, curve['pvi_level'] * 1000 * scale_factor)
+        for chainage, level in ((curve['bvc_chainage'], curve['bvc_level']),
+                                (curve['evc_chainage'], curve['evc_level'])):
+            point = (chainage * 1000 * scale_factor, level * 1000 * scale_factor)
+            msp.add_line(point, pvi, dxfattribs={'color': 8, 'linetype': 'DASHED'})
+            msp.add_line((point[0], point[1] - 300 * scale_factor), (point[0], point[1] + 300 * scale_factor),
+                         dxfattribs={'color': 6})
+
+        msp.add_text(
+            f"{curve['type'].upper()} CURVE\nPVI CH {curve['pvi_chainage']:.1f} RL {curve['pvi_level']:.3f}\n"
+            f"L = {curve['length']:.0f}m, K = {curve['k']:.1f}",
+            dxfattribs={'height': 120 * scale_factor, 'style': 'STANDARD', 'color': 6}
+        ).set_placement((pvi[0], pvi[1] + (600 if curve['type'] == 'Summit' else -900) * scale_factor))
     
+    # Mass-haul diagram below the section on the same chainage scale
+    if mass_haul is not None:
+        lowest = min(profile['level'].min(), np.min(ground[1]) if ground is not None else np.inf)
+        diagram_height = 0.1 * length_mm * scale_factor
+        axis_y = lowest * 1000 * scale_factor - 2000 * scale_factor - diagram_height / 2
+        ordinate_scale = diagram_height / 2 / max(np.abs(mass_haul['ordinate']).max(), 1.0)
+        haul_x = mass_haul['chainage'] * 1000 * scale_factor
+
+        def haul_y(ordinate):
+            return axis_y + (ordinate - mass_haul['balance']) * ordinate_scale
+
+        msp.add_line((haul_x[0], axis_y), (haul_x[-1], axis_y), dxfattribs={'color': 8})  # Balance line
+        msp.add_lwpolyline(np.column_stack((haul_x, haul_y(mass_haul['ordinate']))), dxfattribs={'color': 5})
+
+        for chainage in mass_haul['balance_chainage']:
+            x = chainage * 1000 * scale_factor
+            msp.add_line((x, axis_y - 200 * scale_factor), (x, axis_y + 200 * scale_factor), dxfattribs={'color': 6})
+            msp.add_text(
+                f"BP {chainage:.1f}",
+                dxfattribs={'height': 100 * scale_factor, 'style': 'STANDARD', 'color': 6, 'rotation': 90}
+            ).set_placement((x - 50 * scale_factor, axis_y + 300 * scale_factor))
+
+        # Free-haul chords of the balanced loops
+        for i in np.flatnonzero(mass_haul['closed'] & (mass_haul['chord'] > 0)):
+            y = axis_y + mass_haul['direction'][i] * mass_haul['chord'][i] * ordinate_scale
+            x1, x2 = mass_haul['chord_start'][i] * 1000 * scale_factor, mass_haul['chord_end'][i] * 1000 * scale_factor
+            msp.add_line((x1, y), (x2, y), dxfattribs={'color': 1, 'linetype': 'DASHED'})
+            msp.add_text(
+                f"FREE {mass_haul['free_haul_volume'][i]:.0f} m³ / OVERHAUL {mass_haul['overhaul_volume'][i]:.0f} m³",
+                dxfattribs={'height': 100 * scale_factor, 'style': 'STANDARD', 'color': 1}
+            ).set_placement((x1, y + mass_haul['direction'][i] * 150 * scale_factor))
+
+        msp.add_text(
+            f"MASS HAUL DIAGRAM (CUT +, FILL -), FREE HAUL {mass_haul['free_haul']:.0f}m, "
+            f"MAX ORDINATE {np.abs(mass_haul['ordinate']).max():.0f} m³",
+            dxfattribs={'height': 200 * scale_factor, 'style': 'STANDARD'}
+        ).set_placement((0, axis_y - diagram_height / 2 - 400 * scale_factor))
+
     # Title and legend
-    title_y = max(start_level_mm, end_level_mm) * scale_factor + 500 * scale_factor
+    title_y = profile['level'].max() * 1000 * scale_factor + 500 * scale_factor
     msp.add_text(
         f"ROAD LONGITUDINAL SECTION\nLENGTH: {road_length}m, WIDTH: {road_width}m",
         dxfattribs={'height': 300 * scale_factor, 'style': 'STANDARD'}
@@ -332,11 +640,43 @@ SIDE DRAIN: {side_drain_depth}mm DEEP"""
     
     return doc
 
+@traced("road_lsection.report")
 def generate_road_lsection_report(road_length, road_width, start_level, end_level, gradient,
                                 surface_thickness, base_thickness, subbase_thickness,
-                                design_speed, terrain_type, total_earthwork, total_material):
+                                design_speed, terrain_type, total_earthwork, total_material,
+                                vertical_curves=None, earthwork=None, drainage=None):
     """Generate road longitudinal section report"""
-    
+
+    curve_lines = ''
+    for curve in vertical_curves or []:
+        curve_lines += (f"- PVI Ch {curve['pvi_chainage']:.1f} m, RL {curve['pvi_level']:.3f} m: "
+                        f"{curve['type']}, grades {curve['grade_in']:+.2f}% / {curve['grade_out']:+.2f}%, "
+                        f"L = {curve['length']:.0f} m, K = {curve['k']:.1f} "
+                        f"({'OK' if curve['k'] >= curve['k_required'] else 'below ' + format(curve['k_required'], '.1f')})\n")
+
+    drainage_lines = ''
+    if drainage:
+        drainage_lines = (f"- Hydraulic check: {drainage['reaches']} reaches, peak flow {drainage['max_flow'] * 1000:.0f} l/s "
+                          f"(rational method, Manning's equation)\n"
+                          f"- Required drain depth: up to {drainage['max_design_depth'] * 1000:.0f} mm incl. freeboard\n"
+                          f"- Reaches overflowing the drain as drawn: {drainage['overloaded']}\n"
+                          f"- Reaches beyond the section at any depth: {drainage['insufficient']}\n")
+
+    earthwork_lines = ''
+    if earthwork:
+        earthwork_lines = (f"- From ground survey: {earthwork['stations']} stations over {earthwork['length']:.0f} m\n"
+                           f"- Cut: {earthwork['cut_prismoidal']:.0f} m³ (prismoidal), "
+                           f"{earthwork['cut_trapezoidal']:.0f} m³ (trapezoidal)\n"
+                           f"- Fill: {earthwork['fill_prismoidal']:.0f} m³ (prismoidal), "
+                           f"{earthwork['fill_trapezoidal']:.0f} m³ (trapezoidal)\n")
+        haul = earthwork.get('mass_haul')
+        if haul:
+            earthwork_lines += (f"- Mass haul: {haul['balance_points']} balance points, "
+                                f"{haul['balanced_volume']:.0f} m³ balanced, average haul {haul['average_haul']:.0f} m\n"
+                                f"- Free haul: {haul['free_haul_volume']:.0f} m³; overhaul: {haul['overhaul_volume']:.0f} m³, "
+                                f"{haul['overhaul'] / 1000:.1f} m³·km\n"
+                                f"- Waste: {haul['waste']:.0f} m³, borrow: {haul['borrow']:.0f} m³\n")
+
     report = f"""
 ROAD LONGITUDINAL SECTION DESIGN REPORT
 =======================================
@@ -353,6 +693,8 @@ VERTICAL ALIGNMENT:
 - Gradient: {gradient:.2f}%
 - Level Difference: {abs(end_level - start_level):.2f} m
 
+VERTICAL CURVES:
+{curve_lines or '- None (single grade)' + chr(10)}
 PAVEMENT STRUCTURE:
 - Surface Course: {surface_thickness} mm (Bituminous)
 - Base Course: {base_thickness} mm (Granular)
@@ -367,7 +709,7 @@ GEOMETRIC STANDARDS:
 
 ESTIMATED QUANTITIES:
 - Earthwork: {total_earthwork:.0f} m³
-- Pavement Materials: {total_material:.0f} m³
+{earthwork_lines}- Pavement Materials: {total_material:.0f} m³
 - Surface Course: {(road_width * road_length * surface_thickness)/1000:.0f} m³
 - Base Course: {(road_width * road_length * base_thickness)/1000:.0f} m³
 - Sub-base Course: {(road_width * road_length * subbase_thickness)/1000:.0f} m³
@@ -378,7 +720,7 @@ DESIGN STANDARDS REFERENCE:
 - IRC:SP:84-2019 (Manual of Specifications & Standards)
 
 DRAINAGE CONSIDERATIONS:
-- Cross drainage structures at natural water crossings
+{drainage_lines}- Cross drainage structures at natural water crossings
 - Side drains for surface water disposal
 - Adequate camber for surface drainage
 - Subsurface drainage if required
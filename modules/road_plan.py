@@ -1,8 +1,27 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import (
+    create_dxf_header, add_dimensions, dxf_to_bytes, CHAINAGE_FORMATS, chainage_labels,
+    add_chainage_markers
+)
+from utils.alignment import (
+    evenly_spaced_curves, polyline_vertices, transition_length, element_table
+)
+from utils.corridor import Corridor
+from utils.superelevation import superelevation_design, superelevation_tables, superelevation_stations
+from utils.junctions import DESIGN_VEHICLES, corridor_junctions, junction_summary
+from utils.setting_out import setting_out_tables, setting_out_csv, curve_table, add_setting_out_tables
+from utils.tin import build_tin, read_tin_points, tin_summary
+from utils.contours import add_contours
+from utils.dxf_import import POINT_TYPES, read_dxf_survey, survey_points
+from utils.corridor_surface import (
+    grade_line_over_ground, corridor_surface, surface_volumes, surface_volume_summary, surface_volumes_csv,
+    add_corridor_mesh
+)
+from utils.tracing import traced
+
+JUNCTION_ARM_LENGTH = 200.0  # m of side road drawn at each junction
 
 def page_road_plan():
     st.title("🗺️ Road Plan Designer")
@@ -15,7 +34,7 @@ def page_road_plan():
             st.subheader("📐 Road Alignment")
             total_length = st.number_input("Total Length (m)", min_value=500, max_value=20000, value=2000, step=100,
                                          help="Total length of road alignment")
-            road_width = st.number_input("Carriageway Width (m)", min_value=3.5, max_value=15, value=7.0, step=0.5,
+            road_width = st.number_input("Carriageway Width (m)", min_value=3.5, max_value=15.0, value=7.0, step=0.5,
                                        help="Width of carriageway")
             shoulder_width = st.number_input("Shoulder Width (m)", min_value=1.0, max_value=3.0, value=1.5, step=0.5,
                                            help="Width of road shoulder")
@@ -28,12 +47,23 @@ def page_road_plan():
                 curve_radius = st.number_input("Curve Radius (m)", min_value=30, max_value=1000, value=150, step=25,
                                              help="Radius of horizontal curves")
 
+            st.markdown("**Chainage Marking**")
+            chainage_interval = st.selectbox("Chainage Interval (m)", [20, 30, 50, 100], index=3,
+                                             help="Spacing of chainage ticks and labels")
+            chainage_format = st.selectbox("Chainage Labels", list(CHAINAGE_FORMATS), index=0)
+            setting_out_interval = st.selectbox("Setting-out Chord (m)", [5, 10, 20, 30], index=1,
+                                                help="Peg interval of the curve setting-out tables")
+
         with col2:
             st.subheader("🛤️ Design Parameters")
             design_speed = st.selectbox("Design Speed (kmph)", [30, 50, 60, 80, 100, 120], index=2,
                                       help="Design speed for geometric design")
-            super_elevation = st.number_input("Super-elevation (%)", min_value=2.5, max_value=7.0, value=4.0, step=0.5,
-                                            help="Banking of road at curves")
+            super_elevation = st.number_input("Max Super-elevation (%)", min_value=2.5, max_value=10.0, value=7.0, step=0.5,
+                                            help="Upper limit; each curve gets e = V²/225R per IRC:73")
+            camber = st.number_input("Camber (%)", min_value=1.5, max_value=4.0, value=2.5, step=0.5,
+                                   help="Normal cross-fall on straights")
+            terrain = st.selectbox("Terrain", ["Plain", "Rolling", "Hilly", "Steep"], index=0,
+                                 help="Sets the rate of change of superelevation (1 in 150 / 1 in 60)")
             
             st.markdown("**Right of Way**")
             row_width = st.number_input("ROW Width (m)", min_value=15, max_value=60, value=30, step=5,
@@ -46,10 +76,14 @@ def page_road_plan():
             if num_intersections > 0:
                 intersection_type = st.selectbox("Intersection Type", ["T-Junction", "Cross Junction", "Roundabout"], 
                                                index=0, help="Type of intersection")
+                side_road_width = st.number_input("Side Road Width (m)", min_value=3.0, max_value=15.0, value=5.5,
+                                                  step=0.5, help="Carriageway width of the minor arms")
+                design_vehicle = st.selectbox("Design Vehicle", list(DESIGN_VEHICLES), index=1,
+                                              help="Sets kerb return, entry radii and circulating width")
 
         with col3:
             st.subheader("🏗️ Infrastructure")
-            median_width = st.number_input("Median Width (m)", min_value=0, max_value=5, value=0, step=0.5,
+            median_width = st.number_input("Median Width (m)", min_value=0.0, max_value=5.0, value=0.0, step=0.5,
                                          help="Width of central median (0 for no median)")
             
             st.markdown("**Utilities**")
@@ -66,18 +100,68 @@ def page_road_plan():
             tree_plantation = st.checkbox("Tree Plantation", value=True, help="Include tree plantation areas")
             noise_barrier = st.checkbox("Noise Barrier", value=False, help="Include noise barriers if required")
 
+            st.markdown("**Ground Model**")
+            ground_file = st.file_uploader("Survey Points (x, y, z)", type=['csv', 'txt', 'dxf'],
+                                           help="One point per line: easting and northing in the plan frame "
+                                                "(road starts at the origin along +x) and level (m), or a "
+                                                "survey DXF of spot levels, contours and breaklines")
+            survey_layers = st.text_input("Survey Layers (DXF)", value="",
+                                          help="Comma-separated layer names or wildcards, e.g. SPOT*, CONTOUR; "
+                                               "their points, contours and breaklines are read. Blank reads "
+                                               "only survey points and levelled spot-level blocks")
+            level_tag = st.text_input("Level Attribute (DXF)", value="LEVEL",
+                                      help="Attribute tag holding the level of spot-level blocks drawn flat")
+            contour_interval = st.selectbox("Contour Interval (m)", [0.25, 0.5, 1.0, 2.0, 5.0], index=2,
+                                            help="Every fifth contour is drawn as a labelled major contour")
+            formation_height = st.number_input("Formation Height (m)", min_value=-5.0, max_value=10.0, value=1.0,
+                                               step=0.25, help="Formation above ground at both ends of the road; "
+                                                               "the corridor surface and its cut and fill follow")
+
         submitted = st.form_submit_button("🔄 Generate Road Plan", type="primary")
 
     if submitted:
         with st.spinner("🔄 Generating road plan layout..."):
             try:
+                ground = None
+                if ground_file is not None and ground_file.name.lower().endswith('.dxf'):
+                    layers = [layer for layer in survey_layers.split(',') if layer.strip()]
+                    if layers:
+                        survey = read_dxf_survey(ground_file, layers, level_tag=level_tag.strip() or None)
+                    else:
+                        # No layer filter: drawing linework and unlevelled blocks would corrupt the ground model
+                        survey = read_dxf_survey(ground_file, types=POINT_TYPES, level_tag=level_tag.strip() or None,
+                                                 require_level=bool(level_tag.strip()))
+                    ground = build_tin(*survey_points(survey, include_polylines=bool(layers)))
+                elif ground_file is not None:
+                    ground = build_tin(*read_tin_points(ground_file))
+
+                # Alignment, superelevation, junctions and corridor surface, shared by the page and the drawing
+                design = road_plan_design(
+                    total_length, road_width, shoulder_width, num_curves, curve_radius if num_curves > 0 else 0,
+                    num_intersections, intersection_type if num_intersections > 0 else "", median_width,
+                    design_speed, super_elevation, terrain=terrain, camber=camber,
+                    setting_out_interval=setting_out_interval,
+                    side_road_width=side_road_width if num_intersections > 0 else None,
+                    design_vehicle=design_vehicle if num_intersections > 0 else 'Single Unit Truck',
+                    ground=ground, formation_height=formation_height
+                )
+                alignment, curves, corridor = design['alignment'], design['curves'], design['corridor']
+                cross_fall = design['cross_fall']
+                pegs, curve_summary = design['pegs'], design['curve_summary']
+                volumes = design['volumes']
+                if volumes is not None:
+                    volume_summary = surface_volume_summary(volumes, design['surface'])
+                junctions = junction_summary(design['junctions']) if design['junctions'] is not None else None
+
                 # Create DXF drawing
                 doc = create_road_plan_dxf(
                     total_length, road_width, shoulder_width, row_width,
                     num_curves, curve_radius if num_curves > 0 else 0,
                     num_intersections, intersection_type if num_intersections > 0 else "",
                     median_width, service_road, service_width if service_road else 0,
-                    design_speed, super_elevation
+                    design_speed, super_elevation, chainage_interval=chainage_interval,
+                    chainage_format=chainage_format, ground=ground, contour_interval=contour_interval,
+                    design=design
                 )
 
                 # Display results
@@ -117,12 +201,39 @@ def page_road_plan():
                                     st.success(f"✅ Curve radius OK (min: {min_req}m)")
                                 else:
                                     st.error(f"❌ Increase radius (min: {min_req}m)")
+                                if design['transition'] < design['transition_required'] - 0.05:
+                                    st.warning(f"⚠️ Transitions drawn {design['transition']:.1f} m long, shorter than "
+                                               f"the IRC minimum of {design['transition_required']:.1f} m - "
+                                               f"fewer curves or a longer road are needed to fit them")
                             
-                            st.write(f"• Super-elevation: {super_elevation}%")
+                            if curves:
+                                st.write(f"• Super-elevation: {max(c['superelevation'] for c in curves):.1f}% "
+                                         f"(max allowed {super_elevation}%)")
                             
                             if median_width > 0:
                                 st.write(f"• Median Width: {median_width} m")
 
+                    # Superelevation and widening
+                    if curves:
+                        with st.expander("↩️ Superelevation & Widening", expanded=True):
+                            st.table({
+                                "Curve": [f"{i + 1} ({'L' if c['hand'] > 0 else 'R'})" for i, c in enumerate(curves)],
+                                "SC - CS (m)": [f"{c['sc']:.1f} - {c['cs']:.1f}" for c in curves],
+                                "Radius (m)": [f"{c['radius']:.0f}" for c in curves],
+                                "e (%)": [f"{c['superelevation']:.1f}" for c in curves],
+                                "Friction": [f"{c['friction']:.3f}" for c in curves],
+                                "Widening (m)": [f"{c['widening']:.1f}" for c in curves],
+                                "Runoff (m)": [f"{c['runoff']:.1f}" for c in curves],
+                                "Crown Removal (m)": [f"{c['runout']:.1f}" for c in curves],
+                            })
+                            for i, c in enumerate(curves):
+                                if c['friction'] > 0.15:
+                                    st.warning(f"⚠️ Curve {i + 1}: side friction {c['friction']:.3f} exceeds 0.15 - "
+                                               f"increase radius or restrict speed")
+                                if c['runoff'] < c['runoff_required']:
+                                    st.warning(f"⚠️ Curve {i + 1}: runoff {c['runoff']:.1f} m is shorter than "
+                                               f"{c['runoff_required']:.1f} m for the rate of change")
+
                     # Infrastructure details
                     with st.expander("🏗️ Infrastructure & Utilities", expanded=True):
                         infra_col1, infra_col2 = st.columns(2)
@@ -152,6 +263,43 @@ def page_road_plan():
                             total_area = row_width * total_length / 10000  # hectares
                             st.write(f"• Total Land Area: {total_area:.2f} hectares")
 
+                    if junctions:
+                        with st.expander("🚦 Junctions", expanded=False):
+                            st.write(f"• {junctions['count']} × {junctions['type']} for {design_vehicle}")
+                            if junctions['type'] == "Roundabout":
+                                st.write(f"• Central Island Radius: {junctions['island_radius']:.1f} m, "
+                                         f"Inscribed Radius: {junctions['inscribed_radius']:.1f} m")
+                            st.write(f"• {'Entry' if junctions['type'] == 'Roundabout' else 'Kerb Return'} "
+                                     f"Radius: {junctions['corner_radius']:.0f} m")
+                            st.write(f"• Junction Paving: {junctions['paved_area']:.0f} m²")
+                            st.write(f"• Islands: {junctions['island_area']:.0f} m²")
+                            st.write(f"• Kerbing: {junctions['kerb_length']:.0f} m")
+
+                    if ground is not None:
+                        with st.expander("⛰️ Ground Model", expanded=False):
+                            ground_summary = tin_summary(ground)
+                            st.write(f"• Survey Points: {ground_summary['points']:,}, "
+                                     f"Triangles: {ground_summary['triangles']:,}")
+                            st.write(f"• Levels: {ground_summary['z_range'][0]:.2f} m to "
+                                     f"{ground_summary['z_range'][1]:.2f} m")
+                            st.write(f"• Contours: {contour_interval} m interval, "
+                                     f"major every {5 * contour_interval:g} m")
+                            st.markdown("**Earthwork by Surface Difference**")
+                            st.write(f"• Cut: {volume_summary['cut']:,.0f} m³, Fill: {volume_summary['fill']:,.0f} m³")
+                            st.write(f"• Corridor Footprint: {volume_summary['area']:,.0f} m²")
+                            if volume_summary['not_daylighted']:
+                                st.warning(f"⚠️ {volume_summary['not_daylighted']} side slopes do not meet the "
+                                           f"ground within 30 m or run off the survey")
+                            if volume_summary['unmeasured']:
+                                st.warning(f"⚠️ {volume_summary['unmeasured']:,.0f} m² of the corridor lies outside "
+                                           f"the ground model and is not measured")
+
+                    if len(curve_summary['start']):
+                        with st.expander("📐 Curve Setting-out", expanded=False):
+                            st.table(curve_table(curve_summary))
+                            st.caption(f"{len(pegs['chainage'])} pegs at {setting_out_interval} m chords, "
+                                       "deflection angles and tangent offsets from each curve's start")
+
                     # Design calculations
                     with st.expander("🧮 Design Calculations", expanded=True):
                         calc_col1, calc_col2 = st.columns(2)
@@ -160,12 +308,14 @@ def page_road_plan():
                             st.markdown("**Geometric Calculations**")
                             
                             if num_curves > 0:
-                                # Curve calculations
-                                curve_length = (np.pi * curve_radius * 90) / 180  # Assuming 90° curves
-                                transition_length = design_speed**2 / (2.5 * curve_radius)  # Simplified
+                                # Curve calculations from the drawn alignment
+                                spiral_length = design['transition']
+                                curve_elements = [e for e in element_table(alignment) if e['element'] != 'Tangent']
+                                curve_length = sum(e['length'] for e in curve_elements) / num_curves
                                 
-                                st.write(f"• Curve Length: {curve_length:.0f} m (per curve)")
-                                st.write(f"• Transition Length: {transition_length:.0f} m")
+                                st.write(f"• Curve Length: {curve_length:.0f} m (per curve, incl. transitions)")
+                                st.write(f"• Transition Length: {spiral_length:.1f} m as drawn "
+                                         f"({design['transition_required']:.0f} m required)")
                                 
                                 total_curve_length = num_curves * curve_length
                                 straight_length = total_length - total_curve_length
@@ -202,10 +352,7 @@ def page_road_plan():
                     st.subheader("📥 Download")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "road_plan.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -214,11 +361,38 @@ def page_road_plan():
                         mime="application/dxf"
                     )
                     
+                    if curves:
+                        stations = superelevation_stations(
+                            corridor, np.unique(np.concatenate((corridor.stations(10.0), cross_fall[0]))), road_width
+                        )
+                        st.download_button(
+                            label="📊 Download Superelevation Table (CSV)",
+                            data=superelevation_csv(stations),
+                            file_name="road_superelevation.csv",
+                            mime="text/csv"
+                        )
+
+                    if volumes is not None:
+                        st.download_button(
+                            label="⛰️ Download Surface Volumes (CSV)",
+                            data=surface_volumes_csv(volumes),
+                            file_name="road_surface_volumes.csv",
+                            mime="text/csv"
+                        )
+
+                    if len(curve_summary['start']):
+                        st.download_button(
+                            label="📐 Download Setting-out Tables (CSV)",
+                            data=setting_out_csv(pegs),
+                            file_name="road_curve_setting_out.csv",
+                            mime="text/csv"
+                        )
+
                     # Generate report
                     report = generate_road_plan_report(
                         total_length, road_width, shoulder_width, row_width,
                         design_speed, num_curves, curve_radius if num_curves > 0 else 0,
-                        num_intersections, pavement_area + shoulder_area
+                        num_intersections, pavement_area + shoulder_area, curves=curves, junctions=junctions
                     )
                     
                     st.download_button(
@@ -232,10 +406,79 @@ def page_road_plan():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+def superelevation_csv(stations):
+    """Station-wise cross-fall, widening and edge heights as CSV text"""
+    lines = ["chainage,left_fall_pct,right_fall_pct,widening,left_edge_height,right_edge_height"]
+    for i, chainage in enumerate(stations['chainage']):
+        lines.append(f"{chainage:.3f},{stations['left_fall'][i]:.2f},{stations['right_fall'][i]:.2f},"
+                     f"{stations['widening'][i]:.3f},{stations['left_height'][i]:.3f},{stations['right_height'][i]:.3f}")
+    return "\n".join(lines) + "\n"
+
+@traced("road_plan.design")
+def road_plan_design(total_length, road_width, shoulder_width, num_curves, curve_radius, num_intersections,
+                     intersection_type, median_width, design_speed, super_elevation, terrain='Plain', camber=2.5,
+                     setting_out_interval=None, side_road_width=None, design_vehicle='Single Unit Truck',
+                     ground=None, formation_height=1.0):
+    """Alignment, superelevation, corridor, junctions, setting-out and corridor surface of the road plan
+
+    Worked out once for the page and passed to create_road_plan_dxf(). Keys
+    not applicable (no setting-out interval, no junctions, no ground model)
+    are None. 'transition' is the transition length as drawn, which may be
+    shorter than the IRC 'transition_required' when the curves are crowded.
+    """
+    # Horizontal alignment: tangents, transitions and circular curves
+    spiral_length = transition_length(design_speed, curve_radius) if num_curves > 0 else 0
+    alignment = evenly_spaced_curves(total_length, num_curves, curve_radius, spiral_length)
+    drawn_spiral = max((e['length'] for e in element_table(alignment) if e['element'] == 'Transition'), default=0.0)
+    curves = superelevation_design(alignment, design_speed, road_width, camber, terrain,
+                                   max_superelevation=super_elevation)
+    cross_fall, widening = superelevation_tables(alignment, curves, camber)
+    corridor = Corridor(alignment, camber=camber, cross_fall=cross_fall, widening=widening)
+
+    pegs = curve_summary = None
+    if setting_out_interval:
+        pegs, curve_summary = setting_out_tables(alignment, setting_out_interval)
+
+    junctions = None
+    if num_intersections > 0:
+        junction_chainages = total_length * np.arange(1, num_intersections + 1) / (num_intersections + 1)
+        junctions = corridor_junctions(corridor, junction_chainages, intersection_type, road_width,
+                                       side_road_width, design_vehicle, design_speed, JUNCTION_ARM_LENGTH)
+
+    # Corridor surface daylighted to the ground, with its cut and fill
+    surface = volumes = None
+    if ground is not None:
+        profiled = Corridor(alignment, grade_line_over_ground(alignment, ground, formation_height),
+                            camber, cross_fall, widening)
+        surface = corridor_surface(profiled, ground, road_width, shoulder_width, median_width)
+        volumes = surface_volumes(surface, ground)
+
+    return {
+        'alignment': alignment,
+        'transition': drawn_spiral,
+        'transition_required': spiral_length,
+        'curves': curves,
+        'cross_fall': cross_fall,
+        'widening': widening,
+        'corridor': corridor,
+        'pegs': pegs,
+        'curve_summary': curve_summary,
+        'junctions': junctions,
+        'surface': surface,
+        'volumes': volumes,
+    }
+
+@traced("road_plan.dxf")
 def create_road_plan_dxf(total_length, road_width, shoulder_width, row_width,
                         num_curves, curve_radius, num_intersections, intersection_type,
-                        median_width, service_road, service_width, design_speed, super_elevation):
-    """Create DXF drawing for road plan"""
+                        median_width, service_road, service_width, design_speed, super_elevation,
+                        terrain='Plain', camber=2.5, chainage_interval=100, chainage_format='Metres (1200m)',
+                        setting_out_interval=None, side_road_width=None, design_vehicle='Single Unit Truck',
+                        ground=None, contour_interval=1.0, formation_height=1.0, design=None):
+    """Create DXF drawing for road plan
+
+    design: road_plan_design() of the same inputs, worked out here when not given.
+    """
     doc = ezdxf.new('R2010')
     msp = doc.modelspace()
     
@@ -244,141 +487,128 @@ def create_road_plan_dxf(total_length, road_width, shoulder_width, row_width,
     
     # Scale for drawing (1:1000 typical for road plans)
     scale = 1000
-    length_scaled = total_length * 1000 / scale  # Convert to mm then scale
-    width_scaled = row_width * 1000 / scale
-    
+    unit = 1000 / scale  # drawing units per metre
+
+    if design is None:
+        design = road_plan_design(total_length, road_width, shoulder_width, num_curves, curve_radius,
+                                  num_intersections, intersection_type, median_width, design_speed, super_elevation,
+                                  terrain, camber, setting_out_interval, side_road_width, design_vehicle,
+                                  ground, formation_height)
+    alignment, curves, corridor = design['alignment'], design['curves'], design['corridor']
+    cross_fall = design['cross_fall']
+
+    # Ground contours as the background layer
+    if ground is not None:
+        add_contours(msp, ground, contour_interval, scale=unit, text_height=30 / scale * 1000)
+
+    def add_offset_line(offset, dxfattribs):
+        msp.add_lwpolyline(polyline_vertices(alignment, offset, scale=unit), format='xyb', dxfattribs=dxfattribs)
+
     # Road centerline (main alignment)
-    if num_curves == 0:
-        # Straight road
-        msp.add_line((0, 0), (length_scaled, 0), dxfattribs={'color': 1, 'lineweight': 50})
-    else:
-        # Road with curves - simplified as a serpentine pattern
-        points = []
-        segment_length = length_scaled / (num_curves + 1)
-        
-        for i in range(num_curves + 2):
-            x = i * segment_length
-            if i % 2 == 0:
-                y = 0
-            else:
-                y = (curve_radius * 1000 / scale) / 4  # Simplified curve representation
-            points.append((x, y))
-        
-        msp.add_spline(points, dxfattribs={'color': 1, 'lineweight': 50})
-    
-    # Road edges
-    road_half_width = (road_width * 1000 / scale) / 2
-    
-    # Left edge
-    left_edge_points = []
-    right_edge_points = []
-    
-    if num_curves == 0:
-        left_edge_points = [(0, -road_half_width), (length_scaled, -road_half_width)]
-        right_edge_points = [(0, road_half_width), (length_scaled, road_half_width)]
-    else:
-        # Simplified curve edges
-        segment_length = length_scaled / (num_curves + 1)
-        for i in range(num_curves + 2):
-            x = i * segment_length
-            if i % 2 == 0:
-                y_center = 0
-            else:
-                y_center = (curve_radius * 1000 / scale) / 4
-            
-            left_edge_points.append((x, y_center - road_half_width))
-            right_edge_points.append((x, y_center + road_half_width))
-    
-    msp.add_spline(left_edge_points, dxfattribs={'color': 2})
-    msp.add_spline(right_edge_points, dxfattribs={'color': 2})
-    
+    add_offset_line(0, {'color': 1, 'lineweight': 50})
+
+    # Road edges - true offsets of the centreline
+    road_half_width = road_width / 2
+    add_offset_line(road_half_width, {'color': 2})
+    add_offset_line(-road_half_width, {'color': 2})
+
     # Shoulders
-    shoulder_width_scaled = shoulder_width * 1000 / scale
-    
-    # Left shoulder
-    left_shoulder_points = [(x, y - shoulder_width_scaled) for x, y in left_edge_points]
-    msp.add_spline(left_shoulder_points, dxfattribs={'color': 3, 'linetype': 'DASHED'})
-    
-    # Right shoulder
-    right_shoulder_points = [(x, y + shoulder_width_scaled) for x, y in right_edge_points]
-    msp.add_spline(right_shoulder_points, dxfattribs={'color': 3, 'linetype': 'DASHED'})
-    
+    add_offset_line(road_half_width + shoulder_width, {'color': 3, 'linetype': 'DASHED'})
+    add_offset_line(-road_half_width - shoulder_width, {'color': 3, 'linetype': 'DASHED'})
+
     # Right of Way boundary
-    row_half_width = (row_width * 1000 / scale) / 2
-    msp.add_line((0, -row_half_width), (length_scaled, -row_half_width), 
-                dxfattribs={'color': 4, 'linetype': 'DASHDOT'})
-    msp.add_line((0, row_half_width), (length_scaled, row_half_width), 
-                dxfattribs={'color': 4, 'linetype': 'DASHDOT'})
-    
+    row_half_width = row_width / 2
+    add_offset_line(row_half_width, {'color': 4, 'linetype': 'DASHDOT'})
+    add_offset_line(-row_half_width, {'color': 4, 'linetype': 'DASHDOT'})
+
     # Median (if provided)
     if median_width > 0:
-        median_half_width = (median_width * 1000 / scale) / 2
-        median_left = [(x, y + median_half_width) for x, y in [(0, 0), (length_scaled, 0)]]
-        median_right = [(x, y - median_half_width) for x, y in [(0, 0), (length_scaled, 0)]]
-        
-        msp.add_line(median_left[0], median_left[1], dxfattribs={'color': 5})
-        msp.add_line(median_right[0], median_right[1], dxfattribs={'color': 5})
-    
-    # Intersections
-    if num_intersections > 0:
-        intersection_spacing = length_scaled / (num_intersections + 1)
-        
-        for i in range(num_intersections):
-            x_pos = (i + 1) * intersection_spacing
-            
-            if intersection_type == "T-Junction":
-                # Simple T-junction
-                junction_length = 200 / scale * 1000
-                msp.add_line((x_pos, road_half_width), 
-                           (x_pos, road_half_width + junction_length),
-                           dxfattribs={'color': 6, 'lineweight': 30})
-                
-            elif intersection_type == "Cross Junction":
-                # Cross junction
-                junction_length = 200 / scale * 1000
-                msp.add_line((x_pos, -road_half_width - junction_length), 
-                           (x_pos, road_half_width + junction_length),
-                           dxfattribs={'color': 6, 'lineweight': 30})
-                
-            elif intersection_type == "Roundabout":
-                # Simple roundabout
-                roundabout_radius = 50 / scale * 1000
-                msp.add_circle((x_pos, 0), roundabout_radius, 
-                             dxfattribs={'color': 6, 'lineweight': 30})
-    
+        add_offset_line(median_width / 2, {'color': 5})
+        add_offset_line(-median_width / 2, {'color': 5})
+
+    # Extra widening on curves, half each side, over the runoff and the curve
+    for curve in curves:
+        if curve['widening'] > 0:
+            chainages = np.linspace(curve['full_in'] - curve['runoff'], curve['full_out'] + curve['runoff'], 60)
+            half = road_half_width + corridor.widening(chainages) / 2
+            for side in (1, -1):
+                x, y = corridor.position(chainages, side * half)
+                msp.add_lwpolyline(np.column_stack((x, y)) * unit, dxfattribs={'color': 2, 'linetype': 'DASHED'})
+
+    # Intersections - kerb returns, islands and minor arms square to the alignment
+    junctions = design['junctions']
+    if junctions is not None:
+        junction_attribs = {'color': 6, 'lineweight': 30}
+        for kerb in junctions['kerbs'].reshape(-1, *junctions['kerbs'].shape[-2:]):
+            msp.add_lwpolyline(kerb * unit, dxfattribs=junction_attribs)
+        for edge in junctions['arm_edges'].reshape(-1, 2, 2):
+            msp.add_line(tuple(edge[0] * unit), tuple(edge[1] * unit), dxfattribs=junction_attribs)
+        for island in junctions['splitters'].reshape(-1, *junctions['splitters'].shape[-2:]):
+            msp.add_lwpolyline(island * unit, close=True, dxfattribs={'color': 3})
+        for island, circle in zip(junctions['central_island'], junctions['inscribed']):
+            if len(island):
+                msp.add_lwpolyline(island * unit, close=True, dxfattribs={'color': 3, 'lineweight': 30})
+                msp.add_lwpolyline(circle * unit, close=True, dxfattribs=junction_attribs)
+
+    # Corridor surface daylighted to the ground, as a 3D mesh
+    if design['surface'] is not None:
+        add_corridor_mesh(msp, design['surface'], scale=unit)
+
     # Service roads
     if service_road:
-        service_offset = (road_half_width + shoulder_width_scaled + 
-                         service_width * 1000 / scale / 2 + 100 / scale * 1000)
-        
-        # Left service road
-        msp.add_line((0, -service_offset), (length_scaled, -service_offset),
-                    dxfattribs={'color': 7, 'linetype': 'DASHED'})
-        
-        # Right service road
-        msp.add_line((0, service_offset), (length_scaled, service_offset),
-                    dxfattribs={'color': 7, 'linetype': 'DASHED'})
-    
-    # Chainage markers every 100m
-    chainage_interval = 100 * 1000 / scale
-    num_chainages = int(length_scaled / chainage_interval) + 1
-    
-    for i in range(num_chainages):
-        x_pos = i * chainage_interval
-        if x_pos <= length_scaled:
-            # Chainage line across road
-            msp.add_line((x_pos, -road_half_width), (x_pos, road_half_width),
-                        dxfattribs={'color': 8, 'linetype': 'CENTER'})
-            
-            # Chainage text
-            msp.add_text(f"{i * 100}m",
-                        dxfattribs={'height': 100 / scale * 1000, 'style': 'STANDARD'}
-                        ).set_placement((x_pos, road_half_width + 200 / scale * 1000))
-    
+        service_offset = road_half_width + shoulder_width + service_width / 2 + 100
+
+        # Left and right service roads
+        add_offset_line(service_offset, {'color': 7, 'linetype': 'DASHED'})
+        add_offset_line(-service_offset, {'color': 7, 'linetype': 'DASHED'})
+
+    # Chainage ticks and labels square to the alignment
+    chainages = np.arange(0, total_length + 1e-6, float(chainage_interval))
+    ticks = corridor.query(chainages)
+    add_chainage_markers(msp, ticks['x'] * unit, ticks['y'] * unit, chainage_labels(chainages, chainage_format),
+                         rotation=np.degrees(ticks['heading']), tick_below=road_half_width * unit,
+                         tick_above=road_half_width * unit, text_offset=(road_half_width + 200) * unit,
+                         text_height=100 * unit, dxfattribs={'color': 8, 'linetype': 'CENTER'})
+
+    # Sheet extents from the ROW boundaries
+    outline = np.vstack([polyline_vertices(alignment, offset)[:, :2] for offset in (row_half_width, -row_half_width)])
+    min_x, min_y = outline.min(axis=0) * unit
+    max_x, max_y = outline.max(axis=0) * unit
+
+    # Superelevation diagram: edge heights relative to the centre line (% of half width)
+    if curves:
+        diagram_y = min_y - 3000 / scale * 1000
+        per_percent = 40 / scale * 1000
+        stations = np.unique(np.concatenate(([0, total_length], cross_fall[0])))
+        left_fall, right_fall = corridor.cross_fall(stations)
+        diagram_x = stations * unit
+        msp.add_line((diagram_x[0], diagram_y), (diagram_x[-1], diagram_y), dxfattribs={'color': 1})
+        msp.add_lwpolyline(np.column_stack((diagram_x, diagram_y - left_fall * per_percent)), dxfattribs={'color': 3})
+        msp.add_lwpolyline(np.column_stack((diagram_x, diagram_y - right_fall * per_percent)),
+                           dxfattribs={'color': 5, 'linetype': 'DASHED'})
+        for i, curve in enumerate(curves):
+            for chainage in (curve['start'], curve['full_in'], curve['full_out'], curve['end']):
+                msp.add_line((chainage * unit, diagram_y - curve['superelevation'] * per_percent),
+                             (chainage * unit, diagram_y + curve['superelevation'] * per_percent),
+                             dxfattribs={'color': 8})
+            msp.add_text(f"C{i + 1}: R={curve['radius']:.0f}m e={curve['superelevation']:.1f}% "
+                         f"W={curve['widening']:.1f}m",
+                         dxfattribs={'height': 60 / scale * 1000, 'style': 'STANDARD'}
+                         ).set_placement((curve['full_in'] * unit,
+                                          diagram_y + (curve['superelevation'] + 2) * per_percent))
+        msp.add_text("SUPERELEVATION DIAGRAM - LEFT EDGE (SOLID), RIGHT EDGE (DASHED) RELATIVE TO CENTRE LINE",
+                     dxfattribs={'height': 100 / scale * 1000, 'style': 'STANDARD'}
+                     ).set_placement((diagram_x[0], diagram_y - 12 * per_percent))
+
+    # Curve setting-out tables below the drawing, one per curve
+    if design['curve_summary'] is not None and len(design['curve_summary']['start']):
+        add_setting_out_tables(msp, design['pegs'], design['curve_summary'], min_x, min_y - 4500 / scale * 1000,
+                               text_height=40 / scale * 1000, dxfattribs={'color': 7})
+
     # North arrow
     north_arrow_size = 500 / scale * 1000
-    north_x = length_scaled - 1000 / scale * 1000
-    north_y = row_half_width - 500 / scale * 1000
+    north_x = max_x - 1000 / scale * 1000
+    north_y = max_y + 1500 / scale * 1000
     
     # North arrow triangle
     msp.add_lwpolyline([
@@ -392,8 +622,8 @@ def create_road_plan_dxf(total_length, road_width, shoulder_width, row_width,
                 ).set_placement((north_x - 100 / scale * 1000, north_y + 100 / scale * 1000))
     
     # Title block
-    title_x = 0
-    title_y = row_half_width + 1000 / scale * 1000
+    title_x = min_x
+    title_y = max_y + 1000 / scale * 1000
     
     msp.add_text(
         f"ROAD PLAN\nLENGTH: {total_length}m, WIDTH: {road_width}m\nDESIGN SPEED: {design_speed} KMPH\nSCALE 1:{scale}",
@@ -401,8 +631,8 @@ def create_road_plan_dxf(total_length, road_width, shoulder_width, row_width,
     ).set_placement((title_x, title_y))
     
     # Legend
-    legend_x = length_scaled - 3000 / scale * 1000
-    legend_y = -row_half_width - 1000 / scale * 1000
+    legend_x = max_x - 3000 / scale * 1000
+    legend_y = min_y - 1000 / scale * 1000
     
     legend_text = f"""LEGEND:
 ROAD CENTERLINE
@@ -410,6 +640,7 @@ ROAD EDGES
 SHOULDERS
 ROW BOUNDARY
 CHAINAGES
+{'CONTOURS' if ground is not None else ''}
 {'INTERSECTIONS' if num_intersections > 0 else ''}
 {'SERVICE ROADS' if service_road else ''}"""
     
@@ -419,11 +650,31 @@ CHAINAGES
     
     return doc
 
+@traced("road_plan.report")
 def generate_road_plan_report(total_length, road_width, shoulder_width, row_width,
-                            design_speed, num_curves, curve_radius, num_intersections, total_area):
+                            design_speed, num_curves, curve_radius, num_intersections, total_area,
+                            curves=None, junctions=None):
     """Generate road plan design report"""
     
     formation_width = road_width + 2 * shoulder_width
+
+    superelevation_lines = ''
+    for i, curve in enumerate(curves or []):
+        superelevation_lines += (f"- Curve {i + 1} (R = {curve['radius']:.0f} m, SC {curve['sc']:.1f} m): "
+                                 f"e = {curve['superelevation']:.1f}%, f = {curve['friction']:.3f}, "
+                                 f"widening {curve['widening']:.1f} m, runoff {curve['runoff']:.1f} m, "
+                                 f"crown removal {curve['runout']:.1f} m\n")
+
+    junction_lines = ''
+    if junctions:
+        junction_lines = (f"- Type: {junctions['type']}, "
+                          f"{'entry' if junctions['type'] == 'Roundabout' else 'kerb return'} radius "
+                          f"{junctions['corner_radius']:.0f} m\n")
+        if junctions['type'] == 'Roundabout':
+            junction_lines += (f"- Central island radius {junctions['island_radius']:.1f} m, "
+                               f"inscribed radius {junctions['inscribed_radius']:.1f} m\n")
+        junction_lines += (f"- Junction paving {junctions['paved_area']:.0f} m², islands "
+                           f"{junctions['island_area']:.0f} m², kerbing {junctions['kerb_length']:.0f} m\n")
     
     report = f"""
 ROAD PLAN DESIGN REPORT
@@ -442,10 +693,10 @@ HORIZONTAL ALIGNMENT:
 - Curve Radius: {curve_radius} m
 - Minimum Radius Required: {30 if design_speed <= 30 else 60 if design_speed <= 50 else 95 if design_speed <= 60 else 180 if design_speed <= 80 else 280 if design_speed <= 100 else 410} m
 - Radius Adequacy: {'Adequate' if curve_radius >= (30 if design_speed <= 30 else 60 if design_speed <= 50 else 95 if design_speed <= 60 else 180 if design_speed <= 80 else 280 if design_speed <= 100 else 410) else 'Inadequate'}
-
+{superelevation_lines}
 INTERSECTIONS:
 - Number of Intersections: {num_intersections}
-- Sight Distance Required: {30 if design_speed <= 30 else 60 if design_speed <= 50 else 85 if design_speed <= 60 else 120 if design_speed <= 80 else 160 if design_speed <= 100 else 200} m
+{junction_lines}- Sight Distance Required: {30 if design_speed <= 30 else 60 if design_speed <= 50 else 85 if design_speed <= 60 else 120 if design_speed <= 80 else 160 if design_speed <= 100 else 200} m
 
 AREA CALCULATIONS:
 - Total Pavement Area: {total_area:.0f} m²
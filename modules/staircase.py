@@ -1,8 +1,8 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
+from utils.tracing import traced
 
 def page_staircase():
     st.title("🪜 Staircase Designer")
@@ -62,7 +62,7 @@ def page_staircase():
             st.markdown("**Loading**")
             live_load = st.number_input("Live Load (kN/m²)", min_value=3, max_value=8, value=4, step=1,
                                       help="Live load on staircase")
-            floor_finish = st.number_input("Floor Finish (kN/m²)", min_value=0.5, max_value=2, value=1, step=0.5,
+            floor_finish = st.number_input("Floor Finish (kN/m²)", min_value=0.5, max_value=2.0, value=1.0, step=0.5,
                                          help="Weight of floor finish")
             
             st.markdown("**Support Conditions**")
@@ -212,10 +212,7 @@ def page_staircase():
                     st.subheader("📥 Download")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "staircase.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -242,6 +239,7 @@ def page_staircase():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+@traced("staircase.dxf")
 def create_staircase_dxf(flight_length, flight_height, slab_thickness, riser_height, tread_width,
                         main_bar_dia, main_bar_spacing, dist_bar_dia, dist_bar_spacing,
                         step_bar_dia, clear_cover, num_risers, num_treads):
@@ -398,6 +396,7 @@ def create_staircase_dxf(flight_length, flight_height, slab_thickness, riser_hei
     
     return doc
 
+@traced("staircase.report")
 def generate_staircase_report(flight_length, flight_height, slab_thickness, riser_height, tread_width,
                              num_risers, num_treads, concrete_grade, steel_grade,
                              main_bar_dia, main_bar_spacing, total_load, design_moment, support_type):
@@ -1,8 +1,8 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
+from utils.tracing import traced
 
 def page_sunshade():
     st.title("🌞 Sunshade Designer")
@@ -155,11 +155,8 @@ def page_sunshade():
                 with col_download:
                     st.subheader("📥 Download")
                     
-                    # Save DXF to temporary file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    # Serialize DXF
+                    dxf_data = dxf_to_bytes(doc, "sunshade.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -189,6 +186,7 @@ def page_sunshade():
                 st.error(f"❌ Error generating drawing: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+@traced("sunshade.dxf")
 def create_sunshade_dxf(web_width, total_depth, projection, support_thickness, edge_thickness,
                        bottom_bar_dia, num_bottom_bars, top_bar_dia, num_top_bars,
                        stirrup_dia, stirrup_spacing, main_bar_dia, dist_bar_dia,
@@ -373,6 +371,7 @@ NOTES:
     
     return doc
 
+@traced("sunshade.report")
 def generate_sunshade_report(web_width, total_depth, projection, support_thickness, edge_thickness,
                            bottom_bar_dia, num_bottom_bars, top_bar_dia, num_top_bars,
                            stirrup_dia, stirrup_spacing, main_bar_dia, dist_bar_dia,
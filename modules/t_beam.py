@@ -1,9 +1,9 @@
 import streamlit as st
 import numpy as np
 import ezdxf
-import tempfile
-from utils.dxf_utils import create_dxf_header, add_dimensions
+from utils.dxf_utils import create_dxf_header, add_dimensions, dxf_to_bytes
 from utils.calculations import calculate_t_beam_capacity
+from utils.tracing import traced
 
 def page_t_beam():
     st.title("📐 T-Beam Designer")
@@ -197,10 +197,7 @@ def page_t_beam():
                     st.subheader("📥 Download")
                     
                     # Save DXF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".dxf") as fp:
-                        doc.saveas(fp.name)
-                        with open(fp.name, "rb") as f:
-                            dxf_data = f.read()
+                    dxf_data = dxf_to_bytes(doc, "t_beam.serialize")
                     
                     st.download_button(
                         label="📐 Download DXF",
@@ -227,6 +224,7 @@ def page_t_beam():
                 st.error(f"❌ Error generating design: {str(e)}")
                 st.error("Please check your input values and try again.")
 
+@traced("t_beam.dxf")
 def create_t_beam_dxf(span, flange_width, flange_thickness, web_width, web_depth,
                      bottom_bar_dia, num_bottom_bars, top_bar_dia, num_top_bars,
                      flange_bar_dia, flange_bar_spacing, stirrup_dia, stirrup_spacing, clear_cover):
@@ -371,6 +369,7 @@ def create_t_beam_dxf(span, flange_width, flange_thickness, web_width, web_depth
     
     return doc
 
+@traced("t_beam.report")
 def generate_t_beam_report(span, flange_width, flange_thickness, web_width, web_depth,
                           concrete_grade, steel_grade, bottom_bar_dia, num_bottom_bars,
                           total_load, design_moment, design_shear, results):
@@ -0,0 +1,312 @@
+"""
+Horizontal alignment engine for RajLisp road drawings
+
+An alignment is a chain of elements - tangents, circular arcs and clothoid
+transitions - each with curvature varying linearly along its length
+(tangent: 0, arc: 1/R, clothoid: k_start -> k_end). Elements are stored as
+NumPy arrays so positions, headings and offsets can be evaluated for whole
+chainage arrays at once, and the element under a chainage is found by binary
+search over the element start chainages.
+
+Conventions: lengths in metres, headings in radians counter-clockwise from
+the +x axis, curvature positive for left-hand curves and offsets positive to
+the left of the direction of travel.
+"""
+import math
+
+import numpy as np
+
+from utils.tracing import traced
+
+LINE, ARC, SPIRAL = 0, 1, 2
+ELEMENT_NAMES = {LINE: 'Tangent', ARC: 'Circular Curve', SPIRAL: 'Transition'}
+
+# Gauss-Legendre nodes/weights on [0, 1] for integrating clothoid positions
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(12)
+_GL_NODES = (_GL_NODES + 1) / 2
+_GL_WEIGHTS = _GL_WEIGHTS / 2
+
+
+def transition_length(design_speed, radius):
+    """Minimum transition length (m) as per IRC:73 / IRC:38
+
+    Larger of the rate-of-change-of-centrifugal-acceleration length
+    0.0215 V^3 / (C R) and the superelevation runoff length 2.7 V^2 / R.
+    """
+    if not radius:
+        return 0.0
+    c = min(max(80 / (75 + design_speed), 0.5), 0.8)
+    length = max(0.0215 * design_speed ** 3 / (c * radius), 2.7 * design_speed ** 2 / radius)
+    return math.ceil(length / 5) * 5  # round up to 5 m
+
+
+def _local_positions(length, k_start, k_end, s):
+    """Position and heading change at distance s along an element starting at the origin, heading 0"""
+    arrays = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (length, k_start, k_end, s)))
+    shape = arrays[0].shape
+    length, k_start, k_end, s = (a.ravel() for a in arrays)
+    dk = (k_end - k_start) / np.where(length > 0, length, 1.0)
+    theta = k_start * s + dk * s ** 2 / 2
+
+    # Constant curvature: exact chord of length s * sin(a)/a at half the heading change
+    half = k_start * s / 2
+    chord = s * np.sinc(half / np.pi)
+    x = chord * np.cos(half)
+    y = chord * np.sin(half)
+
+    # Transitions: Gauss-Legendre quadrature of cos/sin of the quadratic heading
+    spiral = dk != 0
+    if spiral.any():
+        u = s[spiral, None] * _GL_NODES
+        phase = k_start[spiral, None] * u + dk[spiral, None] * u ** 2 / 2
+        x[spiral] = s[spiral] * (np.cos(phase) @ _GL_WEIGHTS)
+        y[spiral] = s[spiral] * (np.sin(phase) @ _GL_WEIGHTS)
+    return x.reshape(shape), y.reshape(shape), theta.reshape(shape)
+
+
+@traced("alignment.build")
+def alignment_from_elements(elements, x0=0.0, y0=0.0, heading=0.0, start_chainage=0.0):
+    """Chain elements from a start point into an alignment
+
+    elements: list of dicts with 'type' (LINE, ARC or SPIRAL), 'length' and
+    'k_start'/'k_end' curvatures (1/R, positive turning left).
+    """
+    elements = [e for e in elements if e['length'] > 0]
+    if not elements:
+        raise ValueError("Alignment needs at least one element with positive length")
+
+    count = len(elements)
+    kind = np.array([e['type'] for e in elements], dtype=np.int8)
+    length = np.array([e['length'] for e in elements], dtype=float)
+    k_start = np.array([e.get('k_start', 0.0) for e in elements], dtype=float)
+    k_end = np.array([e.get('k_end', e.get('k_start', 0.0)) for e in elements], dtype=float)
+
+    # End of every element in its own frame, then accumulate along the chain
+    dx, dy, dtheta = _local_positions(length, k_start, k_end, length)
+    start_x = np.empty(count)
+    start_y = np.empty(count)
+    start_heading = np.empty(count)
+    x, y, theta = x0, y0, heading
+    for i in range(count):
+        start_x[i], start_y[i], start_heading[i] = x, y, theta
+        cos_t, sin_t = math.cos(theta), math.sin(theta)
+        x += dx[i] * cos_t - dy[i] * sin_t
+        y += dx[i] * sin_t + dy[i] * cos_t
+        theta += dtheta[i]
+
+    chainage = start_chainage + np.concatenate(([0.0], np.cumsum(length)[:-1]))
+    return {
+        'type': kind,
+        'chainage': chainage,
+        'length': length,
+        'x': start_x,
+        'y': start_y,
+        'heading': start_heading,
+        'k_start': k_start,
+        'k_end': k_end,
+        'start_chainage': float(start_chainage),
+        'end_chainage': float(chainage[-1] + length[-1]),
+        'end': (x, y, theta),
+    }
+
+
+def curve_elements(radius, deflection, spiral_length=0.0):
+    """Transition-arc-transition elements turning through `deflection` radians (+ left)
+
+    Transitions are shortened so they never take more than the whole deflection.
+    """
+    sign = 1.0 if deflection >= 0 else -1.0
+    deflection = abs(deflection)
+    spiral_length = min(spiral_length, deflection * radius)
+    k = sign / radius
+    arc_length = radius * deflection - spiral_length
+
+    elements = []
+    if spiral_length > 0:
+        elements.append({'type': SPIRAL, 'length': spiral_length, 'k_start': 0.0, 'k_end': k})
+    elements.append({'type': ARC, 'length': arc_length, 'k_start': k, 'k_end': k})
+    if spiral_length > 0:
+        elements.append({'type': SPIRAL, 'length': spiral_length, 'k_start': k, 'k_end': 0.0})
+    return elements
+
+
+def curve_tangent_length(radius, deflection, spiral_length=0.0):
+    """Distance from the PI to the tangent-to-spiral (or tangent-to-curve) point"""
+    deflection = abs(deflection)
+    spiral_length = min(spiral_length, deflection * radius)
+    if spiral_length <= 0:
+        return radius * math.tan(deflection / 2)
+    # Exact end of the entry transition instead of the usual series approximation
+    xs, ys, theta_s = (float(v) for v in _local_positions(spiral_length, 0.0, 1 / radius, spiral_length))
+    shift = ys - radius * (1 - math.cos(theta_s))
+    abscissa = xs - radius * math.sin(theta_s)
+    return (radius + shift) * math.tan(deflection / 2) + abscissa
+
+
+@traced("alignment.from_pis")
+def alignment_from_pis(points, radii, spiral_lengths=None, start_chainage=0.0):
+    """Alignment through intersection points (PIs) with a curve at every interior PI
+
+    points: [(x, y), ...] including start and end; radii / spiral_lengths: one
+    per interior PI. Raises ValueError when consecutive curves overlap.
+    """
+    points = [tuple(map(float, p)) for p in points]
+    if len(points) < 2:
+        raise ValueError("Alignment needs a start and an end point")
+    interior = len(points) - 2
+    spiral_lengths = list(spiral_lengths) if spiral_lengths is not None else [0.0] * interior
+    if len(radii) != interior or len(spiral_lengths) != interior:
+        raise ValueError("Give one radius and one transition length per interior PI")
+
+    bearings = [math.atan2(b[1] - a[1], b[0] - a[0]) for a, b in zip(points, points[1:])]
+    elements = []
+    previous_end = 0.0  # distance along the current leg already used by the previous curve
+    for i in range(interior):
+        leg = math.dist(points[i], points[i + 1])
+        deflection = (bearings[i + 1] - bearings[i] + math.pi) % (2 * math.pi) - math.pi
+        tangent = curve_tangent_length(radii[i], deflection, spiral_lengths[i])
+        straight = leg - previous_end - tangent
+        if straight < -1e-6:
+            raise ValueError(f"Curve at PI {i + 1} overlaps the previous curve by {-straight:.2f} m")
+        elements.append({'type': LINE, 'length': max(straight, 0.0)})
+        elements += curve_elements(radii[i], deflection, spiral_lengths[i])
+        previous_end = tangent
+
+    last_leg = math.dist(points[-2], points[-1]) - previous_end
+    if last_leg < -1e-6:
+        raise ValueError("Last curve runs past the end point")
+    elements.append({'type': LINE, 'length': max(last_leg, 0.0)})
+    return alignment_from_elements(elements, points[0][0], points[0][1], bearings[0], start_chainage)
+
+
+@traced("alignment.evenly_spaced_curves")
+def evenly_spaced_curves(total_length, num_curves, radius, spiral_length=0.0, deflection=math.radians(45)):
+    """Alignment of exactly `total_length` with curves of alternating hand between equal tangents
+
+    The deflection is reduced when the curves, transitions included, would
+    not fit in the length; raises ValueError when even the transitions alone
+    do not fit. Transitions are then shortened to half the arc they flank, so
+    read the drawn length back with element_table() before reporting it.
+    """
+    if num_curves <= 0 or radius <= 0:
+        return alignment_from_elements([{'type': LINE, 'length': total_length}])
+
+    # Curves (arc plus one transition length) may take at most 80% of the alignment
+    available = 0.8 * total_length / num_curves
+    if radius * deflection + spiral_length > available:
+        deflection = (available - spiral_length) / radius
+    if deflection <= 0:
+        raise ValueError(f"{num_curves} curves with {spiral_length:.0f} m transitions do not fit "
+                         f"in {total_length:.0f} m")
+    spiral_length = min(spiral_length, radius * deflection / 2)
+    curve_length = radius * deflection + spiral_length
+    tangent = (total_length - num_curves * curve_length) / (num_curves + 1)
+
+    elements = [{'type': LINE, 'length': tangent}]
+    for i in range(num_curves):
+        hand = 1 if i % 2 == 0 else -1
+        elements += curve_elements(radius, hand * deflection, spiral_length)
+        elements.append({'type': LINE, 'length': tangent})
+
+    # Start so the alignment runs along +x on average
+    return alignment_from_elements(elements, heading=-deflection / 2 if num_curves % 2 else 0.0)
+
+
+def locate(alignment, chainage):
+    """Index of the element containing each chainage (binary search, clipped to the ends)"""
+    index = np.searchsorted(alignment['chainage'], chainage, side='right') - 1
+    return np.clip(index, 0, len(alignment['length']) - 1)
+
+
+def evaluate(alignment, chainage, offset=0.0, index=None):
+    """x, y and heading at chainage (array) and offset (scalar or array, + left)
+
+    index: element of each chainage when already known from locate().
+    """
+    chainage = np.asarray(chainage, dtype=float)
+    if index is None:
+        index = locate(alignment, chainage)
+    s = chainage - alignment['chainage'][index]
+
+    dx, dy, dtheta = _local_positions(alignment['length'][index], alignment['k_start'][index],
+                                      alignment['k_end'][index], s)
+    theta0 = alignment['heading'][index]
+    cos_t, sin_t = np.cos(theta0), np.sin(theta0)
+    x = alignment['x'][index] + dx * cos_t - dy * sin_t
+    y = alignment['y'][index] + dx * sin_t + dy * cos_t
+    heading = theta0 + dtheta
+
+    offset = np.asarray(offset, dtype=float)
+    if np.any(offset):
+        x = x - offset * np.sin(heading)
+        y = y + offset * np.cos(heading)
+    return x, y, heading
+
+
+def curvature(alignment, chainage, index=None):
+    """Signed curvature (1/R, + left) at each chainage"""
+    chainage = np.asarray(chainage, dtype=float)
+    if index is None:
+        index = locate(alignment, chainage)
+    s = chainage - alignment['chainage'][index]
+    k_start = alignment['k_start'][index]
+    return k_start + (alignment['k_end'][index] - k_start) * s / alignment['length'][index]
+
+
+def sample_chainages(alignment, interval, include_elements=True):
+    """Regular chainages every `interval` m plus (optionally) every element boundary"""
+    start, end = alignment['start_chainage'], alignment['end_chainage']
+    chainages = np.arange(start, end, interval)
+    extra = [end]
+    if include_elements:
+        extra = np.concatenate((alignment['chainage'], extra))
+    return np.unique(np.concatenate((chainages, extra)))
+
+
+def polyline_vertices(alignment, offset=0.0, spiral_step=5.0, scale=1.0):
+    """(x, y, bulge) vertices of the alignment or a parallel offset line
+
+    Tangents and arcs are exact (arcs as bulges, an offset arc being a
+    concentric arc); transitions are sampled every `spiral_step` m.
+    For ezdxf: msp.add_lwpolyline(vertices, format='xyb').
+    """
+    chainages = [alignment['chainage']]
+    spirals = np.flatnonzero(alignment['type'] == SPIRAL)
+    for i in spirals:
+        steps = max(int(math.ceil(alignment['length'][i] / spiral_step)), 4)
+        chainages.append(alignment['chainage'][i] + alignment['length'][i] * np.arange(1, steps) / steps)
+    chainages = np.unique(np.concatenate(chainages + [[alignment['end_chainage']]]))
+
+    x, y, _ = evaluate(alignment, chainages, offset)
+    index = locate(alignment, chainages)
+    bulge = np.zeros(len(chainages))
+    arcs = (alignment['type'][index] == ARC) & (chainages < alignment['end_chainage'])
+    # Every arc starts on a vertex and has no interior vertices, so its sweep is k * L
+    bulge[arcs] = np.tan(alignment['k_start'][index[arcs]] * alignment['length'][index[arcs]] / 4)
+    return np.column_stack((x * scale, y * scale, bulge))
+
+
+def element_table(alignment):
+    """One row per element for reports and setting-out"""
+    rows = []
+    for i in range(len(alignment['length'])):
+        k_start, k_end = alignment['k_start'][i], alignment['k_end'][i]
+        k = k_end if abs(k_end) > abs(k_start) else k_start
+        rows.append({
+            'element': ELEMENT_NAMES[int(alignment['type'][i])],
+            'start_chainage': float(alignment['chainage'][i]),
+            'end_chainage': float(alignment['chainage'][i] + alignment['length'][i]),
+            'length': float(alignment['length'][i]),
+            'radius': float(1 / abs(k)) if k else None,
+            'hand': ('Left' if k > 0 else 'Right') if k else '',
+            'x': float(alignment['x'][i]),
+            'y': float(alignment['y'][i]),
+            'bearing_deg': float(math.degrees(alignment['heading'][i]) % 360),
+        })
+    return rows
+
+
+def format_chainage(chainage):
+    """Chainage as km+metres, e.g. 1250.5 -> '1+250.500'"""
+    km, metres = divmod(float(chainage), 1000)
+    return f"{int(km)}+{metres:07.3f}"
@@ -4,7 +4,10 @@ Structural calculation utilities for RajLisp Structural Design Suite
 import numpy as np
 import math
 
+from utils.tracing import traced
 
+
+@traced("calculations.calculate_column_capacity")
 def calculate_column_capacity(diameter, length, concrete_grade, steel_grade, steel_area):
     """Calculate axial capacity of circular column"""
     # Concrete properties
@@ -49,6 +52,7 @@ def calculate_column_capacity(diameter, length, concrete_grade, steel_grade, ste
     }
 
 
+@traced("calculations.calculate_rectangular_column_capacity")
 def calculate_rectangular_column_capacity(width, depth, length, concrete_grade, steel_grade, steel_area):
     """Calculate axial capacity of rectangular column"""
     # Concrete properties
@@ -93,6 +97,7 @@ def calculate_rectangular_column_capacity(width, depth, length, concrete_grade,
     }
 
 
+@traced("calculations.calculate_footing_bearing_capacity")
 def calculate_footing_bearing_capacity(footing_width, footing_depth, soil_bearing_capacity, load):
     """Calculate footing bearing pressure and safety factor"""
     # Footing area
@@ -117,6 +122,7 @@ def calculate_footing_bearing_capacity(footing_width, footing_depth, soil_bearin
     }
 
 
+@traced("calculations.calculate_beam_moment_capacity")
 def calculate_beam_moment_capacity(width, depth, concrete_grade, steel_grade, tension_steel, compression_steel=0):
     """Calculate moment capacity of beam section"""
     # Material properties
@@ -159,6 +165,7 @@ def calculate_beam_moment_capacity(width, depth, concrete_grade, steel_grade, te
     }
 
 
+@traced("calculations.calculate_shear_capacity")
 def calculate_shear_capacity(width, depth, concrete_grade, stirrup_diameter, stirrup_spacing):
     """Calculate shear capacity of beam"""
     fck_values = {'M20': 20, 'M25': 25, 'M30': 30, 'M35': 35, 'M40': 40, 'M45': 45}
@@ -187,6 +194,7 @@ def calculate_shear_capacity(width, depth, concrete_grade, stirrup_diameter, sti
     }
 
 
+@traced("calculations.calculate_deflection_check")
 def calculate_deflection_check(span, depth, loading_type='uniformly_distributed'):
     """Check deflection limits"""
     # Basic span-to-depth ratios from IS 456
@@ -209,6 +217,7 @@ def calculate_deflection_check(span, depth, loading_type='uniformly_distributed'
     }
 
 
+@traced("calculations.calculate_staircase_design")
 def calculate_staircase_design(riser, tread, waist_thickness, span, load):
     """Calculate staircase structural parameters"""
     # Effective span
@@ -242,6 +251,7 @@ def calculate_staircase_design(riser, tread, waist_thickness, span, load):
     }
 
 
+@traced("calculations.calculate_development_length")
 def calculate_development_length(bar_diameter, concrete_grade, steel_grade):
     """Calculate development length for reinforcement"""
     fck_values = {'M20': 20, 'M25': 25, 'M30': 30, 'M35': 35, 'M40': 40, 'M45': 45}
@@ -262,6 +272,7 @@ def calculate_development_length(bar_diameter, concrete_grade, steel_grade):
     }
 
 
+@traced("calculations.check_crack_width")
 def check_crack_width(cover, bar_spacing, steel_stress):
     """Check crack width in concrete"""
     # Simplified crack width calculation
@@ -276,6 +287,7 @@ def check_crack_width(cover, bar_spacing, steel_stress):
     }
 
 
+@traced("calculations.calculate_footing_design")
 def calculate_footing_design(footing_type, footing_dimension, footing_thickness, column_load, 
                            soil_bearing_capacity, concrete_grade, steel_grade, main_bar_dia, 
                            main_bar_spacing, dist_bar_dia, dist_bar_spacing):
@@ -0,0 +1,182 @@
+"""
+Contours of the triangulated ground surface for RajLisp road plans
+
+Every triangle of the TIN that spans a contour level contributes one straight
+segment, found for all (triangle, level) pairs at once. Segments run with the
+higher ground on their left, so the segment leaving a triangle through an
+edge is continued by the one entering the neighbouring triangle through the
+same edge; segments are stitched into polylines by matching those edges and
+ranking each chain by pointer jumping, again vectorized. Levels are processed
+in batches holding a bounded number of segments, so large survey areas
+stream out polyline by polyline without building every contour in memory.
+
+Levels in metres; contour polylines carry their level as the LWPOLYLINE
+elevation and sit on the CONTOUR_MINOR and CONTOUR_MAJOR layers.
+"""
+import numpy as np
+from ezdxf.enums import TextEntityAlignment
+
+from utils.tracing import traced
+
+SEGMENT_CHUNK = 1_000_000  # segments per batch of levels
+MINOR_LAYER = 'CONTOUR_MINOR'
+MAJOR_LAYER = 'CONTOUR_MAJOR'
+CONTOUR_LAYERS = {MINOR_LAYER: {'color': 8, 'lineweight': 13}, MAJOR_LAYER: {'color': 32, 'lineweight': 30}}
+
+
+def contour_levels(z_min, z_max, interval, major_every=5):
+    """Contour levels at whole multiples of `interval` inside (z_min, z_max) and which are major"""
+    first = np.floor(z_min / interval) + 1
+    last = np.ceil(z_max / interval) - 1
+    steps = np.arange(first, last + 1)
+    return steps * interval, np.round(steps) % major_every == 0
+
+
+def _segments(tin, triangles, levels, level_index):
+    """Start and end point and the edge keys of the contour segment of each (triangle, level) pair"""
+    corners = tin['triangles'][triangles]
+    z = tin['z'][corners]
+    level = levels[level_index]
+    above = z > level[:, None]
+    following = np.roll(above, -1, axis=1)
+    down = np.argmax(above & ~following, axis=1)  # edge k runs from corner k to corner k + 1
+    up = np.argmax(~above & following, axis=1)
+    rows = np.arange(len(triangles))
+
+    def crossing(edge):
+        a, b = corners[rows, edge], corners[rows, (edge + 1) % 3]
+        low, high = np.minimum(a, b), np.maximum(a, b)  # same point from both triangles of the edge
+        t = (level - tin['z'][low]) / (tin['z'][high] - tin['z'][low])
+        x = tin['x'][low] + t * (tin['x'][high] - tin['x'][low])
+        y = tin['y'][low] + t * (tin['y'][high] - tin['y'][low])
+        return x, y, low * len(tin['x']) + high
+
+    start_x, start_y, start_key = crossing(down)
+    end_x, end_y, end_key = crossing(up)
+    return start_x, start_y, start_key, end_x, end_y, end_key
+
+
+def _chains(level_index, start_key, end_key):
+    """Chain head, rank along the chain and closure of every segment"""
+    count = len(start_key)
+    # Segment j continues segment i where j starts on the edge (and level) where i ends
+    keys, inverse = np.unique(np.concatenate((start_key, end_key)), return_inverse=True)
+    start_id = level_index * len(keys) + inverse[:count]
+    end_id = level_index * len(keys) + inverse[count:]
+    order = np.argsort(start_id)
+    found = np.minimum(np.searchsorted(start_id[order], end_id), count - 1)
+    following = np.where(start_id[order][found] == end_id, order[found], -1)
+    previous = np.full(count, -1)
+    linked = following >= 0
+    previous[following[linked]] = np.flatnonzero(linked)
+
+    # Closed contours have no first segment: cut each loop at its lowest segment number
+    segment = np.arange(count)
+    head = np.where(previous >= 0, previous, segment)
+    lowest = np.minimum(segment, head)
+    steps = max(int(np.ceil(np.log2(max(count, 2)))), 1)
+    for _ in range(steps):
+        lowest = np.minimum(lowest, lowest[head])
+        head = head[head]
+    closed = previous[head] >= 0
+    previous[closed & (lowest == segment)] = -1
+
+    head = np.where(previous >= 0, previous, segment)
+    rank = (previous >= 0).astype(np.int64)
+    for _ in range(steps):
+        rank = rank + rank[head]
+        head = head[head]
+    return head, rank, closed[head]
+
+
+def _batches(levels, z_min, z_max, max_segments):
+    """Consecutive ranges of levels with about max_segments crossing triangles each (at least one level)"""
+    below_min = np.searchsorted(np.sort(z_min), levels, side='right')
+    below_max = np.searchsorted(np.sort(z_max), levels, side='right')
+    total = np.cumsum(below_min - below_max)  # triangles spanning each level, accumulated
+    edges = [0]
+    while edges[-1] < len(levels):
+        base = total[edges[-1] - 1] if edges[-1] else 0
+        edges.append(max(int(np.searchsorted(total, base + max_segments, side='right')), edges[-1] + 1))
+    return zip(edges[:-1], edges[1:])
+
+
+@traced("contours.extract")
+def iter_contours(tin, levels, max_segments=SEGMENT_CHUNK):
+    """Contour polylines of the surface, yielded in batches of levels
+
+    Each batch is a dict with, per polyline, its 'level' and whether it is
+    'closed', plus the vertices of all its polylines in flat 'x', 'y' arrays
+    with `start`, the index of each polyline's first vertex (one extra entry).
+    """
+    levels = np.asarray(levels, dtype=float)
+    z = tin['z'][tin['triangles']]
+    z_min, z_max = z.min(axis=1), z.max(axis=1)
+    for first, last in _batches(levels, z_min, z_max, max_segments):
+        # (triangle, level) pairs: the levels within [lowest, highest) corner of each triangle
+        batch = levels[first:last]
+        candidates = np.flatnonzero((z_min <= batch[-1]) & (z_max > batch[0]))
+        lower = np.searchsorted(batch, z_min[candidates], side='left')
+        upper = np.searchsorted(batch, z_max[candidates], side='left')
+        counts = upper - lower
+        if not counts.sum():
+            continue
+        triangles = np.repeat(candidates, counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        level_index = np.repeat(lower, counts) + within
+
+        start_x, start_y, start_key, end_x, end_y, end_key = _segments(tin, triangles, batch, level_index)
+        head, rank, closed = _chains(level_index, start_key, end_key)
+
+        # Polyline vertices: segment starts in chain order, plus the last end of an open chain
+        heads, chain, lengths = np.unique(head, return_inverse=True, return_counts=True)
+        is_closed = closed[heads]
+        sizes = lengths + ~is_closed
+        start = np.concatenate(([0], np.cumsum(sizes)))
+        x = np.empty(start[-1])
+        y = np.empty(start[-1])
+        x[start[chain] + rank] = start_x
+        y[start[chain] + rank] = start_y
+        last_segment = rank == lengths[chain] - 1
+        tail = last_segment & ~closed
+        x[start[chain[tail]] + lengths[chain[tail]]] = end_x[tail]
+        y[start[chain[tail]] + lengths[chain[tail]]] = end_y[tail]
+        yield {'level': batch[level_index[heads]], 'closed': is_closed, 'start': start, 'x': x, 'y': y}
+
+
+def ensure_contour_layers(doc):
+    """Create the contour layers in a drawing if missing"""
+    for name, attribs in CONTOUR_LAYERS.items():
+        if name not in doc.layers:
+            doc.layers.add(name, **attribs)
+
+
+@traced("contours.dxf")
+def add_contours(msp, tin, interval=1.0, major_every=5, scale=1.0, text_height=2.5, max_segments=SEGMENT_CHUNK):
+    """Draw the contours of a surface as LWPOLYLINEs on the contour layers
+
+    Every major contour is labelled with its level at its middle vertex.
+    scale: drawing units per metre; text_height in drawing units. Returns the
+    number of minor and major polylines drawn.
+    """
+    ensure_contour_layers(msp.doc)
+    levels, major = contour_levels(tin['z'].min(), tin['z'].max(), interval, major_every)
+    major_levels = set(np.round(levels[major], 6))
+    drawn = {MINOR_LAYER: 0, MAJOR_LAYER: 0}
+    for batch in iter_contours(tin, levels, max_segments):
+        for i, level in enumerate(batch['level']):
+            part = slice(batch['start'][i], batch['start'][i + 1])
+            points = np.column_stack((batch['x'][part], batch['y'][part])) * scale
+            layer = MAJOR_LAYER if round(level, 6) in major_levels else MINOR_LAYER
+            msp.add_lwpolyline(points, close=bool(batch['closed'][i]),
+                               dxfattribs={'layer': layer, 'elevation': level * scale})
+            drawn[layer] += 1
+            if layer == MAJOR_LAYER and len(points) > 1:
+                middle = len(points) // 2
+                dx, dy = points[middle] - points[middle - 1]
+                angle = np.degrees(np.arctan2(dy, dx))
+                angle = angle - 180 if abs(angle) > 90 else angle  # keep labels upright
+                msp.add_text(f"{level:.1f}", height=text_height,
+                             dxfattribs={'layer': MAJOR_LAYER, 'rotation': angle, 'style': 'STANDARD'}
+                             ).set_placement(tuple(points[middle]), align=TextEntityAlignment.MIDDLE_CENTER)
+    return drawn[MINOR_LAYER], drawn[MAJOR_LAYER]
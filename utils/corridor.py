@@ -0,0 +1,112 @@
+"""
+Corridor geometry queries for RajLisp road drawings
+
+A Corridor is built once from a horizontal alignment (utils.alignment), an
+optional design profile (utils.vertical_alignment) and optional cross-fall
+and widening tables, and answers vectorized queries for arrays of chainages
+or (chainage, offset) pairs: plan position, heading, curvature, design level,
+grade, cross-fall and extra widening. Plan, L-section, cross-section and
+quantity stages can share one instance instead of recomputing positions.
+
+Conventions as in the alignment and profile engines: metres, radians,
+offsets positive to the left; cross slopes in %, positive falling away from
+the centreline (normal camber is positive on both sides).
+"""
+import numpy as np
+
+from utils import alignment as horizontal
+from utils import vertical_alignment as vertical
+
+
+class Corridor:
+    """Design geometry of one road, queried by chainage and offset"""
+
+    def __init__(self, alignment, profile=None, camber=2.5, cross_fall=None, widening=None):
+        """
+        cross_fall: (chainage, left slope %, right slope %) arrays, linearly
+        interpolated between chainages; default normal camber throughout.
+        widening: (chainage, extra width m) arrays; default none.
+        """
+        self.alignment = alignment
+        self.profile = profile
+        self.camber = camber
+        self.start_chainage = alignment['start_chainage']
+        self.end_chainage = alignment['end_chainage']
+
+        if cross_fall is None:
+            cross_fall = ([self.start_chainage], [camber], [camber])
+        self._fall_chainage, self._left_fall, self._right_fall = (np.atleast_1d(np.asarray(a, dtype=float))
+                                                                  for a in cross_fall)
+        if widening is None:
+            widening = ([self.start_chainage], [0.0])
+        self._widening_chainage, self._widening = (np.atleast_1d(np.asarray(a, dtype=float)) for a in widening)
+
+    def locate(self, chainage):
+        """Horizontal element index of each chainage"""
+        return horizontal.locate(self.alignment, np.asarray(chainage, dtype=float))
+
+    def position(self, chainage, offset=0.0):
+        """Plan x, y at each (chainage, offset)"""
+        x, y, _ = horizontal.evaluate(self.alignment, chainage, offset)
+        return x, y
+
+    def heading(self, chainage):
+        return horizontal.evaluate(self.alignment, chainage)[2]
+
+    def curvature(self, chainage):
+        return horizontal.curvature(self.alignment, chainage)
+
+    def centre_level(self, chainage):
+        """Design level and grade on the centreline (zero without a profile)"""
+        chainage = np.asarray(chainage, dtype=float)
+        if self.profile is None:
+            return np.zeros(chainage.shape), np.zeros(chainage.shape)
+        return vertical.evaluate(self.profile, chainage)
+
+    def cross_fall(self, chainage):
+        """Left and right cross slopes (%) at each chainage"""
+        chainage = np.asarray(chainage, dtype=float)
+        return (np.interp(chainage, self._fall_chainage, self._left_fall),
+                np.interp(chainage, self._fall_chainage, self._right_fall))
+
+    def widening(self, chainage):
+        """Extra carriageway width (m) at each chainage"""
+        return np.interp(np.asarray(chainage, dtype=float), self._widening_chainage, self._widening)
+
+    def level(self, chainage, offset=0.0):
+        """Design level at each (chainage, offset), following the cross-fall on either side"""
+        centre, _ = self.centre_level(chainage)
+        left, right = self.cross_fall(chainage)
+        offset = np.asarray(offset, dtype=float)
+        return centre - np.where(offset > 0, left, right) * np.abs(offset) / 100
+
+    def query(self, chainage, offset=0.0):
+        """Everything at each (chainage, offset) pair with one element search
+
+        Returns a dict of arrays broadcast to the common shape: chainage,
+        offset, x, y, heading, curvature, level, grade, centre_level,
+        left_fall, right_fall and widening.
+        """
+        chainage, offset = np.broadcast_arrays(np.asarray(chainage, dtype=float), np.asarray(offset, dtype=float))
+        index = self.locate(chainage)
+        x, y, heading = horizontal.evaluate(self.alignment, chainage, offset, index=index)
+        centre, grade = self.centre_level(chainage)
+        left, right = self.cross_fall(chainage)
+        return {
+            'chainage': chainage,
+            'offset': offset,
+            'x': x,
+            'y': y,
+            'heading': heading,
+            'curvature': horizontal.curvature(self.alignment, chainage, index=index),
+            'centre_level': centre,
+            'level': centre - np.where(offset > 0, left, right) * np.abs(offset) / 100,
+            'grade': grade,
+            'left_fall': left,
+            'right_fall': right,
+            'widening': self.widening(chainage),
+        }
+
+    def stations(self, interval, include_elements=True):
+        """Regular chainages along the corridor plus element boundaries"""
+        return horizontal.sample_chainages(self.alignment, interval, include_elements)
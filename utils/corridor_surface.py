@@ -0,0 +1,218 @@
+"""
+Corridor surface model and surface-to-surface earthwork for RajLisp roads
+
+The formation template of utils.cross_sections (carriageway with its
+cross-fall and widening, shoulders) is swept along a Corridor - alignment,
+profile and superelevation - at regular stations. Each side then slopes down
+at the fill slope or up at the cut slope from the shoulder edge until it
+meets the triangulated ground (utils.tin), sampled outward for all stations
+at once, giving a 3D corridor surface: a grid of (station, template point)
+vertices from the right catch line to the left.
+
+Volumes come from the grid method between the two surfaces: every strip
+between adjacent stations and template points is subdivided into cells of
+about `grid_step` m, the design level (bilinear over the strip) and the
+ground level (TIN) are compared at each cell centre and the depth is
+multiplied by the cell's true plan area, so curves, superelevation and
+irregular ground are measured exactly rather than by average end areas.
+
+Metres and cubic metres; offsets positive to the left as in utils.corridor.
+"""
+import numpy as np
+
+from utils.alignment import evaluate
+from utils.cross_sections import template_profile
+from utils.tin import interpolate
+from utils.tracing import traced
+from utils.vertical_alignment import straight_profile
+
+CORRIDOR_LAYER = 'CORRIDOR'
+VOLUME_SAMPLES = 2_000_000  # grid cells per batch of station intervals
+
+
+def grade_line_over_ground(alignment, ground, height):
+    """Straight profile `height` m above the ground model at both ends of the alignment"""
+    start, end = alignment['start_chainage'], alignment['end_chainage']
+    x, y, _ = evaluate(alignment, np.array([start, end]))
+    levels = interpolate(ground, x, y)
+    if not np.all(np.isfinite(levels)):
+        raise ValueError("Ground model does not cover both ends of the alignment")
+    return straight_profile(end - start, levels[0] + height, levels[1] + height, start)
+
+
+@traced("corridor_surface.build")
+def corridor_surface(corridor, ground, carriageway_width, shoulder_width, median_width=0.0, shoulder_slope=3.0,
+                     fill_slope=2.0, cut_slope=1.0, interval=10.0, daylight_width=30.0, daylight_step=0.5):
+    """Design surface of the corridor daylighted to the ground model
+
+    Slopes are horizontal per unit vertical. A side slope that does not meet
+    the ground within daylight_width (m) beyond the shoulder edge, or that
+    runs off the ground model, stops there and is flagged as not daylighted.
+    Returns a dict with the station 'chainage' (n,), the 'offset', 'x', 'y'
+    and 'z' of every surface vertex (n, k) ordered from the right catch point
+    to the left one, and per station and side (right, left) the 'catch'
+    offset, 'mode' (+1 fill, -1 cut) and whether it 'daylight's.
+    """
+    chainage = corridor.stations(interval)
+    count = len(chainage)
+    centre, _ = corridor.centre_level(chainage)
+    left_fall, right_fall = corridor.cross_fall(chainage)
+    widening = corridor.widening(chainage)
+    offsets, right_drop = template_profile(carriageway_width, shoulder_width, median_width, right_fall,
+                                           shoulder_slope, widening)
+    _, left_drop = template_profile(carriageway_width, shoulder_width, median_width, left_fall,
+                                    shoulder_slope, widening)
+    half = offsets[:, -1]
+
+    # Walk out from each shoulder edge to the first sample where the side slope meets the ground
+    distance = half[:, None] + daylight_step * np.arange(int(np.ceil(daylight_width / daylight_step)) + 1)
+    catch = np.empty((count, 2))
+    catch_level = np.empty((count, 2))
+    mode = np.empty((count, 2))
+    daylight = np.empty((count, 2), dtype=bool)
+    for side, (sign, drop) in enumerate(((-1, right_drop), (1, left_drop))):
+        x, y = corridor.position(np.repeat(chainage, distance.shape[1]), sign * distance.ravel())
+        ground_level = interpolate(ground, x, y).reshape(distance.shape)
+        edge_level = centre - drop[:, -1]
+        mode[:, side] = np.where(edge_level > ground_level[:, 0], 1.0, -1.0)
+        slope = np.where(mode[:, side] > 0, fill_slope, cut_slope)
+        design = edge_level[:, None] - mode[:, side, None] * (distance - half[:, None]) / slope[:, None]
+        depth = design - ground_level
+        crossed = mode[:, side, None] * depth <= 0  # NaN ground never counts as met
+        daylight[:, side] = crossed.any(axis=1)
+        j = np.argmax(crossed, axis=1)
+        before = np.maximum(j - 1, 0)
+        rows = np.arange(count)
+        d0, d1 = depth[rows, before], depth[rows, j]
+        t = np.divide(d0, d0 - d1, out=np.zeros(count), where=(j > 0) & (d0 != d1))
+        reach = distance[rows, before] + t * (distance[rows, j] - distance[rows, before])
+        # Off the ground model: stop at the last sample with ground under it
+        known = np.isfinite(ground_level)
+        last_known = np.where(known.any(axis=1), known.shape[1] - 1 - np.argmax(known[:, ::-1], axis=1), 0)
+        catch[:, side] = np.where(daylight[:, side], reach, distance[rows, last_known])
+        catch_level[:, side] = edge_level - mode[:, side] * (catch[:, side] - half) / slope
+
+    # Surface vertices: right catch, right template, centre, left template, left catch
+    offset = np.column_stack((-catch[:, 0], -offsets[:, :0:-1], offsets, catch[:, 1]))
+    z = np.column_stack((catch_level[:, 0], (centre[:, None] - right_drop)[:, :0:-1],
+                         centre[:, None] - left_drop, catch_level[:, 1]))
+    x, y = corridor.position(np.repeat(chainage, offset.shape[1]), offset.ravel())
+    return {
+        'chainage': chainage,
+        'offset': offset,
+        'x': x.reshape(offset.shape),
+        'y': y.reshape(offset.shape),
+        'z': z,
+        'catch': catch * [-1, 1],
+        'mode': mode,
+        'daylight': daylight,
+    }
+
+
+def _strip_cells(surface, j, first, last, along, across):
+    """Cell centres, plan areas and design levels of strip j between stations first..last"""
+    u = (np.arange(along) + 0.5) / along
+    v = (np.arange(across) + 0.5) / across
+    u, v = np.meshgrid(u, v, indexing='ij')
+    u, v = u.ravel(), v.ravel()
+    rows = slice(first, last)
+    following = slice(first + 1, last + 1)
+    corners = [(surface[key][rows, j], surface[key][following, j], surface[key][rows, j + 1],
+                surface[key][following, j + 1]) for key in ('x', 'y', 'z')]
+
+    def bilinear(p00, p10, p01, p11):
+        return (p00[:, None] * (1 - u) * (1 - v) + p10[:, None] * u * (1 - v) +
+                p01[:, None] * (1 - u) * v + p11[:, None] * u * v)
+
+    (x00, x10, x01, x11), (y00, y10, y01, y11), levels = corners
+    x_u = (x10 - x00)[:, None] * (1 - v) + (x11 - x01)[:, None] * v
+    x_v = (x01 - x00)[:, None] * (1 - u) + (x11 - x10)[:, None] * u
+    y_u = (y10 - y00)[:, None] * (1 - v) + (y11 - y01)[:, None] * v
+    y_v = (y01 - y00)[:, None] * (1 - u) + (y11 - y10)[:, None] * u
+    area = np.abs(x_u * y_v - x_v * y_u) / (along * across)
+    return bilinear(*corners[0]), bilinear(*corners[1]), area, bilinear(*levels)
+
+
+@traced("corridor_surface.volumes")
+def surface_volumes(surface, ground, grid_step=1.0, max_samples=VOLUME_SAMPLES):
+    """Cut and fill between the corridor surface and the ground, per station interval
+
+    Returns a dict of arrays over the intervals: 'start' and 'end'
+    chainage, 'cut' and 'fill' volume, the plan 'area' measured and the
+    'unmeasured' plan area where the ground model has no level.
+    """
+    chainage = surface['chainage']
+    intervals = len(chainage) - 1
+    along = max(int(np.ceil(np.diff(chainage).max() / grid_step)), 1) if intervals else 1
+    widths = np.abs(np.diff(surface['offset'], axis=1)).max(axis=0)
+    across = np.maximum(np.ceil(widths / grid_step).astype(int), 1)
+    per_interval = along * int(across.sum())
+    batch = max(max_samples // per_interval, 1)
+
+    cut = np.zeros(intervals)
+    fill = np.zeros(intervals)
+    area = np.zeros(intervals)
+    unmeasured = np.zeros(intervals)
+    for first in range(0, intervals, batch):
+        last = min(first + batch, intervals)
+        part = slice(first, last)
+        for j, cells in enumerate(across):
+            x, y, cell_area, design = _strip_cells(surface, j, first, last, along, int(cells))
+            depth = design - interpolate(ground, x, y)
+            known = np.isfinite(depth)
+            depth = np.where(known, depth, 0.0)
+            fill[part] += (np.maximum(depth, 0) * cell_area).sum(axis=1)
+            cut[part] += (np.maximum(-depth, 0) * cell_area).sum(axis=1)
+            area[part] += (cell_area * known).sum(axis=1)
+            unmeasured[part] += (cell_area * ~known).sum(axis=1)
+    return {
+        'start': chainage[:-1],
+        'end': chainage[1:],
+        'cut': cut,
+        'fill': fill,
+        'area': area,
+        'unmeasured': unmeasured,
+    }
+
+
+def surface_volume_summary(volumes, surface=None):
+    """Totals of surface_volumes() for pages and reports"""
+    summary = {
+        'cut': float(volumes['cut'].sum()),
+        'fill': float(volumes['fill'].sum()),
+        'area': float(volumes['area'].sum()),
+        'unmeasured': float(volumes['unmeasured'].sum()),
+    }
+    summary['net'] = summary['cut'] - summary['fill']
+    if surface is not None:
+        summary['not_daylighted'] = int((~surface['daylight']).sum())
+    return summary
+
+
+def surface_volumes_csv(volumes):
+    """Interval-wise cut and fill by surface difference as CSV text"""
+    lines = ["start_chainage,end_chainage,cut_m3,fill_m3,cum_cut_m3,cum_fill_m3,plan_area_m2"]
+    cum_cut, cum_fill = np.cumsum(volumes['cut']), np.cumsum(volumes['fill'])
+    for i in range(len(volumes['start'])):
+        lines.append(f"{volumes['start'][i]:.3f},{volumes['end'][i]:.3f},{volumes['cut'][i]:.3f},"
+                     f"{volumes['fill'][i]:.3f},{cum_cut[i]:.3f},{cum_fill[i]:.3f},{volumes['area'][i]:.2f}")
+    return "\n".join(lines) + "\n"
+
+
+@traced("corridor_surface.dxf")
+def add_corridor_mesh(msp, surface, scale=1.0, dxfattribs=None):
+    """Add the corridor surface as one MESH entity (quad faces) on the CORRIDOR layer
+
+    scale: drawing units per metre, applied to x, y and z.
+    """
+    rows, columns = surface['offset'].shape
+    vertices = np.column_stack((surface['x'].ravel(), surface['y'].ravel(), surface['z'].ravel())) * scale
+    corner = (np.arange(rows - 1)[:, None] * columns + np.arange(columns - 1)).ravel()
+    faces = np.column_stack((corner, corner + columns, corner + columns + 1, corner + 1))
+    if CORRIDOR_LAYER not in msp.doc.layers:
+        msp.doc.layers.add(CORRIDOR_LAYER, color=1)
+    mesh = msp.add_mesh(dxfattribs={'layer': CORRIDOR_LAYER, **(dxfattribs or {})})
+    with mesh.edit_data() as data:
+        data.vertices = vertices.tolist()
+        data.faces = faces.tolist()
+    return mesh
@@ -0,0 +1,268 @@
+"""
+Batch cross-sections from survey offsets for RajLisp road drawings
+
+A cross-section survey file holds one point per line - station (chainage),
+offset from the centreline (negative to the left) and level - for any number
+of stations, in the spirit of the left/right survey points taken by ROADX.LSP.
+The road template (crowned carriageway, shoulders, cut or fill side slopes
+daylighting to ground) is applied at every station at once: points from all
+stations are kept in flat arrays tagged with their station index, sections are
+clipped at every cut/fill crossing and the strips between ground and design
+are measured with the shoelace formula, all vectorized.
+"""
+import numpy as np
+
+from utils.earthwork import CHUNK_ROWS, iter_survey_rows
+from utils.tracing import traced
+
+
+@traced("cross_sections.read")
+def read_cross_sections(source, chunk_rows=CHUNK_ROWS):
+    """Survey points grouped by station
+
+    Returns a dict with the sorted unique stations and, for all points sorted
+    by station then offset, the station index, offset and level plus `start`,
+    the index of each station's first point (len(stations) + 1 entries).
+    Raises ValueError for stations with fewer than two points or repeated offsets.
+    """
+    chunks = list(iter_survey_rows(source, 3, chunk_rows))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 3))
+    if len(data) < 2:
+        raise ValueError("Cross-section survey needs at least two points")
+
+    order = np.lexsort((data[:, 1], data[:, 0]))
+    station, offset, level = data[order, 0], data[order, 1], data[order, 2]
+    stations, index, counts = np.unique(station, return_inverse=True, return_counts=True)
+    if np.any(counts < 2):
+        raise ValueError(f"Station {stations[np.argmax(counts < 2)]:.3f} has fewer than two survey points")
+    repeated = np.flatnonzero((np.diff(index) == 0) & (np.diff(offset) == 0))
+    if len(repeated):
+        raise ValueError(f"Station {station[repeated[0]]:.3f} repeats offset {offset[repeated[0]]:.3f}")
+
+    return {
+        'stations': stations,
+        'index': index,
+        'offset': offset,
+        'level': level,
+        'start': np.concatenate(([0], np.cumsum(counts))),
+    }
+
+
+def template_profile(carriageway_width, shoulder_width, median_width, cross_fall, shoulder_slope, widening=0.0):
+    """One half of the formation template as (offsets, drops below the crown)
+
+    The crown is at the centre (or flat across the median) with the
+    carriageway falling at `cross_fall` (%, negative rising on the high side
+    of a superelevated section) and widened by half the extra `widening`. The
+    shoulder falls at the shoulder slope, or at the carriageway cross-fall
+    where that is steeper. cross_fall and widening may be arrays over
+    stations; offsets and drops then have one row per station.
+    """
+    cross_fall, widening = np.broadcast_arrays(np.asarray(cross_fall, dtype=float),
+                                               np.asarray(widening, dtype=float))
+    median_half = np.full(cross_fall.shape, median_width / 2)
+    half_carriageway = carriageway_width / 2 + widening / 2
+    carriageway_edge = median_half + half_carriageway
+    shoulder_edge = carriageway_edge + shoulder_width
+    edge_drop = half_carriageway * cross_fall / 100
+    shoulder_drop = edge_drop + shoulder_width * np.maximum(cross_fall, shoulder_slope) / 100
+    zero = np.zeros(cross_fall.shape)
+    offsets = np.stack((zero, median_half, carriageway_edge, shoulder_edge), axis=-1)
+    drops = np.stack((zero, zero, edge_drop, shoulder_drop), axis=-1)
+    if median_width == 0:
+        offsets, drops = offsets[..., 1:], drops[..., 1:]
+    return offsets, drops
+
+
+def _ground_at(survey, index, x):
+    """Ground level of station `index` at offset `x` (levels held flat beyond the surveyed width)"""
+    start, offset, level = survey['start'], survey['offset'], survey['level']
+    # Station-major key so one binary search serves every station
+    width = 2 * (np.abs(offset).max() + np.abs(x).max()) + 1
+    key = survey['index'] * width + offset
+    j = np.searchsorted(key, index * width + x, side='right') - 1
+    j = np.clip(j, start[index], start[index + 1] - 2)
+    t = np.clip((x - offset[j]) / (offset[j + 1] - offset[j]), 0, 1)
+    return level[j] + t * (level[j + 1] - level[j])
+
+
+def _shoelace(x, y):
+    """Signed area of each polygon (rows of vertex coordinates), positive anticlockwise"""
+    return 0.5 * np.sum(x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y, axis=-1)
+
+
+@traced("cross_sections.compute")
+def compute_cross_sections(survey, formation_level, carriageway_width, shoulder_width,
+                           median_width=0.0, camber=2.5, shoulder_slope=3.0,
+                           fill_slope=2.0, cut_slope=1.0, cross_fall=None, widening=None):
+    """Apply the template at every surveyed station and measure cut and fill
+
+    formation_level: crown formation level at each station. Slopes are
+    horizontal per unit vertical. Each side slopes down at the fill slope where
+    the ground at the shoulder edge is below formation, up at the cut slope
+    otherwise, to the first point where it meets the ground (the catch point);
+    a side that does not meet the ground within the survey stops at the last
+    surveyed offset and is flagged as not daylighted.
+
+    cross_fall: optional (left %, right %) arrays of carriageway cross-fall per
+    station, e.g. superelevation from a Corridor, instead of the camber;
+    widening: optional extra carriageway width per station.
+    """
+    stations = survey['stations']
+    count = len(stations)
+    crown = np.broadcast_to(np.asarray(formation_level, dtype=float), (count,))
+    if cross_fall is None:
+        cross_fall = (camber, camber)
+    widening = np.broadcast_to(np.asarray(0.0 if widening is None else widening, dtype=float), (count,))
+
+    # Template of each side at each station: offsets (count, k), drops (2, count, k)
+    t_drop = []
+    for fall in cross_fall:
+        fall = np.broadcast_to(np.asarray(fall, dtype=float), (count,))
+        t_offset, drop = template_profile(carriageway_width, shoulder_width, median_width, fall,
+                                          shoulder_slope, widening)
+        t_drop.append(drop)
+    t_drop = np.stack(t_drop)
+    half = t_offset[:, -1]
+    edge_level = crown[:, None] - t_drop[:, :, -1].T
+
+    # Side mode from the ground at each shoulder edge: +1 fill (slope falls outward), -1 cut
+    ids = np.arange(count)
+    edge_ground = np.column_stack((_ground_at(survey, ids, -half), _ground_at(survey, ids, half)))
+    edge_depth = edge_level - edge_ground
+    mode = np.where(edge_depth > 0, 1.0, -1.0)
+    side_slope = np.where(mode > 0, fill_slope, cut_slope)
+    last = t_offset.shape[1] - 2
+
+    def design_at(index, x):
+        shape = np.shape(x)
+        index, x = np.ravel(index), np.ravel(x)
+        a = np.abs(x)
+        side = (x >= 0).astype(int)
+        # Piecewise linear template of the station and side
+        offsets = t_offset[index]
+        j = np.clip((offsets <= a[:, None]).sum(axis=1) - 1, 0, last)
+        rows = np.arange(len(x))
+        x0, x1 = offsets[rows, j], offsets[rows, j + 1]
+        d0, d1 = t_drop[side, index, j], t_drop[side, index, j + 1]
+        inner = crown[index] - (d0 + (a - x0) / (x1 - x0) * (d1 - d0))
+        outer = edge_level[index, side] - mode[index, side] * (a - half[index]) / side_slope[index, side]
+        return np.where(a <= half[index], inner, outer).reshape(shape)
+
+    # Catch points: first sign change of design - ground walking outward from each edge
+    index, offset = survey['index'], survey['offset']
+    depth = design_at(index, offset) - survey['level']
+    points = np.arange(len(offset))
+    catch = np.empty((count, 2))
+    daylight = np.empty((count, 2), dtype=bool)
+    for side, sign in ((0, -1), (1, 1)):
+        beyond = sign * offset > half[index]
+        crossed = beyond & (depth * mode[index, side] <= 0)
+        if side == 0:  # outermost left point is first in each station
+            k = np.maximum.reduceat(np.where(crossed, points, -1), survey['start'][:-1])
+            found = k >= 0
+            k = np.where(found, k, survey['start'][:-1])
+            inner_point = np.minimum(k + 1, len(offset) - 1)
+        else:
+            k = np.minimum.reduceat(np.where(crossed, points, len(offset)), survey['start'][:-1])
+            found = k < len(offset)
+            k = np.where(found, k, survey['start'][1:] - 1)
+            inner_point = np.maximum(k - 1, 0)
+        # Previous point is the shoulder edge unless a surveyed point lies between
+        use_edge = ~(sign * offset[inner_point] > half) | (index[inner_point] != ids)
+        x0 = np.where(use_edge, sign * half, offset[inner_point])
+        d0 = np.where(use_edge, edge_depth[:, side], depth[inner_point])
+        x1, d1 = offset[k], depth[k]
+        t = np.divide(d0, d0 - d1, out=np.zeros(count), where=d0 != d1)
+        catch[:, side] = np.where(found, x0 + t * (x1 - x0), sign * np.maximum(sign * x1, half))
+        daylight[:, side] = found | (edge_depth[:, side] == 0)
+
+    # Breakpoints: surveyed points and template vertices between the catch points
+    template_x = np.concatenate((-t_offset[:, :0:-1], t_offset), axis=1)
+    x = np.concatenate((offset, template_x.ravel(), catch[:, 0], catch[:, 1]))
+    at = np.concatenate((index, np.repeat(ids, template_x.shape[1]), ids, ids))
+    keep = (x >= catch[at, 0]) & (x <= catch[at, 1])
+    x, at = x[keep], at[keep]
+
+    def sorted_depths(x, at):
+        order = np.lexsort((x, at))
+        x, at = x[order], at[order]
+        return x, at, design_at(at, x) - _ground_at(survey, at, x)
+
+    # Clip at cut/fill crossings so every strip is wholly cut or wholly fill
+    x, at, d = sorted_depths(x, at)
+    same = at[1:] == at[:-1]
+    crossing = same & (d[:-1] * d[1:] < 0)
+    t = d[:-1][crossing] / (d[:-1][crossing] - d[1:][crossing])
+    x = np.concatenate((x, x[:-1][crossing] + t * (x[1:][crossing] - x[:-1][crossing])))
+    at = np.concatenate((at, at[:-1][crossing]))
+    x, at, d = sorted_depths(x, at)
+
+    # Shoelace area of each ground-design strip (ground forward, design back)
+    same = at[1:] == at[:-1]
+    ground = design_at(at, x) - d
+    x1, x2, g1, g2 = x[:-1][same], x[1:][same], ground[:-1][same], ground[1:][same]
+    e1, e2 = (g1 + d[:-1][same]), (g2 + d[1:][same])
+    strip = _shoelace(np.column_stack((x1, x2, x2, x1)), np.column_stack((g1, g2, e2, e1)))
+    strip_station = at[:-1][same]
+    fill_area = np.bincount(strip_station, np.maximum(strip, 0), minlength=count)
+    cut_area = np.bincount(strip_station, np.maximum(-strip, 0), minlength=count)
+
+    # Design polyline per station: catch, slope toe/top, template vertices, catch
+    design_offset = np.column_stack((catch[:, 0], template_x, catch[:, 1]))
+    design_level = design_at(np.repeat(ids, design_offset.shape[1]).reshape(design_offset.shape), design_offset)
+
+    return {
+        'stations': stations,
+        'formation_level': crown.copy(),
+        'centre_ground': _ground_at(survey, ids, np.zeros(count)),
+        'cut_area': cut_area,
+        'fill_area': fill_area,
+        'catch_offset': catch,
+        'daylight': daylight,
+        'design_offset': design_offset,
+        'design_level': design_level,
+        'survey': survey,
+    }
+
+
+def section_volumes(sections):
+    """Average end area cut and fill volumes between consecutive stations"""
+    length = np.diff(sections['stations'])
+    cut = length * (sections['cut_area'][:-1] + sections['cut_area'][1:]) / 2
+    fill = length * (sections['fill_area'][:-1] + sections['fill_area'][1:]) / 2
+    return cut, fill
+
+
+def cross_section_summary(sections):
+    """Totals of compute_cross_sections() for pages and reports"""
+    cut, fill = section_volumes(sections)
+    stations = sections['stations']
+    return {
+        'stations': len(stations),
+        'first_chainage': float(stations[0]),
+        'last_chainage': float(stations[-1]),
+        'max_cut_area': float(sections['cut_area'].max()),
+        'max_fill_area': float(sections['fill_area'].max()),
+        'cut_volume': float(cut.sum()),
+        'fill_volume': float(fill.sum()),
+        'not_daylighted': int((~sections['daylight'].all(axis=1)).sum()),
+    }
+
+
+def sheet_layout(count, cell_width, cell_height, sheet_width=841.0, sheet_height=594.0, margin=20.0):
+    """Place `count` equal cells on sheets, column by column from the top left
+
+    Returns (sheet, x, y) arrays - the sheet number of each cell and its lower
+    left corner relative to that sheet's lower left corner - and the number of
+    cells per sheet. Cells larger than the sheet get a sheet each.
+    """
+    columns = max(int((sheet_width - 2 * margin) // cell_width), 1)
+    rows = max(int((sheet_height - 2 * margin) // cell_height), 1)
+    per_sheet = columns * rows
+    n = np.arange(count)
+    sheet, slot = np.divmod(n, per_sheet)
+    column, row = np.divmod(slot, rows)
+    x = margin + column * cell_width
+    y = sheet_height - margin - (row + 1) * cell_height
+    return sheet, x, y, per_sheet
@@ -0,0 +1,184 @@
+"""
+Side-drain hydraulic design for RajLisp road drawings (IRC:SP:42 / IRC:SP:50)
+
+The road is divided into drain reaches between outfalls. For every reach the
+peak runoff from its catchment strip (half the road, shoulder and adjoining
+land) is found by the rational method, and the trapezoidal drain is checked
+and sized by Manning's equation along the reach slope. All reaches are
+solved at once: the normal depth is found by vectorized bisection.
+
+Units: metres, m³/s, mm/h rainfall intensity, slopes as fractions.
+"""
+import numpy as np
+
+from utils.tracing import traced
+
+# Runoff coefficient C by surface
+RUNOFF_COEFFICIENTS = {
+    'Bituminous surface': 0.9,
+    'Concrete surface': 0.95,
+    'Gravel / WBM': 0.6,
+    'Earthen shoulder': 0.5,
+    'Open land / grass': 0.3,
+    'Cultivated fields': 0.4,
+    'Wooded / forest': 0.2,
+}
+
+# Manning's roughness n by drain lining
+MANNING_N = {
+    'Earthen (unlined)': 0.025,
+    'Stone pitched': 0.02,
+    'Brick masonry': 0.015,
+    'Concrete lined': 0.013,
+}
+
+# Permissible velocity (m/s): non-silting minimum, and maximum by lining
+MIN_VELOCITY = 0.6
+MAX_VELOCITY = {'Earthen (unlined)': 1.0, 'Stone pitched': 2.5, 'Brick masonry': 2.5, 'Concrete lined': 3.0}
+
+MIN_DRAIN_SLOPE = 0.002  # 1 in 500
+FREEBOARD = 0.15
+MAX_FLOW_DEPTH = 5.0  # deepest section the bisection searches (m)
+
+
+def weighted_runoff_coefficient(widths, coefficients):
+    """Area-weighted C of a catchment strip made of bands of given widths"""
+    widths = np.asarray(widths, dtype=float)
+    return float((widths * np.asarray(coefficients, dtype=float)).sum() / widths.sum())
+
+
+def time_of_concentration(length, slope):
+    """Kirpich time of concentration (minutes) over a flow length (m) at slope (fraction)"""
+    return 0.0195 * np.asarray(length, dtype=float) ** 0.77 * np.maximum(slope, 1e-4) ** -0.385
+
+
+def rainfall_intensity(one_hour_rainfall, duration):
+    """Critical intensity (mm/h) for a storm of `duration` minutes, IRC:SP:13
+
+    i = (F / T) (T + 1) / (t + 1) with F the one-hour rainfall (mm), T = 1 h
+    and t the duration in hours.
+    """
+    return one_hour_rainfall * 2 / (np.asarray(duration, dtype=float) / 60 + 1)
+
+
+def rational_flow(runoff_coefficient, intensity, area):
+    """Peak runoff Q = C i A / 360 (m³/s) for intensity in mm/h and area in hectares"""
+    return runoff_coefficient * np.asarray(intensity, dtype=float) * np.asarray(area, dtype=float) / 360
+
+
+def trapezoid(depth, bottom_width, side_slope):
+    """Flow area and hydraulic radius of a trapezoidal channel (side slope H:V)"""
+    depth = np.asarray(depth, dtype=float)
+    area = depth * (bottom_width + side_slope * depth)
+    perimeter = bottom_width + 2 * depth * np.sqrt(1 + side_slope ** 2)
+    radius = np.divide(area, perimeter, out=np.zeros_like(area), where=perimeter > 0)
+    return area, radius
+
+
+def manning_flow(depth, bottom_width, side_slope, slope, roughness):
+    """Capacity (m³/s) of a trapezoidal channel flowing at `depth`, Q = A R^2/3 S^1/2 / n"""
+    area, radius = trapezoid(depth, bottom_width, side_slope)
+    return area * radius ** (2 / 3) * np.sqrt(slope) / roughness
+
+
+def normal_depth(flow, bottom_width, side_slope, slope, roughness, max_depth=MAX_FLOW_DEPTH, iterations=50):
+    """Depth at which each channel carries `flow` (vectorized bisection; capacity rises with depth)
+
+    A flow beyond the capacity at max_depth comes back as max_depth; compare
+    with manning_flow(max_depth, ...) to find those channels.
+    """
+    flow, slope = np.broadcast_arrays(np.asarray(flow, dtype=float), np.asarray(slope, dtype=float))
+    low = np.zeros(flow.shape)
+    high = np.full(flow.shape, float(max_depth))
+    for _ in range(iterations):
+        depth = (low + high) / 2
+        enough = manning_flow(depth, bottom_width, side_slope, slope, roughness) >= flow
+        high = np.where(enough, depth, high)
+        low = np.where(enough, low, depth)
+    return high
+
+
+def drain_reaches(start, end, reach_length):
+    """(start, end) chainages of drain reaches between outfalls every `reach_length`"""
+    edges = np.append(np.arange(start, end, reach_length), end)
+    if len(edges) > 2 and edges[-1] - edges[-2] < reach_length / 4:
+        edges = np.delete(edges, -2)  # fold a short last reach into the previous one
+    return np.column_stack((edges[:-1], edges[1:]))
+
+
+@traced("drainage.design")
+def design_side_drains(level, start, end, catchment_width, runoff_coefficient, one_hour_rainfall,
+                       reach_length=250.0, bottom_width=0.3, side_slope=1.0, lining='Stone pitched',
+                       provided_depth=None, freeboard=FREEBOARD, min_slope=MIN_DRAIN_SLOPE, round_to=0.05):
+    """Runoff, capacity and required depth of the side drain in every reach
+
+    level: function of chainage giving the road (and drain bed) level, so the
+    drain falls with the road; flat stretches use min_slope. Flow collects
+    along each reach toward its lower end, where it is largest.
+    catchment_width: width (m) of the strip draining to one side drain.
+    provided_depth: depth (m) of the drain as drawn, checked against the flow.
+    Returns a dict of arrays over the reaches; 'insufficient' marks reaches
+    whose flow exceeds the section even MAX_FLOW_DEPTH deep, where the depths
+    are only that limit and a wider or steeper drain is needed.
+    """
+    reaches = drain_reaches(start, end, reach_length)
+    length = reaches[:, 1] - reaches[:, 0]
+    fall = np.abs(level(reaches[:, 1]) - level(reaches[:, 0]))
+    slope = np.maximum(fall / length, min_slope)
+    roughness = MANNING_N[lining]
+
+    # Rational method over the strip, with the inlet time taken along the road
+    area = catchment_width * length / 10000  # ha
+    duration = np.maximum(time_of_concentration(length, slope), 5.0)
+    intensity = rainfall_intensity(one_hour_rainfall, duration)
+    flow = rational_flow(runoff_coefficient, intensity, area)
+
+    # Sized section: normal depth plus freeboard, rounded up
+    flow_depth = normal_depth(flow, bottom_width, side_slope, slope, roughness, MAX_FLOW_DEPTH)
+    insufficient = flow > manning_flow(MAX_FLOW_DEPTH, bottom_width, side_slope, slope, roughness)
+    design_depth = np.ceil(np.round((flow_depth + freeboard) / round_to, 6)) * round_to
+    flow_area, _ = trapezoid(flow_depth, bottom_width, side_slope)
+    velocity = np.divide(flow, flow_area, out=np.zeros_like(flow), where=flow_area > 0)
+
+    result = {
+        'start': reaches[:, 0],
+        'end': reaches[:, 1],
+        'length': length,
+        'slope': slope,
+        'catchment_area': area,
+        'time_of_concentration': duration,
+        'intensity': intensity,
+        'flow': flow,
+        'flow_depth': flow_depth,
+        'design_depth': design_depth,
+        'top_width': bottom_width + 2 * side_slope * design_depth,
+        'velocity': velocity,
+        'silting': velocity < MIN_VELOCITY,
+        'scouring': velocity > MAX_VELOCITY[lining],
+        'insufficient': insufficient,
+        'bottom_width': bottom_width,
+        'side_slope': side_slope,
+        'lining': lining,
+    }
+    if provided_depth is not None:
+        usable = np.maximum(provided_depth - freeboard, 0)
+        result['capacity'] = manning_flow(usable, bottom_width, side_slope, slope, roughness)
+        result['overloaded'] = flow > result['capacity']
+    return result
+
+
+def drainage_summary(drains):
+    """Totals and worst reach of design_side_drains() for pages and reports"""
+    worst = int(np.argmax(drains['flow']))
+    overloaded = drains.get('overloaded', np.zeros(len(drains['flow']), dtype=bool))
+    return {
+        'reaches': len(drains['flow']),
+        'max_flow': float(drains['flow'][worst]),
+        'max_flow_reach': (float(drains['start'][worst]), float(drains['end'][worst])),
+        'max_design_depth': float(drains['design_depth'].max()),
+        'max_top_width': float(drains['top_width'].max()),
+        'overloaded': int(overloaded.sum()),
+        'silting': int(drains['silting'].sum()),
+        'scouring': int(drains['scouring'].sum()),
+        'insufficient': int(drains['insufficient'].sum()),
+    }
@@ -0,0 +1,177 @@
+"""
+Streaming import of survey and base drawings (DXF) for RajLisp roads and bridges
+
+Survey consultants deliver spot levels and breaklines as DXF drawings that
+can run to hundreds of MB. The modelspace is read entity by entity with
+ezdxf's iterdxf add-on, so the document is never loaded as a whole: only the
+requested entity types on the requested layers are converted, and their
+coordinates are gathered in fixed-size NumPy chunks.
+
+Points come from POINT entities and block INSERTs (spot-level symbols, whose
+level may sit in an attribute); polylines from LINE, LWPOLYLINE (at its
+elevation) and 2D/3D POLYLINE entities, keeping their vertices (arc bulges
+are not followed). Layer filters are case-insensitive and accept shell
+wildcards ('SPOT*', 'CONT_??').
+"""
+import fnmatch
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from ezdxf.addons import iterdxf
+
+from utils.earthwork import CHUNK_ROWS
+from utils.tracing import traced
+
+POINT_TYPES = ('POINT', 'INSERT')
+POLYLINE_TYPES = ('LINE', 'LWPOLYLINE', 'POLYLINE')
+
+
+def _layer_filter(layers):
+    """Predicate on layer names for a list of names or wildcard patterns (None or blank: every layer)"""
+    patterns = [pattern.strip().upper() for pattern in layers or () if pattern.strip()]
+    if not patterns:
+        return lambda name: True
+    return lambda name: any(fnmatch.fnmatchcase(name.upper(), pattern) for pattern in patterns)
+
+
+def iter_dxf_entities(source, types=POINT_TYPES + POLYLINE_TYPES, layers=None):
+    """Modelspace entities of the given types and layers, one at a time
+
+    source: path of an ASCII DXF file or a binary stream (e.g. an upload),
+    which is spooled to a temporary file in blocks first - the single-pass
+    stream reader of iterdxf loses the last entity of the drawing.
+    """
+    on_layer = _layer_filter(layers)
+    if isinstance(source, (str, os.PathLike)):
+        for entity in iterdxf.modelspace(source, types=types):
+            if on_layer(entity.dxf.layer):
+                yield entity
+        return
+    spool = tempfile.NamedTemporaryFile(suffix='.dxf', delete=False)
+    try:
+        with spool:
+            shutil.copyfileobj(source, spool)
+        yield from iter_dxf_entities(spool.name, types, layers)
+    finally:
+        os.unlink(spool.name)
+
+
+def _polyline_vertices(entity):
+    """(n, 3) vertices and closure of a LINE, LWPOLYLINE or POLYLINE entity, or None to skip it"""
+    kind = entity.dxftype()
+    if kind == 'LINE':
+        return np.array([entity.dxf.start, entity.dxf.end], dtype=float), False
+    if kind == 'LWPOLYLINE':
+        xy = np.array(list(entity.get_points('xy')), dtype=float).reshape(-1, 2)
+        return np.column_stack((xy, np.full(len(xy), entity.dxf.elevation))), entity.closed
+    if entity.is_poly_face_mesh or entity.is_polygon_mesh:
+        return None
+    vertices = np.array([tuple(point) for point in entity.points()], dtype=float).reshape(-1, 3)
+    if not entity.is_3d_polyline:
+        vertices[:, 2] = entity.dxf.elevation[2]
+    return vertices, entity.is_closed
+
+
+def _insert_point(entity, level_tag, require_level=False):
+    """Insertion point of a block reference, levelled from its `level_tag` attribute when that holds a number
+
+    With require_level, None for a block reference without such a level.
+    """
+    x, y, z = entity.dxf.insert
+    if level_tag:
+        for attrib in entity.attribs:
+            if attrib.dxf.tag.upper() == level_tag.upper():
+                try:
+                    return x, y, float(attrib.dxf.text)
+                except ValueError:
+                    pass
+    return None if require_level else (x, y, z)
+
+
+@traced("dxf_import.read")
+def read_dxf_survey(source, layers=None, types=POINT_TYPES + POLYLINE_TYPES, level_tag=None, require_level=False,
+                    chunk_rows=CHUNK_ROWS):
+    """Points and polylines of a survey DXF as NumPy arrays
+
+    level_tag: attribute tag (e.g. 'LEVEL') holding the level of spot-level
+    blocks drawn flat; the insert's own z is used where it is missing, unless
+    require_level, which skips such block references (title blocks, north
+    arrows and symbols at z = 0 that would pull the ground model down).
+
+    Returns a dict with 'layers' (names in order of first use), 'points'
+    (n, 3) with their 'point_layer' index, and 'polylines': flat 'vertices'
+    (m, 3) with `start`, the index of each polyline's first vertex (one
+    extra entry), plus per polyline its 'layer' index and whether it is
+    'closed'. Raises ValueError when nothing matches the filters.
+    """
+    layer_index = {}
+    point_chunks, point_layer_chunks = [], []
+    points, point_layers = [], []
+    vertex_chunks, vertices, lengths, closed, polyline_layers = [], [], [], [], []
+    for entity in iter_dxf_entities(source, types, layers):
+        kind = entity.dxftype()
+        if kind in POINT_TYPES:
+            point = tuple(entity.dxf.location) if kind == 'POINT' else _insert_point(entity, level_tag, require_level)
+            if point is None:
+                continue
+            points.append(point)
+            point_layers.append(layer_index.setdefault(entity.dxf.layer, len(layer_index)))
+            if len(points) >= chunk_rows:
+                point_chunks.append(np.array(points, dtype=float))
+                point_layer_chunks.append(np.array(point_layers, dtype=np.int64))
+                points, point_layers = [], []
+            continue
+        polyline = _polyline_vertices(entity)
+        if polyline is None or len(polyline[0]) < 2:
+            continue
+        vertices.append(polyline[0])
+        lengths.append(len(polyline[0]))
+        closed.append(bool(polyline[1]))
+        polyline_layers.append(layer_index.setdefault(entity.dxf.layer, len(layer_index)))
+        if len(vertices) >= chunk_rows:
+            vertex_chunks.append(np.concatenate(vertices))
+            vertices = []
+    if points:
+        point_chunks.append(np.array(points, dtype=float))
+        point_layer_chunks.append(np.array(point_layers, dtype=np.int64))
+    if vertices:
+        vertex_chunks.append(np.concatenate(vertices))
+    if not point_chunks and not vertex_chunks:
+        raise ValueError("No survey points or polylines found on the selected layers")
+
+    return {
+        'layers': list(layer_index),
+        'points': np.concatenate(point_chunks) if point_chunks else np.empty((0, 3)),
+        'point_layer': np.concatenate(point_layer_chunks) if point_layer_chunks else np.empty(0, dtype=np.int64),
+        'polylines': {
+            'vertices': np.concatenate(vertex_chunks) if vertex_chunks else np.empty((0, 3)),
+            'start': np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))),
+            'closed': np.array(closed, dtype=bool),
+            'layer': np.array(polyline_layers, dtype=np.int64),
+        },
+    }
+
+
+def survey_points(survey, include_polylines=True):
+    """x, y, z arrays of all survey points (and polyline vertices, e.g. contours and breaklines) for utils.tin"""
+    points = survey['points']
+    if include_polylines:
+        points = np.concatenate((points, survey['polylines']['vertices']))
+    if len(points) < 3:
+        raise ValueError("Ground survey needs at least three points")
+    return points[:, 0], points[:, 1], points[:, 2]
+
+
+def dxf_survey_summary(survey):
+    """Entity counts per layer for pages and reports"""
+    polylines = survey['polylines']
+    return {
+        name: {
+            'points': int((survey['point_layer'] == i).sum()),
+            'polylines': int((polylines['layer'] == i).sum()),
+            'vertices': int(np.diff(polylines['start'])[polylines['layer'] == i].sum()),
+        }
+        for i, name in enumerate(survey['layers'])
+    }
@@ -1,9 +1,15 @@
 """
 DXF utility functions for RajLisp Structural Design Suite
 """
+import io
+import zipfile
+
 import ezdxf
+import numpy as np
 from ezdxf.math import Vec3
 
+from utils.tracing import span
+
 
 def create_dxf_header(doc, title="Structural Drawing"):
     """Create standard DXF header with drawing setup"""
@@ -215,4 +221,66 @@ def add_section_marker(msp, start_point, end_point, section_name="A"):
         height=80,
         dxfattribs={'layer': 'TEXT', 'color': 3}
     )
-    end_label.set_placement((end_point[0] + 200, end_point[1] + 150), align="MIDDLE_CENTER")
\ No newline at end of file
+    end_label.set_placement((end_point[0] + 200, end_point[1] + 150), align="MIDDLE_CENTER")
+
+def dxf_to_bytes(doc, span_name="dxf.serialize"):
+    """Serialize a DXF document to bytes in memory (no temporary file)"""
+    with span(span_name) as s:
+        stream = io.StringIO()
+        doc.write(stream)
+        data = stream.getvalue().encode(doc.output_encoding, errors='dxfreplace')
+        s.set(bytes=len(data))
+    return data
+
+
+def dxf_zip(files, span_name="dxf.zip"):
+    """Zip archive bytes holding one DXF per (name, bytes) pair"""
+    with span(span_name) as s:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, data in files:
+                archive.writestr(f"{name}.dxf", data)
+        s.set(files=len(files), bytes=buffer.tell())
+    return buffer.getvalue()
+
+
+def _km_plus_metres(chainage):
+    """'1+200' label, rounded to the metre before splitting so 1999.6 reads 2+000"""
+    metres = int(round(chainage))
+    return f"{metres // 1000}+{metres % 1000:03d}"
+
+
+CHAINAGE_FORMATS = {
+    'Metres (1200m)': lambda chainage: f"{chainage:.0f}m",
+    'Km + m (1+200)': _km_plus_metres,
+    'Km (1.200 km)': lambda chainage: f"{chainage / 1000:.3f} km",
+}
+
+
+def chainage_labels(chainages, label_format='Metres (1200m)'):
+    """Chainage label text for each station: a CHAINAGE_FORMATS name or a format string like 'CH {:.0f}'"""
+    formatter = CHAINAGE_FORMATS.get(label_format, label_format.format)
+    return [formatter(float(chainage)) for chainage in chainages]
+
+
+def add_chainage_markers(msp, x, y, labels, rotation=0.0, tick_below=0.0, tick_above=0.0, text_offset=0.0,
+                         text_height=100, dxfattribs=None):
+    """Draw a chainage tick (LINE) and label (TEXT) at each station
+
+    x, y: station points (drawing units); rotation: degrees, scalar or one per
+    station. The tick runs from -tick_below to +tick_above along the rotated
+    local Y axis and the label sits at +text_offset, left aligned. End and
+    text points are worked out for all stations at once.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    rotation = np.broadcast_to(np.asarray(rotation, dtype=float), x.shape)
+    angle = np.radians(rotation)
+    across_x, across_y = -np.sin(angle), np.cos(angle)
+    attribs = dict(dxfattribs or {})
+    with span("dxf.chainage_markers") as s:
+        for i, label in enumerate(labels):
+            msp.add_line((x[i] - tick_below * across_x[i], y[i] - tick_below * across_y[i]),
+                         (x[i] + tick_above * across_x[i], y[i] + tick_above * across_y[i]), dxfattribs=attribs)
+            msp.add_text(label, dxfattribs={'height': text_height, 'style': 'STANDARD', 'rotation': rotation[i]}
+                         ).set_placement((x[i] + text_offset * across_x[i], y[i] + text_offset * across_y[i]))
+        s.set(markers=len(labels))
@@ -0,0 +1,160 @@
+"""
+Ground survey ingestion and earthwork quantities for RajLisp road drawings
+
+Survey files hold one station per line - chainage and natural soil level
+(NSL) separated by commas, semicolons, tabs or spaces - and are read in chunks
+so files with any number of stations can be streamed from disk or from a
+Streamlit upload. Cut/fill depths, end areas and interval volumes against
+the design formation are computed as NumPy arrays.
+"""
+import io
+
+import numpy as np
+
+from utils.tracing import traced
+
+CHUNK_ROWS = 8192
+
+
+def _text_stream(source):
+    """Text line iterator over a path, a text stream or a binary stream (e.g. an upload)"""
+    if isinstance(source, str):
+        return open(source, 'r', encoding='utf-8-sig', newline='')
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+
+
+def iter_survey_rows(source, columns=2, chunk_rows=CHUNK_ROWS):
+    """Yield float arrays of shape (n, columns) from a delimited survey file, chunk by chunk
+
+    Blank lines and lines starting with '#' are skipped, as is a single header
+    line at the top. Extra columns are ignored. Raises ValueError with the line
+    number on the first malformed line.
+    """
+    stream = _text_stream(source)
+    try:
+        rows = []
+        first_data = True
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            values = line.replace(',', ' ').replace(';', ' ').split()
+            try:
+                if len(values) < columns:
+                    raise ValueError
+                rows.append([float(v) for v in values[:columns]])
+            except ValueError:
+                if first_data:
+                    first_data = False  # header line
+                    continue
+                raise ValueError(f"Survey line {line_no}: expected {columns} numbers, got '{line[:60]}'")
+            first_data = False
+
+            if len(rows) >= chunk_rows:
+                yield np.array(rows)
+                rows = []
+        if rows:
+            yield np.array(rows)
+    finally:
+        if isinstance(source, str):
+            stream.close()
+        elif isinstance(stream, io.TextIOWrapper) and stream is not source:
+            stream.detach()  # leave the caller's binary stream open
+
+
+@traced("earthwork.read_ground_profile")
+def read_ground_profile(source, chunk_rows=CHUNK_ROWS):
+    """Chainage and NSL arrays from a (chainage, NSL) survey file, sorted by chainage
+
+    Raises ValueError for fewer than two stations or repeated chainages.
+    """
+    chunks = list(iter_survey_rows(source, 2, chunk_rows))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 2))
+    if len(data) < 2:
+        raise ValueError("Ground survey needs at least two stations")
+
+    order = np.argsort(data[:, 0], kind='stable')
+    chainage, level = data[order, 0], data[order, 1]
+    repeated = np.flatnonzero(np.diff(chainage) == 0)
+    if len(repeated):
+        raise ValueError(f"Ground survey has repeated chainage {chainage[repeated[0]]:.3f}")
+    return chainage, level
+
+
+def section_area(depth, formation_width, side_slope):
+    """Area of a level-ground trapezoid of height `depth` on a formation of given width (H:V side slope)"""
+    return depth * (formation_width + side_slope * depth)
+
+
+def _interval_volumes(h1, h2, length, span, formation_width, side_slope):
+    """Trapezoidal and prismoidal volumes of one kind (cut or fill) between consecutive stations
+
+    h1, h2 >= 0 are the depths at the interval ends and span = |d1| + |d2| the
+    total change of signed depth. Where only one end has depth the section
+    runs out to zero at the cut/fill crossing, so only that part of the
+    interval (length * h / span) is used.
+    """
+    one_sided = (h1 > 0) != (h2 > 0)
+    fraction = np.divide(np.maximum(h1, h2), span, out=np.zeros_like(span), where=span > 0)
+    effective = np.where(one_sided, length * fraction, length)
+    a1 = section_area(h1, formation_width, side_slope)
+    a2 = section_area(h2, formation_width, side_slope)
+    a_mid = section_area((h1 + h2) / 2, formation_width, side_slope)
+    trapezoidal = effective * (a1 + a2) / 2
+    prismoidal = effective * (a1 + 4 * a_mid + a2) / 6
+    return trapezoidal, prismoidal
+
+
+@traced("earthwork.compute")
+def compute_earthwork(chainage, ground_level, formation_level, formation_width,
+                      fill_slope=2.0, cut_slope=1.0):
+    """Per-station cut/fill depths and areas and per-interval volumes
+
+    formation_level: design formation (subgrade) level at every chainage.
+    Slopes are horizontal per unit vertical. Fill depths are positive.
+    """
+    chainage = np.asarray(chainage, dtype=float)
+    depth = np.asarray(formation_level, dtype=float) - np.asarray(ground_level, dtype=float)
+    fill = np.maximum(depth, 0)
+    cut = np.maximum(-depth, 0)
+    length = np.diff(chainage)
+    span = np.abs(depth[:-1]) + np.abs(depth[1:])
+
+    fill_trap, fill_prism = _interval_volumes(fill[:-1], fill[1:], length, span, formation_width, fill_slope)
+    cut_trap, cut_prism = _interval_volumes(cut[:-1], cut[1:], length, span, formation_width, cut_slope)
+
+    return {
+        'chainage': chainage,
+        'ground_level': np.asarray(ground_level, dtype=float),
+        'formation_level': np.asarray(formation_level, dtype=float),
+        'depth': depth,
+        'fill_area': section_area(fill, formation_width, fill_slope),
+        'cut_area': section_area(cut, formation_width, cut_slope),
+        'interval_length': length,
+        'fill_volume_trapezoidal': fill_trap,
+        'cut_volume_trapezoidal': cut_trap,
+        'fill_volume_prismoidal': fill_prism,
+        'cut_volume_prismoidal': cut_prism,
+    }
+
+
+def earthwork_summary(quantities):
+    """Totals of compute_earthwork() for pages and reports"""
+    depth = quantities['depth']
+    return {
+        'stations': len(depth),
+        'length': float(quantities['chainage'][-1] - quantities['chainage'][0]),
+        'max_fill': float(max(depth.max(), 0)),
+        'max_cut': float(max(-depth.min(), 0)),
+        'fill_trapezoidal': float(quantities['fill_volume_trapezoidal'].sum()),
+        'cut_trapezoidal': float(quantities['cut_volume_trapezoidal'].sum()),
+        'fill_prismoidal': float(quantities['fill_volume_prismoidal'].sum()),
+        'cut_prismoidal': float(quantities['cut_volume_prismoidal'].sum()),
+    }
+
+
+def datum_level(min_level):
+    """Drawing datum: minimum level rounded down to a multiple of 5 m (as in ROADL.LSP)"""
+    return float(np.floor(min_level / 5) * 5)
@@ -0,0 +1,343 @@
+"""
+Quantity estimate for RajLisp structures and road sections
+
+The EXSUM.LSP routines (lintel, sunshade, beams, columns and the square
+column footing of FOOTSQR) and EXPROAD.LSP (ROADX) define every member by
+its section, bar numbers, diameters and spacings, and the road by its
+formation template over the surveyed ground. The same inputs give the
+measured quantities: concrete, PCC, shuttering, reinforcement by diameter
+(bar counts exactly as the LISP arrays them, with AutoLISP integer division)
+and earthwork in cutting and embankment. Each routine works on arrays of
+elements, one entry per member type with the number of such members, so a
+whole project's schedule is measured in one call and gathered into a single
+abstract of quantities.
+
+Member dimensions in mm, lengths of members in m, quantities in m³, m² and kg.
+"""
+import numpy as np
+
+from utils.cross_sections import compute_cross_sections, section_volumes
+from utils.tracing import traced
+
+COVER = 25  # clear cover to stirrups and ties, as drawn by EXSUM.LSP
+FOOTING_COVER = 40  # footing bars stop 40 mm short of each face (BFOOTING - 80)
+HOOK_ALLOWANCE = 24  # two hooks and bends of a stirrup or tie, in bar diameters
+COLUMN_BAR_LEG = 0.3  # column bars bent into the footing by 0.3 x footing width (FOOTSQR)
+
+# Abstract items: key, description, unit
+ABSTRACT_ITEMS = [
+    ('cut', "Earthwork in cutting", "m³"),
+    ('fill', "Earthwork in embankment", "m³"),
+    ('pcc', "Plain cement concrete in foundations", "m³"),
+    ('concrete', "Reinforced cement concrete", "m³"),
+    ('formwork', "Centering and shuttering", "m²"),
+]
+
+
+def bar_unit_weight(dia):
+    """Weight of steel bars (kg/m) of diameter `dia` mm, d²/162"""
+    return np.asarray(dia, dtype=float) ** 2 / 162
+
+
+def lisp_count(length, spacing):
+    """Bars at `spacing` over `length` (mm) counted as the LISP does: (length / spacing) + 1, integer division"""
+    return np.floor_divide(np.asarray(length, dtype=float), spacing).astype(np.int64) + 1
+
+
+def _bars(mark, dia, number, cut_length, count):
+    """Bar group of a schedule: arrays over elements, cut length in mm"""
+    dia, number, cut_length, count = np.broadcast_arrays(np.asarray(dia, dtype=float), np.asarray(number),
+                                                         np.asarray(cut_length, dtype=float), np.asarray(count))
+    return {'mark': mark, 'dia': dia, 'number': number * count, 'cut_length': cut_length / 1000}
+
+
+def footsqr_column_bars(nbtotal, nbf):
+    """Column bars FOOTSQR draws for nbtotal bars with nbf on each flange: 2 (NBF + NBS)
+
+    NBS, the bars on each side face, is (nbtotal - 2 nbf) / 2 rounded half
+    up with FIX, so an odd remainder gains a bar.
+    """
+    nbf = np.asarray(nbf)
+    nbs = np.floor((np.asarray(nbtotal, dtype=float) - 2 * nbf) / 2 + 0.5).astype(np.int64)
+    return 2 * (nbf + nbs)
+
+
+def _stirrup_length(b, d, dia, cover=COVER):
+    """Cut length (mm) of a closed rectangular stirrup or tie"""
+    return 2 * ((b - 2 * cover) + (d - 2 * cover)) + HOOK_ALLOWANCE * np.asarray(dia, dtype=float)
+
+
+@traced("estimate.beams")
+def beam_quantities(b, d, length, nbb, diab, nbt, diat, dias, spc, count=1, flange_width=0, flange_depth=0,
+                    bottom_flange_width=0, bottom_flange_depth=0, cover=COVER):
+    """Concrete, shuttering and bars of rectangular, tee, L and inverted tee beams and lintels
+
+    b, d: web width and total depth; flange_width/flange_depth the top flange
+    (BEAMTEE, BEAML) and bottom_flange_* the bottom flange (inverted tee), 0
+    for none. nbb/nbt bottom and top bars of dia diab/diat run the member
+    length less the end covers; two legged stirrups of dia dias at spc. count
+    is the number of identical members. All arguments may be arrays.
+    """
+    b, d, length = (np.asarray(value, dtype=float) for value in (b, d, length))
+    count = np.asarray(count)
+    top_flange = np.maximum(np.asarray(flange_width, dtype=float) - b, 0) * flange_depth
+    bottom_flange = np.maximum(np.asarray(bottom_flange_width, dtype=float) - b, 0) * bottom_flange_depth
+    area = (b * d + top_flange + bottom_flange) / 1e6
+    # Soffit, sides and flange undersides (the flange edges are part of the sides)
+    girth = (np.maximum(b, bottom_flange_width) + 2 * d + np.maximum(np.asarray(flange_width) - b, 0)) / 1000
+    span = length * 1000
+    return {
+        'concrete': area * length * count,
+        'formwork': girth * length * count,
+        'bars': [
+            _bars("Bottom bars", diab, nbb, span - 2 * cover, count),
+            _bars("Top bars", diat, nbt, span - 2 * cover, count),
+            _bars("Stirrups", dias, lisp_count(span - 2 * cover, spc), _stirrup_length(b, d, dias, cover), count),
+        ],
+    }
+
+
+@traced("estimate.sunshades")
+def sunshade_quantities(b, d, length, proj, thick_support, thick_edge, nbb, diab, nbt, diat, dias, spc,
+                        dia_main, spc_main, dia_dist, spc_dist, count=1, cover=COVER):
+    """Lintel with a tapered sunshade slab (SUNSHADE routine of EXSUM.LSP)
+
+    The slab projects `proj` from the lintel face, thick_support at the
+    lintel and thick_edge at the free edge. Main bars at spc_main run b +
+    proj - 50 across the top (R2 of the LISP) along the slope of the slab
+    (rise R) and drop thick_edge - 50 at the free edge; (proj / spc_dist) + 1
+    distribution bars (NODIS) run the length.
+    """
+    lintel = beam_quantities(b, d, length, nbb, diab, nbt, diat, dias, spc, count, cover=cover)
+    proj, length = np.asarray(proj, dtype=float), np.asarray(length, dtype=float)
+    count = np.asarray(count)
+    slab = (np.asarray(thick_support) + np.asarray(thick_edge)) / 2 * proj / 1e6
+    span = length * 1000
+    # Soffit of the projection and its free edge
+    shuttering = (proj + np.asarray(thick_edge)) / 1000 * length
+    run = np.asarray(b, dtype=float) + proj - 50
+    rise = run * (np.asarray(thick_support, dtype=float) - thick_edge) / proj
+    main_bar = np.hypot(run, rise) + np.asarray(thick_edge) - 50
+    return {
+        'concrete': lintel['concrete'] + slab * length * count,
+        'formwork': lintel['formwork'] + shuttering * count,
+        'bars': lintel['bars'] + [
+            _bars("Sunshade main bars", dia_main, lisp_count(span - 2 * cover, spc_main), main_bar, count),
+            _bars("Sunshade distribution bars", dia_dist, lisp_count(proj, spc_dist), span - 2 * cover, count),
+        ],
+    }
+
+
+@traced("estimate.columns")
+def column_quantities(b, d, height, nbars, dial, diat, spc, count=1, circular=False, cover=COVER):
+    """Rectangular (COLURECT) or circular (d the diameter, b ignored) columns with lateral ties at spc"""
+    d, height = np.asarray(d, dtype=float), np.asarray(height, dtype=float)
+    b = d if circular else np.asarray(b, dtype=float)
+    count = np.asarray(count)
+    if circular:
+        area = np.pi * d ** 2 / 4 / 1e6
+        perimeter = np.pi * d / 1000
+        tie = np.pi * (d - 2 * cover) + HOOK_ALLOWANCE * np.asarray(diat, dtype=float)
+    else:
+        area = b * d / 1e6
+        perimeter = 2 * (b + d) / 1000
+        tie = _stirrup_length(b, d, diat, cover)
+    return {
+        'concrete': area * height * count,
+        'formwork': perimeter * height * count,
+        'bars': [
+            _bars("Column bars", dial, nbars, height * 1000, count),
+            _bars("Lateral ties", diat, lisp_count(height * 1000, spc), tie, count),
+        ],
+    }
+
+
+@traced("estimate.footings")
+def footing_quantities(bfooting, depth_edge, depth_centre, b, d, pedestal_projection, pcc_projection,
+                       pcc_thickness, diax, spcx, diay, spcy, nbars=0, dial=0, count=1):
+    """Square sloped column footings with PCC bed (FOOTSQR routine of EXSUM.LSP)
+
+    The footing is bfooting square, depth_edge deep at the edge rising to
+    depth_centre under a pedestal projecting pedestal_projection around the
+    b x d column. Bars each way number (bfooting - 80) / spacing + 1 (NOX,
+    NOY), bfooting - 80 long. nbars column bars of dia dial (see
+    footsqr_column_bars) get the leg bent 0.3 bfooting into the footing, 25 mm
+    above the mesh, and the drop through the footing to it.
+    """
+    bf, edge, centre = (np.asarray(value, dtype=float) for value in (bfooting, depth_edge, depth_centre))
+    count = np.asarray(count)
+    top_x = np.asarray(b, dtype=float) + 2 * np.asarray(pedestal_projection)
+    top_y = np.asarray(d, dtype=float) + 2 * np.asarray(pedestal_projection)
+    rise = centre - edge
+    # Prismoid between the footing and the pedestal top: h / 6 (A1 + 4 Am + A2)
+    sloped = rise / 6 * (bf * bf + (bf + top_x) * (bf + top_y) + top_x * top_y)
+    concrete = (bf * bf * edge + sloped) / 1e9
+    pcc = (bf + 2 * np.asarray(pcc_projection)) ** 2 * np.asarray(pcc_thickness) / 1e9
+    # Vertical sides at the edge; the sloped top is laid without shuttering
+    formwork = 4 * bf * edge / 1e6
+    clear = bf - 2 * FOOTING_COVER
+    return {
+        'concrete': concrete * count,
+        'pcc': pcc * count,
+        'formwork': formwork * count,
+        'bars': [
+            _bars("Footing bars X", diax, lisp_count(clear, spcx), clear, count),
+            _bars("Footing bars Y", diay, lisp_count(clear, spcy), clear, count),
+            _bars("Column bar legs", dial, nbars, COLUMN_BAR_LEG * bf + centre - FOOTING_COVER - 25, count),
+        ],
+    }
+
+
+@traced("estimate.road")
+def road_quantities(survey, formation_level, formation_width, carriageway_width, camber_carriageway=2.5,
+                    camber_shoulder=3.0, side_slope=2.0):
+    """Cut and fill of the ROADX template (EXPROAD.LSP) at every surveyed station
+
+    survey: utils.cross_sections.read_cross_sections() points; the template
+    is the formation width FW with the carriageway CW cambered at
+    camber_carriageway %, shoulders at camber_shoulder % and side slopes of
+    side_slope : 1 in cut and fill. Returns the sections with the average
+    end area volumes between stations.
+
+    ROADX drops the shoulder edge by CamberS x SW / 200, half the given
+    shoulder camber; the shoulders here fall at the full camber_shoulder %.
+    """
+    sections = compute_cross_sections(survey, formation_level, carriageway_width,
+                                      (formation_width - carriageway_width) / 2, 0.0, camber_carriageway,
+                                      camber_shoulder, side_slope, side_slope)
+    sections['cut_volume'], sections['fill_volume'] = section_volumes(sections)
+    return sections
+
+
+def bar_schedule(*quantities):
+    """Flat bar schedule (mark, dia, number, cut length m, weight kg) of all bar groups"""
+    groups = [group for q in quantities for group in q.get('bars', [])]
+    marks = np.array([group['mark'] for group in groups for _ in range(np.size(group['dia']))], dtype=object)
+    dia, number, cut_length = (np.concatenate([np.ravel(group[key]) for group in groups]) if groups else np.empty(0)
+                               for key in ('dia', 'number', 'cut_length'))
+    keep = (number > 0) & (dia > 0)
+    schedule = {'mark': marks[keep], 'dia': dia[keep], 'number': number[keep].astype(np.int64),
+                'cut_length': cut_length[keep]}
+    schedule['weight'] = schedule['number'] * schedule['cut_length'] * bar_unit_weight(schedule['dia'])
+    return schedule
+
+
+@traced("estimate.abstract")
+def estimate_abstract(*quantities, road=None):
+    """Abstract of quantities over structure quantities and an optional road_quantities() result
+
+    Returns {key: total} for the ABSTRACT_ITEMS plus 'steel' {dia: kg} by
+    bar diameter and 'steel_total' in kg.
+    """
+    totals = {key: 0.0 for key, _, _ in ABSTRACT_ITEMS}
+    for q in quantities:
+        for key in ('concrete', 'pcc', 'formwork'):
+            if key in q:
+                totals[key] += float(np.sum(q[key]))
+    if road is not None:
+        totals['cut'] = float(road['cut_volume'].sum())
+        totals['fill'] = float(road['fill_volume'].sum())
+    schedule = bar_schedule(*quantities)
+    diameters, index = np.unique(schedule['dia'], return_inverse=True)
+    weights = np.bincount(index, schedule['weight'], minlength=len(diameters))
+    totals['steel'] = {float(dia): float(weight) for dia, weight in zip(diameters, weights)}
+    totals['steel_total'] = float(weights.sum())
+    return totals
+
+
+def abstract_table(abstract):
+    """Abstract of quantities as a table (dict of columns), steel by diameter in tonnes"""
+    rows = [(description, unit, abstract[key]) for key, description, unit in ABSTRACT_ITEMS if abstract[key]]
+    rows += [(f"Steel reinforcement {dia:.0f} mm dia", "MT", weight / 1000)
+             for dia, weight in abstract['steel'].items()]
+    return {
+        "Item": [str(i) for i in range(1, len(rows) + 1)],
+        "Description": [description for description, _, _ in rows],
+        "Unit": [unit for _, unit, _ in rows],
+        "Quantity": [f"{quantity:,.3f}" for _, _, quantity in rows],
+    }
+
+
+def abstract_csv(abstract):
+    """Abstract of quantities as CSV text"""
+    table = abstract_table(abstract)
+    lines = ["item,description,unit,quantity"]
+    lines += [f"{item},{description},{unit},{quantity.replace(',', '')}" for item, description, unit, quantity in
+              zip(table["Item"], table["Description"], table["Unit"], table["Quantity"])]
+    return "\n".join(lines) + "\n"
+
+
+def bar_schedule_table(schedule):
+    """Bar schedule as a table (dict of columns)"""
+    return {
+        "Member / Mark": list(schedule['mark']),
+        "Dia (mm)": [f"{dia:.0f}" for dia in schedule['dia']],
+        "Nos": [str(number) for number in schedule['number']],
+        "Cut Length (m)": [f"{length:.3f}" for length in schedule['cut_length']],
+        "Weight (kg)": [f"{weight:,.2f}" for weight in schedule['weight']],
+    }
+
+
+def _hand_worked():
+    """Engine values of the hand-worked members of lisp_checks()"""
+    footing = footing_quantities(1500, 250, 450, 300, 300, 75, 100, 100, 12, 150, 12, 200,
+                                 footsqr_column_bars(7, 3), 16)
+    sunshade = sunshade_quantities(230, 300, 1.5, 650, 100, 75, 2, 10, 2, 10, 6, 150, 8, 150, 6, 150)
+    survey = {'stations': np.array([0.0, 20.0]), 'index': np.repeat([0, 1], 2),
+              'offset': np.tile([-20.0, 20.0], 2), 'level': np.full(4, 100.0), 'start': np.array([0, 2, 4])}
+    road = road_quantities(survey, 101.0, 12.0, 7.0, 2.5, 3.0, 2.0)
+    schedule = bar_schedule(footing)
+    weight = {mark: float(w) for mark, w in zip(schedule['mark'], schedule['weight'])}
+    bars = {group['mark']: group for group in footing['bars'] + sunshade['bars']}
+    return {
+        'NOX': int(bars["Footing bars X"]['number']),
+        'NOY': int(bars["Footing bars Y"]['number']),
+        'column_bars': int(footsqr_column_bars(7, 3)),
+        'footing_concrete': float(footing['concrete']),
+        'footing_pcc': float(footing['pcc']),
+        'footing_x_kg': weight["Footing bars X"],
+        'column_leg_kg': weight["Column bar legs"],
+        'NODIS': int(bars["Sunshade distribution bars"]['number']),
+        'sunshade_main_mm': float(bars["Sunshade main bars"]['cut_length']) * 1000,
+        'sunshade_concrete': float(sunshade['concrete']),
+        'roadx_fill_area': float(road['fill_area'][0]),
+        'roadx_fill_volume': float(road['fill_volume'].sum()),
+    }
+
+
+# Members worked by hand the way EXSUM.LSP / EXPROAD.LSP compute them: (key, check, hand value)
+#   FOOTSQR: BFOOTING 1500, edge 250, centre 450, column 300 x 300, pedestal 75, PCC 100 / 100,
+#   12 @ 150 X and 12 @ 200 Y, NBTOTAL 7 with NBF 3 of 16 dia
+#   SUNSHADE: 230 x 300 lintel 1.5 m long, PROJ 650, THICKSUP 100, THICKEDG 75, SPCDIS 150
+#   ROADX: FW 12, CW 7, camber 2.5 % / 3 %, side slope 2 : 1, FL 101 over level ground at 100
+#   (shoulders at the full 3 %, see road_quantities)
+HAND_CHECKS = [
+    ('NOX', "FOOTSQR NOX = (1500 - 80) / 150 + 1", 10),
+    ('NOY', "FOOTSQR NOY = (1500 - 80) / 200 + 1", 8),
+    ('column_bars', "FOOTSQR bars 2 (NBF + FIX((7 - 6) / 2 + 0.5))", 8),
+    ('footing_concrete', "Footing concrete 1.5² x 0.25 + 0.2 / 6 (2.25 + 4 x 0.975² + 0.45²) m³", 0.771),
+    ('footing_pcc', "PCC 1.7² x 0.1 m³", 0.289),
+    ('footing_x_kg', "Footing bars X 10 x 1.42 m x 12² / 162 kg", 12.6222),
+    ('column_leg_kg', "Column bar legs 8 x (0.45 + 0.45 - 0.065) m x 16² / 162 kg", 10.5560),
+    ('NODIS', "SUNSHADE NODIS = 650 / 150 + 1", 5),
+    ('sunshade_main_mm', "Sunshade main bar √(830² + 31.92²) + 75 - 50 mm", 855.614),
+    ('sunshade_concrete', "Sunshade concrete (0.23 x 0.3 + 0.0875 x 0.65) x 1.5 m³", 0.18881),
+    ('roadx_fill_area', "ROADX fill area 2 (3.5 x 0.95625 + 2.5 x 0.875 + 1.675 x 0.8375 / 2) m²", 12.4715625),
+    ('roadx_fill_volume', "ROADX fill 12.47156 m² over 20 m, m³", 249.43125),
+]
+
+
+def lisp_checks(tolerance=5e-4):
+    """Hand-worked LISP members against this engine
+
+    Returns a table (dict of columns); a check passes when the engine value
+    matches the hand calculation within `tolerance` (relative).
+    """
+    engine = _hand_worked()
+    ok = [bool(np.isclose(engine[key], hand, rtol=tolerance, atol=0)) for key, _, hand in HAND_CHECKS]
+    return {
+        "Check": [check for _, check, _ in HAND_CHECKS],
+        "Hand Calculation": [f"{hand:g}" for _, _, hand in HAND_CHECKS],
+        "Engine": [f"{engine[key]:.4f}".rstrip('0').rstrip('.') for key, _, _ in HAND_CHECKS],
+        "Status": ["✅" if passed else "❌" for passed in ok],
+    }
@@ -0,0 +1,185 @@
+"""
+Quantities by chainage interval for RajLisp road works
+
+Estimates and measurement books take quantities per 20/30/100 m interval.
+Station-wise section areas (pavement layers, shoulders, earthwork, drains)
+are integrated by the average end area method over every interval, with the
+interval boundaries and cut/fill crossings inserted as extra stations, all as
+NumPy arrays. Stations can be fed in chunks (e.g. from a long survey
+file) and the intervals are written to CSV as soon as they are complete, so
+corridors of any length are tabulated without holding every section.
+"""
+import csv
+import io
+
+import numpy as np
+
+from utils.earthwork import CHUNK_ROWS
+from utils.tracing import traced
+
+# Quantity columns: key, heading, unit
+QUANTITIES = [
+    ('surface', "Surface course", "m³"),
+    ('base', "Base course", "m³"),
+    ('subbase', "Sub-base", "m³"),
+    ('shoulder', "Shoulders", "m³"),
+    ('cut', "Earthwork in cutting", "m³"),
+    ('fill', "Earthwork in embankment", "m³"),
+    ('drain', "Side drain excavation", "m³"),
+]
+
+# Quantities that run out to zero where the section changes between cut and fill
+EARTHWORK = ('cut', 'fill')
+
+
+def station_areas(chainage, carriageway_width, shoulder_width, surface, base, subbase, cut_area=0.0, fill_area=0.0,
+                  drain_area=0.0, widening=0.0, shoulder_thickness=None):
+    """Section areas (m²) of every quantity at each station
+
+    Layer thicknesses in mm; widening (m) is added to the carriageway, and
+    drain_area is the area of one side drain (two are measured). Shoulders
+    are as thick as the pavement unless shoulder_thickness (mm) is given.
+    Any argument may be an array over the stations.
+    """
+    chainage = np.asarray(chainage, dtype=float)
+    width = carriageway_width + np.asarray(widening, dtype=float)
+    if shoulder_thickness is None:
+        shoulder_thickness = np.asarray(surface) + np.asarray(base) + np.asarray(subbase)
+    areas = {
+        'surface': width * np.asarray(surface) / 1000,
+        'base': width * np.asarray(base) / 1000,
+        'subbase': width * np.asarray(subbase) / 1000,
+        'shoulder': 2 * shoulder_width * np.asarray(shoulder_thickness) / 1000,
+        'cut': cut_area,
+        'fill': fill_area,
+        'drain': 2 * np.asarray(drain_area, dtype=float),
+    }
+    return {key: np.broadcast_to(np.asarray(value, dtype=float), chainage.shape) for key, value in areas.items()}
+
+
+@traced("interval_quantities.compute")
+def interval_volumes(chainage, areas, interval, origin=0.0, depth=None):
+    """Volumes per chainage interval from station-wise areas (average end area)
+
+    Intervals are [origin + k * interval, origin + (k + 1) * interval),
+    clipped to the stations. depth: optional signed fill depth at each
+    station; where it changes sign the cut and fill areas are taken to run
+    out to zero at the crossing instead of spanning the whole gap.
+    Returns index (k), from, to and one volume array per area key.
+    """
+    chainage = np.asarray(chainage, dtype=float)
+    keys = list(areas)
+    values = np.vstack([np.asarray(areas[key], dtype=float) for key in keys])
+
+    if depth is not None:
+        # Cut/fill crossings become stations first, where each kind runs out linearly to nothing
+        depth = np.asarray(depth, dtype=float)
+        crossing = np.flatnonzero(depth[:-1] * depth[1:] < 0)
+        t = depth[crossing] / (depth[crossing] - depth[crossing + 1])
+        zero = chainage[crossing] + t * (chainage[crossing + 1] - chainage[crossing])
+        at_zero = np.vstack([np.interp(zero, chainage, row) for row in values])
+        at_zero[[i for i, key in enumerate(keys) if key in EARTHWORK]] = 0.0
+        order = np.argsort(np.concatenate((chainage, zero)), kind='stable')
+        chainage = np.concatenate((chainage, zero))[order]
+        values = np.hstack((values, at_zero))[:, order]
+
+    first = np.floor((chainage[0] - origin) / interval)
+    last = np.ceil((chainage[-1] - origin) / interval)
+    edges = origin + interval * np.arange(first, last + 1)
+    edges = edges[(edges > chainage[0]) & (edges < chainage[-1])]
+    x = np.union1d(chainage, edges)
+    a = np.vstack([np.interp(x, chainage, row) for row in values])
+
+    length = np.diff(x)
+    volume = (a[:, :-1] + a[:, 1:]) / 2 * length
+    index = np.floor(((x[:-1] + x[1:]) / 2 - origin) / interval).astype(np.int64)
+    k0 = index[0] if len(index) else 0
+    count = int(index[-1] - k0 + 1) if len(index) else 0
+    totals = np.vstack([np.bincount(index - k0, row, minlength=count) for row in volume]) if count else \
+        np.zeros((len(keys), 0))
+    k = np.arange(k0, k0 + count)
+    result = {
+        'index': k,
+        'from': np.maximum(origin + k * interval, chainage[0]),
+        'to': np.minimum(origin + (k + 1) * interval, chainage[-1]),
+    }
+    result.update({key: totals[i] for i, key in enumerate(keys)})
+    return result
+
+
+@traced("interval_quantities.stream")
+def iter_interval_volumes(chunks, interval, origin=0.0):
+    """Completed intervals, batch by batch, from (chainage, areas[, depth]) chunks in chainage order
+
+    Each chunk is computed with interval_volumes() starting from the last
+    station of the previous chunk; the last interval of a chunk is held back
+    until the next chunk shows it is complete.
+    """
+    previous = None
+    pending = None
+    for chunk in chunks:
+        chainage, areas = chunk[0], chunk[1]
+        depth = chunk[2] if len(chunk) > 2 else None
+        if len(chainage) == 0:
+            continue
+        if previous is not None:
+            chainage = np.concatenate(([previous[0]], chainage))
+            areas = {key: np.concatenate(([previous[1][key]], areas[key])) for key in areas}
+            if depth is not None:
+                depth = np.concatenate(([previous[2]], depth))
+        previous = (chainage[-1], {key: areas[key][-1] for key in areas},
+                    depth[-1] if depth is not None else None)
+        if len(chainage) < 2:
+            continue
+
+        volumes = interval_volumes(chainage, areas, interval, origin, depth)
+        if pending is not None and len(volumes['index']) and volumes['index'][0] == pending['index'][0]:
+            for key in areas:
+                volumes[key][0] += pending[key][0]
+            volumes['from'][0] = pending['from'][0]
+        elif pending is not None:
+            yield pending
+        # Hold back the last interval: the next chunk may add to it
+        pending = {key: value[-1:] for key, value in volumes.items()}
+        done = {key: value[:-1] for key, value in volumes.items()}
+        if len(done['index']):
+            yield done
+    if pending is not None:
+        yield pending
+
+
+def chunk_stations(chainage, areas, depth=None, chunk_rows=CHUNK_ROWS):
+    """(chainage, areas, depth) chunks of station arrays already in memory"""
+    for start in range(0, len(chainage), chunk_rows):
+        part = slice(start, start + chunk_rows)
+        yield (chainage[part], {key: value[part] for key, value in areas.items()},
+               None if depth is None else depth[part])
+
+
+def write_interval_csv(batches, stream):
+    """Write interval batches to a CSV text stream as they arrive; returns the number of intervals"""
+    keys = [key for key, _, _ in QUANTITIES]
+    writer = csv.writer(stream, lineterminator="\n")
+    header = ["from_chainage", "to_chainage", "length"] + [f"{key}_m3" for key in keys]
+    rows = 0
+    for batch in batches:
+        if rows == 0:
+            writer.writerow(header)
+        present = [key for key in keys if key in batch]
+        for i in range(len(batch['index'])):
+            writer.writerow([f"{batch['from'][i]:.3f}", f"{batch['to'][i]:.3f}",
+                             f"{batch['to'][i] - batch['from'][i]:.3f}"] +
+                            [f"{batch[key][i]:.3f}" if key in present else "" for key in keys])
+        rows += len(batch['index'])
+    if rows == 0:
+        writer.writerow(header)
+    return rows
+
+
+def interval_quantities_csv(chunks, interval, origin=0.0, excel=False):
+    """CSV text (or bytes with a BOM for Excel) of interval quantities from station chunks"""
+    stream = io.StringIO()
+    write_interval_csv(iter_interval_volumes(chunks, interval, origin), stream)
+    text = stream.getvalue()
+    return text.encode('utf-8-sig') if excel else text
+
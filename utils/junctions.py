@@ -0,0 +1,270 @@
+"""
+Junction geometry for RajLisp road plans (IRC:SP:41 at-grade intersections, IRC:65 roundabouts)
+
+T and cross junctions get kerb returns at every corner, sized for the
+design vehicle and the turning speed, and splitter islands on the minor
+arms; roundabouts get the central island, the circulatory carriageway, entry
+and exit kerb radii onto the inscribed circle and a splitter island on every
+arm. Each junction type is laid out once in a local frame (junction centre
+at the origin, main road along +x) and cached by its parameter signature;
+all junctions of a corridor are then placed together by one rotation and
+translation of the cached polylines. Areas and kerb lengths are returned for
+quantities.
+
+Lengths in metres, speeds in km/h, angles in radians.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from utils.tracing import traced
+
+JUNCTION_TYPES = ["T-Junction", "Cross Junction", "Roundabout"]
+
+# Design vehicles: minimum kerb radius at a corner, entry radius at a roundabout and
+# the width its swept path needs on the circulatory carriageway
+DESIGN_VEHICLES = {
+    'Passenger Car': {'kerb_radius': 6.0, 'entry_radius': 15.0, 'circulating_width': 6.0},
+    'Single Unit Truck': {'kerb_radius': 12.0, 'entry_radius': 20.0, 'circulating_width': 8.0},
+    'Semi-trailer': {'kerb_radius': 15.0, 'entry_radius': 25.0, 'circulating_width': 9.0},
+}
+
+# Side friction for low-speed turns: (turning speed km/h, f)
+TURNING_FRICTION = ([15, 20, 25, 30, 40], [0.32, 0.30, 0.27, 0.24, 0.20])
+
+# Roundabout central island radius by entry design speed (IRC:65)
+ISLAND_RADIUS = ([25, 30, 40], [10.0, 15.0, 20.0])
+
+SPLITTER_MIN_LENGTH = 15.0
+SPLITTER_WIDTH = 3.0
+
+ARM_ANGLES = {
+    "T-Junction": (0.0, math.pi / 2, math.pi),
+    "Cross Junction": (0.0, math.pi / 2, math.pi, 3 * math.pi / 2),
+    "Roundabout": (0.0, math.pi / 2, math.pi, 3 * math.pi / 2),
+}
+
+
+def turning_speed(design_speed):
+    """Speed (km/h) of turning movements at a junction on a road of `design_speed`"""
+    return float(np.clip(0.35 * design_speed, 15, 40))
+
+
+def corner_radius(vehicle, speed):
+    """Kerb return radius: the design vehicle's minimum or the turning-speed radius V² / 127 f if larger"""
+    f = np.interp(speed, *TURNING_FRICTION)
+    return max(DESIGN_VEHICLES[vehicle]['kerb_radius'], math.ceil(speed ** 2 / (127 * f)))
+
+
+def island_radius(design_speed):
+    """Central island radius for the entry speed at a roundabout on a road of `design_speed`"""
+    speed = min(turning_speed(design_speed) + 10, 40)
+    return float(np.interp(speed, *ISLAND_RADIUS))
+
+
+def _arc(centre, start, end, samples):
+    """Points (k, samples, 2) of arcs about centres from start to end points, the short way round"""
+    a0 = np.arctan2(start[:, 1] - centre[:, 1], start[:, 0] - centre[:, 0])
+    a1 = np.arctan2(end[:, 1] - centre[:, 1], end[:, 0] - centre[:, 0])
+    sweep = (a1 - a0 + np.pi) % (2 * np.pi) - np.pi
+    radius = np.hypot(start[:, 0] - centre[:, 0], start[:, 1] - centre[:, 1])
+    angle = a0[:, None] + sweep[:, None] * np.linspace(0, 1, samples)
+    points = centre[:, None, :] + radius[:, None, None] * np.stack((np.cos(angle), np.sin(angle)), axis=-1)
+    return points, np.abs(sweep), radius
+
+
+def _shoelace(points):
+    """Area of each closed polygon (k, n, 2)"""
+    x, y = points[..., 0], points[..., 1]
+    return 0.5 * np.abs(np.sum(x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y, axis=-1))
+
+
+def _corner_returns(angles, half, radius, samples):
+    """Kerb returns between consecutive arms (skipping straight-through sides)"""
+    i = np.arange(len(angles))
+    j = (i + 1) % len(angles)
+    between = (angles[j] - angles[i]) % (2 * np.pi)
+    corner = between < np.pi - 1e-9
+    i, j, between = i[corner], j[corner], between[corner]
+    u_i = np.column_stack((np.cos(angles[i]), np.sin(angles[i])))
+    u_j = np.column_stack((np.cos(angles[j]), np.sin(angles[j])))
+    n_i = np.column_stack((-u_i[:, 1], u_i[:, 0]))
+    n_j = np.column_stack((-u_j[:, 1], u_j[:, 0]))
+    # Centre is R beyond the left edge of arm i and the right edge of arm j: t u_i - s u_j = rhs
+    rhs = -(half[j] + radius)[:, None] * n_j - (half[i] + radius)[:, None] * n_i
+    ts = np.linalg.solve(np.stack((u_i, -u_j), axis=-1), rhs[..., None])[..., 0]
+    centre = (half[i] + radius)[:, None] * n_i + ts[:, :1] * u_i
+    start = half[i][:, None] * n_i + ts[:, :1] * u_i
+    end = -half[j][:, None] * n_j + ts[:, 1:] * u_j
+    points, sweep, _ = _arc(centre, start, end, samples)
+    # Paved area gained over the square corner: R² (tan(φ/2) - φ/2) for a sweep φ
+    area = radius ** 2 * (np.tan(sweep / 2) - sweep / 2)
+    mouth = np.full(len(angles), np.nan)
+    mouth_right = np.full(len(angles), np.nan)
+    mouth[i] = ts[:, 0]
+    mouth_right[j] = ts[:, 1]
+    return points, area, radius * sweep, mouth, mouth_right
+
+
+def _entry_returns(angles, half, radius, inscribed, samples):
+    """Entry and exit kerbs from both edges of every arm onto the inscribed circle"""
+    if np.any(half >= inscribed):
+        raise ValueError("Arm carriageway is wider than the roundabout; increase the island radius")
+    u = np.column_stack((np.cos(angles), np.sin(angles)))
+    n = np.column_stack((-u[:, 1], u[:, 0]))
+    side = np.concatenate((np.ones(len(angles)), -np.ones(len(angles))))
+    u, n, h = np.vstack((u, u)), np.vstack((n, n)) * side[:, None], np.concatenate((half, half))
+    # Centre R beyond the arm edge and R outside the circle
+    t = np.sqrt((inscribed + radius) ** 2 - (h + radius) ** 2)
+    centre = (h + radius)[:, None] * n + t[:, None] * u
+    on_edge = h[:, None] * n + t[:, None] * u
+    on_circle = centre * (inscribed / (inscribed + radius))
+    points, sweep, _ = _arc(centre, on_edge, on_circle, samples)
+    # Area between the arm edge, the return and the circle up to where the edge meets the circle
+    meet = h[:, None] * n + np.sqrt(inscribed ** 2 - h ** 2)[:, None] * u
+    circle, _, _ = _arc(np.zeros_like(meet), on_circle, meet, samples)
+    area = _shoelace(np.concatenate((points, circle[:, 1:]), axis=1))
+    return points, area, radius * sweep, t[:len(angles)], t[len(angles):]
+
+
+def _splitters(angles, start, length, width):
+    """Triangular splitter islands on the arm axes from `start` out to start + length"""
+    u = np.column_stack((np.cos(angles), np.sin(angles)))
+    n = np.column_stack((-u[:, 1], u[:, 0]))
+    base = start[:, None] * u
+    tip = (start + length)[:, None] * u
+    points = np.stack((base + width / 2 * n, tip, base - width / 2 * n), axis=1)
+    return points, np.full(len(angles), width * length / 2)
+
+
+@lru_cache(maxsize=64)
+def junction_template(junction_type, main_width, side_width, vehicle='Single Unit Truck', design_speed=60,
+                      arm_length=50.0, samples=16):
+    """Geometry of one junction in its local frame, cached by parameter signature
+
+    The main road runs along the x axis through the origin; minor arms
+    leave at right angles (to the left for a T). Returns a dict of read-only
+    arrays: 'kerbs' (kerb return polylines), 'splitters' (closed island
+    triangles), 'central_island' and 'inscribed' circles (roundabouts),
+    'arm_edges' (minor-arm kerb lines, two per arm, out to arm_length) and
+    the scalar radii, areas (m²) and kerb length (m).
+    """
+    if junction_type not in ARM_ANGLES:
+        raise ValueError(f"Unknown junction type {junction_type!r}; use one of {', '.join(JUNCTION_TYPES)}")
+    angles = np.array(ARM_ANGLES[junction_type])
+    minor = np.abs(np.sin(angles)) > 0.5
+    half = np.where(minor, side_width / 2, main_width / 2)
+    speed = turning_speed(design_speed)
+    empty = np.zeros((0, 2))
+
+    if junction_type == "Roundabout":
+        spec = DESIGN_VEHICLES[vehicle]
+        central = island_radius(design_speed)
+        inscribed = central + spec['circulating_width']
+        radius = spec['entry_radius']
+        kerbs, return_area, return_length, mouth, mouth_right = _entry_returns(angles, half, radius, inscribed,
+                                                                               samples)
+        splitter_start = np.full(len(angles), inscribed)
+        circle = np.linspace(0, 2 * np.pi, 73)
+        unit_circle = np.column_stack((np.cos(circle), np.sin(circle)))
+        central_island, inscribed_circle = central * unit_circle, inscribed * unit_circle
+        paved = math.pi * (inscribed ** 2 - central ** 2) + return_area.sum()
+        island = math.pi * central ** 2
+        kerb = 2 * math.pi * (central + inscribed) + return_length.sum()
+        arms = np.ones(len(angles), dtype=bool)
+    else:
+        central = inscribed = 0.0
+        radius = corner_radius(vehicle, speed)
+        kerbs, return_area, return_length, mouth, mouth_right = _corner_returns(angles, half, radius, samples)
+        splitter_start = main_width / 2 + np.full(len(angles), 1.5)
+        central_island = inscribed_circle = empty
+        paved = return_area.sum()
+        island = 0.0
+        kerb = return_length.sum()
+        arms = minor
+
+    splitter_length = max(SPLITTER_MIN_LENGTH, design_speed / 2)
+    width = min(SPLITTER_WIDTH, float(side_width) / 2)
+    splitters, splitter_area = _splitters(angles[arms], splitter_start[arms], splitter_length, width)
+    splitter_kerb = (2 * math.hypot(splitter_length, width / 2) + width) * len(splitters)
+
+    # Kerb lines of the minor arms from the end of each return out to arm_length
+    u = np.column_stack((np.cos(angles), np.sin(angles)))
+    n = np.column_stack((-u[:, 1], u[:, 0]))
+    edges = []
+    for k in np.flatnonzero(minor):
+        for offset, along in ((half[k], mouth[k]), (-half[k], mouth_right[k])):
+            edges.append((offset * n[k] + along * u[k], offset * n[k] + max(arm_length, along) * u[k]))
+    arm_edges = np.array(edges).reshape(-1, 2, 2)
+
+    template = {
+        'type': junction_type,
+        'kerbs': kerbs,
+        'splitters': splitters,
+        'central_island': central_island,
+        'inscribed': inscribed_circle,
+        'arm_edges': arm_edges,
+        'corner_radius': float(radius),
+        'island_radius': float(central),
+        'inscribed_radius': float(inscribed),
+        'paved_area': float(paved),
+        'island_area': float(island + splitter_area.sum()),
+        'kerb_length': float(kerb + splitter_kerb),
+    }
+    for value in template.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False  # shared by every caller of the cache
+    return template
+
+
+def place(points, x, y, heading):
+    """Local points (..., 2) placed at every junction: (junctions, ..., 2)"""
+    cos = np.cos(heading).reshape((-1,) + (1,) * (points.ndim - 1))
+    sin = np.sin(heading).reshape(cos.shape)
+    px, py = points[..., 0], points[..., 1]
+    return np.stack((np.reshape(x, cos.shape) + px * cos - py * sin,
+                     np.reshape(y, cos.shape) + px * sin + py * cos), axis=-1)
+
+
+@traced("junctions.corridor")
+def corridor_junctions(corridor, chainages, junction_type, main_width, side_width=None,
+                       vehicle='Single Unit Truck', design_speed=60, arm_length=50.0):
+    """Geometry and quantities of every junction along a corridor in one pass
+
+    chainages: junction centres on the corridor centreline. Returns the
+    cached template, the placed polylines ((junctions, ...) arrays of the
+    template keys) and quantity totals over all junctions.
+    """
+    chainages = np.atleast_1d(np.asarray(chainages, dtype=float))
+    side_width = main_width if side_width is None else side_width
+    template = junction_template(junction_type, float(main_width), float(side_width), vehicle,
+                                 float(design_speed), float(arm_length))
+    at = corridor.query(chainages)
+    placed = {key: place(template[key], at['x'], at['y'], at['heading'])
+              for key in ('kerbs', 'splitters', 'central_island', 'inscribed', 'arm_edges')}
+    count = len(chainages)
+    placed.update({
+        'template': template,
+        'chainage': chainages,
+        'count': count,
+        'paved_area': template['paved_area'] * count,
+        'island_area': template['island_area'] * count,
+        'kerb_length': template['kerb_length'] * count,
+    })
+    return placed
+
+
+def junction_summary(junctions):
+    """Junction radii and quantities for pages and reports"""
+    template = junctions['template']
+    return {
+        'type': template['type'],
+        'count': junctions['count'],
+        'corner_radius': template['corner_radius'],
+        'island_radius': template['island_radius'],
+        'inscribed_radius': template['inscribed_radius'],
+        'paved_area': junctions['paved_area'],
+        'island_area': junctions['island_area'],
+        'kerb_length': junctions['kerb_length'],
+    }
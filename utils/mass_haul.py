@@ -0,0 +1,173 @@
+"""
+Mass-haul engine for RajLisp road earthwork
+
+Interval cut and fill volumes are turned into a cumulative mass ordinate
+(cut positive, in compacted fill-equivalent m³ after bulking and shrinkage).
+Balance points are the crossings of the ordinate with the balance line; each
+loop between two balance points is a balanced cut-to-fill haul, split into
+free haul and overhaul by the free-haul chord. Everything is vectorized over
+stations and loops so alternative grade lines can be compared instantly.
+"""
+import numpy as np
+
+from utils.tracing import traced
+
+
+def earthwork_factor(shrinkage=0.0, bulking=0.0):
+    """Compacted fill obtained from one m³ of cut
+
+    shrinkage: fraction lost when cut soil is compacted into embankment.
+    bulking: fraction gained when cut material (e.g. rock) swells in fill.
+    Either may be an array over intervals for changing materials.
+    """
+    return (1 + np.asarray(bulking, dtype=float)) * (1 - np.asarray(shrinkage, dtype=float))
+
+
+def mass_ordinates(cut_volume, fill_volume, shrinkage=0.0, bulking=0.0):
+    """Cumulative mass ordinate at each station from per-interval cut and fill volumes (starts at 0)"""
+    net = np.asarray(cut_volume, dtype=float) * earthwork_factor(shrinkage, bulking) - np.asarray(fill_volume, dtype=float)
+    return np.concatenate(([0.0], np.cumsum(net)))
+
+
+def balance_points(chainage, ordinate, balance=0.0):
+    """Chainages where the mass ordinate crosses (or touches) the balance line
+
+    Only points within the stretch count: the ordinate starts at 0, so the
+    first station (and a last one that ends on the line) are loop ends.
+    """
+    chainage = np.asarray(chainage, dtype=float)
+    v = np.asarray(ordinate, dtype=float) - balance
+    crossing = np.flatnonzero(v[:-1] * v[1:] < 0)
+    t = v[crossing] / (v[crossing] - v[crossing + 1])
+    crossed = chainage[crossing] + t * (chainage[crossing + 1] - chainage[crossing])
+    return np.sort(np.concatenate((crossed, chainage[1:-1][v[1:-1] == 0])))
+
+
+def _width_above(a1, a2, length, level):
+    """Length of each segment where the (linear) ordinate is at or above `level`"""
+    high, low = np.maximum(a1, a2), np.minimum(a1, a2)
+    fraction = np.divide(high - level, high - low, out=(low >= level).astype(float), where=high > low)
+    return length * np.clip(fraction, 0, 1)
+
+
+def _area_above(a1, a2, length, level):
+    """Area of each segment's ordinate above `level`"""
+    p1, p2 = a1 - level, a2 - level
+    same = (p1 >= 0) & (p2 >= 0)
+    span = np.abs(p1 - p2)
+    partial = np.divide(np.maximum(p1, p2) ** 2, 2 * span, out=np.zeros_like(span), where=span > 0)
+    return np.where(same, (p1 + p2) / 2, np.where((p1 > 0) | (p2 > 0), partial, 0.0)) * length
+
+
+@traced("mass_haul.compute")
+def compute_mass_haul(chainage, cut_volume, fill_volume, shrinkage=0.0, bulking=0.0,
+                      free_haul=100.0, balance=0.0, iterations=50):
+    """Mass-haul diagram, balance points and free-haul/overhaul for every loop
+
+    chainage: n stations; cut_volume, fill_volume: n - 1 interval volumes.
+    Loops are the stretches between consecutive balance points; positive
+    loops carry cut forward (increasing chainage), negative loops backward.
+    A loop is closed when the ordinate is on the balance line at both its
+    ends (at the start of the stretch too, where the ordinate starts at 0) -
+    the open ends of the diagram are left as waste (surplus) or borrow
+    (deficit). 'balance_chainage' lists the balance points within the
+    stretch only, as balance_points() does. The
+    free-haul chord of each closed loop is found by bisection on its height.
+    """
+    chainage = np.asarray(chainage, dtype=float)
+    ordinate = mass_ordinates(cut_volume, fill_volume, shrinkage, bulking)
+
+    # Diagram with the balance crossings inserted as vertices
+    v = ordinate - balance
+    crossing = np.flatnonzero(v[:-1] * v[1:] < 0)
+    t = v[crossing] / (v[crossing] - v[crossing + 1])
+    x = np.concatenate((chainage, chainage[crossing] + t * (chainage[crossing + 1] - chainage[crossing])))
+    order = np.argsort(x, kind='stable')
+    x = x[order]
+    a = np.concatenate((v, np.zeros(len(crossing))))[order]
+
+    # Loop number of every segment: balance points passed so far
+    zero = a == 0
+    loop = np.cumsum(zero)[:-1]
+    zeros = int(zero.sum())
+    length = np.diff(x)
+    a1, a2 = np.abs(a[:-1]), np.abs(a[1:])
+    loops = zeros + 1
+    sign = np.sign(np.bincount(loop, a[1:] + a[:-1], minlength=loops))
+
+    peak = np.zeros(loops)
+    np.maximum.at(peak, loop, np.maximum(a1, a2))
+    loop_start = np.full(loops, np.inf)
+    np.minimum.at(loop_start, loop, x[:-1])
+    loop_end = np.full(loops, -np.inf)
+    np.maximum.at(loop_end, loop, x[1:])
+    span = np.where(np.isfinite(loop_start), loop_end - loop_start, 0.0)
+    haul = np.bincount(loop, _area_above(a1, a2, length, 0.0), minlength=loops)
+
+    # Free-haul chord height: width of the loop above it equals the free-haul distance
+    low = np.zeros(loops)
+    high = np.where(span > free_haul, peak, 0.0)
+    for _ in range(iterations):
+        level = (low + high) / 2
+        width = np.bincount(loop, _width_above(a1, a2, length, level[loop]), minlength=loops)
+        wide = width > free_haul
+        low = np.where(wide, level, low)
+        high = np.where(wide, high, level)
+    chord = high
+
+    # Material below the chord travels further than the free haul
+    below = haul - np.bincount(loop, _area_above(a1, a2, length, chord[loop]), minlength=loops)
+    overhaul = np.maximum(below - chord * free_haul, 0.0)
+
+    # Ends of the free-haul chord, where the loop rises to and falls from its height
+    level = chord[loop]
+    rising = (a1 < level) & (a2 >= level)
+    falling = (a1 >= level) & (a2 < level)
+    cross = x[:-1] + np.divide(level - a1, a2 - a1, out=np.zeros_like(a1), where=a1 != a2) * length
+    chord_start = np.array(loop_end)
+    np.minimum.at(chord_start, loop[rising], cross[rising])
+    chord_end = np.array(loop_start)
+    np.maximum.at(chord_end, loop[falling], cross[falling])
+
+    used = peak > 0
+    closed = (np.arange(loops) >= 1) & (np.arange(loops) < zeros)
+    return {
+        'chainage': chainage,
+        'ordinate': ordinate,
+        'balance': balance,
+        'free_haul': free_haul,
+        'balance_chainage': x[zero][(x[zero] > x[0]) & (x[zero] < x[-1])],
+        'loop_start': loop_start[used],
+        'loop_end': loop_end[used],
+        'direction': np.where(sign[used] >= 0, 1, -1),  # +1 forward haul, -1 backward
+        'closed': closed[used],
+        'volume': peak[used],
+        'free_haul_volume': peak[used] - chord[used],
+        'overhaul_volume': chord[used],
+        'overhaul': overhaul[used],  # m³·m beyond the free haul
+        'haul': haul[used],  # total m³·m
+        'chord': chord[used],
+        'chord_start': chord_start[used],
+        'chord_end': chord_end[used],
+        'end_ordinate': float(v[-1]),
+    }
+
+
+def mass_haul_summary(haul):
+    """Totals of compute_mass_haul() over closed loops, plus waste/borrow at the ends"""
+    closed = haul['closed']
+    volume = haul['volume'][closed].sum()
+    # Open loops at either end are not balanced within the stretch
+    open_volume = haul['volume'][~closed]
+    return {
+        'balance_points': len(haul['balance_chainage']),
+        'loops': int(closed.sum()),
+        'balanced_volume': float(volume),
+        'free_haul_volume': float(haul['free_haul_volume'][closed].sum()),
+        'overhaul_volume': float(haul['overhaul_volume'][closed].sum()),
+        'overhaul': float(haul['overhaul'][closed].sum()),
+        'average_haul': float(haul['haul'][closed].sum() / volume) if volume > 0 else 0.0,
+        'waste': float(max(0.0, haul['end_ordinate'])),
+        'borrow': float(max(0.0, -haul['end_ordinate'])),
+        'unbalanced_volume': float(open_volume.sum()),
+    }
@@ -0,0 +1,180 @@
+"""
+Opt-in memory profiling for drawing generation
+
+While a profiling session is open, every tracing span on the same thread
+(calculation, ezdxf build, serialization, report) is wrapped in tracemalloc:
+its peak memory and top allocation sites are recorded and can be saved as
+JSON for offline comparison between versions.
+
+Enable per session from the sidebar, or for every run with
+RAJLISP_MEMORY_PROFILE=1. Profiles are saved to RAJLISP_PROFILE_DIR
+(default: ./profiles).
+
+Note: tracemalloc is process wide, so allocations made by other Streamlit
+sessions at the same time are included. Profile on a quiet server.
+"""
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from utils import tracing
+
+TOP_SITES = 10
+TRACE_FRAMES = int(os.environ.get('RAJLISP_TRACEMALLOC_FRAMES', '1'))
+PROFILE_DIR = os.environ.get('RAJLISP_PROFILE_DIR', os.path.join(os.getcwd(), 'profiles'))
+
+_local = threading.local()
+_start_lock = threading.Lock()
+_active_sessions = 0
+
+
+def enabled_by_default():
+    return os.environ.get('RAJLISP_MEMORY_PROFILE', '0') == '1'
+
+
+def _filters():
+    return (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracing.__file__),
+    )
+
+
+def _top_sites(before, after, limit=TOP_SITES):
+    """Largest allocation growth by source line between two snapshots"""
+    sites = []
+    for stat in after.compare_to(before, 'lineno')[:limit]:
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        sites.append({
+            'site': f"{os.path.relpath(frame.filename) if not frame.filename.startswith('<') else frame.filename}:{frame.lineno}",
+            'size_kb': stat.size_diff / 1024,
+            'count': stat.count_diff,
+        })
+    return sites
+
+
+class _SpanProfiler:
+    """Tracing listener attaching tracemalloc data to spans of the active session
+
+    tracemalloc has a single peak counter, reset at the start of every span.
+    Before resetting, the enclosing span's peak so far is stored on its frame
+    so nested spans do not hide the outer span's high-water mark.
+    """
+
+    def span_started(self, name):
+        session = getattr(_local, 'session', None)
+        if session is None:
+            return
+        # Snapshot first so its own memory is part of the starting level
+        snapshot = tracemalloc.take_snapshot().filter_traces(_filters())
+        current, peak = tracemalloc.get_traced_memory()
+        stack = session['_stack']
+        if stack:
+            stack[-1]['seen_peak'] = max(stack[-1]['seen_peak'], peak)
+        stack.append({'start_current': current, 'seen_peak': 0, 'snapshot': snapshot})
+        tracemalloc.reset_peak()
+
+    def span_finished(self, name, duration):
+        session = getattr(_local, 'session', None)
+        if session is None or not session['_stack']:
+            return
+        frame = session['_stack'].pop()
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, frame['seen_peak'])
+        after = tracemalloc.take_snapshot().filter_traces(_filters())
+
+        session['phases'].append({
+            'span': name,
+            'phase': name.rsplit('.', 1)[-1],
+            'duration_ms': duration * 1000,
+            'peak_kb': (peak - frame['start_current']) / 1024,
+            'retained_kb': (current - frame['start_current']) / 1024,
+            'top_sites': _top_sites(frame['snapshot'], after),
+        })
+        if session['_stack']:
+            session['_stack'][-1]['seen_peak'] = max(session['_stack'][-1]['seen_peak'], peak)
+
+
+_profiler = _SpanProfiler()
+tracing.add_listener(_profiler)
+
+
+@contextmanager
+def profile_session(label):
+    """Profile every span opened on this thread inside the block
+
+    Yields the session dict; its 'phases' list holds one record per span.
+    """
+    global _active_sessions
+    with _start_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        _active_sessions += 1
+
+    session = {
+        'label': label,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'phases': [],
+        '_stack': [],
+    }
+    _local.session = session
+    try:
+        yield session
+    finally:
+        _local.session = None
+        session['peak_kb'] = max([p['peak_kb'] for p in session['phases']] or [0.0])
+        del session['_stack']
+        with _start_lock:
+            _active_sessions -= 1
+            if _active_sessions == 0 and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+def save_profile(session, directory=None):
+    """Write a session to <directory>/<label>_<timestamp>.json and return the path"""
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    safe_label = re.sub(r'[^A-Za-z0-9_-]+', '_', session['label']).strip('_') or 'profile'
+    filename = f"{safe_label}_{session['timestamp'].replace(':', '').replace('-', '')}.json"
+    path = os.path.join(directory, filename)
+    with open(path, 'w') as f:
+        json.dump(session, f, indent=2)
+    return path
+
+
+def load_profile(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_profiles(old, new):
+    """Per-span peak memory change between two saved sessions"""
+    old_peaks = {p['span']: p['peak_kb'] for p in old['phases']}
+    rows = []
+    for phase in new['phases']:
+        before = old_peaks.get(phase['span'])
+        rows.append({
+            'span': phase['span'],
+            'old_peak_kb': before,
+            'new_peak_kb': phase['peak_kb'],
+            'change_kb': phase['peak_kb'] - before if before is not None else None,
+        })
+    return rows
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python -m utils.memory_profile OLD.json NEW.json")
+        sys.exit(2)
+    for row in compare_profiles(load_profile(sys.argv[1]), load_profile(sys.argv[2])):
+        old_peak = f"{row['old_peak_kb']:.0f}" if row['old_peak_kb'] is not None else '-'
+        change = f"{row['change_kb']:+.0f}" if row['change_kb'] is not None else 'new'
+        print(f"{row['span']:<45} {old_peak:>10} KB -> {row['new_peak_kb']:>10.0f} KB  ({change} KB)")
@@ -0,0 +1,145 @@
+"""
+Flexible pavement design for RajLisp road drawings (IRC:37)
+
+Design traffic in million standard axles (msa) from commercial vehicles per
+day, growth, design life, vehicle damage factor and lane distribution, and
+layer thicknesses for granular base and sub-base pavements read from the
+IRC:37 design catalogue. The catalogue is held as precomputed grids over
+traffic and subgrade CBR and interpolated bilinearly (log traffic), so any
+number of road segments with their own traffic and CBR are designed in one
+vectorized call.
+
+Layers: surface (BC / premix carpet), binder (DBM / BM), base (WMM / WBM)
+and subbase (GSB), thicknesses in mm.
+"""
+import numpy as np
+
+from utils.tracing import traced
+
+# Lane distribution factor by carriageway (share of commercial traffic in the design lane)
+LANE_DISTRIBUTION = {
+    'Single Lane': 1.0,
+    'Intermediate Lane': 0.75,
+    'Two Lane': 0.5,
+    'Four Lane Undivided': 0.4,
+    'Four Lane Divided': 0.75,
+    'Six Lane Divided': 0.6,
+}
+
+# Indicative vehicle damage factor by initial CVPD (upper limit) - plain/rolling, hilly
+VDF = [(150, 1.7, 0.6), (1500, 3.9, 1.7), (np.inf, 5.0, 2.8)]
+
+# Catalogue grid: design traffic (msa) and subgrade CBR (%)
+CATALOGUE_MSA = np.array([0.1, 0.3, 0.5, 1, 2, 3, 5, 10, 20, 30, 50, 100, 150])
+CATALOGUE_CBR = np.array([2, 3, 4, 5, 6, 7, 8, 9, 10])
+
+# Bituminous and base layers depend on traffic only
+SURFACE = np.array([20, 20, 20, 20, 20, 20, 25, 40, 40, 40, 40, 50, 50])
+BINDER = np.array([0, 0, 0, 0, 50, 60, 60, 70, 100, 120, 140, 150, 160])
+BASE = np.array([150, 175, 200, 225, 225, 250, 250, 250, 250, 250, 250, 250, 250])
+
+# Granular sub-base at 10 msa and above by CBR; lighter traffic takes a share of it
+_SUBBASE_HEAVY = np.array([460, 380, 330, 300, 260, 250, 200, 200, 200])
+_SUBBASE_SHARE = np.array([0.5, 0.6, 0.65, 0.7, 0.8, 0.85, 0.9, 1, 1, 1, 1, 1, 1])
+SUBBASE = np.maximum(np.ceil(_SUBBASE_HEAVY[:, None] * _SUBBASE_SHARE[None, :] / 10) * 10, 150)  # (cbr, msa)
+
+
+def vehicle_damage_factor(cvpd, terrain='Plain'):
+    """Indicative VDF for the initial commercial traffic (when axle load surveys are not available)"""
+    cvpd = np.asarray(cvpd, dtype=float)
+    hilly = np.isin(np.asarray(terrain), ['Hilly', 'Steep'])
+    limits = [limit for limit, _, _ in VDF]
+    band = np.searchsorted(limits, cvpd, side='left')
+    plain_vdf = np.array([v for _, v, _ in VDF])[band]
+    hilly_vdf = np.array([v for _, _, v in VDF])[band]
+    return np.where(hilly, hilly_vdf, plain_vdf)
+
+
+def cumulative_msa(cvpd, growth_rate=0.05, design_life=15, vdf=None, lane_distribution=0.5,
+                   years_to_opening=0, terrain='Plain'):
+    """Cumulative standard axles (msa) over the design life
+
+    N = 365 A [(1 + r)^n - 1] / r x D x F / 10^6 with A = P (1 + r)^x the
+    commercial vehicles per day at opening, r the growth rate (fraction),
+    n the design life, D the lane distribution and F the VDF (indicative
+    values by traffic and terrain when not given). All arguments may be
+    arrays over road segments.
+    """
+    cvpd = np.asarray(cvpd, dtype=float)
+    r = np.asarray(growth_rate, dtype=float)
+    n = np.asarray(design_life, dtype=float)
+    opening = cvpd * (1 + r) ** np.asarray(years_to_opening, dtype=float)
+    if vdf is None:
+        vdf = vehicle_damage_factor(cvpd, terrain)
+    # Growth series, with its limit n as r -> 0
+    growth = np.where(r > 0, ((1 + r) ** n - 1) / np.where(r > 0, r, 1), n)
+    return 365 * opening * growth * lane_distribution * np.asarray(vdf, dtype=float) / 1e6
+
+
+def subgrade_modulus(cbr):
+    """Resilient modulus (MPa) of the subgrade from its CBR (%)"""
+    cbr = np.asarray(cbr, dtype=float)
+    return np.where(cbr <= 5, 10 * cbr, 17.6 * cbr ** 0.64)
+
+
+def _grid_position(grid, values):
+    """Cell index and weight of each value on an increasing grid (clamped to the ends)"""
+    values = np.clip(values, grid[0], grid[-1])
+    i = np.clip(np.searchsorted(grid, values, side='right') - 1, 0, len(grid) - 2)
+    return i, (values - grid[i]) / (grid[i + 1] - grid[i])
+
+
+@traced("pavement.design")
+def design_thickness(msa, cbr, round_to=5):
+    """Layer thicknesses (mm) for arrays of design traffic (msa) and subgrade CBR (%)
+
+    Interpolated on the catalogue grids (log traffic, CBR) and rounded up to
+    `round_to` mm. Traffic and CBR outside the catalogue are clamped to it;
+    check `outside` for segments that need a specific design (subgrade
+    improvement below CBR 2 or traffic beyond 150 msa).
+    """
+    msa, cbr = np.broadcast_arrays(np.asarray(msa, dtype=float), np.asarray(cbr, dtype=float))
+    log_grid = np.log10(CATALOGUE_MSA)
+    t_i, t_w = _grid_position(log_grid, np.log10(np.maximum(msa, 1e-6)))
+    c_i, c_w = _grid_position(CATALOGUE_CBR.astype(float), cbr)
+
+    def along_traffic(table):
+        return table[t_i] * (1 - t_w) + table[t_i + 1] * t_w
+
+    subbase = ((SUBBASE[c_i, t_i] * (1 - t_w) + SUBBASE[c_i, t_i + 1] * t_w) * (1 - c_w) +
+               (SUBBASE[c_i + 1, t_i] * (1 - t_w) + SUBBASE[c_i + 1, t_i + 1] * t_w) * c_w)
+
+    def rounded(value):
+        return np.ceil(np.round(value, 6) / round_to) * round_to
+
+    layers = {
+        'surface': rounded(along_traffic(SURFACE)),
+        'binder': rounded(along_traffic(BINDER)),
+        'base': rounded(along_traffic(BASE)),
+        'subbase': rounded(subbase),
+    }
+    layers['total'] = layers['surface'] + layers['binder'] + layers['base'] + layers['subbase']
+    layers['outside'] = (cbr < CATALOGUE_CBR[0]) | (msa > CATALOGUE_MSA[-1])
+    return layers
+
+
+def pavement_design(cvpd, cbr, growth_rate=0.05, design_life=15, lanes='Two Lane', terrain='Plain',
+                    vdf=None, years_to_opening=0):
+    """Design traffic and layer thicknesses in one call (arrays over segments allowed)"""
+    msa = cumulative_msa(cvpd, growth_rate, design_life, vdf, LANE_DISTRIBUTION.get(lanes, 0.5),
+                         years_to_opening, terrain)
+    design = design_thickness(msa, cbr)
+    design['msa'] = msa
+    design['subgrade_modulus'] = subgrade_modulus(cbr)
+    return design
+
+
+def layer_names(msa):
+    """Usual layer descriptions for the traffic level"""
+    heavy = float(msa) >= 5
+    return {
+        'surface': 'Bituminous Concrete' if heavy else 'Premix Carpet / SDBC',
+        'binder': 'Dense Bituminous Macadam' if heavy else 'Bituminous Macadam',
+        'base': 'Wet Mix Macadam' if heavy else 'WBM / Wet Mix Macadam',
+        'subbase': 'Granular Sub-base',
+    }
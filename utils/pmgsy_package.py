@@ -0,0 +1,269 @@
+"""
+PMGSY package processing for RajLisp road drawings
+
+PMGSY works are tendered as packages of 20-100 roads. A package is read from
+a roads table (one road per line: name, length, category, traffic category,
+terrain, widths and layer thicknesses, optionally traffic and CBR for an
+IRC:37 design), the standards and quantities of every road are worked out as
+arrays over the package, and the quantities are consolidated into one bill
+of quantities with a summary report.
+"""
+import csv
+import io
+
+import numpy as np
+
+from utils.pavement import pavement_design
+from utils.tracing import traced
+
+# Carriageway width (m) by road category, also the minimum
+WIDTH_DEFAULTS = {
+    "Through Route": 5.5,
+    "Major Rural Link": 4.75,
+    "Minor Rural Link": 4.0,
+    "Village Road": 3.75,
+}
+
+# Layer thicknesses (mm) by traffic category
+PAVEMENT_STRUCTURES = {
+    "T1": {"surface": 20, "base": 100, "subbase": 150},
+    "T2": {"surface": 25, "base": 125, "subbase": 150},
+    "T3": {"surface": 30, "base": 150, "subbase": 200},
+    "T4": {"surface": 40, "base": 175, "subbase": 225},
+}
+
+TRAFFIC_LOADS = {"T1": "< 10 CVPD", "T2": "10-20 CVPD", "T3": "20-50 CVPD", "T4": "> 50 CVPD"}
+
+DESIGN_SPEEDS = {
+    "Plain": {"Through Route": 80, "Major Rural Link": 65, "Minor Rural Link": 50, "Village Road": 40},
+    "Rolling": {"Through Route": 65, "Major Rural Link": 50, "Minor Rural Link": 40, "Village Road": 35},
+    "Hilly": {"Through Route": 50, "Major Rural Link": 40, "Minor Rural Link": 30, "Village Road": 25},
+    "Steep": {"Through Route": 40, "Major Rural Link": 30, "Minor Rural Link": 25, "Village Road": 20},
+}
+
+GRADIENT_LIMITS = {"Plain": 4, "Rolling": 6, "Hilly": 8, "Steep": 10}
+
+# Construction progress (km/month) by terrain
+CONSTRUCTION_RATES = {"Plain": 2.0, "Rolling": 1.5, "Hilly": 1.0, "Steep": 0.8}
+
+SHOULDER_THICKNESS = 100  # mm, as drawn
+AVERAGE_FILL_HEIGHT = 0.5  # m, assumed where no survey is available
+
+# Table columns: name in the file (lower case) -> key; the first five are required
+ROAD_COLUMNS = {
+    'name': 'name', 'road': 'name',
+    'length': 'length', 'length_km': 'length',
+    'category': 'category', 'road_category': 'category',
+    'traffic': 'traffic', 'traffic_category': 'traffic',
+    'terrain': 'terrain',
+    'carriageway': 'carriageway', 'carriageway_width': 'carriageway',
+    'shoulder': 'shoulder', 'shoulder_width': 'shoulder',
+    'surface': 'surface', 'base': 'base', 'subbase': 'subbase',
+    'cvpd': 'cvpd', 'cbr': 'cbr',
+}
+REQUIRED_COLUMNS = ('name', 'length', 'category', 'traffic', 'terrain')
+
+# Bill of quantities items: key, description, unit
+BOQ_ITEMS = [
+    ('earthwork', "Earthwork in embankment (compacted)", "m³"),
+    ('subbase_volume', "Granular sub-base (GSB)", "m³"),
+    ('base_volume', "Water bound macadam Grade-II base", "m³"),
+    ('surface_area', "Prime coat on WBM", "m²"),
+    ('surface_volume', "Bituminous surfacing (SDBC / BC)", "m³"),
+    ('shoulder_volume', "Earthen / granular shoulders", "m³"),
+    ('drain_excavation', "Side drain excavation", "m³"),
+]
+
+
+def _number(value, row_no, column):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Roads table line {row_no}: {column} '{value}' is not a number")
+
+
+@traced("pmgsy_package.read")
+def read_roads_table(source, growth_rate=0.05, design_life=10):
+    """Roads of a package from a CSV table (path, text or binary stream)
+
+    Required columns: name, length (km), category, traffic (T1-T4), terrain.
+    Optional: carriageway, shoulder (m), surface, base, subbase (mm) - the
+    category and traffic defaults are used where blank - and cvpd, cbr, which
+    replace the layers by the IRC:37 catalogue design for that road.
+    Returns a dict of arrays over the roads.
+    """
+    if isinstance(source, str):
+        stream = open(source, 'r', encoding='utf-8-sig', newline='')
+    elif isinstance(source, io.TextIOBase):
+        stream = source
+    else:
+        stream = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(stream)
+        if reader.fieldnames is None:
+            raise ValueError("Roads table is empty")
+        columns = {field: ROAD_COLUMNS.get(field.strip().lower()) for field in reader.fieldnames}
+        missing = [key for key in REQUIRED_COLUMNS if key not in columns.values()]
+        if missing:
+            raise ValueError(f"Roads table has no column for: {', '.join(missing)}")
+        rows = []
+        for row_no, row in enumerate(reader, 2):
+            road = {columns[field]: (value or '').strip() for field, value in row.items()
+                    if field is not None and columns.get(field)}
+            if not any(road.values()):
+                continue
+            if road['category'] not in WIDTH_DEFAULTS:
+                raise ValueError(f"Roads table line {row_no}: unknown road category '{road['category']}'")
+            if road['traffic'] not in PAVEMENT_STRUCTURES:
+                raise ValueError(f"Roads table line {row_no}: unknown traffic category '{road['traffic']}'")
+            if road['terrain'] not in DESIGN_SPEEDS:
+                raise ValueError(f"Roads table line {row_no}: unknown terrain '{road['terrain']}'")
+            structure = PAVEMENT_STRUCTURES[road['traffic']]
+            defaults = {'carriageway': WIDTH_DEFAULTS[road['category']], 'shoulder': 1.0, **structure,
+                        'cvpd': np.nan, 'cbr': np.nan}
+            for key, default in defaults.items():
+                value = road.get(key, '')
+                road[key] = _number(value, row_no, key) if value else default
+            road['length'] = _number(road['length'], row_no, 'length')
+            if road['length'] <= 0:
+                raise ValueError(f"Roads table line {row_no}: length must be positive")
+            rows.append(road)
+    finally:
+        if isinstance(source, str):
+            stream.close()
+    if not rows:
+        raise ValueError("Roads table has no roads")
+
+    roads = {key: np.array([row[key] for row in rows]) for key in rows[0]}
+    for key in ('length', 'carriageway', 'shoulder', 'surface', 'base', 'subbase', 'cvpd', 'cbr'):
+        roads[key] = roads[key].astype(float)
+
+    # IRC:37 design for the roads with traffic and CBR, all in one call
+    roads['designed'] = ~np.isnan(roads['cvpd']) & ~np.isnan(roads['cbr'])
+    roads['msa'] = np.full(len(rows), np.nan)
+    designed = roads['designed']
+    if designed.any():
+        lanes = np.where(roads['carriageway'][designed] < 5.5, 'Single Lane', 'Intermediate Lane')
+        for lane in np.unique(lanes):
+            index = np.flatnonzero(designed)[lanes == lane]
+            pavement = pavement_design(roads['cvpd'][index], roads['cbr'][index], growth_rate, design_life,
+                                       lane, roads['terrain'][index])
+            roads['surface'][index] = pavement['surface'] + pavement['binder']
+            roads['base'][index] = pavement['base']
+            roads['subbase'][index] = pavement['subbase']
+            roads['msa'][index] = pavement['msa']
+    return roads
+
+
+@traced("pmgsy_package.quantities")
+def package_quantities(roads, side_drains=True, drain_depth=450, drain_width=450,
+                       fill_height=AVERAGE_FILL_HEIGHT):
+    """Standards and quantities of every road (arrays over the package)
+
+    Volumes are for the full road length; earthwork assumes an average
+    embankment height `fill_height` over the formation width.
+    """
+    length_m = roads['length'] * 1000
+    carriageway = roads['carriageway']
+    formation_width = carriageway + 2 * roads['shoulder']
+    pavement_area = carriageway * length_m
+    min_width = np.array([WIDTH_DEFAULTS[category] for category in roads['category']])
+    return {
+        'formation_width': formation_width,
+        'total_pavement': roads['surface'] + roads['base'] + roads['subbase'],
+        'design_speed': np.array([DESIGN_SPEEDS[t][c] for t, c in zip(roads['terrain'], roads['category'])]),
+        'max_gradient': np.array([GRADIENT_LIMITS[t] for t in roads['terrain']]),
+        'width_compliant': carriageway >= min_width,
+        'construction_months': roads['length'] / np.array([CONSTRUCTION_RATES[t] for t in roads['terrain']]),
+        'surface_area': pavement_area,
+        'surface_volume': pavement_area * roads['surface'] / 1000,
+        'base_volume': pavement_area * roads['base'] / 1000,
+        'subbase_volume': pavement_area * roads['subbase'] / 1000,
+        'shoulder_volume': 2 * roads['shoulder'] * length_m * SHOULDER_THICKNESS / 1000,
+        'earthwork': formation_width * length_m * fill_height,
+        'drain_excavation': (2 * drain_width * drain_depth / 1e6 * length_m if side_drains
+                             else np.zeros(len(length_m))),
+    }
+
+
+def package_boq(quantities):
+    """Consolidated bill of quantities as a table (dict of columns)"""
+    return {
+        "Item": [str(i) for i in range(1, len(BOQ_ITEMS) + 1)],
+        "Description": [description for _, description, _ in BOQ_ITEMS],
+        "Unit": [unit for _, _, unit in BOQ_ITEMS],
+        "Quantity": [f"{quantities[key].sum():,.0f}" for key, _, _ in BOQ_ITEMS],
+    }
+
+
+def package_boq_csv(roads, quantities):
+    """Road-wise bill of quantities with a package total line, as CSV text"""
+    header = ["road", "length_km", "category", "traffic", "terrain", "carriageway_m", "surface_mm", "base_mm",
+              "subbase_mm"] + [f"{key}_{'m2' if unit == 'm²' else 'm3'}" for key, _, unit in BOQ_ITEMS]
+    lines = [",".join(header)]
+    for i, name in enumerate(roads['name']):
+        values = [name, f"{roads['length'][i]:.3f}", roads['category'][i], roads['traffic'][i], roads['terrain'][i],
+                  f"{roads['carriageway'][i]:.2f}", f"{roads['surface'][i]:.0f}", f"{roads['base'][i]:.0f}",
+                  f"{roads['subbase'][i]:.0f}"]
+        lines.append(",".join(values + [f"{quantities[key][i]:.2f}" for key, _, _ in BOQ_ITEMS]))
+    total = ["PACKAGE TOTAL", f"{roads['length'].sum():.3f}"] + [""] * 7
+    lines.append(",".join(total + [f"{quantities[key].sum():.2f}" for key, _, _ in BOQ_ITEMS]))
+    return "\n".join(lines) + "\n"
+
+
+def package_summary(roads, quantities):
+    """Package totals for display and the report"""
+    return {
+        'roads': len(roads['name']),
+        'length': float(roads['length'].sum()),
+        'by_category': {category: float(roads['length'][roads['category'] == category].sum())
+                        for category in WIDTH_DEFAULTS if (roads['category'] == category).any()},
+        'designed': int(roads['designed'].sum()),
+        'non_compliant': [str(name) for name in roads['name'][~quantities['width_compliant']]],
+        'construction_months': float(quantities['construction_months'].sum()),
+    }
+
+
+@traced("pmgsy_package.report")
+def generate_package_report(package_name, roads, quantities):
+    """Summary report of a PMGSY package with the consolidated bill of quantities"""
+    summary = package_summary(roads, quantities)
+    road_lines = "\n".join(
+        f"- {roads['name'][i]}: {roads['length'][i]:.2f} km, {roads['category'][i]}, {roads['traffic'][i]}, "
+        f"{roads['terrain'][i]}, {roads['carriageway'][i]:.2f} m carriageway, "
+        f"{roads['surface'][i]:.0f}/{roads['base'][i]:.0f}/{roads['subbase'][i]:.0f} mm"
+        f"{'' if quantities['width_compliant'][i] else ' (WIDTH BELOW PMGSY MINIMUM)'}"
+        for i in range(summary['roads'])
+    )
+    category_lines = "\n".join(f"- {category}: {length:.2f} km" for category, length in summary['by_category'].items())
+    boq_lines = "\n".join(f"{i}. {description}: {quantities[key].sum():,.0f} {unit}"
+                          for i, (key, description, unit) in enumerate(BOQ_ITEMS, 1))
+
+    report = f"""
+PMGSY PACKAGE DESIGN REPORT
+===========================
+
+PACKAGE: {package_name}
+- Number of Roads: {summary['roads']}
+- Total Length: {summary['length']:.2f} km
+- Layers designed by IRC:37 from traffic: {summary['designed']} road(s)
+- Construction effort: ~{summary['construction_months']:.1f} road-months
+
+LENGTH BY CATEGORY:
+{category_lines}
+
+ROADS (surface/base/sub-base):
+{road_lines}
+
+CONSOLIDATED BILL OF QUANTITIES:
+{boq_lines}
+
+NOTES:
+- Earthwork assumes an average embankment height of {AVERAGE_FILL_HEIGHT} m
+- Pavement volumes over the carriageway width; shoulders {SHOULDER_THICKNESS} mm thick
+- Standards: PMGSY Technical Specifications, IRC:SP:20, IRC:37
+
+Generated by RajLisp Structural Design Suite
+Standards: PMGSY & IRC (Indian Roads Congress)
+"""
+    return report
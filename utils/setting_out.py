@@ -0,0 +1,197 @@
+"""
+Curve setting-out tables for RajLisp road plans
+
+Every horizontal curve of an alignment (a run of transitions and circular
+arcs between tangents) is set out from its tangent point: pegs at whole
+multiples of the chord interval, with a first and last sub-chord, each
+fixed by its deflection angle from the back tangent and chord (Rankine's
+method) or by its distance along and offset from the tangent. Pegs of all
+curves are evaluated together on the alignment, so transitions are exact
+and the tables for a whole road come from one vectorized call.
+
+Angles in radians (formatted as degrees, minutes and seconds for the
+tables), distances in metres, offsets positive to the left.
+"""
+import math
+
+import numpy as np
+from ezdxf.enums import TextEntityAlignment
+
+from utils.alignment import LINE, ARC, evaluate, format_chainage
+from utils.tracing import traced
+
+# Table columns: key, heading, column width in text heights
+COLUMNS = [
+    ('peg', "PEG", 4),
+    ('chainage', "CHAINAGE", 9),
+    ('chord', "CHORD (m)", 7),
+    ('deflection', "DEFLECTION", 9),
+    ('long_chord', "LONG CHORD (m)", 9),
+    ('tangent_distance', "ALONG TANGENT (m)", 10),
+    ('tangent_offset', "OFFSET (m)", 7),
+]
+
+
+def dms(angle):
+    """Angle in radians as degrees, minutes and seconds, e.g. 12°34'56\""""
+    seconds = round(abs(math.degrees(angle)) * 3600)
+    degrees, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{'-' if angle < 0 else ''}{degrees}°{minutes:02d}'{seconds:02d}\""
+
+
+def curve_ranges(alignment):
+    """First and last element index of every curve (run of non-tangent elements)"""
+    curved = np.concatenate(([False], alignment['type'] != LINE, [False])).astype(np.int8)
+    change = np.diff(curved)
+    return np.flatnonzero(change == 1), np.flatnonzero(change == -1) - 1
+
+
+@traced("setting_out.tables")
+def setting_out_tables(alignment, chord_interval=10.0):
+    """Setting-out pegs of all curves and a summary of each curve
+
+    Returns (pegs, curves): pegs is a dict of arrays over all pegs, in
+    chainage order, with the curve number (from 1), peg number within the
+    curve, chainage, chord from the previous peg, deflection angle from the
+    back tangent at the start, long chord from the start and distance along
+    and offset from the back tangent. curves holds per curve the start and
+    end chainage, length, hand, least radius, total deflection, tangent
+    length and the position of the intersection point (PI).
+    """
+    first, last = curve_ranges(alignment)
+    start = alignment['chainage'][first]
+    end = alignment['chainage'][last] + alignment['length'][last]
+
+    # Whole-interval pegs inside each curve plus its two ends
+    k_first = np.floor(start / chord_interval + 1e-9).astype(np.int64) + 1
+    k_last = np.ceil(end / chord_interval - 1e-9).astype(np.int64) - 1
+    inner = np.maximum(k_last - k_first + 1, 0)
+    counts = inner + 2
+    curve = np.repeat(np.arange(len(first)), counts)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    peg = np.arange(len(curve)) - offsets[curve]
+    chainage = np.where(peg == 0, start[curve],
+                        np.where(peg == counts[curve] - 1, end[curve], (k_first[curve] + peg - 1) * chord_interval))
+
+    x, y, _ = evaluate(alignment, chainage)
+    x0, y0, h0 = alignment['x'][first], alignment['y'][first], alignment['heading'][first]
+    dx, dy = x - x0[curve], y - y0[curve]
+    cos, sin = np.cos(h0[curve]), np.sin(h0[curve])
+    along = dx * cos + dy * sin
+    offset = -dx * sin + dy * cos
+    step = np.hypot(np.diff(x, prepend=x[:1]), np.diff(y, prepend=y[:1]))
+    pegs = {
+        'curve': curve + 1,
+        'peg': peg,
+        'chainage': chainage,
+        'chord': np.where(peg == 0, 0.0, step),
+        'deflection': np.arctan2(offset, along),
+        'long_chord': np.hypot(dx, dy),
+        'tangent_distance': along,
+        'tangent_offset': offset,
+    }
+
+    # Intersection of the back and forward tangents
+    xe, ye, he = evaluate(alignment, end - 1e-9)
+    total = (he - h0 + np.pi) % (2 * np.pi) - np.pi
+    sin_total = np.where(np.abs(np.sin(total)) > 1e-12, np.sin(total), np.nan)
+    ex, ey = xe - x0, ye - y0
+    tangent = (ex * np.sin(he) - ey * np.cos(he)) / sin_total
+    # Sharpest arc of each curve (segments run to the next curve; tangents add nothing)
+    arc_k = np.where(alignment['type'] == ARC, np.abs(alignment['k_start']), 0.0)
+    sharpest = np.maximum.reduceat(arc_k, first) if len(first) else np.zeros(0)
+    curves = {
+        'start': start,
+        'end': end,
+        'length': end - start,
+        'hand': np.where(total > 0, 'Left', 'Right'),
+        'radius': np.divide(1, sharpest, out=np.full(len(first), np.nan), where=sharpest > 0),
+        'deflection': np.abs(total),
+        'tangent_length': np.abs(tangent),
+        'pi_x': x0 + tangent * np.cos(h0),
+        'pi_y': y0 + tangent * np.sin(h0),
+    }
+    return pegs, curves
+
+
+def _dxf_dms(angle):
+    """dms() with the degree sign as the DXF %%d control code"""
+    return dms(angle).replace("°", "%%d")
+
+
+def _peg_values(pegs, i):
+    """Formatted DXF table values of peg i"""
+    return {
+        'peg': f"{pegs['peg'][i]}",
+        'chainage': format_chainage(pegs['chainage'][i]),
+        'chord': f"{pegs['chord'][i]:.3f}",
+        'deflection': _dxf_dms(pegs['deflection'][i]),
+        'long_chord': f"{pegs['long_chord'][i]:.3f}",
+        'tangent_distance': f"{pegs['tangent_distance'][i]:.3f}",
+        'tangent_offset': f"{pegs['tangent_offset'][i]:.3f}",
+    }
+
+
+def setting_out_csv(pegs):
+    """Setting-out pegs of all curves as CSV text"""
+    lines = ["curve,peg,chainage,chord_m,deflection_deg,deflection_dms,long_chord_m,along_tangent_m,offset_m"]
+    for i in range(len(pegs['chainage'])):
+        angle = dms(pegs['deflection'][i]).replace('"', '""')  # quoted CSV field
+        lines.append(f"{pegs['curve'][i]},{pegs['peg'][i]},{pegs['chainage'][i]:.3f},{pegs['chord'][i]:.3f},"
+                     f"{math.degrees(pegs['deflection'][i]):.6f},\"{angle}\",{pegs['long_chord'][i]:.3f},"
+                     f"{pegs['tangent_distance'][i]:.3f},{pegs['tangent_offset'][i]:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def curve_table(curves):
+    """Curve summary as a table (dict of columns) for pages"""
+    return {
+        "Curve": [f"C{i + 1}" for i in range(len(curves['start']))],
+        "From": [format_chainage(value) for value in curves['start']],
+        "To": [format_chainage(value) for value in curves['end']],
+        "Length (m)": [f"{value:.2f}" for value in curves['length']],
+        "Hand": [str(hand) for hand in curves['hand']],
+        "Radius (m)": [f"{value:.0f}" if np.isfinite(value) else "-" for value in curves['radius']],
+        "Deflection": [dms(value) for value in curves['deflection']],
+        "Tangent (m)": [f"{value:.2f}" for value in curves['tangent_length']],
+    }
+
+
+def add_setting_out_tables(msp, pegs, curves, x, y, text_height=2.5, gap=None, dxfattribs=None):
+    """Draw one setting-out table per curve side by side from top-left (x, y)
+
+    Tables are ruled with lines and filled with TEXT so any CAD version
+    reads them. Returns the lowest y used.
+    """
+    attribs = dict(dxfattribs or {})
+    text_attribs = {**attribs, 'style': 'STANDARD'}
+    row_height = 2 * text_height
+    widths = np.array([width for _, _, width in COLUMNS]) * text_height
+    edges = np.concatenate(([0], np.cumsum(widths)))
+    gap = 3 * text_height if gap is None else gap
+    lowest = y
+    for c in range(len(curves['start'])):
+        rows = np.flatnonzero(pegs['curve'] == c + 1)
+        left = x + c * (edges[-1] + gap)
+        title = (f"CURVE C{c + 1}: {curves['hand'][c].upper()} HAND, "
+                 f"R = {curves['radius'][c]:.0f} m, DEFLECTION {_dxf_dms(curves['deflection'][c])}, "
+                 f"T = {curves['tangent_length'][c]:.2f} m")
+        msp.add_text(title, height=text_height, dxfattribs=text_attribs).set_placement(
+            (left, y + text_height / 2), align=TextEntityAlignment.BOTTOM_LEFT)
+        bottom = y - (len(rows) + 1) * row_height
+        for i in range(len(rows) + 2):
+            msp.add_line((left, y - i * row_height), (left + edges[-1], y - i * row_height), dxfattribs=attribs)
+        for edge in edges:
+            msp.add_line((left + edge, y), (left + edge, bottom), dxfattribs=attribs)
+        centres = left + (edges[:-1] + edges[1:]) / 2
+        for j, (_, heading, _) in enumerate(COLUMNS):
+            msp.add_text(heading, height=text_height * 0.8, dxfattribs=text_attribs).set_placement(
+                (centres[j], y - row_height / 2), align=TextEntityAlignment.MIDDLE_CENTER)
+        for r, i in enumerate(rows, 1):
+            values = _peg_values(pegs, i)
+            for j, (key, _, _) in enumerate(COLUMNS):
+                msp.add_text(values[key], height=text_height * 0.8, dxfattribs=text_attribs).set_placement(
+                    (centres[j], y - (r + 0.5) * row_height), align=TextEntityAlignment.MIDDLE_CENTER)
+        lowest = min(lowest, bottom)
+    return lowest
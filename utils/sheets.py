@@ -0,0 +1,250 @@
+"""
+Plan-and-profile sheet tiling for RajLisp road drawings
+
+A long corridor is split into fixed-length sheet windows (with overlap into
+the neighbouring sheets). Each sheet carries the plan, rotated so the window
+runs left to right, the design and ground profile over a per-sheet datum,
+a level band, match lines at the window ends and a title block, all in paper
+millimetres on an A1 sheet. A sheet whose levels do not fit the profile panel
+at the requested vertical scale is drawn at the next standard scale that
+fits. Sheet data is prepared with vectorized corridor queries in the calling
+process; the DXF documents are then drawn (in worker processes for long
+roads on several cores) and bundled into one zip, one DXF per sheet, as
+drawings are issued.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import ezdxf
+import numpy as np
+from ezdxf.enums import TextEntityAlignment
+
+from utils.dxf_utils import create_dxf_header, chainage_labels, dxf_to_bytes, dxf_zip
+from utils.tracing import traced
+
+SHEET_WIDTH = 841  # A1 landscape, mm
+SHEET_HEIGHT = 594
+MARGIN = 20
+TITLE_WIDTH = 170
+
+# Panels on the sheet (paper mm): plan on top, profile and level band below
+PLAN_CENTRE_Y = 460
+PROFILE_BOTTOM = 110
+PROFILE_TOP = 320
+BAND_ROWS = ('CHAINAGE', 'DESIGN LEVEL', 'GROUND LEVEL')
+BAND_ROW_HEIGHT = 25
+VERTICAL_SCALES = (100, 200, 250, 500, 1000, 2000, 5000)
+
+PLAN_LAYER = 'PLAN_{}'  # one layer per plan line, e.g. PLAN_LEFT_EDGE
+PROFILE_LAYERS = {'PROFILE_DESIGN': 2, 'PROFILE_GROUND': 3}
+
+PARALLEL_SHEETS = 32  # fewer sheets draw faster in this process (~15 ms each) than a process pool starts
+
+
+def sheet_windows(start, end, sheet_length=500.0, overlap=20.0):
+    """(start, end) chainages of each sheet; the drawn range extends `overlap` beyond both ends"""
+    count = max(1, int(np.ceil((end - start) / sheet_length - 1e-9)))
+    edges = np.minimum(start + sheet_length * np.arange(count + 1), end)
+    return np.column_stack((edges[:-1], edges[1:]))
+
+
+def drawing_width(sheet_length, overlap, horizontal_scale):
+    """Paper width (mm) taken by one sheet window with its overlaps"""
+    return (sheet_length + 2 * overlap) * 1000 / horizontal_scale
+
+
+def fitting_vertical_scale(rise, preferred=100):
+    """The preferred vertical scale, or the next standard one, that keeps `rise` m inside the profile panel"""
+    room = PROFILE_TOP - PROFILE_BOTTOM
+    for scale in (preferred,) + tuple(scale for scale in VERTICAL_SCALES if scale > preferred):
+        if rise * 1000 / scale <= room:
+            return scale
+    return int(np.ceil(rise * 1000 / room / 1000) * 1000)
+
+
+def plan_layer(name):
+    """Layer of a named plan line: 'Left Edge' -> PLAN_LEFT_EDGE"""
+    return PLAN_LAYER.format('_'.join(name.upper().split()))
+
+
+@traced("sheets.tile")
+def tile_sheets(corridor, offsets, sheet_length=500.0, overlap=20.0, horizontal_scale=1000,
+                vertical_scale=100, ground=None, label_interval=100, label_format='Metres (1200m)',
+                title="ROAD PLAN AND PROFILE", step=5.0):
+    """Per-sheet drawing data (plain arrays, paper mm) for draw_sheet()
+
+    corridor: utils.corridor.Corridor with the design profile.
+    offsets: {name: (offset m, colour)} plan lines, e.g. edges and shoulders,
+    each drawn on its own plan_layer().
+    ground: optional (chainage, level) survey arrays.
+    vertical_scale: preferred; see fitting_vertical_scale().
+    Raises ValueError when a window does not fit the sheet at the scale.
+    """
+    width = drawing_width(sheet_length, overlap, horizontal_scale)
+    if width > SHEET_WIDTH - 2 * MARGIN - TITLE_WIDTH:
+        raise ValueError(f"A {sheet_length:.0f} m sheet with {overlap:.0f} m overlap needs {width:.0f} mm "
+                         f"at 1:{horizontal_scale}; reduce the sheet length or the scale")
+    h = 1000 / horizontal_scale  # paper mm per metre
+    left = MARGIN + (SHEET_WIDTH - 2 * MARGIN - TITLE_WIDTH - width) / 2
+
+    windows = sheet_windows(corridor.start_chainage, corridor.end_chainage, sheet_length, overlap)
+    names = list(offsets)
+    offset_values = np.array([offsets[name][0] for name in names], dtype=float)
+    sheets = []
+    for number, (s0, s1) in enumerate(windows, 1):
+        d0 = max(s0 - overlap, corridor.start_chainage)
+        d1 = min(s1 + overlap, corridor.end_chainage)
+        stations = np.unique(np.concatenate((np.arange(d0, d1, step), [d0, s0, s1, d1])))
+
+        # Plan rotated about the sheet start so the window chord runs along x
+        plan = corridor.query(stations[:, None], offset_values)
+        ends = corridor.query(np.array([s0, s1]))
+        angle = np.arctan2(ends['y'][1] - ends['y'][0], ends['x'][1] - ends['x'][0]) if s1 > s0 else 0.0
+        cos, sin = np.cos(-angle), np.sin(-angle)
+        dx, dy = plan['x'] - ends['x'][0], plan['y'] - ends['y'][0]
+        plan_x = left + overlap * h + (dx * cos - dy * sin) * h
+        plan_y = PLAN_CENTRE_Y + (dx * sin + dy * cos) * h
+
+        # Profile over a per-sheet datum (whole metres below the lowest level), scaled to fit the panel
+        design = plan['centre_level'][:, 0]
+        levels = [design]
+        ground_xy = None
+        if ground is not None:
+            within = (ground[0] >= d0) & (ground[0] <= d1)
+            ground_xy = (ground[0][within], ground[1][within])
+            levels.append(ground_xy[1])
+        low = min(level.min() for level in levels if len(level))
+        high = max(level.max() for level in levels if len(level))
+        datum = np.floor(low) - 1
+        sheet_vertical_scale = fitting_vertical_scale(high - datum, vertical_scale)
+        v = 1000 / sheet_vertical_scale
+
+        def to_x(chainage):
+            return left + (np.asarray(chainage) - (s0 - overlap)) * h
+
+        def to_y(level):
+            return PROFILE_BOTTOM + (np.asarray(level) - datum) * v
+
+        labels = np.arange(np.ceil(d0 / label_interval) * label_interval, d1 + 1e-6, label_interval)
+        label_design = corridor.centre_level(labels)[0]
+        label_ground = np.interp(labels, *ground_xy) if ground_xy is not None and len(ground_xy[0]) > 1 else None
+
+        sheets.append({
+            'name': f"SHEET_{number:03d}",
+            'number': number,
+            'count': len(windows),
+            'title': title,
+            'start': float(s0),
+            'end': float(s1),
+            'left': left,
+            'width': width,
+            'plan': [(name, np.column_stack((plan_x[:, i], plan_y[:, i])), offsets[name][1])
+                     for i, name in enumerate(names)],
+            'design': np.column_stack((to_x(stations), to_y(design))),
+            'ground': None if ground_xy is None else np.column_stack((to_x(ground_xy[0]), to_y(ground_xy[1]))),
+            'datum': float(datum),
+            'match': [float(to_x(s0)), float(to_x(s1))],
+            'label_x': to_x(labels),
+            'labels': chainage_labels(labels, label_format),
+            'label_design': label_design,
+            'label_ground': label_ground,
+            'horizontal_scale': horizontal_scale,
+            'vertical_scale': sheet_vertical_scale,
+        })
+    return sheets
+
+
+def _text(msp, text, position, height, align=TextEntityAlignment.MIDDLE_CENTER, rotation=0):
+    msp.add_text(text, height=height, rotation=rotation,
+                 dxfattribs={'layer': 'TEXT', 'style': 'STANDARD'}).set_placement(position, align=align)
+
+
+def draw_sheet(sheet):
+    """(name, DXF bytes) of one sheet from tile_sheets() - runs in a worker process for long roads"""
+    doc = ezdxf.new('R2010')
+    create_dxf_header(doc, sheet['title'])
+    layers = {plan_layer(name): colour for name, _, colour in sheet['plan']}
+    for name, colour in {**layers, **PROFILE_LAYERS}.items():
+        if name not in doc.layers:
+            doc.layers.add(name, color=colour)
+    msp = doc.modelspace()
+    outline = {'layer': 'OUTLINE'}
+
+    # Border and title block
+    right = SHEET_WIDTH - MARGIN
+    msp.add_lwpolyline([(MARGIN, MARGIN), (right, MARGIN), (right, SHEET_HEIGHT - MARGIN),
+                        (MARGIN, SHEET_HEIGHT - MARGIN)], close=True, dxfattribs=outline)
+    title_x = right - TITLE_WIDTH
+    msp.add_line((title_x, MARGIN), (title_x, SHEET_HEIGHT - MARGIN), dxfattribs=outline)
+    centre = title_x + TITLE_WIDTH / 2
+    rows = [(sheet['title'], 6), (f"SHEET {sheet['number']} OF {sheet['count']}", 5),
+            (f"FROM {sheet['start']:.1f} m TO {sheet['end']:.1f} m", 3.5),
+            (f"HORIZONTAL 1:{sheet['horizontal_scale']}", 3.5), (f"VERTICAL 1:{sheet['vertical_scale']}", 3.5),
+            (f"DATUM {sheet['datum']:.3f} m", 3.5), ("DRAWN BY: RajLisp", 3.5)]
+    for i, (text, height) in enumerate(rows):
+        y = MARGIN + 120 - i * 13
+        msp.add_line((title_x, y + 6.5), (right, y + 6.5), dxfattribs=outline)
+        _text(msp, text, (centre, y), height)
+
+    # Plan
+    for name, points, _ in sheet['plan']:
+        msp.add_lwpolyline(points, dxfattribs={'layer': plan_layer(name)})
+    _text(msp, "PLAN", (sheet['left'], SHEET_HEIGHT - MARGIN - 10), 5, TextEntityAlignment.MIDDLE_LEFT)
+
+    # Profile
+    msp.add_lwpolyline(sheet['design'], dxfattribs={'layer': 'PROFILE_DESIGN'})
+    if sheet['ground'] is not None and len(sheet['ground']) > 1:
+        msp.add_lwpolyline(sheet['ground'], dxfattribs={'layer': 'PROFILE_GROUND'})
+    x0, x1 = sheet['left'], sheet['left'] + sheet['width']
+    msp.add_line((x0, PROFILE_BOTTOM), (x1, PROFILE_BOTTOM), dxfattribs=outline)
+    _text(msp, f"DATUM {sheet['datum']:.3f}", (x0, PROFILE_BOTTOM + 3), 3, TextEntityAlignment.BOTTOM_LEFT)
+    _text(msp, "PROFILE", (x0, PROFILE_TOP + 10), 5, TextEntityAlignment.MIDDLE_LEFT)
+
+    # Level band under the profile
+    band_top = PROFILE_BOTTOM - 5
+    for i, row in enumerate(BAND_ROWS):
+        y = band_top - (i + 1) * BAND_ROW_HEIGHT
+        msp.add_line((x0, y), (x1, y), dxfattribs=outline)
+        _text(msp, row, (MARGIN + 3, y + BAND_ROW_HEIGHT / 2), 3, TextEntityAlignment.MIDDLE_LEFT)
+    for i, x in enumerate(sheet['label_x']):
+        msp.add_line((x, band_top - len(BAND_ROWS) * BAND_ROW_HEIGHT), (x, PROFILE_BOTTOM),
+                     dxfattribs={'layer': 'CONSTRUCTION', 'color': 8})
+        values = [sheet['labels'][i], f"{sheet['label_design'][i]:.3f}",
+                  f"{sheet['label_ground'][i]:.3f}" if sheet['label_ground'] is not None else "-"]
+        for row, value in enumerate(values):
+            y = band_top - (row + 0.5) * BAND_ROW_HEIGHT
+            _text(msp, value, (x - 1, y), 2.5, rotation=90)
+
+    # Match lines at the window ends, through plan and profile
+    for x, chainage, other in ((sheet['match'][0], sheet['start'], sheet['number'] - 1),
+                               (sheet['match'][1], sheet['end'], sheet['number'] + 1)):
+        if 1 <= other <= sheet['count']:
+            msp.add_line((x, band_top - len(BAND_ROWS) * BAND_ROW_HEIGHT), (x, SHEET_HEIGHT - MARGIN - 20),
+                         dxfattribs={'layer': 'CONSTRUCTION', 'color': 1, 'lineweight': 50})
+            _text(msp, f"MATCH LINE CH {chainage:.1f} - SEE SHEET {other}",
+                  (x + 2, PROFILE_TOP - 40), 3, TextEntityAlignment.BOTTOM_LEFT, rotation=90)
+
+    return sheet['name'], dxf_to_bytes(doc, "sheets.serialize")
+
+
+@traced("sheets.draw")
+def draw_sheets(sheets, workers=None):
+    """[(name, DXF bytes)] for every sheet, drawn concurrently in worker processes
+
+    workers: process count, capped at the CPU count and the number of sheets;
+    1 draws in this process. By default the sheets are drawn here when there
+    are fewer than PARALLEL_SHEETS of them, in one process per CPU otherwise.
+    """
+    cpus = os.cpu_count() or 1
+    if workers is None:
+        workers = cpus if len(sheets) >= PARALLEL_SHEETS else 1
+    workers = min(workers, cpus, len(sheets))
+    if workers <= 1:
+        return [draw_sheet(sheet) for sheet in sheets]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(draw_sheet, sheets, chunksize=max(1, len(sheets) // (4 * workers))))
+
+
+def sheets_zip(files):
+    """Zip archive bytes holding one DXF per sheet"""
+    return dxf_zip(files, "sheets.zip")
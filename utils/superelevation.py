@@ -0,0 +1,202 @@
+"""
+Superelevation and extra widening along a horizontal alignment (IRC:73 / IRC:38)
+
+For every circular curve the design superelevation, its attainment and the
+extra widening are worked out, and turned into station tables of left/right
+cross-fall and widening that utils.corridor.Corridor interpolates. The
+carriageway is rotated about the centreline: the adverse crown is removed on
+the tangent before the transition (tangent runout), then the whole section
+is rotated to full superelevation over the transition (runoff), or over the
+runoff length split 2/3 tangent, 1/3 curve where there is no transition.
+
+Cross slopes are in %, positive falling away from the centreline.
+"""
+import numpy as np
+
+from utils.alignment import ARC, SPIRAL
+from utils.earthwork import iter_survey_rows
+from utils.tracing import traced
+
+# Maximum superelevation (%) by terrain
+MAX_SUPERELEVATION = {'Plain': 7.0, 'Rolling': 7.0, 'Hilly': 10.0, 'Steep': 10.0, 'Snow Bound': 7.0}
+
+# Rate of change of superelevation, 1 in N, by terrain
+RUNOFF_RATE = {'Plain': 150, 'Rolling': 150, 'Hilly': 60, 'Steep': 60, 'Snow Bound': 60}
+
+# Extra widening (m) of a two-lane pavement by upper radius limit (m); single lane in brackets
+EXTRA_WIDENING = [(20, 1.5, 0.9), (40, 1.5, 0.6), (60, 1.2, 0.6), (100, 0.9, 0.0), (300, 0.6, 0.0)]
+
+
+def design_superelevation(design_speed, radius, terrain='Plain', camber=2.5, max_superelevation=None):
+    """Superelevation (%) for 75% of the design speed without friction, e = V^2 / (225 R)
+
+    Never less than the camber, capped at the maximum for the terrain.
+    """
+    e_max = MAX_SUPERELEVATION.get(terrain, 7.0) if max_superelevation is None else max_superelevation
+    e = design_speed ** 2 / (225 * radius) * 100
+    return min(max(e, camber), e_max)
+
+
+def side_friction(design_speed, radius, superelevation):
+    """Lateral friction needed at the full design speed with the given superelevation (%)"""
+    return design_speed ** 2 / (127 * radius) - superelevation / 100
+
+
+def extra_widening(radius, lanes=2):
+    """Extra widening (m) of the pavement on a curve of `radius`, per IRC:73"""
+    for limit, two_lane, single_lane in EXTRA_WIDENING:
+        if radius <= limit:
+            return single_lane if lanes < 2 else two_lane * lanes / 2
+    return 0.0
+
+
+def runoff_length(superelevation, width, terrain='Plain'):
+    """Length (m) to rotate a carriageway of `width` about its centre to `superelevation` (%)"""
+    return superelevation / 100 * width / 2 * RUNOFF_RATE.get(terrain, 150)
+
+
+def curve_list(alignment):
+    """Circular curves of the alignment with their transitions
+
+    One dict per arc: hand (+1 left), radius and the TS, SC, CS and ST
+    chainages (TS = SC and CS = ST where there is no transition).
+    """
+    curves = []
+    for i in np.flatnonzero(alignment['type'] == ARC):
+        k = alignment['k_start'][i]
+        sc = alignment['chainage'][i]
+        cs = sc + alignment['length'][i]
+        ts = sc - alignment['length'][i - 1] if i > 0 and alignment['type'][i - 1] == SPIRAL else sc
+        last = len(alignment['length']) - 1
+        st = cs + alignment['length'][i + 1] if i < last and alignment['type'][i + 1] == SPIRAL else cs
+        curves.append({'hand': 1 if k > 0 else -1, 'radius': float(1 / abs(k)),
+                       'ts': float(ts), 'sc': float(sc), 'cs': float(cs), 'st': float(st)})
+    return curves
+
+
+@traced("superelevation.curves")
+def superelevation_design(alignment, design_speed, carriageway_width, camber=2.5, terrain='Plain',
+                          lanes=2, max_superelevation=None):
+    """Superelevation, widening and attainment chainages for every curve
+
+    Adds to each curve of curve_list(): superelevation (%), friction, widening
+    (m), runoff_required (m) and the chainages where the crown starts to be
+    removed (start), the section is planar (planar_in) and full superelevation
+    is reached (full_in), mirrored on the exit (full_out, planar_out, end).
+    """
+    curves = curve_list(alignment)
+    for curve in curves:
+        e = design_superelevation(design_speed, curve['radius'], terrain, camber, max_superelevation)
+        widening = extra_widening(curve['radius'], lanes)
+        required = runoff_length(e, carriageway_width + widening, terrain)
+        transition = curve['sc'] - curve['ts']
+        if transition > 0:
+            runoff = transition
+            full_in, full_out = curve['sc'], curve['cs']
+        else:
+            # No transition: 2/3 of the runoff on the tangent, 1/3 on the curve
+            runoff = required
+            full_in = curve['sc'] + runoff / 3
+            full_out = curve['cs'] - runoff / 3
+            if full_out < full_in:
+                full_in = full_out = (curve['sc'] + curve['cs']) / 2
+        # Tangent runout at the same rate as the runoff
+        runout = runoff * camber / e
+        curve.update({
+            'superelevation': e,
+            'friction': float(side_friction(design_speed, curve['radius'], e)),
+            'widening': widening,
+            'runoff': runoff,
+            'runoff_required': required,
+            'runout': runout,
+            'start': full_in - runoff - runout,
+            'planar_in': full_in - runoff + runout,
+            'full_in': full_in,
+            'full_out': full_out,
+            'planar_out': full_out + runoff - runout,
+            'end': full_out + runoff + runout,
+        })
+    return curves
+
+
+def _curve_profiles(curve, camber):
+    """Key chainages with (inner, outer) cross-fall (%), and with extra widening (m), of one curve"""
+    e = curve['superelevation']
+    chainage = [curve['start'], curve['planar_in'], curve['full_in'],
+                curve['full_out'], curve['planar_out'], curve['end']]
+    inner = [camber, camber, e, e, camber, camber]
+    # Outer edge rotates at a constant rate from normal camber to -e
+    outer = [camber, -camber, -e, -e, -camber, camber]
+    if e <= camber:
+        inner[1] = inner[4] = e
+    # Widening is attained along the runoff
+    widening = ([curve['full_in'] - curve['runoff'], curve['full_in'], curve['full_out'], curve['full_out'] + curve['runoff']],
+                [0.0, curve['widening'], curve['widening'], 0.0])
+    return chainage, inner, outer, widening
+
+
+@traced("superelevation.tables")
+def superelevation_tables(alignment, curves, camber=2.5):
+    """Station tables for Corridor: (chainage, left %, right %) cross-fall and (chainage, m) widening
+
+    Where the attainment of two curves overlaps (short tangents between
+    reverse curves) the larger departure from normal camber governs.
+    """
+    start, end = alignment['start_chainage'], alignment['end_chainage']
+    keys = [np.array([start, end])]
+    profiles = []
+    for curve in curves:
+        chainage, inner, outer, widening = _curve_profiles(curve, camber)
+        # Planar points are kept in order even for short transitions
+        chainage = np.maximum.accumulate(chainage)
+        profiles.append((chainage, inner, outer, widening, curve['hand']))
+        keys += [chainage, widening[0]]
+    stations = np.unique(np.concatenate(keys))
+
+    left = np.full(len(stations), float(camber))
+    right = np.full(len(stations), float(camber))
+    extra = np.zeros(len(stations))
+    for chainage, inner, outer, widening, hand in profiles:
+        # Left-hand curves fall to the left (inner side left)
+        side_left, side_right = (inner, outer) if hand > 0 else (outer, inner)
+        for values, table in ((side_left, left), (side_right, right)):
+            values = np.interp(stations, chainage, values, left=camber, right=camber)
+            governs = np.abs(values - camber) > np.abs(table - camber)
+            table[governs] = values[governs]
+        extra = np.maximum(extra, np.interp(stations, *widening, left=0.0, right=0.0))
+    return (stations, left, right), (stations, extra)
+
+
+def read_superelevation(source):
+    """Station tables of a superelevation CSV (chainage, left %, right %, widening), as superelevation_tables()
+
+    Reads the station CSV exported by the road plan page, so cross sections
+    surveyed without the alignment get the same rotated, widened template.
+    """
+    data = np.concatenate(list(iter_survey_rows(source, 4)) or [np.empty((0, 4))])
+    if not len(data):
+        raise ValueError("Superelevation table has no stations")
+    data = data[np.argsort(data[:, 0], kind='stable')]
+    return (data[:, 0], data[:, 1], data[:, 2]), (data[:, 0], data[:, 3])
+
+
+def superelevation_stations(corridor, chainage, carriageway_width):
+    """Station-wise cross-fall, widening and carriageway edges for reports and edge profiles
+
+    Edge offsets include half the extra widening on each side; edge heights
+    are relative to the centre line.
+    """
+    chainage = np.asarray(chainage, dtype=float)
+    left, right = corridor.cross_fall(chainage)
+    widening = corridor.widening(chainage)
+    half = carriageway_width / 2 + widening / 2
+    return {
+        'chainage': chainage,
+        'left_fall': left,
+        'right_fall': right,
+        'widening': widening,
+        'left_offset': half,
+        'right_offset': -half,
+        'left_height': -left / 100 * half,
+        'right_height': -right / 100 * half,
+    }
@@ -0,0 +1,422 @@
+"""
+Triangulated ground surface (TIN) for RajLisp road drawings
+
+Scattered survey points (x, y, z) are triangulated by Delaunay's criterion
+entirely with NumPy: points are inserted in parallel rounds - one pending
+point into every triangle that still holds any - and after each round
+illegal edges are flipped in batches of independent flips (Lawson) until
+every triangle's circumcircle is empty. Pending points are carried along
+with the triangle that contains them through splits and flips, so no point
+location search is needed while building.
+
+Level queries use a grid-bucket spatial index over the triangles: each
+triangle is listed in every cell its bounding box touches, and a query
+point only tests the few triangles of its own cell. Levels are interpolated
+linearly (barycentric) in the containing triangle; points outside the
+surface get NaN.
+
+Coordinates are shifted and scaled to a unit box for the predicates and
+jittered by a tiny deterministic amount so regular survey grids (collinear
+and cocircular points) are in general position; the surface keeps the
+original coordinates. The super triangle is only moderately large (larger
+ones lose the predicates to rounding), so the hull triangles it takes with
+it on long, thin surveys are added back afterwards.
+
+Size: about 1.5 s per 100 000 points on one CPU core, growing slightly
+faster than linearly - a million points take around 25 s, so surveys of that
+size are better thinned or split along the corridor before triangulating.
+"""
+import numpy as np
+
+from utils.earthwork import CHUNK_ROWS, iter_survey_rows
+from utils.tracing import traced
+
+SUPER_SCALE = 100.0  # super triangle size relative to the survey extent
+JITTER = 1e-9  # relative perturbation of the triangulation coordinates
+STRAIGHT = 1e-12  # twice the area (unit box) of a boundary turn taken as straight when closing the hull
+QUERY_CHUNK = 262144
+
+
+def _orient(ax, ay, bx, by, cx, cy):
+    """Twice the signed area of triangles abc (positive anticlockwise)"""
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+def _incircle(ax, ay, bx, by, cx, cy, dx, dy):
+    """Positive where d lies inside the circumcircle of the anticlockwise triangle abc"""
+    adx, ady, bdx, bdy, cdx, cdy = ax - dx, ay - dy, bx - dx, by - dy, cx - dx, cy - dy
+    return ((adx * adx + ady * ady) * (bdx * cdy - cdx * bdy) +
+            (bdx * bdx + bdy * bdy) * (cdx * ady - adx * cdy) +
+            (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady))
+
+
+def _relink(tri, nbr, changed, family, x, slot, q):
+    """Restore neighbour links across the outer edges of rewritten triangles
+
+    (x, slot, q): triangle, edge slot and old neighbour of each outer edge.
+    Where q was rewritten too, family[q] lists the triangles now covering it;
+    an unchanged q is pointed back at x across the shared edge.
+    """
+    keep = q >= 0
+    x, slot, q = x[keep], slot[keep], q[keep]
+    e1 = tri[x, (slot + 1) % 3]
+    e2 = tri[x, (slot + 2) % 3]
+    moved = changed[q]
+    target = q.copy()
+    for k in range(family.shape[1]):
+        candidate = family[q, k]
+        rows = tri[np.maximum(candidate, 0)]
+        has = (candidate >= 0) & moved & (rows == e1[:, None]).any(axis=1) & (rows == e2[:, None]).any(axis=1)
+        target = np.where(has, candidate, target)
+    nbr[x, slot] = target
+    still = ~moved
+    xs, qs, a, b = x[still], q[still], e1[still], e2[still]
+    rows = tri[qs]
+    back = np.argmax((rows != a[:, None]) & (rows != b[:, None]), axis=1)
+    nbr[qs, back] = xs
+
+
+def _morton(x, y, bits=16):
+    """Z-order (Morton) key of each point on a 2^bits grid over the extent"""
+    key = np.zeros(len(x), dtype=np.int64)
+    for shift, v in enumerate((x, y)):
+        span = v.max() - v.min() or 1.0
+        cell = ((v - v.min()) / span * (2 ** bits - 1)).astype(np.int64)
+        for bit in range(bits):
+            key |= ((cell >> bit) & 1) << (2 * bit + shift)
+    return key
+
+
+def _first_of(values, scratch):
+    """Mask of the first occurrence of each value (scratch: int array over all values, left dirty)"""
+    order = np.arange(len(values))
+    scratch[values[::-1]] = order[::-1]
+    return scratch[values] == order
+
+
+@traced("tin.triangulate")
+def delaunay(x, y, seed=0):
+    """Delaunay triangles (m, 3) of points (x, y), vertex indices anticlockwise
+
+    Covers the whole convex hull; the hull pockets closed by _close_hull()
+    are triangulated but not necessarily Delaunay. Duplicate points must be
+    removed beforehand (see build_tin()).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n < 3:
+        raise ValueError("Triangulation needs at least three distinct points")
+    rng = np.random.default_rng(seed)
+    centre_x, centre_y = (x.min() + x.max()) / 2, (y.min() + y.max()) / 2
+    extent = max(x.max() - x.min(), y.max() - y.min()) or 1.0
+    # Points and triangles numbered along a Z-order curve keep the gathers cache-friendly
+    order = np.argsort(_morton(x, y), kind='stable')
+    px = np.empty(n + 3)
+    py = np.empty(n + 3)
+    sx = (x[order] - centre_x) / extent
+    sy = (y[order] - centre_y) / extent
+    px[:n] = sx + rng.uniform(-JITTER, JITTER, n)
+    py[:n] = sy + rng.uniform(-JITTER, JITTER, n)
+    px[n:] = [-2 * SUPER_SCALE, 2 * SUPER_SCALE, 0.0]
+    py[n:] = [-SUPER_SCALE, -SUPER_SCALE, 2 * SUPER_SCALE]
+
+    capacity = 2 * (n + 3)
+    tri = np.zeros((capacity, 3), dtype=np.int64)
+    nbr = np.full((capacity, 3), -1, dtype=np.int64)
+    tri[0] = (n, n + 1, n + 2)
+    m = 1
+    pending = np.arange(n)
+    priority = rng.permutation(n)  # random insertion order
+    where = np.zeros(n, dtype=np.int64)  # triangle holding each pending point
+
+    # Scratch arrays over triangles, reset after each use so no step costs O(triangles)
+    scratch = np.zeros(capacity, dtype=np.int64)
+    changed = np.zeros(capacity, dtype=bool)
+    family = np.full((capacity, 3), -1, dtype=np.int64)
+    row = np.full(capacity, -1, dtype=np.int64)
+
+    while len(pending):
+        # One pending point per occupied triangle (its first in the random order)
+        scratch[where] = n
+        np.minimum.at(scratch, where, priority)
+        first = scratch[where] == priority
+        ts = where[first]
+        p = pending[first]
+        k = len(ts)
+        b = m + np.arange(k)
+        c = m + k + np.arange(k)
+        m += 2 * k
+
+        # Split each triangle (v0, v1, v2) about p into (v0, v1, p), (v1, v2, p), (v2, v0, p)
+        v0, v1, v2 = tri[ts].T
+        n0, n1, n2 = nbr[ts].T
+        tri[ts] = np.column_stack((v0, v1, p))
+        tri[b] = np.column_stack((v1, v2, p))
+        tri[c] = np.column_stack((v2, v0, p))
+        nbr[ts] = np.column_stack((b, c, n2))
+        nbr[b] = np.column_stack((c, ts, n0))
+        nbr[c] = np.column_stack((ts, b, n1))
+        changed[ts] = True
+        family[ts] = np.column_stack((ts, b, c))
+        new = np.concatenate((ts, b, c))
+        _relink(tri, nbr, changed, family, new, np.full(3 * k, 2), np.concatenate((n2, n0, n1)))
+        changed[ts] = False
+        family[ts] = -1
+
+        # Carry the other pending points into the part of their triangle they fall in
+        pending, where, priority = pending[~first], where[~first], priority[~first]
+        row[ts] = np.arange(k)
+        r = row[where]
+        row[ts] = -1
+        ox, oy = px[p[r]], py[p[r]]
+        qx, qy = px[pending], py[pending]
+        s0 = _orient(ox, oy, px[v0[r]], py[v0[r]], qx, qy)
+        s1 = _orient(ox, oy, px[v1[r]], py[v1[r]], qx, qy)
+        s2 = _orient(ox, oy, px[v2[r]], py[v2[r]], qx, qy)
+        where = np.where((s1 < 0) & (s0 >= 0), ts[r], np.where((s2 < 0) & (s1 >= 0), b[r], c[r]))
+
+        # Lawson flips in batches of independent edges until the split triangles are legal
+        dirty = new
+        while len(dirty):
+            dirty = dirty[_first_of(dirty, scratch)]
+            changed[dirty] = True
+            t = np.repeat(dirty, 3)
+            slot = np.tile(np.arange(3), len(dirty))
+            u = nbr[t, slot]
+            keep = u >= 0
+            keep[keep] = (t[keep] < u[keep]) | ~changed[u[keep]]  # each shared edge once
+            changed[dirty] = False
+            t, slot, u = t[keep], slot[keep], u[keep]
+            a, e1, e2 = tri[t, slot], tri[t, (slot + 1) % 3], tri[t, (slot + 2) % 3]
+            j = np.argmax((tri[u] != e1[:, None]) & (tri[u] != e2[:, None]), axis=1)
+            w = tri[u, j]
+            illegal = _incircle(px[a], py[a], px[e1], py[e1], px[e2], py[e2], px[w], py[w]) > 0
+            if not illegal.any():
+                break
+            t, slot, u, j, a, e1, e2, w = (v[illegal] for v in (t, slot, u, j, a, e1, e2, w))
+
+            # Independent set: each triangle takes part in at most one flip
+            pair = np.arange(len(t))
+            scratch[t] = len(t)
+            scratch[u] = len(t)
+            np.minimum.at(scratch, t, pair)
+            np.minimum.at(scratch, u, pair)
+            chosen = (scratch[t] == pair) & (scratch[u] == pair)
+            waiting = np.concatenate((t[~chosen], u[~chosen]))
+            t, slot, u, j, a, e1, e2, w = (v[chosen] for v in (t, slot, u, j, a, e1, e2, w))
+
+            # (a, e1, e2) + (w, e2, e1) -> (a, e1, w) + (w, e2, a)
+            nt1, nt2 = nbr[t, (slot + 1) % 3], nbr[t, (slot + 2) % 3]
+            nu1, nu2 = nbr[u, (j + 1) % 3], nbr[u, (j + 2) % 3]
+            tri[t] = np.column_stack((a, e1, w))
+            tri[u] = np.column_stack((w, e2, a))
+            nbr[t] = np.column_stack((nu1, u, nt2))
+            nbr[u] = np.column_stack((nt1, t, nu2))
+            changed[t] = changed[u] = True
+            family[t, :2] = family[u, :2] = np.column_stack((t, u))
+            count = len(t)
+            _relink(tri, nbr, changed, family, np.concatenate((t, t, u, u)), np.repeat([0, 2, 0, 2], count),
+                    np.concatenate((nu1, nt2, nt1, nu2)))
+
+            # Pending points in a flipped pair fall on one side of the new diagonal a-w
+            hit = changed[where]
+            h = where[hit]
+            first_t, second_t = family[h, 0], family[h, 1]
+            ax, ay = px[tri[first_t, 0]], py[tri[first_t, 0]]
+            wx, wy = px[tri[first_t, 2]], py[tri[first_t, 2]]
+            q = pending[hit]
+            where[hit] = np.where(_orient(ax, ay, wx, wy, px[q], py[q]) <= 0, first_t, second_t)
+            changed[t] = changed[u] = False
+            family[t, :2] = family[u, :2] = -1
+            dirty = np.concatenate((t, u, waiting))
+
+    triangles = tri[:m]
+    triangles = triangles[(triangles < n).all(axis=1)]
+    return order[_close_hull(sx, sy, triangles, n)]
+
+
+def _close_hull(px, py, triangles, n):
+    """Add the hull triangles lost with the super triangle's vertices
+
+    Nearly collinear hull points (the long sides of a corridor strip) can
+    have their circumcircle reach a super vertex, leaving thin pockets
+    between the triangulation and the convex hull. The boundary is walked
+    anticlockwise from its leftmost vertex and closed up like a Graham scan:
+    every right turn is a pocket vertex, cut off with one triangle. Turns
+    are taken on the coordinates before jitter, so straight runs of survey
+    points are not closed with zero-area slivers.
+    """
+    a = triangles.ravel()
+    b = np.roll(triangles, -1, axis=1).ravel()
+    edge = a * n + b
+    boundary = ~np.isin(edge, b * n + a)
+    if not boundary.any():
+        return triangles
+    a, b = a[boundary], b[boundary]
+    order = np.argsort(a, kind='stable')
+    a, b = a[order], b[order]
+    first = np.searchsorted(a, np.arange(n))
+    last = np.searchsorted(a, np.arange(n), side='right')
+
+    start = a[np.lexsort((py[a], px[a]))[0]]
+    previous = a[np.flatnonzero(b == start)[0]]  # the edge into the start closes the loop
+    loop, v = [start], start
+    for _ in range(len(a)):
+        nexts = b[first[v]:last[v]]
+        if len(nexts) > 1:  # pinched boundary: keep the outside on the right, turn right most
+            dx, dy = px[v] - px[previous], py[v] - py[previous]
+            turn = np.arctan2(dx * (py[nexts] - py[v]) - dy * (px[nexts] - px[v]),
+                              dx * (px[nexts] - px[v]) + dy * (py[nexts] - py[v]))
+            nexts = nexts[[np.argmin(turn)]]
+        previous, v = v, int(nexts[0])
+        loop.append(v)
+        if v == start:
+            break
+
+    added, stack = [], [loop[0]]
+    for c in loop[1:]:
+        while len(stack) > 1 and _orient(px[stack[-2]], py[stack[-2]], px[stack[-1]], py[stack[-1]],
+                                         px[c], py[c]) < -STRAIGHT:
+            added.append((stack[-2], c, stack[-1]))
+            stack.pop()
+        stack.append(c)
+    if not added:
+        return triangles
+    return np.concatenate((triangles, np.array(added, dtype=triangles.dtype)))
+
+
+@traced("tin.build")
+def build_tin(x, y, z, max_edge=None, cell_triangles=2.0, seed=0):
+    """Ground surface from survey points, with its spatial index
+
+    Repeated (x, y) positions keep their first level. max_edge: drop
+    triangles with any side longer than this (m), e.g. across gaps in the
+    survey or along a concave boundary. Returns a dict with the point
+    arrays, 'triangles' and the 'index' of build_index().
+    """
+    x, y, z = (np.asarray(v, dtype=float).ravel() for v in (x, y, z))
+    _, first = np.unique(np.column_stack((x, y)), axis=0, return_index=True)
+    first = np.sort(first)
+    x, y, z = x[first], y[first], z[first]
+    triangles = delaunay(x, y, seed)
+    if max_edge is not None:
+        tx, ty = x[triangles], y[triangles]
+        sides = np.hypot(tx - np.roll(tx, -1, axis=1), ty - np.roll(ty, -1, axis=1))
+        triangles = triangles[(sides <= max_edge).all(axis=1)]
+    tin = {'x': x, 'y': y, 'z': z, 'triangles': triangles}
+    tin['index'] = build_index(tin, cell_triangles)
+    return tin
+
+
+def read_tin_points(source, chunk_rows=CHUNK_ROWS):
+    """x, y, z arrays from a delimited (x, y, z) survey point file"""
+    chunks = list(iter_survey_rows(source, 3, chunk_rows))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 3))
+    if len(data) < 3:
+        raise ValueError("Ground survey needs at least three points")
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+@traced("tin.index")
+def build_index(tin, cell_triangles=2.0):
+    """Grid buckets of triangles by bounding box, about `cell_triangles` triangles per cell
+
+    Returns the grid origin, cell size and shape, and a CSR list of the
+    triangles touching each cell ('start' offsets into 'triangles').
+    """
+    tx, ty = tin['x'][tin['triangles']], tin['y'][tin['triangles']]
+    x0, y0 = tin['x'].min(), tin['y'].min()
+    width = max(tin['x'].max() - x0, 1e-9)
+    height = max(tin['y'].max() - y0, 1e-9)
+    count = max(len(tx), 1)
+    size = np.sqrt(width * height * cell_triangles / count) or 1.0
+    nx, ny = int(width // size) + 1, int(height // size) + 1
+
+    ix0 = ((tx.min(axis=1) - x0) // size).astype(np.int64)
+    ix1 = ((tx.max(axis=1) - x0) // size).astype(np.int64)
+    iy0 = ((ty.min(axis=1) - y0) // size).astype(np.int64)
+    iy1 = ((ty.max(axis=1) - y0) // size).astype(np.int64)
+    span_x = ix1 - ix0 + 1
+    cells_per = span_x * (iy1 - iy0 + 1)
+    owner = np.repeat(np.arange(len(tx)), cells_per)
+    r = np.arange(len(owner)) - np.repeat(np.cumsum(cells_per) - cells_per, cells_per)
+    cell = (iy0[owner] + r // span_x[owner]) * nx + ix0[owner] + r % span_x[owner]
+    order = np.argsort(cell, kind='stable')
+    return {
+        'x0': float(x0),
+        'y0': float(y0),
+        'size': float(size),
+        'shape': (ny, nx),
+        'start': np.concatenate(([0], np.cumsum(np.bincount(cell, minlength=nx * ny)))),
+        'triangles': owner[order],
+    }
+
+
+def _locate_chunk(tin, qx, qy):
+    """Containing triangle (-1 outside) and barycentric weights for one chunk of query points"""
+    index = tin['index']
+    ny, nx = index['shape']
+    ix = np.floor((qx - index['x0']) / index['size']).astype(np.int64)
+    iy = np.floor((qy - index['y0']) / index['size']).astype(np.int64)
+    inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny) & np.isfinite(qx) & np.isfinite(qy)
+    cell = np.where(inside, iy * nx + ix, 0)
+    begin = index['start'][cell]
+    count = np.where(inside, index['start'][cell + 1] - begin, 0)
+
+    query = np.repeat(np.arange(len(qx)), count)
+    offset = np.arange(len(query)) - np.repeat(np.cumsum(count) - count, count)
+    candidate = index['triangles'][begin[query] + offset]
+    corners = tin['triangles'][candidate]
+    ax, ay = tin['x'][corners[:, 0]], tin['y'][corners[:, 0]]
+    bx, by = tin['x'][corners[:, 1]], tin['y'][corners[:, 1]]
+    cx, cy = tin['x'][corners[:, 2]], tin['y'][corners[:, 2]]
+    px, py = qx[query], qy[query]
+    area = _orient(ax, ay, bx, by, cx, cy)
+    wa = _orient(px, py, bx, by, cx, cy) / area
+    wb = _orient(ax, ay, px, py, cx, cy) / area
+    wc = 1 - wa - wb
+    tolerance = -1e-9
+    hit = (wa >= tolerance) & (wb >= tolerance) & (wc >= tolerance)
+
+    found = np.full(len(qx), -1)
+    weights = np.full((len(qx), 3), np.nan)
+    q, h = query[hit][::-1], np.flatnonzero(hit)[::-1]
+    found[q] = candidate[h]
+    weights[q] = np.column_stack((wa[h], wb[h], wc[h]))
+    return found, weights
+
+
+def locate(tin, qx, qy):
+    """Triangle containing each query point (-1 outside the surface) and its barycentric weights"""
+    qx, qy = np.broadcast_arrays(np.asarray(qx, dtype=float), np.asarray(qy, dtype=float))
+    shape = qx.shape
+    qx, qy = qx.ravel(), qy.ravel()
+    found = np.empty(len(qx), dtype=np.int64)
+    weights = np.empty((len(qx), 3))
+    for start in range(0, len(qx), QUERY_CHUNK):
+        part = slice(start, start + QUERY_CHUNK)
+        found[part], weights[part] = _locate_chunk(tin, qx[part], qy[part])
+    return found.reshape(shape), weights.reshape(shape + (3,))
+
+
+@traced("tin.interpolate")
+def interpolate(tin, qx, qy):
+    """Ground level at each query point (any array shape), NaN outside the surface"""
+    found, weights = locate(tin, qx, qy)
+    if not len(tin['triangles']):
+        return np.full(found.shape, np.nan)
+    corners = tin['triangles'][np.maximum(found, 0)]
+    level = (tin['z'][corners] * weights).sum(axis=-1)
+    return np.where(found >= 0, level, np.nan)
+
+
+def tin_summary(tin):
+    """Point and triangle counts, extent and level range for pages and reports"""
+    return {
+        'points': len(tin['x']),
+        'triangles': len(tin['triangles']),
+        'x_range': (float(tin['x'].min()), float(tin['x'].max())),
+        'y_range': (float(tin['y'].min()), float(tin['y'].max())),
+        'z_range': (float(tin['z'].min()), float(tin['z'].max())),
+    }
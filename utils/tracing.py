@@ -0,0 +1,204 @@
+"""
+Lightweight tracing spans for RajLisp Structural Design Suite
+
+Spans time the hot paths of a submit (calculation, DXF construction,
+serialization, report generation) and are aggregated per process so the
+sidebar diagnostics panel and monitoring can see where the time goes.
+
+Usage:
+    from utils.tracing import span, traced
+
+    @traced("road_plan.dxf")
+    def create_road_plan_dxf(...):
+        ...
+
+    with span("road_plan.serialize", entities=len(msp)):
+        ...
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Most recent individual spans kept for JSON lines export
+MAX_RECENT_SPANS = 5000
+
+_lock = threading.Lock()
+_stats = {}
+_recent = deque(maxlen=MAX_RECENT_SPANS)
+_local = threading.local()
+_listeners = []
+_enabled = os.environ.get('RAJLISP_TRACING', '1') != '0'
+
+
+def set_enabled(enabled):
+    """Turn span recording on or off for this process"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+def add_listener(listener):
+    """Register an object with span_started(name) / span_finished(name, duration)
+
+    Listeners run on the thread that opened the span (used by the memory
+    profiler to attach allocation data to each phase).
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _record(name, start_wall, duration, status, attrs, parent):
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = {'count': 0, 'errors': 0, 'total': 0.0,
+                                   'min': float('inf'), 'max': 0.0, 'last': 0.0}
+        stat['count'] += 1
+        stat['total'] += duration
+        stat['last'] = duration
+        stat['min'] = min(stat['min'], duration)
+        stat['max'] = max(stat['max'], duration)
+        if status != 'ok':
+            stat['errors'] += 1
+
+        _recent.append({
+            'name': name,
+            'parent': parent,
+            'start': start_wall,
+            'duration_ms': duration * 1000,
+            'status': status,
+            'thread': threading.current_thread().name,
+            'attrs': attrs,
+        })
+
+
+class span:
+    """Context manager timing one span; nested spans record their parent"""
+
+    __slots__ = ('name', 'attrs', '_start', '_start_wall', '_parent')
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        if not _enabled:
+            return self
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self._parent = stack[-1] if stack else None
+        stack.append(self.name)
+        for listener in _listeners:
+            listener.span_started(self.name)
+        self._start_wall = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not _enabled or not hasattr(self, '_start'):
+            return False
+        duration = time.perf_counter() - self._start
+        _local.stack.pop()
+        for listener in _listeners:
+            listener.span_finished(self.name, duration)
+        status = 'ok' if exc_type is None else f"error:{exc_type.__name__}"
+        _record(self.name, self._start_wall, duration, status, self.attrs, self._parent)
+        return False
+
+    def set(self, **attrs):
+        """Attach extra attributes (e.g. entity counts) while the span is open"""
+        self.attrs.update(attrs)
+
+
+def traced(name):
+    """Decorator recording every call of the function as a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_stats():
+    """Aggregated span statistics for this process, sorted by total time"""
+    with _lock:
+        rows = []
+        for name, stat in _stats.items():
+            rows.append({
+                'span': name,
+                'count': stat['count'],
+                'errors': stat['errors'],
+                'total_ms': stat['total'] * 1000,
+                'mean_ms': stat['total'] * 1000 / stat['count'],
+                'min_ms': stat['min'] * 1000,
+                'max_ms': stat['max'] * 1000,
+                'last_ms': stat['last'] * 1000,
+            })
+    return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
+
+def get_recent_spans():
+    with _lock:
+        return list(_recent)
+
+
+def reset():
+    """Clear all recorded spans"""
+    with _lock:
+        _stats.clear()
+        _recent.clear()
+
+
+def export_jsonl(path=None):
+    """Recent spans as JSON lines; written to `path` (appending) when given"""
+    lines = '\n'.join(json.dumps(record, default=str) for record in get_recent_spans())
+    if lines:
+        lines += '\n'
+    if path:
+        with open(path, 'a') as f:
+            f.write(lines)
+    return lines
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def export_prometheus(prefix='rajlisp_span'):
+    """Aggregated span statistics in Prometheus text exposition format"""
+    stats = get_stats()
+    lines = [
+        f"# HELP {prefix}_seconds Time spent in instrumented spans",
+        f"# TYPE {prefix}_seconds summary",
+    ]
+    for row in stats:
+        label = f'{{span="{_label(row["span"])}"}}'
+        lines.append(f"{prefix}_seconds_sum{label} {row['total_ms'] / 1000:.6f}")
+        lines.append(f"{prefix}_seconds_count{label} {row['count']}")
+
+    lines += [
+        f"# HELP {prefix}_max_seconds Slowest observed span",
+        f"# TYPE {prefix}_max_seconds gauge",
+    ]
+    for row in stats:
+        lines.append(f'{prefix}_max_seconds{{span="{_label(row["span"])}"}} {row["max_ms"] / 1000:.6f}')
+
+    lines += [
+        f"# HELP {prefix}_errors_total Spans that ended with an exception",
+        f"# TYPE {prefix}_errors_total counter",
+    ]
+    for row in stats:
+        lines.append(f'{prefix}_errors_total{{span="{_label(row["span"])}"}} {row["errors"]}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,197 @@
+"""
+Vertical alignment (design profile) engine for RajLisp road drawings
+
+A profile is a list of PVIs (points of vertical intersection) joined by
+straight grades, with a symmetric parabolic vertical curve centred on every
+interior PVI. Curve lengths are either given or sized from the design speed
+as per IRC:SP:23 (summit curves for stopping sight distance, valley curves
+for headlight sight distance and comfort). Levels, grades and K-values are
+evaluated vectorized over chainage arrays.
+
+Conventions: chainages and levels in metres, grades as fractions (0.02 = 2%),
+K in metres per percent of grade change.
+"""
+import math
+
+import numpy as np
+
+from utils.tracing import traced
+
+# Stopping sight distance (m) by design speed (kmph) - same values as the road pages
+STOPPING_SIGHT_DISTANCE = {30: 30, 50: 60, 60: 85, 80: 120, 100: 160, 120: 200}
+
+# IRC:SP:23 minimum vertical curve length (m) by design speed (kmph)
+MIN_CURVE_LENGTH = [(35, 15), (40, 20), (50, 30), (65, 40), (80, 50), (100, 60), (float('inf'), 70)]
+
+
+def sight_distance(design_speed):
+    """Stopping sight distance for a design speed, interpolated between table values"""
+    speeds = sorted(STOPPING_SIGHT_DISTANCE)
+    return float(np.interp(design_speed, speeds, [STOPPING_SIGHT_DISTANCE[v] for v in speeds]))
+
+
+def minimum_curve_length(design_speed):
+    for speed, length in MIN_CURVE_LENGTH:
+        if design_speed <= speed:
+            return length
+
+
+def k_value(design_speed, curve_type):
+    """Minimum K (m per % grade change) for a summit or valley curve, L >= S case
+
+    Summit: L = A S^2 / 440 (eye 1.2 m, object 0.15 m).
+    Valley: L = A S^2 / (150 + 3.5 S) (headlight 0.75 m, beam 1 deg).
+    """
+    s = sight_distance(design_speed)
+    if curve_type == 'Summit':
+        return s ** 2 / 440
+    return s ** 2 / (150 + 3.5 * s)
+
+
+def vertical_curve_length(design_speed, grade_in, grade_out):
+    """Length (m) of the vertical curve between two grades, rounded up to 5 m"""
+    change = abs(grade_out - grade_in) * 100  # %
+    if change < 1e-9:
+        return 0.0
+    curve_type = 'Summit' if grade_out < grade_in else 'Valley'
+    length = k_value(design_speed, curve_type) * change
+    if curve_type == 'Valley':
+        # Comfort: L = 2 (N V^3 / C)^0.5 with C = 0.6 m/s^3
+        length = max(length, 2 * math.sqrt(change / 100 * (design_speed / 3.6) ** 3 / 0.6))
+    length = max(length, minimum_curve_length(design_speed))
+    return math.ceil(length / 5) * 5
+
+
+@traced("vertical_alignment.build")
+def profile_from_pvis(pvis, design_speed=60):
+    """Design profile through PVIs
+
+    pvis: [(chainage, level), ...] or (chainage, level, curve_length) tuples,
+    in increasing chainage. A missing or None curve length is sized from the
+    design speed; the first and last PVI never carry a curve. Raises ValueError
+    when chainages are not increasing or curves overlap.
+    """
+    if len(pvis) < 2:
+        raise ValueError("Profile needs at least a start and an end PVI")
+    chainage = np.array([float(p[0]) for p in pvis])
+    level = np.array([float(p[1]) for p in pvis])
+    if np.any(np.diff(chainage) <= 0):
+        raise ValueError("PVI chainages must be strictly increasing")
+
+    grade = np.diff(level) / np.diff(chainage)
+    curve_length = np.zeros(len(pvis))
+    for i in range(1, len(pvis) - 1):
+        given = pvis[i][2] if len(pvis[i]) > 2 else None
+        curve_length[i] = float(given) if given is not None else \
+            vertical_curve_length(design_speed, grade[i - 1], grade[i])
+        if grade[i] == grade[i - 1]:
+            curve_length[i] = 0.0
+
+    bvc = chainage - curve_length / 2
+    evc = chainage + curve_length / 2
+    for i in range(1, len(pvis)):
+        if bvc[i] < evc[i - 1] - 1e-6:
+            raise ValueError(f"Vertical curves at ch {chainage[i - 1]:.1f} and {chainage[i]:.1f} overlap")
+    if curve_length[1:-1].size and (bvc[1] < chainage[0] or evc[-2] > chainage[-1]):
+        raise ValueError("Vertical curve runs past the end of the profile")
+
+    curves = np.flatnonzero(curve_length > 0)
+    return {
+        'chainage': chainage,
+        'level': level,
+        'grade': grade,
+        'curve_length': curve_length,
+        'design_speed': design_speed,
+        # Curves only, in chainage order, for the binary search in evaluate()
+        'curve_pvi': curves,
+        'curve_bvc': bvc[curves],
+        'curve_evc': evc[curves],
+    }
+
+
+def straight_profile(length, start_level, end_level, start_chainage=0.0):
+    """Single grade from start to end"""
+    return profile_from_pvis([(start_chainage, start_level), (start_chainage + length, end_level)])
+
+
+def evaluate(profile, chainage):
+    """Design level and grade at each chainage (grades beyond the ends are extended)"""
+    chainage = np.asarray(chainage, dtype=float)
+    pvi_chainage, pvi_level, grade = profile['chainage'], profile['level'], profile['grade']
+
+    segment = np.clip(np.searchsorted(pvi_chainage, chainage, side='right') - 1, 0, len(grade) - 1)
+    level = pvi_level[segment] + grade[segment] * (chainage - pvi_chainage[segment])
+    slope = grade[segment]
+
+    if len(profile['curve_pvi']):
+        c = np.clip(np.searchsorted(profile['curve_bvc'], chainage, side='right') - 1, 0, None)
+        in_curve = (chainage >= profile['curve_bvc'][c]) & (chainage < profile['curve_evc'][c])
+        if np.any(in_curve):
+            pvi = profile['curve_pvi'][c[in_curve]]
+            length = profile['curve_length'][pvi]
+            g1, g2 = grade[pvi - 1], grade[pvi]
+            x = chainage[in_curve] - profile['curve_bvc'][c[in_curve]]
+            level = np.array(level, dtype=float)
+            slope = np.array(slope, dtype=float)
+            level[in_curve] = pvi_level[pvi] - g1 * length / 2 + g1 * x + (g2 - g1) * x ** 2 / (2 * length)
+            slope[in_curve] = g1 + (g2 - g1) * x / length
+    return level, slope
+
+
+def level_at(profile, chainage):
+    return evaluate(profile, chainage)[0]
+
+
+def k_at(profile, chainage):
+    """K-value of the vertical curve at each chainage (inf on straight grades)"""
+    chainage = np.asarray(chainage, dtype=float)
+    k = np.full(chainage.shape, np.inf)
+    if len(profile['curve_pvi']):
+        c = np.clip(np.searchsorted(profile['curve_bvc'], chainage, side='right') - 1, 0, None)
+        in_curve = (chainage >= profile['curve_bvc'][c]) & (chainage < profile['curve_evc'][c])
+        pvi = profile['curve_pvi'][c[in_curve]]
+        change = np.abs(profile['grade'][pvi] - profile['grade'][pvi - 1]) * 100
+        k[in_curve] = profile['curve_length'][pvi] / change
+    return k
+
+
+def profile_vertices(profile, curve_step=5.0):
+    """(chainage, level) vertices of the profile: grades exact, curves sampled every `curve_step` m"""
+    chainages = [profile['chainage'][[0, -1]]]
+    for bvc, evc in zip(profile['curve_bvc'], profile['curve_evc']):
+        steps = max(int(math.ceil((evc - bvc) / curve_step)), 4)
+        chainages.append(np.linspace(bvc, evc, steps + 1))
+    chainages = np.unique(np.concatenate(chainages))
+    return np.column_stack((chainages, level_at(profile, chainages)))
+
+
+def curve_table(profile):
+    """One row per vertical curve for reports and drawings"""
+    rows = []
+    for pvi in profile['curve_pvi']:
+        g1, g2 = profile['grade'][pvi - 1], profile['grade'][pvi]
+        length = profile['curve_length'][pvi]
+        change = (g2 - g1) * 100
+        bvc = profile['chainage'][pvi] - length / 2
+        evc = profile['chainage'][pvi] + length / 2
+        row = {
+            'pvi_chainage': float(profile['chainage'][pvi]),
+            'pvi_level': float(profile['level'][pvi]),
+            'grade_in': float(g1 * 100),
+            'grade_out': float(g2 * 100),
+            'type': 'Summit' if g2 < g1 else 'Valley',
+            'length': float(length),
+            'k': float(length / abs(change)),
+            'k_required': float(k_value(profile['design_speed'], 'Summit' if g2 < g1 else 'Valley')),
+            'bvc_chainage': float(bvc),
+            'evc_chainage': float(evc),
+            'bvc_level': float(level_at(profile, bvc)),
+            'evc_level': float(level_at(profile, evc)),
+        }
+        # High/low point where the grade passes through zero
+        if g1 * g2 < 0:
+            turning = bvc - g1 * length / (g2 - g1)
+            row['turning_chainage'] = float(turning)
+            row['turning_level'] = float(level_at(profile, turning))
+        rows.append(row)
+    return rows